@@ -0,0 +1,22 @@
+from django.contrib import admin
+from .models import UserStatsRollup, DailyApplicationStats, AIUsage
+
+@admin.register(UserStatsRollup)
+class UserStatsRollupAdmin(admin.ModelAdmin):
+    list_display = ['user', 'saved_jobs', 'active_alerts', 'job_matches', 'reconciled_at', 'updated_at']
+    search_fields = ['user__username']
+    readonly_fields = ['reconciled_at', 'updated_at']
+
+@admin.register(DailyApplicationStats)
+class DailyApplicationStatsAdmin(admin.ModelAdmin):
+    list_display = ['user', 'day', 'platform', 'rule', 'attempted', 'submitted', 'failed', 'responded']
+    list_filter = ['day', 'platform']
+    search_fields = ['user__username', 'platform']
+    date_hierarchy = 'day'
+
+@admin.register(AIUsage)
+class AIUsageAdmin(admin.ModelAdmin):
+    list_display = ['purpose', 'user', 'model', 'prompt_tokens', 'completion_tokens', 'estimated_prompt_tokens', 'duration_ms', 'created_at']
+    list_filter = ['purpose', 'model', 'created_at']
+    search_fields = ['user__username']
+    date_hierarchy = 'created_at'
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from analytics.timeseries import rebuild
+
+
+class Command(BaseCommand):
+    help = 'Rebuild daily application funnel buckets from application history'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append', dest='user_ids',
+                            help='Only rebuild buckets for this user id (repeatable)')
+
+    def handle(self, *args, **options):
+        count = rebuild(options['user_ids'])
+        self.stdout.write(
+            self.style.SUCCESS(f'Rebuilt {count} daily application buckets')
+        )
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.2 on 2026-10-19 04:38
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserStatsRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('applications_by_status', models.JSONField(blank=True, default=dict)),
+                ('sessions_by_status', models.JSONField(blank=True, default=dict)),
+                ('active_rules', models.PositiveIntegerField(default=0)),
+                ('saved_jobs', models.PositiveIntegerField(default=0)),
+                ('active_alerts', models.PositiveIntegerField(default=0)),
+                ('job_matches', models.PositiveIntegerField(default=0)),
+                ('top_companies', models.JSONField(blank=True, default=list)),
+                ('reconciled_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='stats_rollup', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
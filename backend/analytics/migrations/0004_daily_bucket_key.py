@@ -0,0 +1,49 @@
+# Generated by Django 5.2.2 on 2026-10-19 05:41
+
+from django.conf import settings
+from django.db import migrations, models
+
+COUNTERS = (
+    'attempted', 'submitted', 'failed', 'responded',
+    'interviews', 'offers', 'rejections',
+    'response_seconds_total', 'response_count',
+)
+
+
+def merge_buckets(apps, schema_editor):
+    """Key buckets by rule and fold duplicates left by concurrent writers into one row"""
+    DailyApplicationStats = apps.get_model('analytics', 'DailyApplicationStats')
+    kept = {}
+    for bucket in DailyApplicationStats.objects.order_by('pk').iterator():
+        bucket.rule_key = bucket.rule_id or 0
+        key = (bucket.user_id, bucket.day, bucket.platform, bucket.rule_key)
+        first = kept.get(key)
+        if first is None:
+            kept[key] = bucket
+            continue
+        for field in COUNTERS:
+            setattr(first, field, getattr(first, field) + getattr(bucket, field))
+        bucket.delete()
+    DailyApplicationStats.objects.bulk_update(list(kept.values()), ['rule_key', *COUNTERS], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0003_ai_usage'),
+        ('automation', '0007_cover_letter_cache'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dailyapplicationstats',
+            name='rule_key',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.RunPython(merge_buckets, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='dailyapplicationstats',
+            constraint=models.UniqueConstraint(fields=('user', 'day', 'platform', 'rule_key'), name='unique_daily_bucket'),
+        ),
+    ]
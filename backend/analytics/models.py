@@ -0,0 +1,115 @@
+from django.db import models
+from django.contrib.auth.models import User
+
+
+class UserStatsRollup(models.Model):
+    """Per-user dashboard counters, maintained incrementally by signals"""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='stats_rollup')
+    
+    # Automation
+    applications_by_status = models.JSONField(default=dict, blank=True)
+    sessions_by_status = models.JSONField(default=dict, blank=True)
+    active_rules = models.PositiveIntegerField(default=0)
+    
+    # Jobs
+    saved_jobs = models.PositiveIntegerField(default=0)
+    active_alerts = models.PositiveIntegerField(default=0)
+    job_matches = models.PositiveIntegerField(default=0)
+    top_companies = models.JSONField(default=list, blank=True)
+    
+    reconciled_at = models.DateTimeField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"Stats for {self.user.username}"
+    
+    @property
+    def total_applications(self):
+        return sum(self.applications_by_status.values())
+    
+    @property
+    def total_sessions(self):
+        return sum(self.sessions_by_status.values())
+
+
+class DailyApplicationStats(models.Model):
+    """Application funnel counters bucketed per user, day, platform and rule"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='daily_application_stats')
+    day = models.DateField()
+    platform = models.CharField(max_length=100, blank=True)
+    rule = models.ForeignKey(
+        'automation.AutomationRule',
+        on_delete=models.SET_NULL,
+        related_name='daily_stats',
+        blank=True,
+        null=True
+    )
+    # Rule id or 0; unlike ``rule`` it is kept when the rule is deleted, so it
+    # can be part of the bucket's unique key
+    rule_key = models.PositiveBigIntegerField(default=0)
+    
+    # Funnel counters (events are bucketed on the day they happened)
+    attempted = models.PositiveIntegerField(default=0)
+    submitted = models.PositiveIntegerField(default=0)
+    failed = models.PositiveIntegerField(default=0)
+    responded = models.PositiveIntegerField(default=0)
+    interviews = models.PositiveIntegerField(default=0)
+    offers = models.PositiveIntegerField(default=0)
+    rejections = models.PositiveIntegerField(default=0)
+    
+    # Time to response, as a running sum so averages can be rolled up
+    response_seconds_total = models.BigIntegerField(default=0)
+    response_count = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'day']),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'day', 'platform', 'rule_key'], name='unique_daily_bucket'),
+        ]
+        ordering = ['-day']
+    
+    def __str__(self):
+        return f"{self.user.username} {self.day} {self.platform or 'all'}"
+
+
+class AIUsage(models.Model):
+    """Tokens spent on one AI call"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='ai_usage', blank=True, null=True)
+    purpose = models.CharField(max_length=50)  # e.g. form_analysis, cover_letter
+    model = models.CharField(max_length=100, blank=True)
+    
+    prompt_tokens = models.PositiveIntegerField(default=0)
+    completion_tokens = models.PositiveIntegerField(default=0)
+    estimated_prompt_tokens = models.PositiveIntegerField(default=0)  # local estimate, to check the budgeting
+    duration_ms = models.PositiveIntegerField(default=0)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'created_at']),
+            models.Index(fields=['purpose', 'created_at']),
+        ]
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"{self.purpose} {self.prompt_tokens}+{self.completion_tokens} tokens"
+    
+    @property
+    def total_tokens(self):
+        return self.prompt_tokens + self.completion_tokens
+    
+    @classmethod
+    def record(cls, user_id, purpose, result):
+        """Store the usage of an llm.ChatResult"""
+        return cls.objects.create(
+            user_id=user_id,
+            purpose=purpose,
+            model=result.model or '',
+            prompt_tokens=result.prompt_tokens,
+            completion_tokens=result.completion_tokens,
+            estimated_prompt_tokens=result.estimated_tokens,
+            duration_ms=int(result.duration * 1000),
+        )
@@ -0,0 +1,144 @@
+"""
+Incrementally maintained per-user statistics.
+
+Signal handlers apply +1/-1 deltas to a user's UserStatsRollup row as
+applications, sessions, rules, saved jobs, alerts and matches change, so the
+dashboard stats endpoints read a single row. ``reconcile`` recomputes rows
+from the raw tables (nightly, and lazily for users without a row yet).
+"""
+import logging
+from collections import Counter, defaultdict
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from .models import UserStatsRollup
+
+logger = logging.getLogger('analytics')
+
+TOP_COMPANIES_LIMIT = 10
+
+# Application statuses reached only after the application went out
+SUBMITTED_STATUSES = (
+    'submitted', 'in_review', 'interview_scheduled', 'rejected',
+    'withdrawn', 'offered', 'accepted',
+)
+
+
+def adjust(user_id, applications=None, sessions=None, **counters):
+    """
+    Apply deltas to a user's rollup row.
+
+    ``applications``/``sessions`` map a status to a delta; other keyword
+    arguments are deltas for the integer counter fields. Users without a row
+    are skipped: their row is built from scratch on first read.
+    """
+    with transaction.atomic():
+        rollup = UserStatsRollup.objects.select_for_update().filter(user_id=user_id).first()
+        if rollup is None:
+            return
+
+        for field, deltas in (('applications_by_status', applications), ('sessions_by_status', sessions)):
+            if not deltas:
+                continue
+            values = getattr(rollup, field)
+            for status, delta in deltas.items():
+                values[status] = max(0, values.get(status, 0) + delta)
+                if not values[status]:
+                    del values[status]
+        for field, delta in counters.items():
+            setattr(rollup, field, max(0, getattr(rollup, field) + delta))
+        rollup.save()
+
+
+def refresh_top_companies(user_id):
+    from jobs.models import SavedJob
+
+    companies = list(
+        SavedJob.objects.filter(user_id=user_id)
+        .values('job__company_name')
+        .annotate(saves=Count('id'))
+        .order_by('-saves', 'job__company_name')
+        .values_list('job__company_name', flat=True)[:TOP_COMPANIES_LIMIT]
+    )
+    UserStatsRollup.objects.filter(user_id=user_id).update(top_companies=companies, updated_at=timezone.now())
+
+
+def _grouped(queryset, field):
+    counts = defaultdict(dict)
+    for row in queryset.values('user_id', field).annotate(total=Count('id')).order_by():
+        counts[row['user_id']][row[field]] = row['total']
+    return counts
+
+
+def _counts(queryset):
+    rows = queryset.values('user_id').annotate(total=Count('id')).order_by()
+    return Counter({row['user_id']: row['total'] for row in rows})
+
+
+def reconcile(user_ids=None):
+    """Recompute rollups from the raw tables for ``user_ids`` (default: everyone)"""
+    from automation.models import AutomationRule, AutomationSession, JobApplication
+    from jobs.models import JobAlert, JobMatch, SavedJob
+
+    users = User.objects.all()
+    if user_ids is not None:
+        users = users.filter(id__in=user_ids)
+    ids = list(users.values_list('id', flat=True))
+
+    def scoped(queryset):
+        return queryset if user_ids is None else queryset.filter(user_id__in=ids)
+
+    applications = _grouped(scoped(JobApplication.objects.all()), 'status')
+    sessions = _grouped(scoped(AutomationSession.objects.all()), 'status')
+    active_rules = _counts(scoped(AutomationRule.objects.filter(is_active=True)))
+    saved_jobs = _counts(scoped(SavedJob.objects.all()))
+    active_alerts = _counts(scoped(JobAlert.objects.filter(is_active=True)))
+    job_matches = _counts(scoped(JobMatch.objects.all()))
+
+    top_companies = defaultdict(list)
+    company_rows = (
+        scoped(SavedJob.objects.all())
+        .values('user_id', 'job__company_name')
+        .annotate(saves=Count('id'))
+        .order_by('user_id', '-saves', 'job__company_name')
+        .values_list('user_id', 'job__company_name')
+    )
+    for user_id, company in company_rows:
+        if len(top_companies[user_id]) < TOP_COMPANIES_LIMIT:
+            top_companies[user_id].append(company)
+
+    now = timezone.now()
+    existing = UserStatsRollup.objects.in_bulk(ids, field_name='user_id')
+    to_create, to_update = [], []
+    for user_id in ids:
+        rollup = existing.get(user_id) or UserStatsRollup(user_id=user_id)
+        rollup.applications_by_status = applications.get(user_id, {})
+        rollup.sessions_by_status = sessions.get(user_id, {})
+        rollup.active_rules = active_rules[user_id]
+        rollup.saved_jobs = saved_jobs[user_id]
+        rollup.active_alerts = active_alerts[user_id]
+        rollup.job_matches = job_matches[user_id]
+        rollup.top_companies = top_companies.get(user_id, [])
+        rollup.reconciled_at = now
+        rollup.updated_at = now
+        (to_update if rollup.pk else to_create).append(rollup)
+
+    fields = [
+        'applications_by_status', 'sessions_by_status', 'active_rules', 'saved_jobs',
+        'active_alerts', 'job_matches', 'top_companies', 'reconciled_at', 'updated_at',
+    ]
+    UserStatsRollup.objects.bulk_update(to_update, fields, batch_size=500)
+    UserStatsRollup.objects.bulk_create(to_create, batch_size=500, ignore_conflicts=True)
+    return len(ids)
+
+
+def get_rollup(user):
+    """The user's rollup row, built on first access"""
+    rollup = UserStatsRollup.objects.filter(user=user).first()
+    if rollup is None:
+        reconcile([user.id])
+        rollup = UserStatsRollup.objects.get(user=user)
+    return rollup
@@ -0,0 +1,142 @@
+"""
+Signal handlers keeping UserStatsRollup rows and the daily application
+funnel in step with the raw tables
+"""
+from django.db.models.signals import post_delete, post_init, post_save, pre_save
+from django.dispatch import receiver
+
+from automation.models import AutomationRule, AutomationSession, JobApplication
+from jobs.models import JobAlert, JobMatch, SavedJob
+from .rollups import adjust, refresh_top_companies
+from .timeseries import record_application_change
+
+_UNKNOWN = object()
+_TRACKED = []
+
+
+def _remember(model, field):
+    """
+    Track the stored value of ``field`` as loaded or last saved, so post_save
+    can diff it without reading the row again. Rows built by hand with a pk or
+    loaded with the field deferred are still read once. refresh_from_db()
+    does not update the tracked value; reconcile_stats_rollups corrects any
+    drift that causes.
+    """
+    attname = model._meta.get_field(field).attname
+
+    def loaded(sender, instance, **kwargs):
+        instance._rollup_stored = instance.__dict__.get(attname, _UNKNOWN)
+
+    def saving(sender, instance, **kwargs):
+        previous = instance._rollup_stored
+        if instance.pk is None:
+            previous = None
+        elif instance._state.adding or previous is _UNKNOWN:
+            previous = model.objects.filter(pk=instance.pk).values_list(field, flat=True).first()
+        instance._rollup_previous = previous
+
+    def saved(sender, instance, **kwargs):
+        instance._rollup_stored = instance.__dict__.get(attname, _UNKNOWN)
+
+    post_init.connect(loaded, sender=model, weak=False, dispatch_uid=f'rollup-loaded-{model.__name__}')
+    pre_save.connect(saving, sender=model, weak=False, dispatch_uid=f'rollup-{model.__name__}')
+    _TRACKED.append((model, saved))
+
+
+_remember(JobApplication, 'status')
+_remember(AutomationSession, 'status')
+_remember(AutomationRule, 'is_active')
+_remember(JobAlert, 'is_active')
+
+
+def _status_deltas(old, new):
+    deltas = {}
+    if old is not None:
+        deltas[old] = deltas.get(old, 0) - 1
+    if new is not None:
+        deltas[new] = deltas.get(new, 0) + 1
+    return {status: delta for status, delta in deltas.items() if delta}
+
+
+@receiver(post_save, sender=JobApplication)
+def application_saved(sender, instance, created, **kwargs):
+    old = None if created else instance._rollup_previous
+    deltas = _status_deltas(old, instance.status)
+    if deltas:
+        adjust(instance.user_id, applications=deltas)
+        record_application_change(instance, old)
+
+
+@receiver(post_delete, sender=JobApplication)
+def application_deleted(sender, instance, **kwargs):
+    adjust(instance.user_id, applications={instance.status: -1})
+
+
+@receiver(post_save, sender=AutomationSession)
+def session_saved(sender, instance, created, **kwargs):
+    old = None if created else instance._rollup_previous
+    deltas = _status_deltas(old, instance.status)
+    if deltas:
+        adjust(instance.user_id, sessions=deltas)
+
+
+@receiver(post_delete, sender=AutomationSession)
+def session_deleted(sender, instance, **kwargs):
+    adjust(instance.user_id, sessions={instance.status: -1})
+
+
+@receiver(post_save, sender=AutomationRule)
+def rule_saved(sender, instance, created, **kwargs):
+    old = False if created else bool(instance._rollup_previous)
+    delta = int(instance.is_active) - int(old)
+    if delta:
+        adjust(instance.user_id, active_rules=delta)
+
+
+@receiver(post_delete, sender=AutomationRule)
+def rule_deleted(sender, instance, **kwargs):
+    if instance.is_active:
+        adjust(instance.user_id, active_rules=-1)
+
+
+@receiver(post_save, sender=JobAlert)
+def alert_saved(sender, instance, created, **kwargs):
+    old = False if created else bool(instance._rollup_previous)
+    delta = int(instance.is_active) - int(old)
+    if delta:
+        adjust(instance.user_id, active_alerts=delta)
+
+
+@receiver(post_delete, sender=JobAlert)
+def alert_deleted(sender, instance, **kwargs):
+    if instance.is_active:
+        adjust(instance.user_id, active_alerts=-1)
+
+
+@receiver(post_save, sender=SavedJob)
+def saved_job_saved(sender, instance, created, **kwargs):
+    if created:
+        adjust(instance.user_id, saved_jobs=1)
+        refresh_top_companies(instance.user_id)
+
+
+@receiver(post_delete, sender=SavedJob)
+def saved_job_deleted(sender, instance, **kwargs):
+    adjust(instance.user_id, saved_jobs=-1)
+    refresh_top_companies(instance.user_id)
+
+
+@receiver(post_save, sender=JobMatch)
+def match_saved(sender, instance, created, **kwargs):
+    if created:
+        adjust(instance.user_id, job_matches=1)
+
+
+@receiver(post_delete, sender=JobMatch)
+def match_deleted(sender, instance, **kwargs):
+    adjust(instance.user_id, job_matches=-1)
+
+
+# After the handlers above have diffed the save
+for model, saved in _TRACKED:
+    post_save.connect(saved, sender=model, weak=False, dispatch_uid=f'rollup-saved-{model.__name__}')
@@ -0,0 +1,16 @@
+from celery import shared_task
+from .rollups import reconcile
+import logging
+
+logger = logging.getLogger('analytics')
+
+
+@shared_task
+def reconcile_stats_rollups():
+    """
+    Nightly recomputation of every user's stats rollup from the raw tables,
+    correcting any drift from missed signals (bulk updates, raw SQL)
+    """
+    count = reconcile()
+    logger.info(f"Reconciled stats rollups for {count} users")
+    return f"Reconciled stats rollups for {count} users"
@@ -0,0 +1,179 @@
+from django.contrib.auth.models import User
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from automation.models import AutomationRule, AutomationSession, JobApplication
+from jobs.models import JobAlert, JobListing, JobSource, SavedJob
+from .models import DailyApplicationStats, UserStatsRollup
+from .rollups import get_rollup, reconcile
+from .timeseries import increment
+
+
+class AnalyticsTestCase(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user('ada', password='secret')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.source = JobSource.objects.create(name='linkedin', base_url='https://linkedin.com')
+
+    def make_listing(self, title='Engineer', company_name='Initech'):
+        return JobListing.objects.create(
+            title=title, company_name=company_name, description='', location='Berlin',
+            source=self.source, source_url='https://linkedin.com/jobs/1'
+        )
+
+    def make_application(self, status='pending', **fields):
+        return JobApplication.objects.create(user=self.user, job=self.make_listing(), status=status, **fields)
+
+
+class RollupTests(AnalyticsTestCase):
+
+    def snapshot(self):
+        rollup = UserStatsRollup.objects.get(user=self.user)
+        return {
+            field: getattr(rollup, field) for field in (
+                'applications_by_status', 'sessions_by_status', 'active_rules',
+                'saved_jobs', 'active_alerts', 'job_matches', 'top_companies',
+            )
+        }
+
+    def test_signals_keep_the_rollup_equal_to_a_recount(self):
+        get_rollup(self.user)
+
+        application = self.make_application()
+        self.make_application('failed')
+        application.status = 'submitted'
+        application.save()
+        AutomationSession.objects.create(user=self.user, target_platform='linkedin', status='running')
+        rule = AutomationRule.objects.create(user=self.user, name='Python')
+        AutomationRule.objects.create(user=self.user, name='Off', is_active=False)
+        JobAlert.objects.create(user=self.user, name='Alert', keywords=['python'])
+        for company in ('Initech', 'Initech', 'Hooli'):
+            SavedJob.objects.create(user=self.user, job=self.make_listing(company_name=company))
+        rule.is_active = False
+        rule.save()
+        self.make_application().delete()
+
+        incremental = self.snapshot()
+        self.assertEqual(incremental['applications_by_status'], {'submitted': 1, 'failed': 1})
+        self.assertEqual(incremental['sessions_by_status'], {'running': 1})
+        self.assertEqual(incremental['active_rules'], 0)
+        self.assertEqual(incremental['saved_jobs'], 3)
+        self.assertEqual(incremental['top_companies'], ['Initech', 'Hooli'])
+
+        reconcile([self.user.id])
+        self.assertEqual(self.snapshot(), incremental)
+
+    def test_saves_diff_the_loaded_status_without_reading_it_again(self):
+        get_rollup(self.user)
+        application = self.make_application()
+        table = JobApplication._meta.db_table
+
+        loaded = JobApplication.objects.get(pk=application.pk)
+        with CaptureQueriesContext(connection) as queries:
+            loaded.status = 'submitted'
+            loaded.save()
+            loaded.status = 'failed'
+            loaded.save()
+        reads = [q['sql'] for q in queries.captured_queries if q['sql'].startswith(f'SELECT "{table}"."status"')]
+        self.assertEqual(reads, [])
+        self.assertEqual(self.snapshot()['applications_by_status'], {'failed': 1})
+
+        # Built by hand with a pk, or loaded without the status: read once
+        JobApplication(
+            pk=application.pk, user=self.user, job=application.job, status='submitted'
+        ).save(update_fields=['status'])
+        deferred = JobApplication.objects.only('id').get(pk=application.pk)
+        deferred.status = 'pending'
+        deferred.save()
+        self.assertEqual(self.snapshot()['applications_by_status'], {'pending': 1})
+        reconcile([self.user.id])
+        self.assertEqual(self.snapshot()['applications_by_status'], {'pending': 1})
+
+    def test_row_is_built_on_first_read(self):
+        self.make_application('submitted')
+        self.assertFalse(UserStatsRollup.objects.filter(user=self.user).exists())
+        self.assertEqual(get_rollup(self.user).applications_by_status, {'submitted': 1})
+
+    def test_stats_endpoints_read_the_rollup(self):
+        self.make_application('submitted')
+        self.make_application('pending')
+        SavedJob.objects.create(user=self.user, job=self.make_listing(company_name='Hooli'))
+        get_rollup(self.user)
+
+        with self.assertNumQueries(1):
+            stats = self.client.get('/api/automation/stats/').data
+        self.assertEqual(
+            (stats['total_applications'], stats['successful_applications'], stats['pending_applications']),
+            (2, 1, 1)
+        )
+        analytics = self.client.get('/api/jobs/analytics/').data
+        self.assertEqual((analytics['total_saved_jobs'], analytics['top_companies']), (1, ['Hooli']))
+
+
+class FunnelTests(AnalyticsTestCase):
+
+    def test_increments_share_one_bucket(self):
+        rule = AutomationRule.objects.create(user=self.user, name='Python')
+        for _ in range(3):
+            increment(self.user.id, 'linkedin', rule.id, attempted=1)
+        increment(self.user.id, 'linkedin', rule.id, submitted=1)
+
+        bucket = DailyApplicationStats.objects.get(user=self.user)
+        self.assertEqual((bucket.attempted, bucket.submitted, bucket.rule_key), (3, 1, rule.id))
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            DailyApplicationStats.objects.create(
+                user=self.user, day=bucket.day, platform='linkedin', rule=rule, rule_key=rule.id
+            )
+
+    def test_deleting_rules_keeps_buckets_apart(self):
+        first = AutomationRule.objects.create(user=self.user, name='First')
+        second = AutomationRule.objects.create(user=self.user, name='Second')
+        for rule in (first, second, None):
+            increment(self.user.id, 'linkedin', rule.id if rule else None, attempted=1)
+
+        first.delete()
+        second.delete()
+        increment(self.user.id, 'linkedin', None, attempted=1)
+        self.assertEqual(
+            sorted(DailyApplicationStats.objects.values_list('rule_id', 'attempted')),
+            [(None, 1), (None, 1), (None, 2)]
+        )
+
+    def test_application_changes_reach_the_report(self):
+        application = self.make_application()
+        application.status = 'submitted'
+        application.save()
+
+        response = self.client.get('/api/analytics/funnel/')
+        self.assertEqual(response.status_code, 200)
+        totals = response.data['totals']
+        self.assertEqual((totals['attempted'], totals['submitted']), (1, 1))
+
+    def test_deleted_rules_stay_apart_in_the_report(self):
+        kept = AutomationRule.objects.create(user=self.user, name='Kept')
+        deleted = AutomationRule.objects.create(user=self.user, name='Deleted')
+        for rule, count in ((kept, 1), (deleted, 2), (None, 3)):
+            for _ in range(count):
+                increment(self.user.id, 'linkedin', rule.id if rule else None, attempted=1)
+        deleted_id = deleted.id
+        deleted.delete()
+
+        response = self.client.get('/api/analytics/funnel/?group_by=rule')
+        self.assertEqual(
+            sorted((row['key'] or 0, row['attempted']) for row in response.data['series']),
+            [(0, 3), (kept.id, 1), (deleted_id, 2)]
+        )
+        response = self.client.get(f'/api/analytics/funnel/?rule={deleted_id}')
+        self.assertEqual(response.data['totals']['attempted'], 2)
+
+    def test_rule_filter_is_validated(self):
+        self.assertEqual(self.client.get('/api/analytics/funnel/?rule=abc').status_code, 400)
+        rule = AutomationRule.objects.create(user=self.user, name='Python')
+        self.make_application(rule=rule)
+        response = self.client.get(f'/api/analytics/funnel/?rule={rule.id}&group_by=rule')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['series'][0]['key'], rule.id)
@@ -0,0 +1,170 @@
+"""
+Daily-bucketed application funnel.
+
+Every application event (attempt, submission, failure, employer response)
+increments a counter on the DailyApplicationStats bucket for its user, day,
+platform and rule at write time. Reports sum buckets, so their cost depends
+on the number of days in range, not on the number of applications.
+"""
+from datetime import timedelta
+
+from django.db.models import F, Sum
+from django.db.models.functions import TruncMonth, TruncWeek
+from django.utils import timezone
+
+from .models import DailyApplicationStats
+
+COUNTERS = (
+    'attempted', 'submitted', 'failed', 'responded',
+    'interviews', 'offers', 'rejections',
+    'response_seconds_total', 'response_count',
+)
+
+# Statuses that mean the employer reacted to a submitted application
+RESPONSE_STATUSES = ('in_review', 'interview_scheduled', 'rejected', 'offered', 'accepted')
+
+GROUPINGS = ('day', 'week', 'month', 'platform', 'rule')
+
+
+def increment(user_id, platform, rule_id, day=None, **deltas):
+    """Add ``deltas`` to the bucket for (user, day, platform, rule)"""
+    day = day or timezone.localdate()
+    # The unique key makes a concurrent create fail over to fetching the winner's row
+    bucket, created = DailyApplicationStats.objects.get_or_create(
+        user_id=user_id, day=day, platform=platform or '', rule_key=rule_id or 0,
+        defaults={'rule_id': rule_id, **deltas}
+    )
+    if not created:
+        DailyApplicationStats.objects.filter(pk=bucket.pk).update(
+            **{field: F(field) + delta for field, delta in deltas.items()}
+        )
+
+
+def application_deltas(application, old_status, now=None):
+    """Counter deltas for an application moving from ``old_status`` to its current status"""
+    new_status = application.status
+    if old_status == new_status:
+        return {}
+
+    deltas = {}
+    if old_status is None:
+        deltas['attempted'] = 1
+    if new_status == 'submitted':
+        deltas['submitted'] = 1
+    elif new_status == 'failed':
+        deltas['failed'] = 1
+
+    if new_status in RESPONSE_STATUSES and old_status not in RESPONSE_STATUSES:
+        deltas['responded'] = 1
+        responded_at = application.response_received_at or now or timezone.now()
+        if application.applied_at:
+            deltas['response_seconds_total'] = max(0, int((responded_at - application.applied_at).total_seconds()))
+            deltas['response_count'] = 1
+    if new_status == 'interview_scheduled':
+        deltas['interviews'] = 1
+    elif new_status == 'offered':
+        deltas['offers'] = 1
+    elif new_status == 'rejected':
+        deltas['rejections'] = 1
+    return deltas
+
+
+def record_application_change(application, old_status):
+    deltas = application_deltas(application, old_status)
+    if deltas:
+        increment(application.user_id, application.job.source.name, application.rule_id, **deltas)
+
+
+def _with_rates(row):
+    submitted = row.get('submitted') or 0
+    responded = row.get('responded') or 0
+    response_count = row.pop('response_count', 0) or 0
+    response_seconds = row.pop('response_seconds_total', 0) or 0
+    row['response_rate'] = round(responded / submitted * 100, 1) if submitted else 0
+    row['avg_hours_to_response'] = round(response_seconds / response_count / 3600, 1) if response_count else None
+    return row
+
+
+def funnel(user, start, end, group_by='day', platform=None, rule_id=None):
+    """Totals and a per-group series of funnel counters between two dates (inclusive)"""
+    buckets = DailyApplicationStats.objects.filter(user=user, day__gte=start, day__lte=end)
+    if platform:
+        buckets = buckets.filter(platform__iexact=platform)
+    if rule_id:
+        # rule_key outlives the rule (rule is SET_NULL), keeping deleted rules' buckets apart
+        buckets = buckets.filter(rule_key=rule_id)
+
+    sums = {field: Sum(field) for field in COUNTERS}
+    totals = buckets.aggregate(**sums)
+    totals = _with_rates({field: totals[field] or 0 for field in COUNTERS})
+
+    if group_by == 'week':
+        grouped = buckets.annotate(key=TruncWeek('day'))
+    elif group_by == 'month':
+        grouped = buckets.annotate(key=TruncMonth('day'))
+    elif group_by == 'platform':
+        grouped = buckets.annotate(key=F('platform'))
+    elif group_by == 'rule':
+        grouped = buckets.annotate(key=F('rule_key'))
+    else:
+        grouped = buckets.annotate(key=F('day'))
+
+    series = [
+        _with_rates(row)
+        for row in grouped.values('key').annotate(**sums).order_by('key')
+    ]
+    if group_by == 'rule':
+        for row in series:
+            row['key'] = row['key'] or None  # rule_key 0: no rule
+    return {'totals': totals, 'series': series}
+
+
+def rebuild(user_ids=None):
+    """
+    Recreate buckets from JobApplication history (for backfills).
+
+    Only the current status of each application is known, so intermediate
+    steps (e.g. an interview before a rejection) are not recovered.
+    """
+    from automation.models import JobApplication
+
+    buckets = DailyApplicationStats.objects.all()
+    applications = JobApplication.objects.select_related('job__source')
+    if user_ids is not None:
+        buckets = buckets.filter(user_id__in=user_ids)
+        applications = applications.filter(user_id__in=user_ids)
+    buckets.delete()
+
+    rows = {}
+    for application in applications.iterator():
+        platform = application.job.source.name
+        created_day = timezone.localdate(application.created_at)
+        events = [(created_day, {'attempted': 1})]
+        if application.status == 'failed':
+            events.append((created_day, {'failed': 1}))
+        elif application.applied_at:
+            events.append((timezone.localdate(application.applied_at), {'submitted': 1}))
+        if application.status in RESPONSE_STATUSES:
+            responded_at = application.response_received_at or application.last_updated
+            deltas = application_deltas(application, 'submitted', now=responded_at)
+            deltas.pop('submitted', None)
+            events.append((timezone.localdate(responded_at), deltas))
+
+        for day, deltas in events:
+            key = (application.user_id, day, platform, application.rule_id)
+            row = rows.setdefault(key, dict.fromkeys(COUNTERS, 0))
+            for field, delta in deltas.items():
+                row[field] += delta
+
+    DailyApplicationStats.objects.bulk_create([
+        DailyApplicationStats(
+            user_id=user_id, day=day, platform=platform, rule_id=rule_id, rule_key=rule_id or 0, **counters
+        )
+        for (user_id, day, platform, rule_id), counters in rows.items()
+    ], batch_size=1000)
+    return len(rows)
+
+
+def default_range(days=30):
+    end = timezone.localdate()
+    return end - timedelta(days=days - 1), end
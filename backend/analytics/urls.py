@@ -0,0 +1,6 @@
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path('funnel/', views.ApplicationFunnelView.as_view(), name='application-funnel'),
+]
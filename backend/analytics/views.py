@@ -0,0 +1,47 @@
+from datetime import date
+from rest_framework import generics, status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from .timeseries import funnel, default_range, GROUPINGS
+
+
+class ApplicationFunnelView(generics.RetrieveAPIView):
+    """Application funnel and trends over a date range, from daily buckets"""
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request, *args, **kwargs):
+        start, end = default_range()
+        try:
+            if request.query_params.get('start'):
+                start = date.fromisoformat(request.query_params['start'])
+            if request.query_params.get('end'):
+                end = date.fromisoformat(request.query_params['end'])
+        except ValueError:
+            return Response({'error': 'start and end must be YYYY-MM-DD dates'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        if start > end:
+            return Response({'error': 'start must not be after end'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        group_by = request.query_params.get('group_by', 'day')
+        if group_by not in GROUPINGS:
+            return Response(
+                {'error': f"group_by must be one of: {', '.join(GROUPINGS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        rule_id = request.query_params.get('rule')
+        if rule_id and not rule_id.isdigit():
+            return Response({'error': 'rule must be a rule id'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        report = funnel(
+            request.user, start, end, group_by,
+            platform=request.query_params.get('platform'),
+            rule_id=rule_id
+        )
+        
+        return Response({
+            'start': start,
+            'end': end,
+            'group_by': group_by,
+            **report
+        })
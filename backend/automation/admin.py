@@ -1,5 +1,8 @@
 from django.contrib import admin
-from .models import AutomationSession, JobApplication, ApplicationFormField, AutomationRule, PlatformCredentials
+from .models import (
+    AutomationSession, SessionCheckpoint, JobApplication, ApplicationFormField, FormAnalysis, CoverLetter,
+    AutomationRule, PlatformCredentials
+)
 
 @admin.register(AutomationSession)
 class AutomationSessionAdmin(admin.ModelAdmin):
@@ -7,6 +10,24 @@ class AutomationSessionAdmin(admin.ModelAdmin):
     list_filter = ['status', 'session_type', 'started_at']
     search_fields = ['user__username', 'session_type', 'target_platform']
 
+@admin.register(SessionCheckpoint)
+class SessionCheckpointAdmin(admin.ModelAdmin):
+    list_display = ['session', 'job', 'state', 'outcome', 'attempts', 'lease_expires_at']
+    list_filter = ['state', 'outcome']
+    search_fields = ['session__user__username', 'job__title']
+
+@admin.register(FormAnalysis)
+class FormAnalysisAdmin(admin.ModelAdmin):
+    list_display = ['user', 'field_count', 'model', 'hits', 'last_used_at', 'expires_at']
+    list_filter = ['model']
+    search_fields = ['user__username', 'key']
+
+@admin.register(CoverLetter)
+class CoverLetterAdmin(admin.ModelAdmin):
+    list_display = ['user', 'model', 'hits', 'created_at', 'last_used_at', 'expires_at']
+    list_filter = ['model']
+    search_fields = ['user__username', 'key', 'text']
+
 @admin.register(JobApplication)
 class JobApplicationAdmin(admin.ModelAdmin):
     list_display = ['user', 'job', 'status', 'applied_at', 'is_automated']
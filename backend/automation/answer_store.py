@@ -0,0 +1,239 @@
+"""
+Form-answer knowledge base.
+
+Application questions recur across jobs ("years of Python", "work
+authorization"). Each user's known answers are gathered into an in-memory
+AnswerIndex from, most trusted last:
+
+    ApplicationFormField suggestions on jobs only this user applied to
+    (those rows belong to the job, not to one applicant)
+    custom_answers of the user's submitted applications (newest last)
+    custom_answers of the user's application templates (default last)
+
+and looked up by normalized question label, exactly or by token overlap,
+before any AI call. Indexes are kept per process under the user's generation
+(in the shared cache), which automation.signals moves whenever an
+application or template of theirs is saved or deleted; a lookup costs one
+cache read, and the index is rebuilt only after such a change.
+"""
+import re
+import threading
+import time
+from collections import Counter, OrderedDict, defaultdict, namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Exists, OuterRef
+
+from analytics.rollups import SUBMITTED_STATUSES
+from profiles.models import ApplicationTemplate
+from .forms import normalize_label
+from .models import ApplicationFormField, JobApplication
+
+Answer = namedtuple('Answer', 'text confidence source')
+
+STOP_WORDS = frozenset(
+    'a an and are as at be by can currently do does for have how i if in is it legally many much of on or '
+    'please the this to what when which will with would you your'.split()
+)
+SYNONYMS = (
+    (re.compile(r'\bunited states(?: of america)?\b|\busa\b|\bu s\b'), 'us'),
+    (re.compile(r'\byrs?\b'), 'years'),
+)
+YES_WORDS = {'yes', 'y', 'true'}
+NO_WORDS = {'no', 'n', 'false'}
+
+CACHE_SIZE = 256  # users whose index a worker keeps
+
+
+def tokens(key):
+    for pattern, replacement in SYNONYMS:
+        key = pattern.sub(replacement, key)
+    return frozenset(word for word in key.split() if word not in STOP_WORDS)
+
+
+def match_option(text, options):
+    """The option an answer stands for, or None if it fits none of them"""
+    if not options:
+        return text
+    wanted = text.strip().lower()
+    lowered = [option.lower() for option in options]
+    if wanted in lowered:
+        return options[lowered.index(wanted)]
+    for words, default in ((YES_WORDS, 'yes'), (NO_WORDS, 'no')):
+        if wanted in words:
+            for option, low in zip(options, lowered):
+                if low.split()[:1] == [default]:
+                    return option
+    numbers = re.findall(r'\d+', wanted)
+    if numbers:
+        value = int(numbers[0])
+        for option, low in zip(options, lowered):
+            bounds = [int(number) for number in re.findall(r'\d+', low)]
+            if len(bounds) >= 2 and bounds[0] <= value <= bounds[1]:
+                return option
+            if len(bounds) == 1 and (bounds[0] == value or ('+' in low and value >= bounds[0])):
+                return option
+    for option, low in zip(options, lowered):
+        if wanted and (low.startswith(wanted) or wanted.startswith(low)):
+            return option
+    return None
+
+
+class AnswerIndex:
+    """Answers by normalized label, with an inverted token index for fuzzy lookup"""
+
+    def __init__(self):
+        self.answers = {}  # normalized label -> Answer
+        self.tokens = {}  # normalized label -> its tokens
+        self.postings = defaultdict(set)  # token -> normalized labels
+
+    def __len__(self):
+        return len(self.answers)
+
+    def add(self, label, text, confidence=1.0, source=''):
+        key = normalize_label(label)
+        text = str(text).strip()
+        if not key or not text:
+            return
+        current = self.answers.get(key)
+        if current is not None and current.confidence > confidence:
+            return
+        self.answers[key] = Answer(text, confidence, source)
+        self.tokens[key] = tokens(key)
+        for token in self.tokens[key]:
+            self.postings[token].add(key)
+
+    def lookup(self, label, options=(), min_similarity=None):
+        """
+        Best known answer to a question, as an Answer whose confidence is
+        scaled by how closely the labels match; None when nothing fits
+        (including answers that are not among the field's ``options``)
+        """
+        if min_similarity is None:
+            min_similarity = settings.JOB_AUTOMATION['ANSWER_MIN_SIMILARITY']
+        key = normalize_label(label)
+        candidates = []
+        if key in self.answers:
+            candidates.append((1.0, key))
+        else:
+            wanted = tokens(key)
+            shared = Counter(other for token in wanted for other in self.postings.get(token, ()))
+            for other, overlap in shared.items():
+                similarity = overlap / (len(wanted) + len(self.tokens[other]) - overlap)
+                if similarity >= min_similarity:
+                    candidates.append((similarity, other))
+            candidates.sort(reverse=True)
+
+        for similarity, other in candidates:
+            answer = self.answers[other]
+            text = match_option(answer.text, tuple(options))
+            if text is not None:
+                return Answer(text, answer.confidence * similarity, answer.source)
+        return None
+
+
+GENERATION_KEY = 'answer-store:generation:{}'
+
+
+def get_generation(user_id):
+    key = GENERATION_KEY.format(user_id)
+    generation = cache.get(key)
+    if generation is None:
+        # A fresh value rather than a restarted count, so an evicted key never
+        # comes back as the generation of an index built before it
+        cache.add(key, time.time_ns(), timeout=None)
+        generation = cache.get(key)
+    return generation
+
+
+def bump_generation(user_id):
+    """Have every process rebuild the user's index on its next lookup"""
+    try:
+        cache.incr(GENERATION_KEY.format(user_id))
+    except ValueError:
+        cache.add(GENERATION_KEY.format(user_id), time.time_ns(), timeout=None)
+
+
+def build_index(user):
+    index = AnswerIndex()
+    min_confidence = settings.JOB_AUTOMATION['ANSWER_MIN_CONFIDENCE']
+
+    other_applicants = JobApplication.objects.filter(job=OuterRef('job')).exclude(user=user)
+    fields = ApplicationFormField.objects.filter(
+        job__applications__user=user,
+        job__applications__status__in=SUBMITTED_STATUSES,
+        confidence_score__gte=min_confidence,
+    ).exclude(suggested_answer='').exclude(Exists(other_applicants)).order_by('created_at').values_list(
+        'field_label', 'suggested_answer', 'confidence_score'
+    )
+    for label, text, confidence in fields:
+        index.add(label, text, confidence, source='form_field')
+
+    applications = JobApplication.objects.filter(
+        user=user, status__in=SUBMITTED_STATUSES
+    ).exclude(custom_answers={}).order_by('created_at').values_list('custom_answers', flat=True)
+    for custom_answers in applications:
+        for label, text in (custom_answers or {}).items():
+            index.add(label, text, 0.9, source='application')
+
+    templates = ApplicationTemplate.objects.filter(profile__user=user).order_by('is_default', 'updated_at')
+    for custom_answers in templates.values_list('custom_answers', flat=True):
+        for label, text in (custom_answers or {}).items():
+            index.add(label, text, 1.0, source='template')
+    return index
+
+
+_indexes = OrderedDict()  # user id -> (generation, AnswerIndex)
+_lock = threading.Lock()
+
+
+def get_index(user):
+    """The user's AnswerIndex, rebuilt only if its sources changed"""
+    generation = get_generation(user.id)
+    with _lock:
+        cached = _indexes.get(user.id)
+        if cached is not None and cached[0] == generation:
+            _indexes.move_to_end(user.id)
+            return cached[1]
+
+    index = build_index(user)
+    with _lock:
+        _indexes[user.id] = (generation, index)
+        _indexes.move_to_end(user.id)
+        if len(_indexes) > CACHE_SIZE:
+            _indexes.popitem(last=False)
+    return index
+
+
+FIELD_TYPES = {choice for choice, _ in ApplicationFormField.FIELD_TYPES}
+
+
+def record_fields(job, fields, suggestions):
+    """
+    Remember the fields of a job's form with the answers suggested for them
+    (``suggestions``: field name -> Answer), skipping fields already recorded.
+    Profile-derived answers (contact details, this job's cover letter) are
+    not kept as suggestions.
+    """
+    known = set(ApplicationFormField.objects.filter(job=job).values_list('field_name', flat=True))
+    new = []
+    for field in fields:
+        if not field.name or field.name in known:
+            continue
+        known.add(field.name)
+        suggestion = suggestions.get(field.name)
+        if suggestion and suggestion.source == 'profile':
+            suggestion = None
+        new.append(ApplicationFormField(
+            job=job,
+            field_name=field.name[:200],
+            field_type=field.type if field.type in FIELD_TYPES else 'text',
+            field_label=field.label[:500],
+            is_required=field.required,
+            css_selector=f'[name="{field.name}"]'[:500],
+            field_options=list(field.options),
+            suggested_answer=suggestion.text if suggestion else '',
+            confidence_score=suggestion.confidence if suggestion else 0.0,
+        ))
+    ApplicationFormField.objects.bulk_create(new)
@@ -0,0 +1,149 @@
+"""
+Content-addressed store for automation artifacts (debug screenshots).
+
+capture() asks the browser for an already compressed frame: WebP through the
+Chromium DevTools protocol, JPEG through Playwright on other browsers. No
+image encoding runs on the automation thread, which only waits for the
+capture itself. Decoding, hashing and writing happen on a background writer
+thread, and capture() returns a future for the stored key. When more writes
+than MAX_PENDING are queued, new captures are dropped, so debug capture
+never holds up an application or piles up frames in memory.
+
+Files are stored once per content under
+ARTIFACT_DIR/<aa>/<bb>/<sha256>.<ext>, so identical frames (a page that did
+not change between captures) share one file. Storing a frame again refreshes
+its modification time. prune() removes files older than
+ARTIFACT_MAX_AGE_DAYS, then the least recently stored until the store fits
+in ARTIFACT_MAX_BYTES.
+"""
+import base64
+import hashlib
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+logger = logging.getLogger('automation')
+
+MAX_PENDING = 16  # frames queued for writing before new captures are dropped
+STALE_TEMP_SECONDS = 60 * 60  # leftovers of interrupted writes
+
+_executor = None
+_executor_lock = threading.Lock()
+_pending = threading.BoundedSemaphore(MAX_PENDING)
+
+
+def _writer():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='artifacts')
+        return _executor
+
+
+def _grab(page, quality):
+    """(data, extension) for the current viewport; data is base64 text from the DevTools protocol"""
+    try:
+        session = page.context.new_cdp_session(page)
+    except Exception:
+        session = None  # not Chromium
+    if session is not None:
+        try:
+            result = session.send('Page.captureScreenshot', {'format': 'webp', 'quality': quality})
+            return result['data'], '.webp'
+        except Exception as e:
+            logger.debug(f"WebP capture unavailable, using JPEG: {str(e)}")
+        finally:
+            session.detach()
+    return page.screenshot(type='jpeg', quality=quality), '.jpg'
+
+
+def capture(page, quality=None):
+    """
+    Capture the page and store it in the background; returns a future for the
+    artifact key, or None when too many writes are pending
+    """
+    if not _pending.acquire(blocking=False):
+        logger.warning("Screenshot dropped: artifact writes are backed up")
+        return None
+    try:
+        data, extension = _grab(page, quality or settings.JOB_AUTOMATION['SCREENSHOT_QUALITY'])
+        return _writer().submit(_store_pending, data, extension)
+    except Exception:
+        _pending.release()
+        raise
+
+
+def _store_pending(data, extension):
+    try:
+        if isinstance(data, str):
+            data = base64.b64decode(data)
+        return store(data, extension)
+    finally:
+        _pending.release()
+
+
+def key_for(data, extension):
+    digest = hashlib.sha256(data).hexdigest()
+    return f'{digest[:2]}/{digest[2:4]}/{digest}{extension}'
+
+
+def path_for(key):
+    return os.path.join(settings.ARTIFACT_DIR, key)
+
+
+def store(data, extension):
+    """Write ``data`` under its content hash (once) and return its key"""
+    key = key_for(data, extension)
+    path = path_for(key)
+    if os.path.exists(path):
+        os.utime(path)
+        return key
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    with open(temp_path, 'wb') as handle:
+        handle.write(data)
+    os.replace(temp_path, path)
+    return key
+
+
+def prune(max_age_days=None, max_bytes=None):
+    """Remove expired artifacts, then the oldest until the store fits; returns the number removed"""
+    max_age_days = max_age_days if max_age_days is not None else settings.JOB_AUTOMATION['ARTIFACT_MAX_AGE_DAYS']
+    max_bytes = max_bytes if max_bytes is not None else settings.JOB_AUTOMATION['ARTIFACT_MAX_BYTES']
+    now = time.time()
+    cutoff = now - max_age_days * 24 * 60 * 60
+
+    files = []
+    removed = 0
+    for directory, _, names in os.walk(settings.ARTIFACT_DIR):
+        for name in names:
+            path = os.path.join(directory, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            temp = name.endswith('.tmp')
+            if stat.st_mtime < cutoff or (temp and stat.st_mtime < now - STALE_TEMP_SECONDS):
+                removed += _remove(path)
+            elif not temp:
+                files.append((stat.st_mtime, stat.st_size, path))
+
+    total = sum(size for _, size, _ in files)
+    for _, size, path in sorted(files):
+        if total <= max_bytes:
+            break
+        removed += _remove(path)
+        total -= size
+    return removed
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+        return 1
+    except FileNotFoundError:
+        return 0
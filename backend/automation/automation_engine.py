@@ -4,13 +4,18 @@ Base automation engine for job application automation
 import time
 import random
 import logging
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from abc import ABC, abstractmethod
 from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeoutError
 from django.conf import settings
 from django.utils import timezone
 from .models import JobApplication, ApplicationFormField
+from . import answer_store, artifacts, checkpoints, circuit_breaker, cover_letters, events, form_cache, forms, prompts
+from .cancellation import SessionCancelled, is_cancelled, POLL_INTERVAL
 from jobs.models import JobListing
-import openai
+from analytics.models import AIUsage
+from hopeforjob import llm
+from profiles import snapshot
 
 logger = logging.getLogger('automation')
 
@@ -18,19 +23,24 @@ logger = logging.getLogger('automation')
 class BaseAutomator(ABC):
     """Base class for job board automation"""
     
-    def __init__(self, user, session):
+    # URL fragments of the platform's captcha / security checkpoint pages
+    CHALLENGE_MARKERS = ()
+    
+    def __init__(self, user, session, profile=None):
         self.user = user
         self.session = session
+        self.profile = profile or snapshot.for_user(user)  # ProfileSnapshot, None without a profile
+        self.checkpoint = None  # leased SessionCheckpoint while applying
+        self.cover_letter = ''  # prepared for the job being applied to
+        self.challenged = False  # set once the platform has served a challenge
+        self.screenshots = []  # (name, taken at, future for the artifact key)
         self.browser = None
         self.page = None
         self.playwright = None
         
-        # Configure OpenAI if available
-        if hasattr(settings, 'OPENAI_API_KEY') and settings.OPENAI_API_KEY:
-            openai.api_key = settings.OPENAI_API_KEY
-            self.ai_enabled = True
-        else:
-            self.ai_enabled = False
+        # AI calls go through the shared process-wide client
+        self.ai_enabled = llm.is_configured()
+        if not self.ai_enabled:
             logger.warning("OpenAI API key not configured. AI features disabled.")
     
     def __enter__(self):
@@ -82,22 +92,73 @@ class BaseAutomator(ABC):
         except Exception as e:
             logger.error(f"Error closing browser: {str(e)}")
     
+    def report_progress(self, event, **data):
+        """Publish a live progress event for the current session"""
+        if self.session is not None:
+            events.publish(self.session, event, **data)
+    
+    def check_cancelled(self):
+        """Abort the current run if the session has been stopped"""
+        if self.session is not None and is_cancelled(self.session.pk):
+            raise SessionCancelled(f"Session {self.session.session_id} was cancelled")
+    
+    def heartbeat(self):
+        """Keep the job's lease alive and abort if the session was cancelled"""
+        if self.checkpoint is not None:
+            checkpoints.renew(self.checkpoint)
+        self.check_cancelled()
+    
+    def detect_challenge(self):
+        """Check whether the current page is a captcha or security checkpoint"""
+        url = self.page.url if self.page else ''
+        if any(marker in url for marker in self.CHALLENGE_MARKERS):
+            if not self.challenged:
+                logger.warning(f"{self.__class__.__name__} was served a challenge: {url}")
+            self.challenged = True
+        return self.challenged
+    
     def random_delay(self, min_seconds=1, max_seconds=3):
-        """Add random delay to mimic human behavior"""
-        delay = random.uniform(min_seconds, max_seconds)
-        time.sleep(delay)
+        """Add random delay to mimic human behavior (cut short if the session is cancelled)"""
+        deadline = time.monotonic() + random.uniform(min_seconds, max_seconds)
+        while True:
+            self.heartbeat()
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            time.sleep(min(remaining, POLL_INTERVAL))
     
-    def take_screenshot(self, name="screenshot"):
-        """Take screenshot for debugging"""
+    def take_screenshot(self, name="screenshot", failure=False):
+        """
+        Take screenshot for debugging (AUTOMATION_SCREENSHOTS: 'off', 'failures'
+        or 'all'); it is stored in the background, see automation.artifacts
+        """
+        mode = settings.JOB_AUTOMATION['SCREENSHOTS']
+        if self.page is None or mode == 'off' or (mode == 'failures' and not failure):
+            return None
         try:
-            timestamp = timezone.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"{name}_{timestamp}.png"
-            screenshot_path = f"logs/screenshots/{filename}"
-            self.page.screenshot(path=screenshot_path)
-            return screenshot_path
+            future = artifacts.capture(self.page)
         except Exception as e:
             logger.error(f"Failed to take screenshot: {str(e)}")
             return None
+        if future is not None:
+            self.screenshots.append((name, timezone.now().isoformat(), future))
+        return future
+    
+    def stored_screenshots(self, timeout=5):
+        """[{'name', 'key', 'taken_at'}] for the screenshots written so far, waiting up to ``timeout`` seconds in total"""
+        deadline = time.monotonic() + timeout
+        stored = []
+        for name, taken_at, future in self.screenshots:
+            try:
+                key = future.result(timeout=max(deadline - time.monotonic(), 0))
+            except FutureTimeoutError:
+                logger.warning(f"Screenshot {name} was not written in time")
+                continue
+            except Exception as e:
+                logger.error(f"Failed to store screenshot {name}: {str(e)}")
+                continue
+            stored.append({'name': name, 'key': key, 'taken_at': taken_at})
+        return stored
     
     def wait_for_element(self, selector, timeout=10000):
         """Wait for element to be visible"""
@@ -116,6 +177,8 @@ class BaseAutomator(ABC):
                 element.click()
                 self.random_delay(0.5, 1.5)
                 return True
+        except SessionCancelled:
+            raise
         except Exception as e:
             logger.error(f"Failed to click element {selector}: {str(e)}")
         return False
@@ -129,57 +192,141 @@ class BaseAutomator(ABC):
                 element.fill(text)
                 self.random_delay(0.5, 1.0)
                 return True
+        except SessionCancelled:
+            raise
         except Exception as e:
             logger.error(f"Failed to fill element {selector}: {str(e)}")
         return False
     
-    def analyze_form_with_ai(self, form_html, job_context):
-        """Use AI to analyze form fields and suggest answers"""
+    def request_form_analysis(self, fields, job_context):
+        """
+        Start AI analysis of form fields; returns (future, fields sent), the future
+        None without AI, so the flow can keep going while the model answers
+        """
+        if not self.ai_enabled:
+            return None, []
+        
+        messages, sent = prompts.form_analysis_messages(fields, job_context, self.get_user_profile_summary())
+        if len(sent) < len(fields):
+            logger.info(f"Form prompt over budget: sending {len(sent)} of {len(fields)} fields")
+        future = llm.submit(messages, max_tokens=prompts.completion_budget(sent), temperature=0.3)
+        return future, sent
+    
+    def wait_for_ai(self, future):
+        """Wait for an AI call, keeping the lease alive and honouring cancellation meanwhile"""
+        try:
+            while True:
+                try:
+                    return future.result(timeout=POLL_INTERVAL)
+                except FutureTimeoutError:
+                    self.heartbeat()
+        except SessionCancelled:
+            future.cancel()
+            raise
+    
+    def analyze_form_with_ai(self, form_html, job_context, fields=None):
+        """
+        Use AI to suggest answers for a form's fields, as {normalized label: {answer, confidence}}.
+        
+        Only ``fields`` (default: every field of the form) are sent, as a compact
+        schema rather than the HTML. Answers are cached by form structure and
+        profile version, so a form seen on an earlier job is answered without
+        calling the model.
+        """
         if not self.ai_enabled:
             return {}
         
         try:
-            prompt = f"""
-            Analyze this job application form and suggest appropriate answers based on the user profile and job context.
-            
-            Job: {job_context.get('title', '')} at {job_context.get('company', '')}
-            User Profile: {self.get_user_profile_summary()}
-            
-            Form HTML:
-            {form_html}
-            
-            Please provide JSON responses for each form field with confidence scores.
-            """
-            
-            response = openai.ChatCompletion.create(
-                model="gpt-4",
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=1000,
-                temperature=0.3
-            )
-            
-            return response.choices[0].message.content
-            
+            if fields is None:
+                fields = forms.extract_fields(form_html)
+            if not fields:
+                return {}
+            key = forms.structure_key(fields, scope=f'{self.user.id}:{self.profile_version()}')
+            answers = form_cache.lookup(key)
+            if answers is not None:
+                return answers
+            
+            future, sent = self.request_form_analysis(fields, job_context)
+            result = self.wait_for_ai(future)
+            AIUsage.record(self.user.id, 'form_analysis', result)
+            answers = forms.parse_answers(result.content, sent)
+            if answers and len(sent) == len(fields):  # a partial answer set would shadow the dropped fields
+                form_cache.store(key, self.user, answers, field_count=len(fields), model=result.model)
+            return answers
+            
+        except SessionCancelled:
+            raise
         except Exception as e:
             logger.error(f"AI form analysis failed: {str(e)}")
             return {}
     
-    def get_user_profile_summary(self):
-        """Get a summary of user profile for AI context"""
+    def profile_answer(self, field, job):
+        """Answers taken straight from the profile (contact details)"""
+        if 'phone' in f'{field.name} {field.label}'.lower():
+            return self.profile.phone_number if self.profile else None
+        return None
+    
+    def answer_fields(self, fields, form_html, job):
+        """
+        Answers for a form's fields as {field name: Answer}: profile details
+        first, then the user's known answers, and AI only for what is left
+        """
+        index = answer_store.get_index(self.user)
+        found = {}
+        unanswered = []
+        for field in fields:
+            if not field.name or field.type == 'file':
+                continue
+            text = self.profile_answer(field, job)
+            answer = answer_store.Answer(text, 1.0, 'profile') if text else index.lookup(field.label, field.options)
+            if answer:
+                found[field.name] = answer
+            else:
+                unanswered.append(field)
+        
+        if unanswered and self.ai_enabled:
+            # The whole form is analysed, so its cache entry is shared whatever the
+            # user's known answers cover; suggestions are only used for what is left
+            suggested = self.analyze_form_with_ai(
+                form_html, {'title': job.title, 'company': job.company_name}, fields=fields
+            )
+            for field in unanswered:
+                suggestion = suggested.get(forms.normalize_label(field.label))
+                text = suggestion and answer_store.match_option(suggestion['answer'], field.options)
+                if text:
+                    found[field.name] = answer_store.Answer(text, suggestion['confidence'], 'ai')
+        return found
+    
+    def fill_field(self, field, text):
+        """Enter an answer into a form field, located by name; returns True if it took"""
+        name = field.name.replace('\\', '\\\\').replace('"', '\\"')
+        selector = f'[name="{name}"]'
         try:
-            profile = self.user.profile
-            return {
-                'name': profile.full_name,
-                'current_position': profile.current_position,
-                'experience_years': profile.years_of_experience,
-                'skills': profile.skills,
-                'location': profile.location,
-                'education': [str(edu) for edu in profile.education.all()[:2]],
-                'experience': [str(exp) for exp in profile.experiences.all()[:3]]
-            }
+            if field.type in ('radio', 'checkbox'):
+                if text not in field.options:
+                    return False
+                self.page.locator(selector).nth(field.options.index(text)).check()
+            elif field.type == 'select':
+                self.page.select_option(selector, label=text)
+            else:
+                return self.safe_fill(selector, text)
+            return True
+        except SessionCancelled:
+            raise
         except Exception as e:
-            logger.error(f"Failed to get user profile summary: {str(e)}")
+            logger.warning(f"Failed to answer field {field.label!r}: {str(e)}")
+            return False
+    
+    def profile_version(self):
+        """Changes whenever the profile that AI answers are based on is edited"""
+        return self.profile.version if self.profile else ''
+    
+    def get_user_profile_summary(self):
+        """Get a summary of user profile for AI context"""
+        if self.profile is None:
+            logger.error(f"Failed to get user profile summary: user {self.user.id} has no profile")
             return {}
+        return self.profile.summary()
     
     @abstractmethod
     def login(self):
@@ -205,8 +352,10 @@ class BaseAutomator(ABC):
 class LinkedInAutomator(BaseAutomator):
     """LinkedIn-specific automation"""
     
-    def __init__(self, user, session):
-        super().__init__(user, session)
+    CHALLENGE_MARKERS = ('/checkpoint/challenge', '/checkpoint/lg/', 'captcha', '/authwall')
+    
+    def __init__(self, user, session, profile=None):
+        super().__init__(user, session, profile)
         self.base_url = "https://www.linkedin.com"
         self.logged_in = False
     
@@ -234,6 +383,10 @@ class LinkedInAutomator(BaseAutomator):
                     if self.safe_click('button[type="submit"]'):
                         self.random_delay(3, 5)
                         
+                        if self.detect_challenge():
+                            logger.error("LinkedIn login blocked by a security challenge")
+                            return False
+                        
                         # Check if login was successful
                         if self.page.url.startswith(f"{self.base_url}/feed") or "challenge" not in self.page.url:
                             self.logged_in = True
@@ -243,6 +396,8 @@ class LinkedInAutomator(BaseAutomator):
             logger.error("LinkedIn login failed")
             return False
             
+        except SessionCancelled:
+            raise
         except Exception as e:
             logger.error(f"LinkedIn login error: {str(e)}")
             return False
@@ -278,6 +433,8 @@ class LinkedInAutomator(BaseAutomator):
             
             return False
             
+        except SessionCancelled:
+            raise
         except Exception as e:
             logger.error(f"LinkedIn job search error: {str(e)}")
             return False
@@ -294,6 +451,15 @@ class LinkedInAutomator(BaseAutomator):
             self.page.goto(job.source_url)
             self.random_delay(2, 4)
             
+            if self.detect_challenge():
+                self.take_screenshot('challenge', failure=True)
+                return {
+                    'success': False,
+                    'error': 'LinkedIn served a security challenge',
+                    'scope': circuit_breaker.PLATFORM,
+                    'logs': ['Navigate to job page', 'Blocked by security challenge']
+                }
+            
             # Look for Easy Apply button
             easy_apply_selector = 'button[aria-label*="Easy Apply"]'
             if self.wait_for_element(easy_apply_selector, timeout=5000):
@@ -306,17 +472,23 @@ class LinkedInAutomator(BaseAutomator):
                 if self.safe_click(apply_selector):
                     return self._handle_external_apply(job, application)
             
+            self.take_screenshot('no_apply_button', failure=True)
             return {
                 'success': False,
                 'error': 'No apply button found',
+                'scope': circuit_breaker.JOB,
                 'logs': ['Navigate to job page', 'No apply options available']
             }
             
+        except SessionCancelled:
+            raise
         except Exception as e:
             logger.error(f"LinkedIn job application error: {str(e)}")
+            self.take_screenshot('apply_error', failure=True)
             return {
                 'success': False,
                 'error': str(e),
+                'scope': circuit_breaker.error_scope(e),
                 'logs': [f'Error: {str(e)}']
             }
     
@@ -335,21 +507,25 @@ class LinkedInAutomator(BaseAutomator):
                 
                 while current_step < max_steps:
                     current_step += 1
+                    self.heartbeat()
                     logs.append(f'Processing step {current_step}')
+                    self.report_progress('step', job_id=job.id, step=current_step, description='Filling application form')
                     
-                    # Check for form fields
-                    form_fields = self.page.query_selector_all('input, select, textarea')
-                    
-                    for field in form_fields:
-                        field_name = field.get_attribute('name') or ''
-                        field_type = field.get_attribute('type') or field.tag_name
-                        
-                        # Fill field based on type and name
-                        if 'phone' in field_name.lower():
-                            field.fill(self.user.profile.phone_number or '')
-                        elif 'cover' in field_name.lower() and field.tag_name == 'textarea':
-                            field.fill(self._generate_cover_letter(job))
-                        # Add more field handling logic
+                    # Answer this step's questions (known answers first, AI only for the rest)
+                    modal = self.page.query_selector('.jobs-easy-apply-modal')
+                    form_html = modal.inner_html() if modal else ''
+                    fields = forms.extract_fields(form_html)
+                    answers = self.answer_fields(fields, form_html, job)
+                    filled = 0
+                    for field in fields:
+                        answer = answers.get(field.name)
+                        if answer and self.fill_field(field, answer.text):
+                            filled += 1
+                            if answer.source != 'profile':
+                                application.custom_answers[field.label] = answer.text  # known answers once submitted
+                    answer_store.record_fields(job, fields, answers)
+                    logs.append(f'Answered {filled} of {len(fields)} fields')
+                    self.take_screenshot(f'step_{current_step}')
                     
                     self.random_delay(1, 2)
                     
@@ -365,6 +541,7 @@ class LinkedInAutomator(BaseAutomator):
                     if submit_button:
                         submit_button.click()
                         logs.append('Application submitted')
+                        self.report_progress('step', job_id=job.id, step=current_step, description='Submitting application')
                         self.random_delay(2, 4)
                         
                         # Verify submission
@@ -377,17 +554,23 @@ class LinkedInAutomator(BaseAutomator):
                     
                     break
                 
+            self.take_screenshot('easy_apply_incomplete', failure=True)
             return {
                 'success': False,
                 'error': 'Failed to complete Easy Apply flow',
+                'scope': circuit_breaker.ACCOUNT,
                 'logs': logs
             }
             
+        except SessionCancelled:
+            raise
         except Exception as e:
             logs.append(f'Error in Easy Apply: {str(e)}')
+            self.take_screenshot('easy_apply_error', failure=True)
             return {
                 'success': False,
                 'error': str(e),
+                'scope': circuit_breaker.error_scope(e),
                 'logs': logs
             }
     
@@ -398,22 +581,22 @@ class LinkedInAutomator(BaseAutomator):
         return {
             'success': False,
             'error': 'External application - manual action required',
+            'scope': circuit_breaker.JOB,
             'logs': ['Redirected to external application page']
         }
     
+    def profile_answer(self, field, job):
+        """Cover letter boxes get the generated letter; other profile details as usual"""
+        if field.type == 'textarea' and 'cover' in f'{field.name} {field.label}'.lower():
+            return self.cover_letter or self._generate_cover_letter(job)
+        return super().profile_answer(field, job)
+    
     def _generate_cover_letter(self, job):
         """Generate cover letter for the job"""
         try:
-            template = self.user.profile.cover_letter_template
-            if not template:
-                template = f"Dear Hiring Manager,\n\nI am interested in the {job.title} position at {job.company_name}."
-            
-            # Simple placeholder replacement
-            cover_letter = template.replace('{job_title}', job.title)
-            cover_letter = cover_letter.replace('{company_name}', job.company_name)
-            cover_letter = cover_letter.replace('{user_name}', self.user.profile.full_name)
-            
-            return cover_letter
+            return cover_letters.letter_for(
+                self.user.id, self.profile, job, cover_letters.template_for(self.profile, self.session)
+            )
             
         except Exception as e:
             logger.error(f"Failed to generate cover letter: {str(e)}")
@@ -454,6 +637,8 @@ class LinkedInAutomator(BaseAutomator):
                 'pages_scraped': page_num + 1
             }
             
+        except SessionCancelled:
+            raise
         except Exception as e:
             logger.error(f"LinkedIn job scraping error: {str(e)}")
             return {
@@ -499,8 +684,8 @@ class LinkedInAutomator(BaseAutomator):
 class IndeedAutomator(BaseAutomator):
     """Indeed-specific automation (placeholder)"""
     
-    def __init__(self, user, session):
-        super().__init__(user, session)
+    def __init__(self, user, session, profile=None):
+        super().__init__(user, session, profile)
         self.base_url = "https://www.indeed.com"
     
     def login(self):
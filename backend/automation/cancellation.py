@@ -0,0 +1,90 @@
+"""
+Cooperative cancellation for automation sessions.
+
+Stopping a session sets a flag in the shared cache and revokes the
+session's queued Celery tasks. Tasks that are already running poll the flag
+between automation steps (and while waiting out human-like delays) and
+abort with SessionCancelled, which closes their browser straight away.
+
+The cache flag is the fast path and only reaches other worker processes
+through a shared cache (CACHE_URL). Without it, or when the flag was
+evicted, pollers still notice the session's cancelled status in the
+database, checked at most every DB_CHECK_INTERVAL seconds per session.
+"""
+import logging
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from . import events
+
+logger = logging.getLogger('automation')
+
+CANCEL_KEY = 'automation:session:{}:cancelled'
+CANCEL_TTL = 60 * 60 * 24
+POLL_INTERVAL = 0.5  # seconds between flag checks while an automator sleeps
+DB_CHECK_INTERVAL = 5  # seconds between database checks of one session's status
+MAX_TRACKED_SESSIONS = 1024
+
+_db_checked = {}  # session pk -> time.monotonic() of its last database check
+
+
+class SessionCancelled(Exception):
+    """Raised inside an automator when its session has been stopped"""
+
+
+def is_cancelled(session_pk):
+    if cache.get(CANCEL_KEY.format(session_pk)):
+        return True
+
+    now = time.monotonic()
+    if now - _db_checked.get(session_pk, -DB_CHECK_INTERVAL) < DB_CHECK_INTERVAL:
+        return False
+    if len(_db_checked) >= MAX_TRACKED_SESSIONS:
+        _db_checked.clear()
+    _db_checked[session_pk] = now
+
+    from .models import AutomationSession
+
+    if AutomationSession.objects.filter(pk=session_pk, status='cancelled').exists():
+        cache.set(CANCEL_KEY.format(session_pk), True, timeout=CANCEL_TTL)
+        return True
+    return False
+
+
+def clear_cancelled(session_pk):
+    cache.delete(CANCEL_KEY.format(session_pk))
+    _db_checked.pop(session_pk, None)
+
+
+def revoke_tasks(task_ids):
+    """Drop queued tasks so they never start a browser"""
+    if not task_ids:
+        return
+    from celery import current_app
+
+    try:
+        current_app.control.revoke(list(task_ids))
+    except Exception as e:
+        logger.warning(f"Failed to revoke {len(task_ids)} automation tasks: {str(e)}")
+
+
+def cancel_session(session):
+    """Flag, revoke and mark ``session`` cancelled; returns the updated session"""
+    from .models import AutomationSession
+
+    cache.set(CANCEL_KEY.format(session.pk), True, timeout=CANCEL_TTL)
+    revoke_tasks(session.task_ids)
+
+    with transaction.atomic():
+        session = AutomationSession.objects.select_for_update().get(pk=session.pk)
+        if session.status in ('pending', 'running'):
+            session.status = 'cancelled'
+            session.completed_at = timezone.now()
+            session.save()
+
+    events.publish_counters(session)
+    logger.info(f"Cancelled automation session {session.session_id} after {session.jobs_processed} jobs")
+    return session
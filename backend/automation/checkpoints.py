@@ -0,0 +1,235 @@
+"""
+Per-job checkpoints for automation sessions.
+
+Every job in a session has a SessionCheckpoint row. A worker claims it
+(pending -> in_flight) under a lease before opening a browser, renews the
+lease while it works and finishes it (-> done) in the same transaction that
+updates the session counters, so each job is counted exactly once however
+often its task is delivered. If a worker dies, its lease expires and the
+reaper puts the job back in the queue; only that one job's work is lost.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from . import events
+from .cancellation import clear_cancelled
+from .models import AutomationSession, SessionCheckpoint
+
+logger = logging.getLogger('automation')
+
+COUNTER_FOR_OUTCOME = {
+    'submitted': 'applications_submitted',
+    'failed': 'applications_failed',
+}
+
+
+def lease_duration():
+    return timedelta(seconds=settings.JOB_AUTOMATION['APPLICATION_LEASE_SECONDS'])
+
+
+def application_delay(session):
+    return session.automation_config.get(
+        'delay_between_applications', settings.JOB_AUTOMATION['MIN_DELAY_BETWEEN_APPLICATIONS']
+    )
+
+
+def create_checkpoints(session, job_ids, rules=None):
+    """``rules`` optionally maps job id -> id of the AutomationRule that selected it"""
+    rules = rules or {}
+    SessionCheckpoint.objects.bulk_create(
+        [SessionCheckpoint(session=session, job_id=job_id, rule_id=rules.get(job_id)) for job_id in job_ids],
+        ignore_conflicts=True
+    )
+
+
+def claim(session, job):
+    """
+    Take the lease on ``job`` for this worker; returns the checkpoint, or None
+    if the job is finished or another live worker holds it
+    """
+    SessionCheckpoint.objects.get_or_create(session=session, job=job)
+    now = timezone.now()
+    claimed = SessionCheckpoint.objects.filter(
+        Q(state='pending') | Q(state='in_flight', lease_expires_at__lt=now),
+        session=session, job=job
+    ).update(state='in_flight', lease_expires_at=now + lease_duration(), attempts=F('attempts') + 1, updated_at=now)
+    if not claimed:
+        return None
+    return SessionCheckpoint.objects.get(session=session, job=job)
+
+
+def renew(checkpoint):
+    """Extend the lease once half of it has run out (cheap to call often)"""
+    now = timezone.now()
+    if checkpoint.lease_expires_at - now > lease_duration() / 2:
+        return
+    checkpoint.lease_expires_at = now + lease_duration()
+    SessionCheckpoint.objects.filter(pk=checkpoint.pk, state='in_flight').update(
+        lease_expires_at=checkpoint.lease_expires_at, updated_at=now
+    )
+
+
+def release(checkpoint):
+    """Hand an unfinished job back (e.g. on cancellation) so a resume picks it up"""
+    SessionCheckpoint.objects.filter(pk=checkpoint.pk, state='in_flight').update(
+        state='pending', lease_expires_at=None, not_before=None, updated_at=timezone.now()
+    )
+
+
+def postpone(checkpoint, countdown):
+    """
+    Hand a claimed job back and queue it again in ``countdown`` seconds,
+    without counting the attempt; returns the new task id
+    """
+    from .tasks import apply_to_job_task
+
+    now = timezone.now()
+    not_before = now + timedelta(seconds=countdown)
+    SessionCheckpoint.objects.filter(pk=checkpoint.pk, state='in_flight').update(
+        state='pending', lease_expires_at=None, not_before=not_before, attempts=F('attempts') - 1, updated_at=now
+    )
+    session = checkpoint.session
+    result = apply_to_job_task.apply_async(
+        (session.user_id, checkpoint.job_id, str(session.session_id)), countdown=countdown
+    )
+    SessionCheckpoint.objects.filter(pk=checkpoint.pk, state='pending').update(task_id=result.id)
+    return result.id
+
+
+def finish(checkpoint, outcome):
+    """
+    Mark the job done and count it on the session; returns the updated session.
+
+    A checkpoint that is no longer in flight (already finished by a duplicate
+    delivery) is not counted again.
+    """
+    with transaction.atomic():
+        session = AutomationSession.objects.select_for_update().get(pk=checkpoint.session_id)
+        finished = SessionCheckpoint.objects.filter(pk=checkpoint.pk, state='in_flight').update(
+            state='done', outcome=outcome, lease_expires_at=None, updated_at=timezone.now()
+        )
+        if not finished:
+            return session
+
+        session.jobs_processed += 1
+        if outcome in COUNTER_FOR_OUTCOME:
+            field = COUNTER_FOR_OUTCOME[outcome]
+            setattr(session, field, getattr(session, field) + 1)
+        if session.status == 'running' and session.jobs_processed >= session.total_jobs_targeted:
+            session.status = 'completed'
+            session.completed_at = timezone.now()
+        session.save()
+    return session
+
+
+def enqueue(session, checkpoints):
+    """Queue one staggered application task per checkpoint; returns the task ids"""
+    from .tasks import apply_to_job_task
+
+    delay = application_delay(session)
+    now = timezone.now()
+    task_ids = []
+    for position, checkpoint in enumerate(checkpoints):
+        countdown = position * delay
+        result = apply_to_job_task.apply_async(
+            (session.user_id, checkpoint.job_id, str(session.session_id)), countdown=countdown
+        )
+        checkpoint.task_id = result.id
+        checkpoint.not_before = now + timedelta(seconds=countdown)
+        task_ids.append(result.id)
+    SessionCheckpoint.objects.bulk_update(checkpoints, ['task_id', 'not_before'])
+
+    # Every unfinished job's current task, including those queued earlier and
+    # not requeued now, so stopping the session revokes all of them. Plain
+    # update: application tasks may already be saving counters on this row.
+    # updated_at moves too, as it drives the session's ETag and Last-Modified
+    queued = list(
+        session.checkpoints.exclude(state='done').exclude(task_id='').order_by('id').values_list('task_id', flat=True)
+    )
+    AutomationSession.objects.filter(pk=session.pk).update(task_ids=queued, updated_at=timezone.now())
+    return task_ids
+
+
+def resume(session):
+    """
+    Restart a cancelled or failed session with only its unfinished jobs, or
+    requeue the stalled jobs of a running one (an expired lease, or a pending
+    job whose task was due but never started); returns the number of jobs
+    queued
+    """
+    now = timezone.now()
+    if session.status != 'running':
+        clear_cancelled(session.pk)
+    SessionCheckpoint.objects.filter(session=session, state='in_flight', lease_expires_at__lt=now).update(
+        state='pending', lease_expires_at=None, not_before=None
+    )
+    pending = session.checkpoints.filter(state='pending')
+    if session.status == 'running':
+        pending = pending.filter(Q(not_before__isnull=True) | Q(not_before__lt=now))
+    pending = list(pending.order_by('id'))
+    if not pending:
+        return 0
+
+    if session.status != 'running':
+        with transaction.atomic():
+            session = AutomationSession.objects.select_for_update().get(pk=session.pk)
+            session.status = 'running'
+            session.completed_at = None
+            session.save()
+
+    enqueue(session, pending)
+    events.publish_counters(session)
+    logger.info(f"Resumed automation session {session.session_id} with {len(pending)} unfinished jobs")
+    return len(pending)
+
+
+def reap_stale():
+    """
+    Recover jobs of running sessions whose worker died.
+
+    Expired leases go back to pending (or are failed once they have used up
+    their attempts, since the job itself may be what kills the worker), and
+    pending jobs whose task is long overdue are queued again. Returns
+    (expired leases, jobs requeued).
+    """
+    now = timezone.now()
+    max_attempts = settings.JOB_AUTOMATION['MAX_APPLICATION_ATTEMPTS']
+
+    expired = list(SessionCheckpoint.objects.filter(
+        session__status='running', state='in_flight', lease_expires_at__lt=now
+    ))
+    for checkpoint in expired:
+        if checkpoint.attempts >= max_attempts:
+            logger.warning(f"Giving up on job {checkpoint.job_id} after {checkpoint.attempts} attempts")
+            events.publish_counters(finish(checkpoint, 'failed'))
+        else:
+            SessionCheckpoint.objects.filter(pk=checkpoint.pk, state='in_flight', lease_expires_at__lt=now).update(
+                state='pending', lease_expires_at=None, not_before=None, updated_at=now
+            )
+
+    overdue = SessionCheckpoint.objects.filter(session__status='running', state='pending').filter(
+        Q(not_before__isnull=True) | Q(not_before__lt=now - lease_duration())
+    ).order_by('session_id', 'id')
+    by_session = {}
+    for checkpoint in overdue:
+        by_session.setdefault(checkpoint.session_id, []).append(checkpoint)
+    for session in AutomationSession.objects.filter(pk__in=by_session):
+        enqueue(session, by_session[session.pk])
+
+    # Sessions whose jobs are all done but were never marked complete
+    finished = AutomationSession.objects.filter(status='running').annotate(
+        total=Count('checkpoints'),
+        unfinished=Count('checkpoints', filter=~Q(checkpoints__state='done'))
+    ).filter(total__gt=0, unfinished=0)
+    for session in finished:
+        session.status = 'completed'
+        session.completed_at = now
+        session.save()
+        events.publish_counters(session)
+
+    return len(expired), sum(len(checkpoints) for checkpoints in by_session.values())
@@ -0,0 +1,205 @@
+"""
+Circuit breakers for job platforms.
+
+Every application task goes through two breakers kept in the shared cache:
+one for the platform and one for the user's account on it. A breaker opens
+when the failure rate over the recent window crosses the threshold, or
+straight away when the platform serves a challenge (captcha, security
+checkpoint). While it is open, tasks are deferred instead of starting a
+browser; how long it stays open doubles with every consecutive trip. Once
+the open period has passed, a single probe task is let through (half-open):
+its success closes the breaker, its failure opens it again for longer.
+
+Not every failure says something about the platform. A failure's scope
+decides which breakers count it: challenges, timeouts and navigation or
+browser errors count against both; login and application-flow failures
+only against the account; a listing without a usable apply button against
+neither.
+"""
+import logging
+import random
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from playwright.sync_api import Error as PlaywrightError
+
+logger = logging.getLogger('automation')
+
+STATE_KEY = 'circuit:{}:state'
+PROBE_KEY = 'circuit:{}:probe'
+COUNT_KEY = 'circuit:{}:{}:{}'  # name, bucket, calls|failures
+BUCKET_SECONDS = 60
+
+# Failure scopes: which breakers a failed call counts against
+PLATFORM = 'platform'  # challenges, timeouts, navigation and browser errors
+ACCOUNT = 'account'  # login and application-flow failures of one account
+JOB = 'job'  # the listing itself (no apply button, external application)
+
+
+class CircuitOpen(Exception):
+    """Raised when a platform (or account) is not accepting calls yet"""
+
+    def __init__(self, name, retry_after):
+        super().__init__(f"Circuit for {name} is open; retry in {retry_after:.0f}s")
+        self.name = name
+        self.retry_after = retry_after
+
+
+def _config():
+    return settings.JOB_AUTOMATION['CIRCUIT_BREAKER']
+
+
+def breaker_names(platform, user_id=None):
+    """The breakers guarding an automation call: platform, then account"""
+    platform = platform.lower()
+    names = [platform]
+    if user_id is not None:
+        names.append(f'{platform}:account:{user_id}')
+    return names
+
+
+def _buckets(now):
+    current = int(now // BUCKET_SECONDS)
+    return range(current - _config()['WINDOW_SECONDS'] // BUCKET_SECONDS, current + 1)
+
+
+def _count(name, kind, now):
+    key = COUNT_KEY.format(name, int(now // BUCKET_SECONDS), kind)
+    cache.add(key, 0, timeout=_config()['WINDOW_SECONDS'] + BUCKET_SECONDS)
+    try:
+        cache.incr(key)
+    except ValueError:  # expired between add and incr
+        cache.set(key, 1, timeout=_config()['WINDOW_SECONDS'] + BUCKET_SECONDS)
+
+
+def _window_keys(name, now):
+    return [COUNT_KEY.format(name, bucket, kind) for bucket in _buckets(now) for kind in ('calls', 'failures')]
+
+
+def failure_rate(name, now=None):
+    """(calls, failure rate) over the sliding window"""
+    now = now or time.time()
+    counts = cache.get_many(_window_keys(name, now))
+    calls = sum(value for key, value in counts.items() if key.endswith(':calls'))
+    failures = sum(value for key, value in counts.items() if key.endswith(':failures'))
+    return calls, (failures / calls if calls else 0.0)
+
+
+def get_state(name):
+    """{'state': 'open', 'trips': n, 'until': timestamp} or None when closed"""
+    return cache.get(STATE_KEY.format(name))
+
+
+def is_open(name):
+    """True while calls are being deferred (the probe window does not count as open)"""
+    state = get_state(name)
+    return bool(state) and state['until'] > time.time()
+
+
+def _open(name, trips, reason):
+    config = _config()
+    duration = min(config['OPEN_SECONDS'] * 2 ** (trips - 1), config['MAX_OPEN_SECONDS'])
+    until = time.time() + duration
+    # Keep the trip count well past the open period so repeated trips keep backing off
+    cache.set(STATE_KEY.format(name), {'state': 'open', 'trips': trips, 'until': until}, timeout=duration * 4)
+    cache.delete(PROBE_KEY.format(name))
+    logger.warning(f"Circuit for {name} opened for {duration:.0f}s (trip {trips}): {reason}")
+
+
+def _retry_after(state, now):
+    """Time until the breaker half-opens, spread with jitter so deferred tasks don't return together"""
+    remaining = max(state['until'] - now, 0)
+    spread = min(_config()['OPEN_SECONDS'] * 2 ** (state['trips'] - 1), _config()['MAX_OPEN_SECONDS'])
+    return remaining + random.uniform(0, spread)
+
+
+def acquire(names, probe_id=''):
+    """
+    Ask every breaker in ``names`` for permission to run one call.
+
+    Returns the names this call is the half-open probe for (pass them back to
+    record_success/record_failure); raises CircuitOpen if any breaker refuses.
+    """
+    now = time.time()
+    probes = []
+    try:
+        for name in names:
+            state = get_state(name)
+            if not state:
+                continue
+            if state['until'] > now:
+                raise CircuitOpen(name, _retry_after(state, now))
+            if not cache.add(PROBE_KEY.format(name), probe_id or 'probe',
+                             timeout=settings.JOB_AUTOMATION['APPLICATION_LEASE_SECONDS']):
+                raise CircuitOpen(name, random.uniform(0, _config()['OPEN_SECONDS']))
+            probes.append(name)
+    except CircuitOpen:
+        # Don't hold a probe slot for a call that isn't going to run
+        release_probes(probes)
+        raise
+    return probes
+
+
+def release_probes(probes):
+    """Give up probe slots without a verdict (e.g. the call was cancelled)"""
+    cache.delete_many([PROBE_KEY.format(name) for name in probes])
+
+
+def record_success(names, probes=()):
+    now = time.time()
+    for name in names:
+        _count(name, 'calls', now)
+        if name in probes:
+            # Start the failure window afresh, or the failures that tripped it would trip it again
+            cache.delete_many([STATE_KEY.format(name), PROBE_KEY.format(name)] + _window_keys(name, now))
+            logger.info(f"Circuit for {name} closed after a successful probe")
+
+
+def record_failure(names, probes=(), challenge=False, reason=''):
+    """Count a failed call; trips the account breaker at once on a challenge"""
+    config = _config()
+    now = time.time()
+    for name in names:
+        _count(name, 'calls', now)
+        _count(name, 'failures', now)
+
+        state = get_state(name)
+        trips = (state['trips'] if state else 0) + 1
+        if name in probes:
+            _open(name, trips, f"probe failed ({reason})")
+            continue
+        if state and state['until'] > now:
+            continue  # already open
+        if challenge and ':account:' in name:
+            _open(name, trips, f"challenge detected ({reason})")
+            continue
+        calls, rate = failure_rate(name, now)
+        if calls >= config['MIN_CALLS'] and rate >= config['FAILURE_RATE']:
+            _open(name, trips, f"{rate:.0%} of {calls} calls failed ({reason})")
+
+
+def error_scope(error):
+    """Scope of a failure raised as ``error``"""
+    if isinstance(error, (PlaywrightError, OSError, TimeoutError)):
+        return PLATFORM
+    return ACCOUNT
+
+
+def record_scoped_failure(names, probes, scope, challenge=False, reason=''):
+    """
+    Count a failed call against the breakers its ``scope`` implicates; the
+    others are left alone and give up their probe slot without a verdict
+    """
+    if scope == PLATFORM:
+        failing = list(names)
+    elif scope == ACCOUNT:
+        failing = [name for name in names if ':account:' in name]
+    else:
+        failing = []
+    record_failure(failing, [name for name in probes if name in failing], challenge=challenge, reason=reason)
+    release_probes([name for name in probes if name not in failing])
+
+
+def reset(name):
+    cache.delete_many([STATE_KEY.format(name), PROBE_KEY.format(name)] + _window_keys(name, time.time()))
@@ -0,0 +1,308 @@
+"""
+Condition language for AutomationRule.conditions.
+
+A condition is a JSON tree:
+
+    {"all": [condition, ...]}    {"any": [condition, ...]}    {"not": condition}
+    {"field": "salary", "op": "gte", "value": 120000}
+
+Fields and the operators they accept:
+
+    title, company, location, platform    eq, ne, in, not_in, contains (case-insensitive)
+    place_id, employment_type,
+    experience_level, difficulty           eq, ne, in, not_in
+    salary, salary_min, salary_max         eq, ne, lt, lte, gt, gte, between ([low, high])
+    remote, auto_applicable                eq
+    skills                                 contains, overlaps (required or preferred skills)
+
+``salary`` is the top of the advertised range, or its bottom if that is all
+there is. Case-insensitive comparisons fold ASCII letters only, as SQLite's
+LIKE does, so both compiled forms agree on non-ASCII text. The older flat form ({"keywords": [...], "remote_only": true, ...})
+is still accepted and rewritten into this language.
+
+compile_conditions() turns a tree into a Django ``Q`` (to filter listings in
+the database) and a Python predicate over listing rows (dicts with the
+fields in rules.LISTING_FIELDS); both select the same listings.
+"""
+import json
+import string
+from collections import namedtuple
+
+from django.db.models import Q
+
+CompiledConditions = namedtuple('CompiledConditions', 'q matches')
+
+# field name: (type, listing field or (primary, fallback) fields)
+FIELDS = {
+    'title': ('text', 'title'),
+    'company': ('text', 'company_name'),
+    'location': ('text', 'location'),
+    'platform': ('text', 'source__name'),
+    'place_id': ('choice', 'place_id'),
+    'employment_type': ('choice', 'employment_type'),
+    'experience_level': ('choice', 'experience_level'),
+    'difficulty': ('choice', 'auto_apply_difficulty'),
+    'salary': ('number', ('salary_max', 'salary_min')),
+    'salary_min': ('number', 'salary_min'),
+    'salary_max': ('number', 'salary_max'),
+    'remote': ('bool', 'is_remote'),
+    'auto_applicable': ('bool', 'is_auto_applicable'),
+    'skills': ('list', ('required_skills', 'preferred_skills')),
+}
+
+OPERATORS = {
+    'text': ('eq', 'ne', 'in', 'not_in', 'contains'),
+    'choice': ('eq', 'ne', 'in', 'not_in'),
+    'number': ('eq', 'ne', 'lt', 'lte', 'gt', 'gte', 'between'),
+    'bool': ('eq',),
+    'list': ('contains', 'overlaps'),
+}
+
+NUMBER_LOOKUPS = {
+    'eq': ('exact', lambda x, v: x == v),
+    'lt': ('lt', lambda x, v: x < v),
+    'lte': ('lte', lambda x, v: x <= v),
+    'gt': ('gt', lambda x, v: x > v),
+    'gte': ('gte', lambda x, v: x >= v),
+}
+
+ASCII_LOWER = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
+TREE_KEYS = {'all', 'any', 'not', 'field', 'op', 'value'}
+CRITERIA_KEYS = {
+    'keywords', 'exclude_keywords', 'companies', 'exclude_companies', 'employment_types',
+    'experience_levels', 'platforms', 'locations', 'remote_only', 'min_salary',
+}
+
+# ~Q(pk__in=[]) rather than Q(): an empty Q vanishes when OR-ed with others
+MATCH_ALL = CompiledConditions(~Q(pk__in=[]), lambda listing: True)
+MATCH_NONE = CompiledConditions(Q(pk__in=[]), lambda listing: False)
+
+
+class ConditionError(ValueError):
+    """Raised for conditions that are not valid in the rule language"""
+
+
+def _fold(text):
+    text = text or ''
+    return text.lower() if text.isascii() else text.translate(ASCII_LOWER)
+
+
+def _negate(compiled):
+    matches = compiled.matches
+    return CompiledConditions(~compiled.q, lambda listing: not matches(listing))
+
+
+def _combine(children, require_all):
+    if not children:
+        return MATCH_ALL if require_all else MATCH_NONE
+    if len(children) == 1:
+        return children[0]
+
+    q = Q() if require_all else Q(pk__in=[])
+    for child in children:
+        q = (q & child.q) if require_all else (q | child.q)
+    predicates = tuple(child.matches for child in children)
+
+    if require_all:
+        def matches(listing):
+            for predicate in predicates:
+                if not predicate(listing):
+                    return False
+            return True
+    else:
+        def matches(listing):
+            for predicate in predicates:
+                if predicate(listing):
+                    return True
+            return False
+    return CompiledConditions(q, matches)
+
+
+def _text_values(field, op, value):
+    values = value if op in ('in', 'not_in') else [value]
+    if op in ('in', 'not_in') and not isinstance(value, list):
+        raise ConditionError(f"'{field}' {op} needs a list of values")
+    if not all(isinstance(item, str) for item in values):
+        raise ConditionError(f"'{field}' {op} compares against text")
+    return values
+
+
+def _compile_text(field, path, op, value):
+    values = _text_values(field, op, value)
+    if op == 'contains':
+        needle = _fold(value)
+        return CompiledConditions(
+            Q(**{f'{path}__icontains': value}),
+            lambda listing: needle in _fold(listing[path])
+        )
+    if op in ('eq', 'ne', 'in', 'not_in'):
+        q = Q(pk__in=[])
+        for item in values:
+            q |= Q(**{f'{path}__iexact': item})
+        wanted = {_fold(item) for item in values}
+        compiled = CompiledConditions(q, lambda listing: _fold(listing[path]) in wanted)
+        return _negate(compiled) if op in ('ne', 'not_in') else compiled
+
+
+def _compile_choice(field, path, op, value):
+    values = _text_values(field, op, value)
+    wanted = frozenset(values)
+    compiled = CompiledConditions(Q(**{f'{path}__in': values}), lambda listing: listing[path] in wanted)
+    return _negate(compiled) if op in ('ne', 'not_in') else compiled
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _compile_number(field, paths, op, value):
+    if op == 'between':
+        if not (isinstance(value, list) and len(value) == 2 and all(_is_number(v) for v in value)):
+            raise ConditionError(f"'{field}' between needs [low, high]")
+        low, high = value
+        return _combine([
+            _compile_number(field, paths, 'gte', low),
+            _compile_number(field, paths, 'lte', high),
+        ], require_all=True)
+    if not _is_number(value):
+        raise ConditionError(f"'{field}' {op} compares against a number")
+    if op == 'ne':
+        return _negate(_compile_number(field, paths, 'eq', value))
+
+    lookup, compare = NUMBER_LOOKUPS[op]
+    if isinstance(paths, str):
+        return CompiledConditions(
+            Q(**{f'{paths}__{lookup}': value}),
+            lambda listing: listing[paths] is not None and compare(listing[paths], value)
+        )
+
+    primary, fallback = paths
+
+    def matches(listing):
+        amount = listing[primary] if listing[primary] is not None else listing[fallback]
+        return amount is not None and compare(amount, value)
+    return CompiledConditions(
+        Q(**{f'{primary}__{lookup}': value}) | Q(**{f'{primary}__isnull': True, f'{fallback}__{lookup}': value}),
+        matches
+    )
+
+
+def _compile_bool(field, path, op, value):
+    if not isinstance(value, bool):
+        raise ConditionError(f"'{field}' eq compares against true or false")
+    return CompiledConditions(Q(**{path: value}), lambda listing: bool(listing[path]) is value)
+
+
+def _compile_list(field, paths, op, value):
+    values = value if op == 'overlaps' else [value]
+    if op == 'overlaps' and not isinstance(value, list):
+        raise ConditionError(f"'{field}' overlaps needs a list of values")
+    if not values or not all(isinstance(item, str) for item in values):
+        raise ConditionError(f"'{field}' {op} compares against text")
+
+    # Match whole JSON array elements: the quoted, JSON-encoded value
+    q = Q(pk__in=[])
+    for item in values:
+        for path in paths:
+            q |= Q(**{f'{path}__icontains': json.dumps(item)})
+    wanted = frozenset(_fold(item) for item in values)
+
+    def matches(listing):
+        for path in paths:
+            for item in listing[path] or ():
+                if isinstance(item, str) and _fold(item) in wanted:
+                    return True
+        return False
+    return CompiledConditions(q, matches)
+
+
+COMPILERS = {
+    'text': _compile_text,
+    'choice': _compile_choice,
+    'number': _compile_number,
+    'bool': _compile_bool,
+    'list': _compile_list,
+}
+
+
+def _compile_node(node, location='conditions'):
+    if not isinstance(node, dict):
+        raise ConditionError(f"{location} must be an object")
+
+    if 'all' in node or 'any' in node:
+        key = 'all' if 'all' in node else 'any'
+        if len(node) != 1 or not isinstance(node[key], list):
+            raise ConditionError(f"{location}.{key} must be the only key and hold a list")
+        children = [_compile_node(child, f'{location}.{key}[{i}]') for i, child in enumerate(node[key])]
+        return _combine(children, require_all=(key == 'all'))
+
+    if 'not' in node:
+        if len(node) != 1:
+            raise ConditionError(f"{location}.not must be the only key")
+        return _negate(_compile_node(node['not'], f'{location}.not'))
+
+    field, op = node.get('field'), node.get('op', 'eq')
+    if field not in FIELDS:
+        raise ConditionError(f"{location}: unknown field {field!r}")
+    kind, paths = FIELDS[field]
+    if op not in OPERATORS[kind]:
+        raise ConditionError(f"{location}: '{field}' does not support {op!r}")
+    if 'value' not in node:
+        raise ConditionError(f"{location}: missing value")
+    return COMPILERS[kind](field, paths, op, node['value'])
+
+
+def _listify(value):
+    if value in (None, '', []):
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+def from_criteria(conditions):
+    """Rewrite the flat criteria form into a condition tree"""
+    unknown = set(conditions) - CRITERIA_KEYS
+    if unknown:
+        # A dropped key would widen the rule, up to matching every listing
+        raise ConditionError(f"Unknown condition keys: {', '.join(sorted(unknown))}")
+    clauses = []
+
+    keywords = _listify(conditions.get('keywords'))
+    if keywords:
+        clauses.append({'any': [{'field': 'title', 'op': 'contains', 'value': k} for k in keywords]})
+    excluded = _listify(conditions.get('exclude_keywords'))
+    if excluded:
+        clauses.append({'not': {'any': [{'field': 'title', 'op': 'contains', 'value': k} for k in excluded]}})
+
+    for key, field, op in (
+        ('companies', 'company', 'in'),
+        ('exclude_companies', 'company', 'not_in'),
+        ('employment_types', 'employment_type', 'in'),
+        ('experience_levels', 'experience_level', 'in'),
+        ('platforms', 'platform', 'in'),
+    ):
+        values = _listify(conditions.get(key))
+        if values:
+            clauses.append({'field': field, 'op': op, 'value': values})
+
+    locations = _listify(conditions.get('locations'))
+    if locations:
+        clauses.append({'any': [{'field': 'place_id', 'op': 'in', 'value': locations}] + [
+            {'field': 'location', 'op': 'contains', 'value': location} for location in locations
+        ]})
+    if conditions.get('remote_only'):
+        clauses.append({'field': 'remote', 'op': 'eq', 'value': True})
+    if conditions.get('min_salary'):
+        clauses.append({'field': 'salary', 'op': 'gte', 'value': conditions['min_salary']})
+    return {'all': clauses}
+
+
+def compile_conditions(conditions):
+    """Compile a condition tree (or flat criteria) into CompiledConditions"""
+    if not conditions:
+        return MATCH_ALL
+    if not isinstance(conditions, dict):
+        raise ConditionError("conditions must be an object")
+    if not set(conditions) <= TREE_KEYS:
+        conditions = from_criteria(conditions)
+    return _compile_node(conditions)
@@ -0,0 +1,180 @@
+"""
+Cover letters, generated ahead of the browser.
+
+A letter is the user's template (see profiles.letter_templates) rendered
+for the job and their profile snapshot, rewritten by the model for the job's
+description when COVER_LETTER_AI is turned on (it is off by default).
+Bulk sessions call prepare() for all their jobs before any application task
+is queued: model calls run concurrently through the shared rate-limited client and the
+results are stored in the database under a key of (user, profile snapshot
+version, template, job content), so every worker reuses them. The application task
+then copies the letter into JobApplication.cover_letter_used; a letter that
+was not ready falls back to the filled-in template, so the browser never
+waits on text generation.
+"""
+import hashlib
+import json
+import logging
+from concurrent.futures import wait
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from analytics.models import AIUsage
+from hopeforjob import llm
+from profiles import letter_templates
+from .models import CoverLetter
+
+logger = logging.getLogger('automation')
+
+DEFAULT_TEMPLATE = "Dear Hiring Manager,\n\nI am interested in the {job_title} position at {company_name}."
+MAX_DESCRIPTION_TOKENS = 800  # of the job description sent to the model
+MAX_LETTER_TOKENS = 600
+
+SYSTEM_PROMPT = (
+    "You tailor cover letters to job postings. Keep the candidate's letter, its voice and its facts; "
+    "adjust it to the role and company, mention what from the posting the candidate matches, and keep "
+    "it under 300 words. Reply with the letter only."
+)
+
+
+def template_for(profile, session=None):
+    """
+    The compiled template to use: the session's (bulk apply), else the one in
+    the profile snapshot (default application template, else the profile's),
+    else a plain default
+    """
+    config = session.automation_config if session is not None else {}
+    if config.get('cover_letter_template'):
+        return letter_templates.compile_template(config['cover_letter_template'])
+    if profile is not None and profile.cover_letter_template:
+        return letter_templates.compile_cached(profile.cover_letter_template_key, profile.cover_letter_template)
+    return letter_templates.compile_template(DEFAULT_TEMPLATE)
+
+
+def job_hash(job):
+    """Hash of the posting content a letter is written for (not its id, so reposts share letters)"""
+    content = [job.title, job.company_name, job.location, job.description]
+    return hashlib.sha256(json.dumps(content).encode()).hexdigest()
+
+
+def letter_key(user_id, profile, template, job):
+    profile_version = profile.version if profile is not None else ''
+    payload = json.dumps([user_id, profile_version, hashlib.sha256(template.source.encode()).hexdigest(), job_hash(job)])
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def lookup(key):
+    """Cached letter for ``key``, or None"""
+    now = timezone.now()
+    entry = CoverLetter.objects.filter(key=key, expires_at__gt=now).only('id', 'text').first()
+    if entry is None:
+        return None
+    CoverLetter.objects.filter(pk=entry.pk).update(hits=F('hits') + 1, last_used_at=now)
+    return entry.text
+
+
+def store(key, user_id, text, model=''):
+    now = timezone.now()
+    CoverLetter.objects.update_or_create(key=key, defaults={
+        'user_id': user_id,
+        'text': text,
+        'model': model,
+        'last_used_at': now,
+        'expires_at': now + timedelta(days=settings.JOB_AUTOMATION['COVER_LETTER_TTL_DAYS']),
+    })
+
+
+def prune():
+    """Drop expired letters, then the least recently used beyond the size limit; returns the count"""
+    expired, _ = CoverLetter.objects.filter(expires_at__lte=timezone.now()).delete()
+
+    limit = settings.JOB_AUTOMATION['COVER_LETTER_CACHE_SIZE']
+    cutoff = CoverLetter.objects.order_by('-last_used_at').values_list('last_used_at', flat=True)[limit:limit + 1]
+    evicted = 0
+    if cutoff:
+        evicted, _ = CoverLetter.objects.filter(last_used_at__lte=cutoff[0]).delete()
+    return expired + evicted
+
+
+def _truncate(text, max_tokens):
+    if llm.estimate_tokens(text) <= max_tokens:
+        return text
+    words = text.split()
+    # Start from a proportional cut and shorten until it fits
+    cut = len(words) * max_tokens // max(llm.estimate_tokens(text), 1)
+    while cut > 0 and llm.estimate_tokens(' '.join(words[:cut])) > max_tokens:
+        cut = cut * 9 // 10
+    return ' '.join(words[:cut]) + ' ...'
+
+
+def personalization_messages(letter, job, profile):
+    candidate = {}
+    if profile is not None:
+        candidate = {
+            'current_position': profile.current_position,
+            'experience_years': profile.years_of_experience,
+            'skills': list(profile.skills[:20]),
+        }
+    description = _truncate(job.description or '', MAX_DESCRIPTION_TOKENS)
+    return [
+        {'role': 'system', 'content': SYSTEM_PROMPT},
+        {'role': 'user', 'content': (
+            f"Job: {job.title} at {job.company_name}\n"
+            f"Posting: {description}\n"
+            f"Candidate: {json.dumps(candidate, separators=(',', ':'))}\n"
+            f"Letter:\n{letter}"
+        )},
+    ]
+
+
+def prepare(items, timeout=None):
+    """
+    Generate and cache letters for (user id, profile snapshot, job, template)
+    items; returns the number generated.
+
+    Letters already cached are skipped. Model calls for the rest run
+    concurrently; whatever has not finished by ``timeout`` seconds is left to
+    the template fallback.
+    """
+    if not settings.JOB_AUTOMATION['COVER_LETTER_AI'] or not llm.is_configured():
+        return 0
+
+    pending = {}  # key -> (user id, future)
+    for user_id, profile, job, template in items:
+        key = letter_key(user_id, profile, template, job)
+        if key in pending or CoverLetter.objects.filter(key=key, expires_at__gt=timezone.now()).exists():
+            continue
+        messages = personalization_messages(template.render(job, profile), job, profile)
+        pending[key] = (user_id, llm.submit(messages, max_tokens=MAX_LETTER_TOKENS, temperature=0.7))
+    if not pending:
+        return 0
+
+    futures = [future for _, future in pending.values()]
+    _, not_done = wait(futures, timeout=timeout or settings.JOB_AUTOMATION['COVER_LETTER_PREPARE_TIMEOUT'])
+    for future in not_done:
+        future.cancel()
+
+    generated = 0
+    for key, (user_id, future) in pending.items():
+        if future in not_done:
+            continue
+        try:
+            result = future.result()
+        except Exception as e:
+            logger.warning(f"Cover letter generation failed: {str(e)}")
+            continue
+        AIUsage.record(user_id, 'cover_letter', result)
+        if result.content and result.content.strip():
+            store(key, user_id, result.content.strip(), model=result.model)
+            generated += 1
+
+    logger.info(f"Generated {generated} of {len(pending)} cover letters ({len(not_done)} timed out)")
+    return generated
+
+
+def letter_for(user_id, profile, job, template):
+    """The prepared letter for ``job``, or the filled-in template (never calls the model)"""
+    return lookup(letter_key(user_id, profile, template, job)) or template.render(job, profile)
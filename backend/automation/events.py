@@ -0,0 +1,231 @@
+"""
+Progress events for automation sessions.
+
+Workers publish small JSON events (job started, form step, submitted,
+failed, counters) to a per-session channel; the SSE endpoint subscribes to
+that channel and relays them to the browser. Channels live on Redis pub/sub
+when AUTOMATION_EVENTS_URL is set, and on an in-process broker otherwise
+(development with eager Celery tasks, tests).
+
+Browsers open the stream with EventSource, which cannot send an
+Authorization header. Besides the session cookie, the endpoint accepts a
+stream ticket: a random, single-use value valid for one session for
+TICKET_TIMEOUT seconds, issued by an authenticated POST. An API token
+never has to appear in a URL (and so in access logs).
+"""
+import asyncio
+import json
+import logging
+import secrets
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger('automation')
+
+TERMINAL_EVENTS = ('session_completed', 'session_failed', 'session_cancelled')
+COUNTER_FIELDS = ('total_jobs_targeted', 'jobs_processed', 'applications_submitted', 'applications_failed')
+TICKET_KEY = 'automation:stream-ticket:{}'
+TICKET_TIMEOUT = 60  # seconds to open the stream after asking for a ticket
+
+
+def channel_name(session_id):
+    return f'automation:session:{session_id}:events'
+
+
+def session_counters(session):
+    return {field: getattr(session, field) for field in COUNTER_FIELDS}
+
+
+class InProcessSubscription:
+
+    def __init__(self, broker, channel):
+        self.broker = broker
+        self.channel = channel
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue()
+
+    async def get(self, timeout):
+        """Next message, or None after ``timeout`` idle seconds"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def close(self):
+        self.broker.unsubscribe(self)
+
+
+class InProcessBroker:
+    """Fan-out to subscribers in the same process (each with its own event loop)"""
+
+    def __init__(self):
+        self._subscribers = {}
+        self._lock = threading.Lock()
+
+    def publish(self, channel, message):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for subscription in subscribers:
+            subscription.loop.call_soon_threadsafe(subscription.queue.put_nowait, message)
+        return len(subscribers)
+
+    async def subscribe(self, channel):
+        subscription = InProcessSubscription(self, channel)
+        with self._lock:
+            self._subscribers.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.channel, set())
+            subscribers.discard(subscription)
+            if not subscribers:
+                self._subscribers.pop(subscription.channel, None)
+
+
+class RedisSubscription:
+
+    def __init__(self, client, pubsub, channel):
+        self.client = client
+        self.pubsub = pubsub
+        self.channel = channel
+
+    async def get(self, timeout):
+        """Next message, or None after ``timeout`` idle seconds"""
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            message = await self.pubsub.get_message(ignore_subscribe_messages=True, timeout=remaining)
+            if message is not None:
+                return message['data'].decode()
+
+    async def close(self):
+        await self.pubsub.unsubscribe(self.channel)
+        await self.pubsub.aclose()
+        await self.client.aclose()
+
+
+class RedisBroker:
+    """Redis pub/sub: publishers are Celery workers, subscribers are ASGI workers"""
+
+    def __init__(self, url):
+        self.url = url
+        self._client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            import redis
+            self._client = redis.Redis.from_url(self.url)
+        return self._client
+
+    def publish(self, channel, message):
+        return self.client.publish(channel, message)
+
+    async def subscribe(self, channel):
+        import redis.asyncio as aioredis
+
+        client = aioredis.Redis.from_url(self.url)
+        pubsub = client.pubsub()
+        await pubsub.subscribe(channel)
+        return RedisSubscription(client, pubsub, channel)
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                url = settings.AUTOMATION_EVENTS_URL
+                _broker = RedisBroker(url) if url else InProcessBroker()
+    return _broker
+
+
+def publish(session, event, **data):
+    """
+    Publish a progress event for ``session``.
+
+    Never raises: progress reporting must not break an application run.
+    """
+    message = json.dumps({
+        'event': event,
+        'session': session.pk,
+        'time': time.time(),
+        'data': data,
+    }, default=str)
+    try:
+        get_broker().publish(channel_name(session.pk), message)
+    except Exception as e:
+        logger.warning(f"Failed to publish {event} for session {session.pk}: {str(e)}")
+
+
+def publish_counters(session):
+    publish(session, 'counters', status=session.status, **session_counters(session))
+    if session.status in ('completed', 'failed', 'cancelled'):
+        publish(session, f'session_{session.status}', status=session.status, **session_counters(session))
+
+
+def issue_ticket(session):
+    """Single-use ticket letting the session's owner open its event stream"""
+    ticket = secrets.token_urlsafe(32)
+    cache.set(TICKET_KEY.format(ticket), (session.user_id, session.pk), timeout=TICKET_TIMEOUT)
+    return ticket
+
+
+async def redeem_ticket(ticket, session_id):
+    """The user id a ticket was issued to, if it is valid for ``session_id``; a ticket works once"""
+    key = TICKET_KEY.format(ticket)
+    grant = await cache.aget(key)
+    # Of concurrent redemptions only the one that deletes the key wins
+    if grant is None or not await cache.adelete(key):
+        return None
+    user_id, granted_session_id = grant
+    return user_id if granted_session_id == session_id else None
+
+
+def format_sse(message, event='message'):
+    """Encode one Server-Sent Events frame"""
+    return f'event: {event}\ndata: {message}\n\n'
+
+
+async def stream(session, heartbeat=None):
+    """
+    Async iterator of SSE frames for ``session``.
+
+    Starts with a ``snapshot`` of the current counters so a client that
+    connects mid-run is immediately up to date, relays published events, sends
+    comment heartbeats while idle, and ends after a terminal session event.
+    """
+    heartbeat = heartbeat or settings.AUTOMATION_EVENTS_HEARTBEAT
+    # Subscribe before reading the snapshot so no event falls in between
+    subscription = await get_broker().subscribe(channel_name(session.pk))
+    try:
+        await session.arefresh_from_db()
+        yield format_sse(json.dumps({
+            'event': 'snapshot',
+            'session': session.pk,
+            'data': {'status': session.status, **session_counters(session)},
+        }), 'snapshot')
+        if session.status in ('completed', 'failed', 'cancelled'):
+            return
+
+        while True:
+            message = await subscription.get(heartbeat)
+            if message is None:
+                yield ': keepalive\n\n'
+                continue
+            event = json.loads(message).get('event', 'message')
+            yield format_sse(message, event)
+            if event in TERMINAL_EVENTS:
+                return
+    finally:
+        await subscription.close()
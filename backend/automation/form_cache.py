@@ -0,0 +1,53 @@
+"""
+Shared cache of AI form analyses.
+
+Answers are stored in the database under the form's structure key (see
+forms.structure_key, scoped to the user and their profile version), so every
+worker reuses them and a recurring Easy Apply form is analysed once per
+profile version rather than once per job. Entries expire after a TTL;
+prune() also trims the table to its size limit, least recently used first.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from .models import FormAnalysis
+
+logger = logging.getLogger('automation')
+
+
+def lookup(key):
+    """Cached answers for ``key``, or None"""
+    now = timezone.now()
+    entry = FormAnalysis.objects.filter(key=key, expires_at__gt=now).only('id', 'answers').first()
+    if entry is None:
+        return None
+    FormAnalysis.objects.filter(pk=entry.pk).update(hits=F('hits') + 1, last_used_at=now)
+    return entry.answers
+
+
+def store(key, user, answers, field_count=0, model=''):
+    now = timezone.now()
+    FormAnalysis.objects.update_or_create(key=key, defaults={
+        'user': user,
+        'answers': answers,
+        'field_count': field_count,
+        'model': model,
+        'last_used_at': now,
+        'expires_at': now + timedelta(days=settings.JOB_AUTOMATION['FORM_ANALYSIS_TTL_DAYS']),
+    })
+
+
+def prune():
+    """Drop expired entries, then the least recently used beyond the size limit; returns the count"""
+    expired, _ = FormAnalysis.objects.filter(expires_at__lte=timezone.now()).delete()
+
+    limit = settings.JOB_AUTOMATION['FORM_ANALYSIS_CACHE_SIZE']
+    cutoff = FormAnalysis.objects.order_by('-last_used_at').values_list('last_used_at', flat=True)[limit:limit + 1]
+    evicted = 0
+    if cutoff:
+        evicted, _ = FormAnalysis.objects.filter(last_used_at__lte=cutoff[0]).delete()
+    return expired + evicted
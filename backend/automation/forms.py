@@ -0,0 +1,231 @@
+"""
+Application form structure.
+
+extract_fields() reduces an application form's HTML to its fillable fields
+(name, label, type, options, required), skipping scripts, icons and hidden
+or button inputs. structure_key() hashes what identifies a form to a person
+filling it in (labels, types and options, not element ids or names, which
+embed job ids) so the same form on different jobs gets the same key.
+"""
+import hashlib
+import json
+import re
+from collections import namedtuple
+from html.parser import HTMLParser
+
+FormField = namedtuple('FormField', 'name label type options required')
+
+SKIPPED_CONTENT = {'script', 'style', 'svg', 'noscript', 'template'}
+SKIPPED_INPUTS = {'hidden', 'submit', 'button', 'image', 'reset'}
+PLACEHOLDER_OPTIONS = {'', 'select an option', 'select', 'choose', 'please select'}
+
+
+def _clean(text):
+    return ' '.join(text.split())
+
+
+class _FormParser(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.fields = []  # dicts, in document order
+        self.labels_for = {}  # element id -> label text
+        self.skip_depth = 0
+        self.label = None  # open <label>: its text, target id and the fields inside it
+        self.legends = []  # legend text per open fieldset
+        self.legend = None
+        self.select = None
+        self.option = None
+
+    def handle_starttag(self, tag, attrs):
+        if self.skip_depth or tag in SKIPPED_CONTENT:
+            if tag in SKIPPED_CONTENT:
+                self.skip_depth += 1
+            return
+        attrs = {name: value or '' for name, value in attrs}
+
+        if tag == 'label':
+            self.label = {'text': [], 'for': attrs.get('for', ''), 'fields': []}
+        elif tag == 'fieldset':
+            self.legends.append('')
+        elif tag == 'legend':
+            self.legend = []
+        elif tag == 'input':
+            input_type = attrs.get('type', 'text').lower()
+            if input_type not in SKIPPED_INPUTS:
+                self._add_field(attrs, input_type)
+        elif tag == 'select':
+            self.select = self._add_field(attrs, 'select')
+        elif tag == 'option' and self.select is not None:
+            self.option = []
+        elif tag == 'textarea':
+            self._add_field(attrs, 'textarea')
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag in SKIPPED_CONTENT:
+            self.skip_depth -= 1
+
+    def handle_endtag(self, tag):
+        if self.skip_depth:
+            if tag in SKIPPED_CONTENT:
+                self.skip_depth -= 1
+            return
+
+        if tag == 'label' and self.label is not None:
+            text = _clean(' '.join(self.label['text']))
+            if self.label['for']:
+                self.labels_for[self.label['for']] = text
+            for field in self.label['fields']:
+                field['wrapped_label'] = field['wrapped_label'] or text
+            self.label = None
+        elif tag == 'legend' and self.legend is not None:
+            if self.legends:
+                self.legends[-1] = _clean(' '.join(self.legend))
+            self.legend = None
+        elif tag == 'fieldset' and self.legends:
+            self.legends.pop()
+        elif tag == 'option' and self.option is not None:
+            text = _clean(' '.join(self.option))
+            if text.lower() not in PLACEHOLDER_OPTIONS:
+                self.select['options'].append(text)
+            self.option = None
+        elif tag == 'select':
+            self.select = None
+
+    def handle_data(self, data):
+        if self.skip_depth:
+            return
+        buffers = [self.legend, self.option, self.label['text'] if self.label else None]
+        for buffer in buffers:
+            if buffer is not None:
+                buffer.append(data)
+
+    def _add_field(self, attrs, field_type):
+        field = {
+            'name': attrs.get('name', ''),
+            'id': attrs.get('id', ''),
+            'type': field_type,
+            'value': attrs.get('value', ''),
+            'aria_label': attrs.get('aria-label', ''),
+            'placeholder': attrs.get('placeholder', ''),
+            'wrapped_label': '',
+            'legend': self.legends[-1] if self.legends else '',
+            'options': [],
+            'required': 'required' in attrs or attrs.get('aria-required', '').lower() == 'true',
+            'grouped': False,
+        }
+        self.fields.append(field)
+        if self.label is not None:
+            self.label['fields'].append(field)
+        return field
+
+
+def _label_for(field, labels_for):
+    return _clean(
+        labels_for.get(field['id'])
+        or field['aria_label']
+        or (field['wrapped_label'] if field['type'] not in ('radio', 'checkbox') else '')
+        or field['legend']
+        or field['placeholder']
+        or field['wrapped_label']
+        or field['name']
+    )
+
+
+def extract_fields(form_html):
+    """The fillable fields of a form, as FormField tuples in document order"""
+    parser = _FormParser()
+    parser.feed(form_html or '')
+    parser.close()
+
+    fields = []
+    groups = {}  # radio/checkbox groups share a name: one field, one option per input
+    for field in parser.fields:
+        if field['type'] in ('radio', 'checkbox') and field['name']:
+            option = _clean(parser.labels_for.get(field['id']) or field['wrapped_label'] or field['value'])
+            if field['name'] in groups:
+                group = groups[field['name']]
+                group['options'].append(option)
+                group['required'] = group['required'] or field['required']
+                continue
+            field = dict(field, options=[option], grouped=True)
+            groups[field['name']] = field
+        fields.append(field)
+
+    return [
+        FormField(
+            field['name'],
+            field['legend'] if field['grouped'] and field['legend'] else _label_for(field, parser.labels_for),
+            field['type'],
+            tuple(option for option in field['options'] if option),
+            field['required'],
+        )
+        for field in fields
+    ]
+
+
+def normalize_label(label):
+    """Lower-cased label without punctuation, numbering or required markers"""
+    return ' '.join(re.sub(r'[^\w\s]|\d+', ' ', label.lower()).split())
+
+
+def structure_key(fields, scope=''):
+    """Content hash of a form's structure, namespaced by ``scope`` (e.g. user and profile version)"""
+    structure = [[normalize_label(f.label), f.type, list(f.options), f.required] for f in fields]
+    payload = json.dumps([scope, structure], separators=(',', ':'))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def parse_answers(content, fields=()):
+    """
+    Parse the model's JSON reply into {normalized label: {'answer', 'confidence'}}.
+
+    Answers are keyed by field id, the field's position in ``fields`` (the
+    fields sent, see prompts.form_analysis_messages); keys that are not an
+    id are taken as labels. Accepts a fenced code block, a mapping of key ->
+    answer (or -> object with an answer and confidence) or a list of such
+    objects; anything else yields {}.
+    """
+    text = (content or '').strip()
+    fenced = re.search(r'```(?:json)?\s*(.*?)```', text, re.DOTALL)
+    if fenced:
+        text = fenced.group(1)
+    try:
+        data = json.loads(text)
+    except ValueError:
+        return {}
+
+    if isinstance(data, dict) and isinstance(data.get('fields'), (dict, list)):
+        data = data['fields']
+    if isinstance(data, dict):
+        items = data.items()
+    elif isinstance(data, list):
+        items = [
+            (next((item[key] for key in ('id', 'label', 'field', 'name') if item.get(key) is not None), None), item)
+            for item in data if isinstance(item, dict)
+        ]
+    else:
+        return {}
+
+    by_id = {str(field_id): field for field_id, field in enumerate(fields)}
+    answers = {}
+    for key, value in items:
+        if key is None or isinstance(key, (dict, list)):
+            continue
+        field = by_id.get(str(key).strip())
+        label = normalize_label(field.label if field else str(key))
+        if not label:
+            continue
+        if isinstance(value, dict):
+            answer = value.get('answer', value.get('value', value.get('suggested_answer')))
+            confidence = value.get('confidence', value.get('confidence_score', 0.5))
+        else:
+            answer, confidence = value, 0.5
+        if answer is None or isinstance(answer, (dict, list)):
+            continue
+        try:
+            confidence = max(0.0, min(float(confidence), 1.0))
+        except (TypeError, ValueError):
+            confidence = 0.5
+        answers[label] = {'answer': str(answer), 'confidence': confidence}
+    return answers
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.2 on 2026-10-19 06:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('automation', '0002_application_rule'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='automationsession',
+            name='task_ids',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
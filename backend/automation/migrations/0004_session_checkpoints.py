@@ -0,0 +1,34 @@
+# Generated by Django 5.2.2 on 2026-10-19 07:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('automation', '0003_session_task_ids'),
+        ('jobs', '0002_normalized_location'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SessionCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('state', models.CharField(choices=[('pending', 'Pending'), ('in_flight', 'In Flight'), ('done', 'Done')], default='pending', max_length=20)),
+                ('outcome', models.CharField(blank=True, max_length=30)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('task_id', models.CharField(blank=True, max_length=255)),
+                ('not_before', models.DateTimeField(blank=True, null=True)),
+                ('lease_expires_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('job', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='session_checkpoints', to='jobs.joblisting')),
+                ('session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='checkpoints', to='automation.automationsession')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['state', 'lease_expires_at'], name='automation__state_c8c724_idx')],
+                'unique_together': {('session', 'job')},
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.2 on 2026-10-19 07:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('automation', '0004_session_checkpoints'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sessioncheckpoint',
+            name='rule',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='checkpoints', to='automation.automationrule'),
+        ),
+    ]
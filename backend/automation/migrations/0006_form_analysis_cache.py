@@ -0,0 +1,36 @@
+# Generated by Django 5.2.2 on 2026-10-19 14:05
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('automation', '0005_checkpoint_rule'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FormAnalysis',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=64, unique=True)),
+                ('answers', models.JSONField(default=dict)),
+                ('field_count', models.PositiveIntegerField(default=0)),
+                ('model', models.CharField(blank=True, max_length=100)),
+                ('hits', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_used_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('expires_at', models.DateTimeField()),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='form_analyses', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'form analyses',
+                'indexes': [models.Index(fields=['last_used_at'], name='automation__last_us_dd1320_idx'), models.Index(fields=['expires_at'], name='automation__expires_4c1568_idx')],
+            },
+        ),
+    ]
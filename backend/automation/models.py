@@ -49,6 +49,7 @@ class AutomationSession(models.Model):
     session_logs = models.JSONField(default=list, blank=True)
     error_message = models.TextField(blank=True)
     results_summary = models.JSONField(default=dict, blank=True)
+    task_ids = models.JSONField(default=list, blank=True)  # queued Celery tasks, revoked on cancel
     
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -77,6 +78,46 @@ class AutomationSession(models.Model):
         return 0
 
 
+class SessionCheckpoint(models.Model):
+    """Per-job progress of an automation session, for crash recovery and resume"""
+    
+    STATE_CHOICES = [
+        ('pending', 'Pending'),
+        ('in_flight', 'In Flight'),
+        ('done', 'Done'),
+    ]
+    
+    session = models.ForeignKey(AutomationSession, on_delete=models.CASCADE, related_name='checkpoints')
+    job = models.ForeignKey(JobListing, on_delete=models.CASCADE, related_name='session_checkpoints')
+    rule = models.ForeignKey(
+        'AutomationRule',
+        on_delete=models.SET_NULL,
+        related_name='checkpoints',
+        blank=True,
+        null=True
+    )  # set when the job was queued by the auto-apply scheduler
+    
+    state = models.CharField(max_length=20, choices=STATE_CHOICES, default='pending')
+    outcome = models.CharField(max_length=30, blank=True)  # submitted, failed, skipped
+    attempts = models.PositiveIntegerField(default=0)
+    
+    # Scheduling and leases
+    task_id = models.CharField(max_length=255, blank=True)
+    not_before = models.DateTimeField(blank=True, null=True)  # when the queued task is due
+    lease_expires_at = models.DateTimeField(blank=True, null=True)
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        unique_together = ('session', 'job')
+        indexes = [
+            models.Index(fields=['state', 'lease_expires_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.session.session_id} -> {self.job_id} ({self.state})"
+
+
 class JobApplication(models.Model):
     """Track individual job applications"""
     
@@ -102,6 +143,13 @@ class JobApplication(models.Model):
         blank=True, 
         null=True
     )
+    rule = models.ForeignKey(
+        'AutomationRule',
+        on_delete=models.SET_NULL,
+        related_name='applications',
+        blank=True,
+        null=True
+    )
     
     # Application Details
     status = models.CharField(max_length=30, choices=STATUS_CHOICES, default='pending')
@@ -181,6 +229,58 @@ class ApplicationFormField(models.Model):
         return f"{self.job.title} - {self.field_label or self.field_name}"
 
 
+class FormAnalysis(models.Model):
+    """AI-suggested answers for one form structure and profile version, shared by all workers"""
+    
+    key = models.CharField(max_length=64, unique=True)  # automation.forms.structure_key
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='form_analyses')
+    
+    answers = models.JSONField(default=dict)  # normalized field label -> {answer, confidence}
+    field_count = models.PositiveIntegerField(default=0)
+    model = models.CharField(max_length=100, blank=True)
+    
+    # Usage, for TTL and least-recently-used eviction
+    hits = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(default=timezone.now)
+    expires_at = models.DateTimeField()
+    
+    class Meta:
+        verbose_name_plural = 'form analyses'
+        indexes = [
+            models.Index(fields=['last_used_at']),
+            models.Index(fields=['expires_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.user.username} - {self.field_count} fields ({self.hits} hits)"
+
+
+class CoverLetter(models.Model):
+    """Cover letter generated for one template, profile version and job posting, shared by all workers"""
+    
+    key = models.CharField(max_length=64, unique=True)  # automation.cover_letters.letter_key
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='cover_letters')
+    
+    text = models.TextField()
+    model = models.CharField(max_length=100, blank=True)
+    
+    # Usage, for TTL and least-recently-used eviction
+    hits = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(default=timezone.now)
+    expires_at = models.DateTimeField()
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['last_used_at']),
+            models.Index(fields=['expires_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.user.username} - {self.text[:50]}"
+
+
 class AutomationRule(models.Model):
     """User-defined automation rules"""
     
@@ -0,0 +1,102 @@
+"""
+Prompt preparation for AI form analysis.
+
+The model gets a compact JSON schema of the fields still to answer (id,
+label, type, options, required) instead of the form's HTML, and answers by
+field id: the field's position in the list sent, so shortened labels never
+have to be matched back (see forms.parse_answers). The prompt is cut
+to fit a token budget estimated locally: long option lists and labels are
+shortened first, then the profile is trimmed, then optional fields are
+dropped from the end, then required ones (one field is always kept).
+"""
+import json
+
+from django.conf import settings
+
+from hopeforjob import llm
+
+MAX_OPTIONS = 15
+MAX_LABEL_CHARS = 120
+MAX_PROFILE_ITEMS = 1
+COMPLETION_TOKENS_PER_FIELD = 40
+
+SYSTEM_PROMPT = (
+    "You fill in job application forms for a candidate. Answer every field from the candidate's "
+    "profile and the job. For fields with options, answer with one of the options verbatim. "
+    'Reply with a JSON object mapping each field id to {"answer": ..., "confidence": 0-1}; '
+    "use a low confidence when the profile does not say."
+)
+
+
+def _compact(data):
+    return json.dumps(data, separators=(',', ':'), ensure_ascii=False)
+
+
+def _schema(field_id, field, max_options=None, max_label=None):
+    label = field.label
+    if max_label and len(label) > max_label:
+        label = label[:max_label].rstrip() + '...'
+    entry = {'id': field_id, 'label': label, 'type': field.type}
+    if field.options:
+        entry['options'] = list(field.options[:max_options] if max_options else field.options)
+    if field.required:
+        entry['required'] = True
+    return entry
+
+
+def _trim_profile(profile):
+    return {
+        key: value[:MAX_PROFILE_ITEMS] if isinstance(value, list) and key != 'skills' else value
+        for key, value in profile.items()
+    }
+
+
+def _messages(fields, job_context, profile, max_options=None, max_label=None):
+    job = f"{job_context.get('title', '')} at {job_context.get('company', '')}"
+    schema = [_schema(field_id, field, max_options, max_label) for field_id, field in enumerate(fields)]
+    return [
+        {'role': 'system', 'content': SYSTEM_PROMPT},
+        {'role': 'user', 'content': f"Job: {job}\nCandidate: {_compact(profile)}\nFields: {_compact(schema)}"},
+    ]
+
+
+def form_analysis_messages(fields, job_context, profile, budget=None):
+    """
+    Chat messages asking for answers to ``fields`` within ``budget`` prompt tokens.
+
+    Returns (messages, fields sent); the second may be shorter than ``fields``
+    if the budget could not fit them all. Field ids in the prompt are
+    positions in the fields sent.
+    """
+    budget = budget or settings.JOB_AUTOMATION['FORM_PROMPT_TOKEN_BUDGET']
+    fields = list(fields)
+
+    messages = _messages(fields, job_context, profile)
+    if llm.estimate_message_tokens(messages) <= budget:
+        return messages, fields
+
+    # Shorten before dropping anything
+    profile = _trim_profile(profile)
+    messages = _messages(fields, job_context, profile, MAX_OPTIONS, MAX_LABEL_CHARS)
+    if llm.estimate_message_tokens(messages) <= budget:
+        return messages, fields
+
+    # Drop fields from the end, optional ones before required ones
+    for required in (False, True):
+        for index in range(len(fields) - 1, -1, -1):
+            if len(fields) == 1:
+                break
+            if fields[index].required == required:
+                del fields[index]
+                messages = _messages(fields, job_context, profile, MAX_OPTIONS, MAX_LABEL_CHARS)
+                if llm.estimate_message_tokens(messages) <= budget:
+                    return messages, fields
+    return messages, fields
+
+
+def completion_budget(fields):
+    """Output tokens to allow for answering ``fields``"""
+    return min(
+        settings.JOB_AUTOMATION['FORM_ANALYSIS_MAX_TOKENS'],
+        COMPLETION_TOKENS_PER_FIELD * len(fields) + 50,
+    )
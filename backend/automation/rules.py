@@ -0,0 +1,58 @@
+"""
+Compiled AutomationRule conditions.
+
+compile_rule() turns a rule's ``conditions`` (see conditions.py for the
+language) into a Django ``Q`` for prefiltering listings in the database and
+a Python predicate over listing rows (dicts of LISTING_FIELDS), so the
+auto-apply scheduler can test every rule against a batch of listings
+without re-reading the JSON. Compiled rules are cached per process by rule
+id and ``updated_at``, so editing a rule recompiles it on next use.
+"""
+import threading
+from collections import OrderedDict
+
+from jobs.models import JobListing
+from .conditions import compile_conditions
+
+LISTING_FIELDS = (
+    'id', 'title', 'company_name', 'location', 'place_id', 'latitude', 'longitude', 'is_remote',
+    'employment_type', 'experience_level', 'salary_min', 'salary_max',
+    'required_skills', 'preferred_skills', 'source__name', 'posted_date', 'scraped_at',
+    'auto_apply_difficulty', 'is_auto_applicable',
+)
+
+CACHE_SIZE = 4096
+
+_compiled = OrderedDict()
+_lock = threading.Lock()
+
+
+def compile_rule(rule):
+    """CompiledConditions (``q``, ``matches``) for a rule, from cache when unchanged"""
+    key = (rule.pk, rule.updated_at)
+    with _lock:
+        compiled = _compiled.get(key)
+        if compiled is not None:
+            _compiled.move_to_end(key)
+            return compiled
+
+    compiled = compile_conditions(rule.conditions or {})
+    if rule.pk is None:
+        return compiled
+    with _lock:
+        _compiled[key] = compiled
+        if len(_compiled) > CACHE_SIZE:
+            _compiled.popitem(last=False)
+    return compiled
+
+
+def clear_cache():
+    with _lock:
+        _compiled.clear()
+
+
+def matching_listings(rule, listings=None):
+    """Listings (active ones by default) matching ``rule``, filtered in the database"""
+    if listings is None:
+        listings = JobListing.objects.filter(is_active=True)
+    return listings.filter(compile_rule(rule).q)
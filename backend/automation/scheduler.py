@@ -0,0 +1,291 @@
+"""
+Auto-apply scheduler for AutomationRule.
+
+One pass evaluates a batch of listings against the compiled active rules of
+every user with auto-apply enabled, then hands out application slots in a
+fair order: users take turns, each turn going to that user's best remaining
+match (lowest rule ``priority`` first, then the best location match for the
+user's places, then newest listing), until the
+user's daily cap, the rule's daily cap or the platform's capacity runs out.
+Each user's winners are queued as one checkpointed session.
+
+Passes run after every crawl (for the new listings) and periodically over a
+lookback window, so there is no per-user polling. Only one pass runs at a
+time: taken pairs and remaining caps are read before dispatching, so
+overlapping passes would queue the same pairs and overrun the caps. A pass
+that finds another running is skipped; the next periodic pass covers its
+listings.
+"""
+import heapq
+import logging
+from collections import Counter, defaultdict, namedtuple
+from datetime import timedelta
+from types import SimpleNamespace
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, F
+from django.utils import timezone
+
+from jobs.geo import location_match_score
+from jobs.models import JobListing
+from profiles import snapshot
+from profiles.models import UserProfile
+from . import checkpoints, circuit_breaker, cover_letters
+from .models import AutomationRule, AutomationSession, JobApplication, SessionCheckpoint
+from .rules import LISTING_FIELDS, compile_rule
+
+logger = logging.getLogger('automation')
+
+SUPPORTED_PLATFORMS = ('linkedin', 'indeed')  # platforms with an automator
+RUN_LOCK_KEY = 'automation:scheduler:run'
+RUN_LOCK_TIMEOUT = 15 * 60  # seconds; a crashed pass stops blocking others after this
+
+# location: negated jobs.geo.location_match_score, so better matches sort first
+# rule_ids: every rule of the user that matched, most urgent first
+Candidate = namedtuple('Candidate', 'priority location recency user_id job_id rule_ids platform')
+
+
+def load_rules(user_ids=None):
+    """{user id: [(rule, predicate)]} for active rules of users with auto-apply enabled"""
+    rules = AutomationRule.objects.filter(is_active=True, user__profile__auto_apply_enabled=True)
+    if user_ids is not None:
+        rules = rules.filter(user_id__in=user_ids)
+
+    by_user = defaultdict(list)
+    for rule in rules.order_by('priority', 'id'):
+        try:
+            by_user[rule.user_id].append((rule, compile_rule(rule).matches))
+        except (ValueError, TypeError, KeyError) as e:
+            logger.warning(f"Skipping automation rule {rule.id} with invalid conditions: {str(e)}")
+    return by_user
+
+
+def load_listings(job_ids=None, lookback_hours=None):
+    listings = JobListing.objects.filter(is_active=True, source__name__iregex=r'^(%s)$' % '|'.join(SUPPORTED_PLATFORMS))
+    if job_ids is not None:
+        listings = listings.filter(id__in=job_ids)
+    else:
+        hours = lookback_hours or settings.JOB_AUTOMATION['AUTO_APPLY_LOOKBACK_HOURS']
+        listings = listings.filter(scraped_at__gte=timezone.now() - timedelta(hours=hours))
+    return list(listings.values(*LISTING_FIELDS))
+
+
+def taken_pairs(user_ids, job_ids):
+    """(user, job) pairs already applied to or queued in an unfinished session"""
+    applied = JobApplication.objects.filter(user_id__in=user_ids, job_id__in=job_ids).values_list('user_id', 'job_id')
+    queued = SessionCheckpoint.objects.filter(
+        session__user_id__in=user_ids, job_id__in=job_ids
+    ).exclude(state='done').values_list('session__user_id', 'job_id')
+    return set(applied) | set(queued)
+
+
+def remaining_user_caps(user_ids):
+    """Applications each user may still start today (submitted today plus already queued count)"""
+    start_of_day = timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0)
+    used = Counter(dict(
+        JobApplication.objects.filter(user_id__in=user_ids, is_automated=True, created_at__gte=start_of_day)
+        .values('user_id').annotate(count=Count('id')).values_list('user_id', 'count')
+    ))
+    used.update(dict(
+        SessionCheckpoint.objects.filter(session__user_id__in=user_ids, state='pending')
+        .values('session__user_id').annotate(count=Count('id')).values_list('session__user_id', 'count')
+    ))
+
+    global_cap = settings.JOB_AUTOMATION['MAX_APPLICATIONS_PER_DAY']
+    profile_caps = UserProfile.objects.filter(user_id__in=user_ids).values_list('user_id', 'max_applications_per_day')
+    return {
+        user_id: max(min(profile_cap, global_cap) - used[user_id], 0)
+        for user_id, profile_cap in profile_caps
+    }
+
+
+def remaining_rule_caps(rules):
+    """Applications each rule may still start today (``max_applications_per_day``)"""
+    start_of_day = timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0)
+    rule_ids = [rule.id for rule in rules]
+    used = Counter(dict(
+        JobApplication.objects.filter(rule_id__in=rule_ids, created_at__gte=start_of_day)
+        .values('rule_id').annotate(count=Count('id')).values_list('rule_id', 'count')
+    ))
+    used.update(dict(
+        SessionCheckpoint.objects.filter(rule_id__in=rule_ids, state='pending')
+        .values('rule_id').annotate(count=Count('id')).values_list('rule_id', 'count')
+    ))
+    return {rule.id: max(rule.max_applications_per_day - used[rule.id], 0) for rule in rules}
+
+
+def remaining_platform_capacity():
+    """Free slots per platform: configured capacity minus jobs queued or in flight"""
+    load = Counter({
+        name.lower(): count for name, count in
+        SessionCheckpoint.objects.filter(session__status='running').exclude(state='done')
+        .values('job__source__name').annotate(count=Count('id')).values_list('job__source__name', 'count')
+    })
+    capacity = settings.JOB_AUTOMATION['PLATFORM_CAPACITY']
+    return {
+        platform: max(capacity.get(platform, capacity['default']) - load[platform], 0)
+        for platform in SUPPORTED_PLATFORMS
+        if not circuit_breaker.is_open(platform)  # no new work for a platform that is failing
+    }
+
+
+def find_matches(listings, rules_by_user, taken, profiles=None):
+    """
+    Evaluate every rule against every listing in one pass.
+
+    Returns {user id: [Candidate]} best first; a listing matched by several of
+    a user's rules is ranked by the highest-priority one, the others stand in
+    once that rule's daily cap is used up. Within a priority, listings closer
+    to the places in the user's profile (``profiles``: {user id: snapshot})
+    come first.
+    """
+    profiles = profiles or {}
+    matches = defaultdict(list)
+    for listing in listings:
+        timestamp = listing['posted_date'] or listing['scraped_at']
+        recency = -timestamp.timestamp() if timestamp else 0
+        platform = listing['source__name'].lower()
+        job = SimpleNamespace(**listing)
+        for user_id, rules in rules_by_user.items():
+            if (user_id, listing['id']) in taken:
+                continue
+            matched = [rule for rule, predicate in rules if predicate(listing)]  # ordered by priority
+            if matched:
+                profile = profiles.get(user_id)
+                location = -location_match_score(profile, job) if profile else 0
+                matches[user_id].append(Candidate(
+                    matched[0].priority, location, recency, user_id, listing['id'],
+                    tuple(rule.id for rule in matched), platform
+                ))
+    for candidates in matches.values():
+        candidates.sort()
+    return matches
+
+
+def allocate(matches, user_caps, rule_caps, platform_capacity):
+    """
+    Fair, priority-ordered allocation of application slots.
+
+    Users are served round robin (fewest slots taken so far first, ties going
+    to the more urgent match) so one user with hundreds of matches cannot
+    starve the others of platform capacity.
+    """
+    def usable_rule(candidate):
+        if platform_capacity.get(candidate.platform, 0) <= 0:
+            return None
+        return next((rule_id for rule_id in candidate.rule_ids if rule_caps.get(rule_id, 0) > 0), None)
+
+    positions = {user_id: 0 for user_id in matches}
+    heap = [(0, candidates[0].priority, user_id) for user_id, candidates in matches.items() if user_caps.get(user_id)]
+    heapq.heapify(heap)
+    allocation = defaultdict(list)
+
+    while heap:
+        turns, _, user_id = heapq.heappop(heap)
+        candidates = matches[user_id]
+        position = positions[user_id]
+        rule_id = None
+        while position < len(candidates):
+            rule_id = usable_rule(candidates[position])
+            if rule_id is not None:
+                break
+            position += 1
+        if rule_id is None:
+            continue
+
+        candidate = candidates[position]
+        allocation[user_id].append((candidate, rule_id))
+        user_caps[user_id] -= 1
+        rule_caps[rule_id] -= 1
+        platform_capacity[candidate.platform] -= 1
+        positions[user_id] = position + 1
+
+        if positions[user_id] < len(candidates) and user_caps[user_id] > 0:
+            heapq.heappush(heap, (turns + 1, candidates[positions[user_id]].priority, user_id))
+    return allocation
+
+
+def prepare_cover_letters(allocation):
+    """Write every allocated job's cover letter in one concurrent batch, before any session is queued"""
+    profiles = snapshot.for_users(list(allocation))
+    jobs = JobListing.objects.in_bulk([candidate.job_id for allocated in allocation.values() for candidate, _ in allocated])
+    items = []
+    for user_id, allocated in allocation.items():
+        profile = profiles.get(user_id)
+        template = cover_letters.template_for(profile)
+        items.extend((user_id, profile, jobs[candidate.job_id], template) for candidate, _ in allocated)
+    return cover_letters.prepare(items)
+
+
+def dispatch(allocation):
+    """Queue one checkpointed session per user; returns the sessions"""
+    sessions = []
+    triggered = Counter()
+    for user_id, allocated in allocation.items():
+        platforms = {candidate.platform for candidate, _ in allocated}
+        session = AutomationSession.objects.create(
+            user_id=user_id,
+            session_type='job_application',
+            target_platform=platforms.pop() if len(platforms) == 1 else 'multiple',
+            automation_config={'trigger': 'auto_apply'},
+            status='running',
+            started_at=timezone.now(),
+            total_jobs_targeted=len(allocated)
+        )
+        checkpoints.create_checkpoints(
+            session,
+            [candidate.job_id for candidate, _ in allocated],
+            rules={candidate.job_id: rule_id for candidate, rule_id in allocated}
+        )
+        checkpoints.enqueue(session, list(session.checkpoints.order_by('id')))
+        triggered.update(rule_id for _, rule_id in allocated)
+        sessions.append(session)
+
+    for rule_id, count in triggered.items():
+        AutomationRule.objects.filter(pk=rule_id).update(times_triggered=F('times_triggered') + count)
+    return sessions
+
+
+def run(job_ids=None, lookback_hours=None):
+    """One scheduling pass, unless another is running; returns a summary dict"""
+    if not cache.add(RUN_LOCK_KEY, True, timeout=RUN_LOCK_TIMEOUT):
+        logger.info("Auto-apply pass skipped: another pass is running")
+        return {'users': 0, 'listings': 0, 'matched': 0, 'queued': 0, 'skipped': True}
+    try:
+        return _run(job_ids, lookback_hours)
+    finally:
+        cache.delete(RUN_LOCK_KEY)
+
+
+def _run(job_ids, lookback_hours):
+    rules_by_user = load_rules()
+    if not rules_by_user:
+        return {'users': 0, 'listings': 0, 'matched': 0, 'queued': 0}
+
+    listings = load_listings(job_ids, lookback_hours)
+    user_ids = list(rules_by_user)
+    taken = taken_pairs(user_ids, [listing['id'] for listing in listings])
+    matches = find_matches(listings, rules_by_user, taken, snapshot.for_users(user_ids))
+
+    allocation = allocate(
+        matches,
+        remaining_user_caps(user_ids),
+        remaining_rule_caps([rule for rules in rules_by_user.values() for rule, _ in rules]),
+        remaining_platform_capacity()
+    )
+    prepare_cover_letters(allocation)
+    sessions = dispatch(allocation)
+
+    summary = {
+        'users': len(user_ids),
+        'listings': len(listings),
+        'matched': sum(len(candidates) for candidates in matches.values()),
+        'queued': sum(len(allocated) for allocated in allocation.values()),
+        'sessions': len(sessions),
+    }
+    logger.info(
+        f"Auto-apply pass: {summary['listings']} listings x {summary['users']} users, "
+        f"{summary['matched']} matches, {summary['queued']} applications queued"
+    )
+    return summary
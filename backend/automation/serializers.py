@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from .conditions import ConditionError, compile_conditions
 from .models import (
     AutomationSession, JobApplication, ApplicationFormField,
     AutomationRule, PlatformCredentials
@@ -53,6 +54,13 @@ class AutomationRuleSerializer(serializers.ModelSerializer):
         fields = '__all__'
         read_only_fields = ('id', 'user', 'created_at', 'updated_at')
 
+    def validate_conditions(self, value):
+        try:
+            compile_conditions(value)
+        except ConditionError as e:
+            raise serializers.ValidationError(str(e))
+        return value
+
     def create(self, validated_data):
         validated_data['user'] = self.context['request'].user
         return super().create(validated_data)
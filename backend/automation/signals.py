@@ -0,0 +1,31 @@
+"""
+Signal handlers moving a user's answer store generation when one of the
+sources of their known form answers changes
+"""
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+
+from profiles.models import ApplicationTemplate, UserProfile
+from .answer_store import bump_generation
+from .models import JobApplication
+
+
+def _bump_later(user_id):
+    # Also after commit, or an index built during the transaction would keep the old rows
+    bump_generation(user_id)
+    transaction.on_commit(lambda: bump_generation(user_id))
+
+
+def _application_changed(sender, instance, **kwargs):
+    _bump_later(instance.user_id)
+
+
+def _template_changed(sender, instance, **kwargs):
+    user_id = UserProfile.objects.filter(pk=instance.profile_id).values_list('user_id', flat=True).first()
+    if user_id is not None:
+        _bump_later(user_id)
+
+
+for signal in (post_save, post_delete):
+    signal.connect(_application_changed, sender=JobApplication, dispatch_uid=f'answers-application-{signal is post_save}')
+    signal.connect(_template_changed, sender=ApplicationTemplate, dispatch_uid=f'answers-template-{signal is post_save}')
@@ -1,15 +1,22 @@
 from celery import shared_task
+from django.conf import settings
 from django.contrib.auth.models import User
 from django.utils import timezone
 from .models import AutomationSession, JobApplication
 from jobs.models import JobListing
 from .automation_engine import LinkedInAutomator, IndeedAutomator
+from hopeforjob.idempotency import idempotent
+from profiles import snapshot
+from . import artifacts, checkpoints, circuit_breaker, cover_letters, events
+from .cancellation import SessionCancelled, is_cancelled, revoke_tasks
+from .circuit_breaker import CircuitOpen
 import logging
 
 logger = logging.getLogger('automation')
 
 
 @shared_task
+@idempotent(lambda user_id, source_name, search_criteria: [user_id, source_name.lower(), search_criteria])
 def scrape_jobs_task(user_id, source_name, search_criteria):
     """
     Background task to scrape jobs from various sources
@@ -71,10 +78,19 @@ def scrape_jobs_task(user_id, source_name, search_criteria):
 
 
 @shared_task
+@idempotent(
+    lambda user_id, job_id, session_id=None: [user_id, int(job_id), session_id],
+    lock_timeout=settings.JOB_AUTOMATION['APPLICATION_LEASE_SECONDS']
+)
 def apply_to_job_task(user_id, job_id, session_id=None):
     """
     Background task to automatically apply to a specific job
     """
+    # Bound before anything can raise, for the cleanup in the handlers below
+    session = checkpoint = application = probes = None
+    breakers = ()
+    created = False
+    previous_status = None
     try:
         user = User.objects.get(id=user_id)
         job = JobListing.objects.get(id=job_id)
@@ -82,6 +98,9 @@ def apply_to_job_task(user_id, job_id, session_id=None):
         # Get or create session
         if session_id:
             session = AutomationSession.objects.get(session_id=session_id)
+            if session.status == 'cancelled' or is_cancelled(session.pk):
+                logger.info(f"Skipping {job.title} at {job.company_name}: session {session_id} was cancelled")
+                return {'status': 'cancelled', 'job_id': job_id}
         else:
             session = AutomationSession.objects.create(
                 user=user,
@@ -92,47 +111,102 @@ def apply_to_job_task(user_id, job_id, session_id=None):
                 total_jobs_targeted=1
             )
         
+        # Lease the job so a redelivered or resumed task can't run it twice
+        checkpoint = checkpoints.claim(session, job)
+        if checkpoint is None:
+            logger.info(f"Skipping {job.title} at {job.company_name}: already handled in session {session.session_id}")
+            return {'status': 'skipped', 'job_id': job_id}
+        
+        # Don't start a browser while the platform (or this account) keeps failing
+        breakers = circuit_breaker.breaker_names(job.source.name, user.id)
+        try:
+            probes = circuit_breaker.acquire(breakers, probe_id=str(session.session_id))
+        except CircuitOpen as e:
+            checkpoints.postpone(checkpoint, e.retry_after)
+            events.publish(session, 'job_deferred', job_id=job.id, retry_in=round(e.retry_after), reason=str(e))
+            logger.info(f"Deferred {job.title} at {job.company_name} by {e.retry_after:.0f}s: {str(e)}")
+            return {'status': 'deferred', 'job_id': job_id, 'retry_in': round(e.retry_after)}
+        
         logger.info(f"Starting job application for {job.title} at {job.company_name}")
         
-        # Create application record
-        application = JobApplication.objects.create(
+        # Create application record (or pick up the one left by an earlier attempt)
+        application, created = JobApplication.objects.get_or_create(
             user=user,
             job=job,
-            session=session,
-            is_automated=True,
-            status='pending'
+            defaults={'session': session, 'rule_id': checkpoint.rule_id, 'is_automated': True, 'status': 'pending'}
         )
+        previous_status = application.status
+        if not created:
+            if application.status not in ('pending', 'failed'):
+                session = checkpoints.finish(checkpoint, 'skipped')
+                events.publish(session, 'application_skipped', job_id=job.id, application_id=application.id)
+                events.publish_counters(session)
+                logger.info(f"Already applied to {job.title} at {job.company_name}, skipping")
+                return {
+                    'application_id': str(application.application_id),
+                    'status': 'skipped',
+                    'success': False,
+                    'message': 'Already applied to this job'
+                }
+            application.session = session
+            application.rule_id = checkpoint.rule_id or application.rule_id
+            application.status = 'pending'
+            application.error_details = ''
+            application.save()
+        
+        events.publish(session, 'job_started', job_id=job.id, application_id=application.id,
+                       title=job.title, company=job.company_name)
+        
+        # Prepared ahead by bulk sessions; otherwise the filled-in template
+        profile = snapshot.for_user(user)
+        if not application.cover_letter_used:
+            application.cover_letter_used = cover_letters.letter_for(
+                user.id, profile, job, cover_letters.template_for(profile, session)
+            )
+            application.save(update_fields=['cover_letter_used', 'last_updated'])
         
         # Initialize appropriate automator
         if job.source.name.lower() == 'linkedin':
-            automator = LinkedInAutomator(user, session)
+            automator = LinkedInAutomator(user, session, profile)
         elif job.source.name.lower() == 'indeed':
-            automator = IndeedAutomator(user, session)
+            automator = IndeedAutomator(user, session, profile)
         else:
             raise ValueError(f"Unsupported platform: {job.source.name}")
+        automator.checkpoint = checkpoint
+        automator.cover_letter = application.cover_letter_used
         
-        # Perform application
-        result = automator.apply_to_job(job, application)
+        # Perform application (the browser is closed as soon as this block exits)
+        with automator:
+            result = automator.apply_to_job(job, application)
+        
+        if result.get('success'):
+            circuit_breaker.record_success(breakers, probes)
+        else:
+            scope = circuit_breaker.PLATFORM if automator.challenged else result.get('scope', circuit_breaker.ACCOUNT)
+            circuit_breaker.record_scoped_failure(breakers, probes, scope, challenge=automator.challenged,
+                                                  reason=result.get('error', ''))
         
         # Update application status
         if result.get('success'):
             application.status = 'submitted'
             application.applied_at = timezone.now()
-            session.applications_submitted += 1
         else:
             application.status = 'failed'
             application.error_details = result.get('error', 'Unknown error')
-            session.applications_failed += 1
         
         application.automation_logs = result.get('logs', [])
+        application.screenshots = list(application.screenshots or []) + automator.stored_screenshots()
         application.save()
         
         # Update session progress
-        session.jobs_processed += 1
-        if session.jobs_processed >= session.total_jobs_targeted:
-            session.status = 'completed'
-            session.completed_at = timezone.now()
-        session.save()
+        session = checkpoints.finish(checkpoint, application.status)
+        
+        if application.status == 'submitted':
+            events.publish(session, 'application_submitted', job_id=job.id, application_id=application.id)
+        else:
+            events.publish(session, 'application_failed', job_id=job.id, application_id=application.id,
+                           error=application.error_details)
+        events.publish_counters(session)
         
         logger.info(f"Job application completed. Status: {application.status}")
         
@@ -142,17 +216,37 @@ def apply_to_job_task(user_id, job_id, session_id=None):
             'success': result.get('success', False),
             'message': result.get('message', '')
         }
+    
+    except SessionCancelled:
+        # Nothing was submitted; the job stays unfinished so a resume picks it up
+        logger.info(f"Job application for job {job_id} aborted: session {session_id} was cancelled")
+        if probes is not None:
+            circuit_breaker.release_probes(probes)
+        if checkpoint is not None:
+            checkpoints.release(checkpoint)
+        if application is not None:
+            if created:
+                application.delete()
+            else:
+                application.status = previous_status
+                application.save()
+        if session is not None:
+            events.publish(session, 'job_cancelled', job_id=job_id)
+        return {'status': 'cancelled', 'job_id': job_id}
         
     except Exception as e:
         logger.error(f"Job application task failed: {str(e)}")
-        if 'application' in locals():
+        if probes is not None:
+            circuit_breaker.record_scoped_failure(breakers, probes, circuit_breaker.error_scope(e), reason=str(e))
+        if application is not None:
             application.status = 'failed'
             application.error_details = str(e)
             application.save()
         
-        if 'session' in locals():
-            session.applications_failed += 1
-            session.save()
+        if checkpoint is not None:
+            session = checkpoints.finish(checkpoint, 'failed')
+            events.publish(session, 'application_failed', job_id=job_id, error=str(e))
+            events.publish_counters(session)
         
         return {
             'status': 'failed',
@@ -161,77 +255,67 @@ def apply_to_job_task(user_id, job_id, session_id=None):
 
 
 @shared_task
-def bulk_apply_task(user_id, job_ids, automation_config):
+@idempotent(lambda user_id, job_ids, automation_config, session_id=None: [user_id, sorted(job_ids), session_id])
+def bulk_apply_task(user_id, job_ids, automation_config, session_id=None):
     """
     Background task to apply to multiple jobs in bulk
+    
+    Each job gets a checkpoint and its own application task, staggered by the
+    configured delay; task ids are stored on the session so stopping it can
+    revoke the queue. Cover letters are generated for all jobs first.
     """
     try:
         user = User.objects.get(id=user_id)
-        jobs = JobListing.objects.filter(id__in=job_ids)
+        job_ids = list(JobListing.objects.filter(id__in=job_ids).values_list('id', flat=True))
         
-        # Create automation session
-        session = AutomationSession.objects.create(
-            user=user,
-            session_type='job_application',
-            target_platform='multiple',
-            automation_config=automation_config,
-            status='running',
-            started_at=timezone.now(),
-            total_jobs_targeted=len(jobs)
-        )
+        # Get or create automation session
+        if session_id:
+            session = AutomationSession.objects.get(session_id=session_id)
+            if session.status == 'cancelled':
+                return {'session_id': session_id, 'status': 'cancelled'}
+        else:
+            session = AutomationSession(
+                user=user,
+                session_type='job_application',
+                target_platform='multiple',
+                automation_config=automation_config
+            )
+        session.status = 'running'
+        session.started_at = timezone.now()
+        session.total_jobs_targeted = len(job_ids)
+        session.save()
         
-        logger.info(f"Starting bulk application session {session.session_id} for {len(jobs)} jobs")
+        logger.info(f"Starting bulk application session {session.session_id} for {len(job_ids)} jobs")
         
-        results = []
+        checkpoints.create_checkpoints(session, job_ids)
+        pending = list(session.checkpoints.filter(state='pending').select_related('job').order_by('id'))
         
-        # Apply to each job
-        for job in jobs:
-            try:
-                result = apply_to_job_task.delay(user_id, job.id, str(session.session_id))
-                results.append({
-                    'job_id': job.id,
-                    'job_title': job.title,
-                    'company': job.company_name,
-                    'result': result.get()
-                })
-                
-                # Add delay between applications to avoid being flagged
-                import time
-                time.sleep(automation_config.get('delay_between_applications', 30))
-                
-            except Exception as e:
-                logger.error(f"Failed to apply to job {job.id}: {str(e)}")
-                results.append({
-                    'job_id': job.id,
-                    'job_title': job.title,
-                    'company': job.company_name,
-                    'result': {'status': 'failed', 'error': str(e)}
-                })
-        
-        # Update session
-        session.status = 'completed'
-        session.completed_at = timezone.now()
-        session.results_summary = {'applications': results}
-        session.save()
+        # Write the cover letters before any browser starts
+        profile = snapshot.for_user(user)
+        template = cover_letters.template_for(profile, session)
+        cover_letters.prepare([(user.id, profile, checkpoint.job, template) for checkpoint in pending])
+        
+        task_ids = checkpoints.enqueue(session, pending)
+        if is_cancelled(session.pk):
+            revoke_tasks(task_ids)
         
-        logger.info(f"Bulk application session completed. Applied to {session.applications_submitted} jobs")
+        logger.info(f"Queued {len(task_ids)} applications for bulk session {session.session_id}")
         
         return {
             'session_id': str(session.session_id),
-            'status': 'completed',
-            'total_jobs': len(jobs),
-            'successful_applications': session.applications_submitted,
-            'failed_applications': session.applications_failed,
-            'results': results
+            'status': 'running',
+            'total_jobs': len(job_ids),
+            'task_ids': task_ids
         }
         
     except Exception as e:
         logger.error(f"Bulk apply task failed: {str(e)}")
-        if 'session' in locals():
+        if 'session' in locals() and session.pk:
             session.status = 'failed'
             session.error_message = str(e)
             session.completed_at = timezone.now()
             session.save()
+            events.publish_counters(session)
         
         return {
             'status': 'failed',
@@ -239,6 +323,63 @@ def bulk_apply_task(user_id, job_ids, automation_config):
         }
 
 
+@shared_task
+def schedule_auto_apply(job_ids=None):
+    """
+    Match listings against every user's auto-apply rules and queue the winners
+    (new listings after a crawl, or the recent lookback window when periodic)
+    """
+    from .scheduler import run
+    
+    summary = run(job_ids)
+    if summary.get('skipped'):
+        return "Skipped: another auto-apply pass is running"
+    return f"Queued {summary['queued']} auto-applications from {summary['matched']} matches"
+
+
+@shared_task
+def reap_stale_checkpoints():
+    """
+    Periodic task to recover jobs whose worker died mid-application
+    """
+    expired, requeued = checkpoints.reap_stale()
+    if expired or requeued:
+        logger.info(f"Recovered {expired} expired job leases, requeued {requeued} jobs")
+    return f"Recovered {expired} expired leases, requeued {requeued} jobs"
+
+
+@shared_task
+def prune_form_analysis_cache():
+    """
+    Periodic task to drop expired and least recently used cached form analyses
+    """
+    from . import form_cache
+    
+    count = form_cache.prune()
+    logger.info(f"Pruned {count} cached form analyses")
+    return f"Pruned {count} form analyses"
+
+
+@shared_task
+def prune_cover_letters():
+    """
+    Periodic task to drop expired and least recently used generated cover letters
+    """
+    count = cover_letters.prune()
+    logger.info(f"Pruned {count} cached cover letters")
+    return f"Pruned {count} cover letters"
+
+
+@shared_task
+def prune_artifacts():
+    """
+    Periodic task to drop debug screenshots past their age or beyond the artifact store's size limit
+    """
+    count = artifacts.prune()
+    logger.info(f"Pruned {count} automation artifacts")
+    return f"Pruned {count} artifacts"
+
+
 @shared_task
 def cleanup_old_sessions():
     """
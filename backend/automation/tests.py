@@ -1,3 +1,1124 @@
-from django.test import TestCase
+import asyncio
+import base64
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import Future
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone as django_timezone
+from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from analytics.models import AIUsage
+from hopeforjob import idempotency, llm
+from hopeforjob.idempotency import idempotency_key, idempotent
+from jobs.models import JobListing, JobSource
+from profiles import snapshot
+from profiles.models import ApplicationTemplate, UserProfile
+from . import (
+    answer_store, artifacts, cancellation, circuit_breaker, cover_letters, form_cache, forms, prompts, scheduler,
+    tasks,
+)
+from .automation_engine import LinkedInAutomator
+from .cancellation import SessionCancelled
+from .circuit_breaker import CircuitOpen
+from .conditions import ConditionError, compile_conditions
+from .models import (
+    ApplicationFormField, AutomationRule, AutomationSession, FormAnalysis, JobApplication, SessionCheckpoint
+)
+from .rules import LISTING_FIELDS
+from .serializers import AutomationRuleSerializer
+from .tasks import apply_to_job_task
+
+
+def listing(listing_id, place_id, latitude, longitude, day=1, **fields):
+    row = {
+        'id': listing_id, 'place_id': place_id, 'latitude': latitude, 'longitude': longitude,
+        'is_remote': False, 'posted_date': datetime(2026, 1, day, tzinfo=timezone.utc),
+        'scraped_at': None, 'source__name': 'LinkedIn',
+    }
+    row.update(fields)
+    return row
+
+
+class FindMatchesTests(SimpleTestCase):
+
+    def test_closer_listings_rank_first_within_a_priority(self):
+        rule = SimpleNamespace(id=1, priority=0)
+        listings = [
+            listing(1, 'us-ma-boston', 42.3601, -71.0589, day=3),
+            listing(2, 'us-nj-newark', 40.7357, -74.1724, day=1),
+            listing(3, 'us-pa-philadelphia', 39.9526, -75.1652, day=2),
+        ]
+        profiles = {7: SimpleNamespace(place_id='us-ny-new-york', preferred_place_ids=())}
+
+        matches = scheduler.find_matches(listings, {7: [(rule, lambda row: True)]}, set(), profiles)
+        self.assertEqual([candidate.job_id for candidate in matches[7]], [2, 3, 1])
+
+        # Without a profile the newest listing comes first
+        matches = scheduler.find_matches(listings, {7: [(rule, lambda row: True)]}, set())
+        self.assertEqual([candidate.job_id for candidate in matches[7]], [1, 3, 2])
+
+    def test_priority_outranks_location(self):
+        urgent, relaxed = SimpleNamespace(id=1, priority=0), SimpleNamespace(id=2, priority=5)
+        listings = [
+            listing(1, 'us-nj-newark', 40.7357, -74.1724),
+            listing(2, 'us-ma-boston', 42.3601, -71.0589),
+        ]
+        rules = {7: [(urgent, lambda row: row['id'] == 2), (relaxed, lambda row: True)]}
+        profiles = {7: SimpleNamespace(place_id='us-ny-new-york', preferred_place_ids=())}
+
+        matches = scheduler.find_matches(listings, rules, set(), profiles)
+        self.assertEqual([candidate.job_id for candidate in matches[7]], [2, 1])
+        self.assertEqual(matches[7][0].rule_ids, (1, 2))
+
+
+class AutomationTestCase(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        cancellation._db_checked.clear()
+        self.user = User.objects.create_user('ada', password='secret')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.source = JobSource.objects.create(name='linkedin', base_url='https://linkedin.com')
+
+    def make_listing(self, title='Engineer'):
+        return JobListing.objects.create(
+            title=title, company_name='Initech', description='', location='Berlin',
+            source=self.source, source_url='https://linkedin.com/jobs/1'
+        )
+
+    def make_session(self, status='running', user=None, **fields):
+        return AutomationSession.objects.create(
+            user=user or self.user, target_platform='linkedin', status=status, **fields
+        )
+
+
+class SessionEventTicketTests(AutomationTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.session = self.make_session('completed', jobs_processed=2)
+
+    def ticket(self, session=None):
+        response = self.client.post(f'/api/automation/sessions/{(session or self.session).pk}/stream_ticket/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data['url'].endswith(f"?ticket={response.data['ticket']}"))
+        return response.data['ticket']
+
+    async def open_stream(self, query, session=None):
+        response = await self.async_client.get(f'/api/automation/sessions/{(session or self.session).pk}/events/{query}')
+        if response.status_code != 200:
+            return response.status_code, None
+        frames = [frame async for frame in response.streaming_content]
+        return 200, b''.join(frames).decode()
+
+    async def test_ticket_opens_the_stream_once(self):
+        ticket = await sync_to_async(self.ticket)()
+        status, body = await self.open_stream(f'?ticket={ticket}')
+        self.assertEqual(status, 200)
+        self.assertIn('event: snapshot', body)
+        self.assertIn('"jobs_processed": 2', body)
+
+        self.assertEqual((await self.open_stream(f'?ticket={ticket}'))[0], 401)
+
+    async def test_ticket_is_bound_to_its_session(self):
+        other = await AutomationSession.objects.acreate(user=self.user, target_platform='linkedin', status='completed')
+        ticket = await sync_to_async(self.ticket)(other)
+        self.assertEqual((await self.open_stream(f'?ticket={ticket}'))[0], 401)
+
+    async def test_api_token_is_not_accepted_in_the_url(self):
+        token = await Token.objects.acreate(user=self.user)
+        self.assertEqual((await self.open_stream(f'?token={token.key}'))[0], 401)
+        response = await self.async_client.get(
+            f'/api/automation/sessions/{self.session.pk}/events/', headers={'Authorization': f'Token {token.key}'}
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_tickets_are_only_issued_for_own_sessions(self):
+        stranger = User.objects.create_user('eve', password='secret')
+        session = self.make_session(user=stranger)
+        response = self.client.post(f'/api/automation/sessions/{session.pk}/stream_ticket/')
+        self.assertEqual(response.status_code, 404)
+
+
+class FakeAutomator:
+    """Stands in for a platform automator; ``result`` is returned or raised by apply_to_job"""
+
+    result = {'success': True, 'message': 'Applied'}
+    challenged = False
+
+    def __init__(self, user, session, profile=None):
+        self.session = session
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def apply_to_job(self, job, application):
+        if isinstance(self.result, BaseException):
+            raise self.result
+        return dict(self.result)
+
+    def stored_screenshots(self):
+        return []
+
+
+def automator(result, challenged=False):
+    return type('Automator', (FakeAutomator,), {'result': result, 'challenged': challenged})
+
+
+class ApplyTaskTestCase(AutomationTestCase):
+
+    def setUp(self):
+        super().setUp()
+        UserProfile.objects.create(user=self.user)
+        self.job = self.make_listing()
+        self.session = self.make_session(total_jobs_targeted=1)
+
+    def apply(self, result, job=None, challenged=False):
+        with mock.patch('automation.tasks.LinkedInAutomator', automator(result, challenged)):
+            return apply_to_job_task(self.user.id, (job or self.job).id, str(self.session.session_id))
+
+
+class CancellationTests(ApplyTaskTestCase):
+
+    def test_cancelling_mid_application_hands_the_job_back(self):
+        result = self.apply(SessionCancelled())
+        self.assertEqual(result['status'], 'cancelled')
+        self.assertFalse(JobApplication.objects.exists())
+        self.assertEqual(SessionCheckpoint.objects.get(job=self.job).state, 'pending')
+
+    def test_cancelling_before_the_lease_is_taken(self):
+        with mock.patch('automation.tasks.checkpoints.claim', side_effect=SessionCancelled):
+            result = self.apply({'success': True})
+        self.assertEqual(result, {'status': 'cancelled', 'job_id': self.job.id})
+
+    def test_earlier_application_status_is_restored(self):
+        application = JobApplication.objects.create(user=self.user, job=self.job, status='failed')
+        self.apply(SessionCancelled())
+        application.refresh_from_db()
+        self.assertEqual(application.status, 'failed')
+
+    def test_database_status_is_seen_without_the_cache_flag(self):
+        self.assertFalse(cancellation.is_cancelled(self.session.pk))
+        AutomationSession.objects.filter(pk=self.session.pk).update(status='cancelled')
+        cache.clear()
+        # Within the check interval the earlier answer stands
+        with self.assertNumQueries(0):
+            self.assertFalse(cancellation.is_cancelled(self.session.pk))
+
+        with mock.patch('automation.cancellation.time.monotonic', return_value=time.monotonic() + 60):
+            self.assertTrue(cancellation.is_cancelled(self.session.pk))
+        with self.assertNumQueries(0):
+            self.assertTrue(cancellation.is_cancelled(self.session.pk))
+
+    def test_stop_session_skips_queued_jobs(self):
+        response = self.client.post(f'/api/automation/sessions/{self.session.pk}/stop_session/')
+        self.assertEqual(response.data['status'], 'cancelled')
+        self.assertEqual(self.apply({'success': True})['status'], 'cancelled')
+        self.assertFalse(JobApplication.objects.exists())
+
+
+class ResumeTests(AutomationTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.queued = []
+        patcher = mock.patch.object(apply_to_job_task, 'apply_async', side_effect=self.fake_apply_async)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def fake_apply_async(self, args, countdown=0):
+        task_id = f'task-{len(self.queued) + 1}'
+        self.queued.append((args[1], task_id))
+        return SimpleNamespace(id=task_id)
+
+    def make_checkpoints(self, session, *states):
+        now = django_timezone.now()
+        made = []
+        for index, (state, minutes) in enumerate(states):
+            checkpoint = SessionCheckpoint(
+                session=session, job=self.make_listing(f'Job {index}'), state=state, task_id=f'old-{index}'
+            )
+            if state == 'in_flight':
+                checkpoint.lease_expires_at = now + timedelta(minutes=minutes)
+            elif state == 'pending':
+                checkpoint.not_before = now + timedelta(minutes=minutes)
+            checkpoint.save()
+            made.append(checkpoint)
+        session.task_ids = [checkpoint.task_id for checkpoint in made]
+        session.save()
+        return made
+
+    def resume(self, session):
+        return self.client.post(f'/api/automation/sessions/{session.pk}/resume_session/')
+
+    def test_healthy_running_session_is_left_alone(self):
+        session = self.make_session('running')
+        self.make_checkpoints(session, ('in_flight', 10), ('pending', 5), ('done', 0))
+
+        response = self.resume(session)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.queued, [])
+        session.refresh_from_db()
+        self.assertEqual(session.task_ids, ['old-0', 'old-1', 'old-2'])
+
+    def test_running_session_requeues_only_stalled_jobs(self):
+        session = self.make_session('running')
+        expired, due, waiting, done = self.make_checkpoints(
+            session, ('in_flight', -1), ('pending', -1), ('pending', 5), ('done', 0)
+        )
+
+        response = self.resume(session)
+        self.assertEqual(response.data['jobs_queued'], 2)
+        self.assertEqual([job_id for job_id, _ in self.queued], [expired.job_id, due.job_id])
+        session.refresh_from_db()
+        # The waiting job's task is still queued and still revocable
+        self.assertEqual(session.task_ids, ['task-1', 'task-2', 'old-2'])
+
+    def test_requeued_task_ids_change_the_etag(self):
+        session = self.make_session('running')
+        self.make_checkpoints(session, ('in_flight', -1), ('pending', 5))
+        url = f'/api/automation/sessions/{session.pk}/'
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        self.resume(session)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['task_ids'], ['task-1', 'old-1'])
+
+    def test_cancelled_session_requeues_every_unfinished_job(self):
+        session = self.make_session('cancelled')
+        self.make_checkpoints(session, ('pending', 5), ('in_flight', -1), ('done', 0))
+        cache.set(cancellation.CANCEL_KEY.format(session.pk), True)
+
+        self.assertEqual(self.resume(session).data['jobs_queued'], 2)
+        session.refresh_from_db()
+        self.assertEqual(session.status, 'running')
+        self.assertFalse(cancellation.is_cancelled(session.pk))
+
+    def test_finished_sessions_cannot_be_resumed(self):
+        session = self.make_session('completed')
+        self.make_checkpoints(session, ('done', 0))
+        self.assertEqual(self.resume(session).status_code, 400)
+        failed = self.make_session('failed')
+        self.make_checkpoints(failed, ('done', 0))
+        self.assertEqual(self.resume(failed).data['error'], 'Session has no unfinished jobs')
+
+
+class IdempotencyTests(ApplyTaskTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.calls = []
+        self.task = idempotent(lambda job_id: [int(job_id)])(self.record)
+
+    def record(self, job_id):
+        self.calls.append(job_id)
+        return {'status': 'success', 'job_id': job_id}
+
+    def test_duplicate_is_skipped_while_the_lock_is_held(self):
+        key = idempotency_key(f'{__name__}.record', [1])
+        cache.add(f'{key}:lock', 'first-task')
+        result = self.task(1)
+        self.assertEqual(result, {'status': 'in_progress', 'duplicate': True, 'task_id': 'first-task'})
+        self.assertEqual(self.calls, [])
+
+        cache.delete(f'{key}:lock')
+        self.assertEqual(self.task(1)['status'], 'success')
+        self.assertEqual(self.calls, [1])
+
+    def test_memo_answers_only_recent_duplicates(self):
+        self.task(1)
+        self.assertTrue(self.task('1')['duplicate'])
+        self.assertEqual(self.calls, [1])
+
+        later = time.time() + idempotency.RESULT_TIMEOUT + 1
+        with mock.patch('django.core.cache.backends.locmem.time.time', return_value=later):
+            self.assertNotIn('duplicate', self.task(1))
+        self.assertEqual(self.calls, [1, 1])
+
+    def test_failed_runs_are_not_memoized(self):
+        task = idempotent(lambda job_id: [job_id])(lambda job_id: {'status': 'failed'})
+        task(1)
+        self.assertNotIn('duplicate', task(1))
+
+    def test_malformed_job_id_reaches_the_task(self):
+        result = apply_to_job_task(self.user.id, 'abc', str(self.session.session_id))
+        self.assertEqual(result['status'], 'failed')
+        self.assertEqual(self.task('abc'), {'status': 'success', 'job_id': 'abc'})
+
+
+class TaskRoutingTests(SimpleTestCase):
+
+    def queue_for(self, name):
+        from hopeforjob.celery import app
+
+        return app.amqp.router.route({}, name)['queue'].name
+
+    def test_tasks_reach_their_workload_queue(self):
+        self.assertEqual(self.queue_for('automation.tasks.apply_to_job_task'), 'browser')
+        self.assertEqual(self.queue_for('jobs.tasks.refresh_job_indexes'), 'ingest')
+        self.assertEqual(self.queue_for('automation.tasks.prune_artifacts'), 'maintenance')
+        self.assertEqual(self.queue_for('automation.tasks.bulk_apply_task'), 'default')
+
+    def test_every_route_names_a_registered_task_and_profiled_queue(self):
+        from hopeforjob.celery import app
+
+        app.loader.import_default_modules()
+        for name, route in settings.CELERY_TASK_ROUTES.items():
+            self.assertIn(name, app.tasks)
+            self.assertIn(route['queue'], settings.WORKER_PROFILES)
+        for entry in settings.CELERY_BEAT_SCHEDULE.values():
+            self.assertIn(entry['task'], app.tasks)
+
+    def test_worker_profile_follows_a_single_queue(self):
+        from hopeforjob.celery import apply_worker_profile
+
+        conf = {}
+        apply_worker_profile(conf=conf, options={'queues': 'browser'})
+        self.assertEqual(conf['worker_prefetch_multiplier'], 1)
+        self.assertEqual(conf['worker_max_tasks_per_child'], 20)
+
+        for queues in (['browser', 'ingest'], ['unknown'], None):
+            conf = {}
+            apply_worker_profile(conf=conf, options={'queues': queues})
+            self.assertEqual(conf, {}, queues)
+
+
+class AllocateTests(SimpleTestCase):
+
+    def candidates(self, user_id, count, rule_ids=(1,), platform='linkedin', priority=1):
+        return [
+            scheduler.Candidate(priority, 0, -n, user_id, user_id * 100 + n, rule_ids, platform)
+            for n in range(count)
+        ]
+
+    def test_users_take_turns_for_platform_capacity(self):
+        matches = {1: self.candidates(1, 5), 2: self.candidates(2, 2)}
+        allocation = scheduler.allocate(matches, {1: 10, 2: 10}, {1: 10}, {'linkedin': 4})
+        self.assertEqual({user_id: len(allocated) for user_id, allocated in allocation.items()}, {1: 2, 2: 2})
+
+    def test_caps_are_respected(self):
+        matches = {1: self.candidates(1, 5, rule_ids=(1, 2)) + self.candidates(1, 1, platform='indeed')}
+        allocation = scheduler.allocate(matches, {1: 4}, {1: 1, 2: 2}, {'linkedin': 10, 'indeed': 0})
+        # The first rule's cap is used up, then the next matching rule stands in
+        self.assertEqual([rule_id for _, rule_id in allocation[1]], [1, 2, 2])
+        self.assertFalse(scheduler.allocate(matches, {1: 0}, {1: 5}, {'linkedin': 5}))
+
+
+class SchedulerRunTests(AutomationTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.queued = []
+        patcher = mock.patch.object(
+            apply_to_job_task, 'apply_async',
+            side_effect=lambda args, countdown=0: self.queued.append(args[1]) or SimpleNamespace(id=f'task-{args[1]}')
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        UserProfile.objects.create(user=self.user, auto_apply_enabled=True, max_applications_per_day=2)
+
+    def make_rule(self, user=None, **fields):
+        fields.setdefault('conditions', {'field': 'title', 'op': 'contains', 'value': 'engineer'})
+        return AutomationRule.objects.create(user=user or self.user, name='Rule', **fields)
+
+    def test_overlapping_passes_run_one_at_a_time(self):
+        self.make_rule()
+        for n in range(3):
+            self.make_listing(f'Engineer {n}')
+        overlapping = []
+        load_rules = scheduler.load_rules
+
+        def load_rules_while_another_pass_starts(*args, **kwargs):
+            if not overlapping:
+                # A second pass starting on another worker while this one is running
+                thread = threading.Thread(target=lambda: overlapping.append(scheduler.run()))
+                thread.start()
+                thread.join()
+            return load_rules(*args, **kwargs)
+
+        with mock.patch.object(scheduler, 'load_rules', side_effect=load_rules_while_another_pass_starts):
+            summary = scheduler.run()
+        self.assertEqual(summary['queued'], 2)
+        self.assertEqual(overlapping[0]['queued'], 0)
+        self.assertTrue(overlapping[0]['skipped'])
+        self.assertEqual(len(self.queued), 2)
+        self.assertEqual(JobApplication.objects.count(), 0)
+        self.assertEqual(SessionCheckpoint.objects.count(), 2)
+
+        # The lock is released, also when a pass fails
+        with mock.patch.object(scheduler, 'load_rules', side_effect=RuntimeError('database gone')):
+            with self.assertRaises(RuntimeError):
+                scheduler.run()
+        self.assertNotIn('skipped', scheduler.run())
+
+    def test_pass_queues_matches_once_within_the_daily_cap(self):
+        rule = self.make_rule()
+        jobs = [self.make_listing(f'Engineer {n}') for n in range(3)]
+        self.make_listing('Designer')
+
+        summary = scheduler.run()
+        self.assertEqual((summary['matched'], summary['queued'], summary['sessions']), (3, 2, 1))
+        session = AutomationSession.objects.get(user=self.user)
+        self.assertEqual(session.automation_config, {'trigger': 'auto_apply'})
+        self.assertEqual(sorted(self.queued), sorted(session.checkpoints.values_list('job_id', flat=True)))
+        self.assertEqual(set(session.checkpoints.values_list('rule_id', flat=True)), {rule.id})
+        rule.refresh_from_db()
+        self.assertEqual(rule.times_triggered, 2)
+
+        # Queued jobs are taken and count against today's cap
+        self.assertEqual(scheduler.run(job_ids=[job.id for job in jobs])['queued'], 0)
+
+    def test_users_without_auto_apply_and_broken_rules_are_skipped(self):
+        other = User.objects.create_user('bob', password='secret')
+        UserProfile.objects.create(user=other)
+        self.make_rule(user=other)
+        self.make_rule(conditions={'field': 'salary', 'op': 'contains', 'value': 1})
+        self.make_listing('Engineer')
+
+        with self.assertLogs('automation', 'WARNING'):
+            self.assertEqual(scheduler.run()['queued'], 0)
+        self.assertFalse(AutomationSession.objects.exists())
+
+
+class ConditionTests(AutomationTestCase):
+
+    def setUp(self):
+        super().setUp()
+        indeed = JobSource.objects.create(name='Indeed', base_url='https://indeed.com')
+        rows = [
+            ('Senior Python Engineer', 'Initech', 120000, 150000, ['Python', 'Django'], [], True, 'senior', self.source),
+            ('Data ENGINEER', 'Hooli', None, 90000, ['SQL'], ['python'], False, 'mid', indeed),
+            ('Ingénieur Logiciel', 'Société', 70000, None, [], [], False, '', self.source),
+            ('Designer', 'Initech', None, None, ['Figma'], [], True, 'entry', indeed),
+        ]
+        for title, company, low, high, required, preferred, remote, level, source in rows:
+            JobListing.objects.create(
+                title=title, company_name=company, description='', location='Berlin', source=source,
+                source_url='https://example.com/jobs/1', salary_min=low, salary_max=high,
+                required_skills=required, preferred_skills=preferred, is_remote=remote, experience_level=level
+            )
+
+    def selected(self, conditions):
+        compiled = compile_conditions(conditions)
+        in_database = set(JobListing.objects.filter(compiled.q).values_list('title', flat=True))
+        in_python = {row['title'] for row in JobListing.objects.values(*LISTING_FIELDS) if compiled.matches(row)}
+        self.assertEqual(in_database, in_python, conditions)
+        return in_python
+
+    def test_database_and_predicate_select_the_same_listings(self):
+        cases = [
+            ({'field': 'title', 'op': 'contains', 'value': 'engineer'}, {'Senior Python Engineer', 'Data ENGINEER'}),
+            ({'field': 'title', 'op': 'contains', 'value': 'INGÉNIEUR'}, set()),
+            ({'field': 'title', 'op': 'contains', 'value': 'ingénieur'}, {'Ingénieur Logiciel'}),
+            ({'field': 'company', 'op': 'not_in', 'value': ['initech']}, {'Data ENGINEER', 'Ingénieur Logiciel'}),
+            ({'field': 'platform', 'op': 'eq', 'value': 'indeed'}, {'Data ENGINEER', 'Designer'}),
+            ({'field': 'experience_level', 'op': 'in', 'value': ['senior', 'mid']}, {'Senior Python Engineer', 'Data ENGINEER'}),
+            ({'field': 'salary', 'op': 'gte', 'value': 80000}, {'Senior Python Engineer', 'Data ENGINEER'}),
+            ({'field': 'salary', 'op': 'between', 'value': [60000, 100000]}, {'Data ENGINEER', 'Ingénieur Logiciel'}),
+            ({'field': 'salary_min', 'op': 'ne', 'value': 70000}, {'Senior Python Engineer', 'Data ENGINEER', 'Designer'}),
+            ({'field': 'skills', 'op': 'contains', 'value': 'python'}, {'Senior Python Engineer', 'Data ENGINEER'}),
+            ({'field': 'skills', 'op': 'overlaps', 'value': ['SQL', 'Figma']}, {'Data ENGINEER', 'Designer'}),
+            ({'not': {'field': 'remote', 'op': 'eq', 'value': True}}, {'Data ENGINEER', 'Ingénieur Logiciel'}),
+            ({'any': []}, set()),
+            ({'all': [
+                {'field': 'remote', 'op': 'eq', 'value': True},
+                {'any': [{'field': 'title', 'op': 'contains', 'value': 'design'}, {'field': 'salary', 'op': 'gt', 'value': 1}]},
+            ]}, {'Senior Python Engineer', 'Designer'}),
+            ({'keywords': ['engineer'], 'exclude_keywords': 'data', 'remote_only': True}, {'Senior Python Engineer'}),
+        ]
+        for conditions, expected in cases:
+            self.assertEqual(self.selected(conditions), expected, conditions)
+
+    def test_invalid_conditions_are_rejected(self):
+        for conditions in (
+            'salary', {'field': 'nope', 'value': 1}, {'field': 'salary', 'op': 'contains', 'value': 1},
+            {'field': 'salary', 'op': 'gte', 'value': '100'}, {'field': 'salary', 'op': 'between', 'value': [1]},
+            {'field': 'remote', 'value': 'yes'}, {'field': 'title', 'op': 'in', 'value': 'x'},
+            {'field': 'skills', 'op': 'overlaps', 'value': []}, {'field': 'title'},
+            {'all': [], 'any': []}, {'not': {}, 'all': []},
+            {'keyword': ['python']}, {'keywords': ['python'], 'remote': True}, {'all': [], 'keywords': ['x']},
+        ):
+            with self.assertRaises(ConditionError, msg=conditions):
+                compile_conditions(conditions)
+
+        response = self.client.post('/api/automation/rules/', {
+            'name': 'Broken', 'conditions': {'field': 'salary', 'op': 'gte', 'value': 'lots'}
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('conditions', response.data)
+
+    def test_serializer_rejects_unknown_criteria(self):
+        serializer = AutomationRuleSerializer(data={'name': 'Typo', 'conditions': {'keyword': ['python']}})
+        self.assertFalse(serializer.is_valid())
+        self.assertIn('keyword', str(serializer.errors['conditions'][0]))
+
+        serializer = AutomationRuleSerializer(data={'name': 'Python', 'conditions': {'keywords': ['python']}})
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+
+
+class CircuitBreakerTests(ApplyTaskTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.names = circuit_breaker.breaker_names('LinkedIn', self.user.id)
+        self.platform, self.account = self.names
+
+    def later(self, seconds):
+        return mock.patch('automation.circuit_breaker.time.time', return_value=time.time() + seconds)
+
+    def test_failures_open_the_breaker_and_a_probe_closes_it(self):
+        for _ in range(5):
+            circuit_breaker.record_failure([self.platform], reason='timeout')
+        self.assertTrue(circuit_breaker.is_open(self.platform))
+        with self.assertRaises(CircuitOpen):
+            circuit_breaker.acquire(self.names)
+
+        with self.later(61):
+            probes = circuit_breaker.acquire(self.names, probe_id='first')
+            self.assertEqual(probes, [self.platform])
+            with self.assertRaises(CircuitOpen):
+                circuit_breaker.acquire(self.names)  # one probe at a time
+            circuit_breaker.record_failure(self.names, probes, reason='still failing')
+        state = circuit_breaker.get_state(self.platform)
+        self.assertEqual(state['trips'], 2)
+        self.assertGreater(state['until'], time.time() + 100)  # open twice as long
+
+        with self.later(200):
+            probes = circuit_breaker.acquire(self.names)
+            circuit_breaker.record_success(self.names, probes)
+            self.assertIsNone(circuit_breaker.get_state(self.platform))
+            # The failure window starts afresh, or the old failures would trip it again
+            self.assertEqual(circuit_breaker.failure_rate(self.platform), (0, 0.0))
+
+    def test_challenge_opens_only_the_account(self):
+        circuit_breaker.record_failure(self.names, challenge=True, reason='captcha')
+        self.assertTrue(circuit_breaker.is_open(self.account))
+        self.assertFalse(circuit_breaker.is_open(self.platform))
+
+    def test_open_breaker_defers_the_job(self):
+        for _ in range(5):
+            circuit_breaker.record_failure([self.platform])
+        result = self.apply({'success': True})
+        self.assertEqual(result['status'], 'deferred')
+        self.assertEqual(SessionCheckpoint.objects.get(job=self.job).state, 'pending')
+        self.assertFalse(JobApplication.objects.exists())
+
+    def test_failures_count_against_the_breakers_their_scope_implicates(self):
+        failures = [
+            ({'success': False, 'error': 'No apply button found', 'scope': circuit_breaker.JOB}, (0, 0)),
+            ({'success': False, 'error': 'Failed to complete Easy Apply flow'}, (0, 1)),
+            (ValueError('LinkedIn credentials not found'), (0, 2)),
+            (PlaywrightTimeoutError('Timeout 30000ms exceeded'), (1, 3)),
+        ]
+        for result, (platform_failures, account_failures) in failures:
+            self.apply(result, job=self.make_listing())
+            self.assertEqual(circuit_breaker.failure_rate(self.platform)[0], platform_failures, result)
+            self.assertEqual(circuit_breaker.failure_rate(self.account)[0], account_failures, result)
+
+        self.apply({'success': False, 'error': 'LinkedIn served a security challenge'},
+                   job=self.make_listing(), challenged=True)
+        self.assertTrue(circuit_breaker.is_open(self.account))
+        self.assertEqual(circuit_breaker.failure_rate(self.platform), (2, 1.0))
+
+    def test_probe_slot_is_given_back_when_its_breaker_is_not_implicated(self):
+        for _ in range(5):
+            circuit_breaker.record_failure([self.platform])
+        with self.later(61):
+            self.apply({'success': False, 'error': 'Failed to complete Easy Apply flow'})
+            self.assertTrue(circuit_breaker.acquire(self.names))
+
+
+def completion(content, prompt_tokens=12, completion_tokens=3):
+    return SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+        usage=SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens),
+        model='gpt-test',
+    )
+
+
+class LLMClientTests(SimpleTestCase):
+
+    def setUp(self):
+        self.client = llm.LLMClient(api_key='test', max_concurrency=2)
+        self.addCleanup(self.client.close)
+        self.in_flight = self.most_in_flight = 0
+
+    async def fake_create(self, messages, **kwargs):
+        self.in_flight += 1
+        self.most_in_flight = max(self.most_in_flight, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        if messages[0]['content'] == 'fail':
+            raise RuntimeError('upstream error')
+        return completion(messages[0]['content'].upper())
+
+    def stub(self):
+        return mock.patch.object(self.client.client.chat.completions, 'create', side_effect=self.fake_create)
+
+    def test_calls_share_the_client_within_the_concurrency_limit(self):
+        with self.stub():
+            futures = [self.client.submit([{'role': 'user', 'content': f'q{n}'}]) for n in range(6)]
+            results = [future.result(timeout=5) for future in futures]
+        self.assertEqual([result.content for result in results], [f'Q{n}' for n in range(6)])
+        self.assertEqual((results[0].prompt_tokens, results[0].model), (12, 'gpt-test'))
+        self.assertEqual(self.most_in_flight, 2)
+
+    def test_errors_reach_the_caller(self):
+        with self.stub():
+            with self.assertRaises(RuntimeError):
+                self.client.complete([{'role': 'user', 'content': 'fail'}])
+            # The loop keeps serving later calls
+            self.assertEqual(asyncio.run(self.client.acomplete([{'role': 'user', 'content': 'ok'}])).content, 'OK')
+
+    def test_token_bucket_waits_for_refill(self):
+        async def drain():
+            bucket = llm.TokenBucket(6000)
+            await bucket.acquire(6000)
+            started = time.monotonic()
+            await bucket.acquire(10)  # 0.1s of refill
+            waited = time.monotonic() - started
+            # An oversized call is capped at one minute's worth instead of waiting forever
+            await asyncio.wait_for(llm.TokenBucket(6000).acquire(10 ** 6), timeout=1)
+            return waited
+
+        self.assertGreaterEqual(asyncio.run(drain()), 0.09)
+
+    def test_token_estimate(self):
+        self.assertEqual(llm.estimate_tokens('hello world'), 4)
+        self.assertEqual(llm.estimate_tokens('{"a":"b"}'), 5)
+        self.assertEqual(llm.estimate_message_tokens([{'content': ''}, {'content': 'hi'}]), 9)
+
+    def test_process_shares_one_client(self):
+        llm.reset_client()
+        self.addCleanup(llm.reset_client)
+        self.assertIs(llm.get_client(), llm.get_client())
+
+
+FORM_HTML = '''
+<form>
+  <input type="hidden" name="csrf" value="x">
+  <script>var label = "not a field";</script>
+  <label for="q-{job}-phone">Mobile phone number*</label><input id="q-{job}-phone" name="phone-{job}" required>
+  <label>Years of Python experience <input name="years-{job}" type="number"></label>
+  <fieldset><legend>Will you relocate?</legend>
+    <label><input type="radio" name="relocate-{job}" value="y"> Yes</label>
+    <label><input type="radio" name="relocate-{job}" value="n"> No</label>
+  </fieldset>
+  <select name="level-{job}" aria-label="Seniority"><option>Select an option</option><option>Senior</option></select>
+  <button type="submit">Next</button>
+</form>
+'''
+
+
+def chat_result(content, model='gpt-test'):
+    return llm.ChatResult(content, 40, 10, model, 38, 0.2)
+
+
+def done(value):
+    future = Future()
+    future.set_result(value)
+    return future
+
+
+class FormAnalysisTests(AutomationTestCase):
+
+    def setUp(self):
+        super().setUp()
+        UserProfile.objects.create(user=self.user)
+        self.automator = LinkedInAutomator(self.user, self.make_session())
+        self.automator.ai_enabled = True
+
+    def test_fields_are_extracted_in_document_order(self):
+        fields = forms.extract_fields(FORM_HTML.format(job=1))
+        self.assertEqual(
+            [(field.label, field.type, field.options, field.required) for field in fields],
+            [
+                ('Mobile phone number*', 'text', (), True),
+                ('Years of Python experience', 'number', (), False),
+                ('Will you relocate?', 'radio', ('Yes', 'No'), False),
+                ('Seniority', 'select', ('Senior',), False),
+            ]
+        )
+        self.assertEqual(forms.extract_fields(''), [])
+
+    def test_same_form_on_another_job_has_the_same_key(self):
+        first = forms.extract_fields(FORM_HTML.format(job=1))
+        second = forms.extract_fields(FORM_HTML.format(job=2))
+        self.assertNotEqual(first[0].name, second[0].name)
+        self.assertEqual(forms.structure_key(first, 'u:1'), forms.structure_key(second, 'u:1'))
+        self.assertNotEqual(forms.structure_key(first, 'u:1'), forms.structure_key(first, 'u:2'))
+
+    def test_analysis_is_cached_per_form_structure(self):
+        reply = chat_result('```json\n{"Years of Python experience": {"answer": 5, "confidence": 0.9}}\n```')
+        with mock.patch('automation.automation_engine.llm.submit', return_value=done(reply)) as submit:
+            first = self.automator.analyze_form_with_ai(FORM_HTML.format(job=1), {})
+            second = self.automator.analyze_form_with_ai(FORM_HTML.format(job=2), {})
+        self.assertEqual(submit.call_count, 1)
+        self.assertEqual(first, second)
+        self.assertEqual(first['years of python experience'], {'answer': '5', 'confidence': 0.9})
+        self.assertEqual(FormAnalysis.objects.get().hits, 1)
+        self.assertEqual(AIUsage.objects.get().purpose, 'form_analysis')
+
+    def test_unusable_replies_are_not_cached(self):
+        for outcome in (done(chat_result('I cannot help with that')), RuntimeError('upstream error')):
+            with mock.patch('automation.automation_engine.llm.submit', side_effect=[outcome]):
+                self.assertEqual(self.automator.analyze_form_with_ai(FORM_HTML.format(job=1), {}), {})
+        self.assertFalse(FormAnalysis.objects.exists())
+
+    def test_expired_and_least_recently_used_entries_are_pruned(self):
+        for key in ('a', 'b', 'c'):
+            form_cache.store(key, self.user, {'q': {'answer': key, 'confidence': 1}})
+        FormAnalysis.objects.filter(key='a').update(expires_at=django_timezone.now())
+        FormAnalysis.objects.filter(key='b').update(last_used_at=django_timezone.now() - timedelta(days=1))
+        self.assertIsNone(form_cache.lookup('a'))
+
+        with mock.patch.dict(settings.JOB_AUTOMATION, FORM_ANALYSIS_CACHE_SIZE=1):
+            self.assertEqual(form_cache.prune(), 2)
+        self.assertEqual(list(FormAnalysis.objects.values_list('key', flat=True)), ['c'])
+
+
+class AnswerStoreTests(AutomationTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.profile = UserProfile.objects.create(user=self.user, phone_number='+49 30 1234')
+        answer_store._indexes.clear()
+        self.addCleanup(answer_store._indexes.clear)
+
+    def test_answers_are_fitted_to_the_options(self):
+        options = ('Yes, I am', 'No', '0-2 years', '3-5 years', '10+ years')
+        for text, expected in (
+            ('yes', 'Yes, I am'), ('N', 'No'), ('4', '3-5 years'), ('12 years', '10+ years'),
+            ('3-5 YEARS', '3-5 years'), ('maybe', None),
+        ):
+            self.assertEqual(answer_store.match_option(text, options), expected, text)
+        self.assertEqual(answer_store.match_option('anything', ()), 'anything')
+
+    def test_lookup_matches_similar_questions(self):
+        index = answer_store.AnswerIndex()
+        index.add('Are you legally authorized to work in the United States?', 'Yes', 0.9)
+        index.add('Years of Python experience', '5', 1.0)
+        index.add('Years of Python experience', '1', 0.5)  # less trusted, ignored
+
+        exact = index.lookup('Years of Python experience*')
+        self.assertEqual((exact.text, exact.confidence), ('5', 1.0))
+        fuzzy = index.lookup('Authorized to work in the US without sponsorship?', options=('Yes', 'No'))
+        self.assertEqual(fuzzy.text, 'Yes')
+        self.assertLess(fuzzy.confidence, 0.9)
+        self.assertIsNone(index.lookup('Years of Java experience'))
+        self.assertIsNone(index.lookup('Years of Python experience', options=('Beginner', 'Expert')))
+
+    def test_index_prefers_templates_and_tracks_its_sources(self):
+        job = self.make_listing()
+        JobApplication.objects.create(
+            user=self.user, job=job, status='submitted', custom_answers={'Notice period': '1 month'}
+        )
+        other_job = self.make_listing('Other')
+        stranger = User.objects.create_user('eve', password='secret')
+        JobApplication.objects.create(user=stranger, job=other_job, status='submitted')
+        JobApplication.objects.create(user=self.user, job=other_job, status='submitted')
+        ApplicationFormField.objects.create(
+            job=other_job, field_name='q', field_label='Salary expectation', suggested_answer='90000',
+            confidence_score=0.95
+        )
+
+        index = answer_store.get_index(self.user)
+        self.assertEqual(index.lookup('Notice period').source, 'application')
+        # Suggestions on a job someone else applied to are not this user's answers
+        self.assertIsNone(index.lookup('Salary expectation'))
+        self.assertIs(answer_store.get_index(self.user), index)
+
+        ApplicationTemplate.objects.create(
+            profile=self.profile, name='Default', cover_letter_template='Hi', custom_answers={'Notice period': '2 weeks'}
+        )
+        rebuilt = answer_store.get_index(self.user)
+        self.assertIsNot(rebuilt, index)
+        self.assertEqual(rebuilt.lookup('Notice period').text, '2 weeks')
+
+    def test_lookups_read_the_generation_not_the_tables(self):
+        index = answer_store.get_index(self.user)
+        with self.assertNumQueries(0):
+            self.assertIs(answer_store.get_index(self.user), index)
+
+        application = JobApplication.objects.create(
+            user=self.user, job=self.make_listing(), status='submitted', custom_answers={'Notice period': '1 month'}
+        )
+        self.assertEqual(answer_store.get_index(self.user).lookup('Notice period').text, '1 month')
+        application.delete()
+        self.assertIsNone(answer_store.get_index(self.user).lookup('Notice period'))
+
+    def test_known_answers_come_before_ai(self):
+        ApplicationTemplate.objects.create(
+            profile=self.profile, name='Default', cover_letter_template='Hi',
+            custom_answers={'Years of Python experience': '5'}
+        )
+        fields = forms.extract_fields(FORM_HTML.format(job=1))
+        automator = LinkedInAutomator(self.user, self.make_session())
+        automator.ai_enabled = True
+        suggested = {
+            'years of python experience': {'answer': '2', 'confidence': 0.9},
+            'will you relocate': {'answer': 'yes', 'confidence': 0.8},
+            'seniority': {'answer': 'Lead', 'confidence': 0.9},
+        }
+        with mock.patch.object(automator, 'analyze_form_with_ai', return_value=suggested) as analyze:
+            answers = automator.answer_fields(fields, '', self.make_listing())
+
+        # The whole form, so the analysis is cached under the same key whatever is already known
+        self.assertEqual(analyze.call_args.kwargs['fields'], fields)
+        self.assertEqual(
+            {name.split('-')[0]: (answer.text, answer.source) for name, answer in answers.items()},
+            {'phone': ('+49 30 1234', 'profile'), 'years': ('5', 'template'), 'relocate': ('Yes', 'ai')}
+        )
+
+        job = self.make_listing('Recorded')
+        answer_store.record_fields(job, fields, answers)
+        answer_store.record_fields(job, fields, answers)
+        recorded = dict(ApplicationFormField.objects.filter(job=job).values_list('field_label', 'suggested_answer'))
+        self.assertEqual(len(recorded), 4)
+        self.assertEqual(recorded['Mobile phone number*'], '')  # profile details are not kept
+        self.assertEqual(recorded['Will you relocate?'], 'Yes')
+
+    def test_form_analysis_is_reused_as_known_answers_change(self):
+        automator = LinkedInAutomator(self.user, self.make_session())
+        automator.ai_enabled = True
+        reply = chat_result('```json\n{"Years of Python experience": {"answer": 2, "confidence": 0.9}}\n```')
+        with mock.patch('automation.automation_engine.llm.submit', return_value=done(reply)) as submit:
+            first = automator.answer_fields(forms.extract_fields(FORM_HTML.format(job=1)), '', self.make_listing())
+            ApplicationTemplate.objects.create(
+                profile=self.profile, name='Default', cover_letter_template='Hi',
+                custom_answers={'Years of Python experience': '5'}
+            )
+            second = automator.answer_fields(forms.extract_fields(FORM_HTML.format(job=2)), '', self.make_listing('Other'))
+        self.assertEqual(submit.call_count, 1)
+        years = [
+            next((answer.text, answer.source) for name, answer in answers.items() if name.startswith('years'))
+            for answers in (first, second)
+        ]
+        self.assertEqual(years, [('2', 'ai'), ('5', 'template')])
+
+
+class FormPromptTests(SimpleTestCase):
+
+    long_label = 'Please describe in detail ' + 'your experience with distributed systems ' * 5 + '(required)'
+
+    def fields(self):
+        return [
+            forms.FormField('a', self.long_label, 'textarea', (), False),
+            forms.FormField('b', 'Country', 'select', tuple(f'Country {n}' for n in range(40)), True),
+            forms.FormField('c', 'Years of Python experience', 'number', (), False),
+        ]
+
+    def schema(self, messages):
+        return json.loads(messages[1]['content'].split('Fields: ', 1)[1])
+
+    def test_answers_map_back_by_field_id(self):
+        messages, sent = prompts.form_analysis_messages(self.fields(), {'title': 'Engineer'}, {}, budget=300)
+        schema = self.schema(messages)
+        self.assertEqual([entry['id'] for entry in schema], list(range(len(sent))))
+        self.assertTrue(schema[0]['label'].endswith('...'))
+        self.assertEqual(len(schema[1]['options']), prompts.MAX_OPTIONS)
+
+        reply = '{"0": {"answer": "Five years of Kafka", "confidence": 0.7}, "2": "6", "9": "stray"}'
+        answers = forms.parse_answers(reply, sent)
+        self.assertEqual(answers[forms.normalize_label(self.long_label)]['answer'], 'Five years of Kafka')
+        self.assertEqual(answers['years of python experience'], {'answer': '6', 'confidence': 0.5})
+        self.assertEqual(len(answers), 2)
+
+    def test_dropped_fields_keep_ids_in_line(self):
+        messages, sent = prompts.form_analysis_messages(self.fields(), {}, {}, budget=90)
+        self.assertEqual([field.name for field in sent], ['b'])  # optional fields go first
+        self.assertEqual(self.schema(messages)[0]['id'], 0)
+        self.assertEqual(forms.parse_answers('[{"id": 0, "answer": "Country 3"}]', sent), {
+            'country': {'answer': 'Country 3', 'confidence': 0.5}
+        })
+
+    def test_malformed_replies_yield_nothing(self):
+        fields = self.fields()
+        for reply in ('', 'not json', '"text"', '[1, 2]', '{"0": null}', '{"0": ["a"]}', '[{"answer": "x"}]'):
+            self.assertEqual(forms.parse_answers(reply, fields), {}, reply)
+
+
+class CoverLetterTests(AutomationTestCase):
+
+    def setUp(self):
+        super().setUp()
+        UserProfile.objects.create(user=self.user)
+        self.profile = snapshot.for_user(self.user)
+        self.template = cover_letters.template_for(self.profile)
+        self.job = self.make_listing()
+        configured = mock.patch('automation.cover_letters.llm.is_configured', return_value=True)
+        configured.start()
+        self.addCleanup(configured.stop)
+
+    def prepare(self, *replies):
+        with mock.patch('automation.cover_letters.llm.submit', side_effect=list(replies)) as submit:
+            generated = cover_letters.prepare([(self.user.id, self.profile, self.job, self.template)])
+        return generated, submit.call_count
+
+    def letter(self):
+        return cover_letters.letter_for(self.user.id, self.profile, self.job, self.template)
+
+    def test_model_is_not_called_unless_enabled(self):
+        self.assertFalse(settings.JOB_AUTOMATION['COVER_LETTER_AI'])
+        self.assertEqual(self.prepare(), (0, 0))
+        self.assertEqual(self.letter(), self.template.render(self.job, self.profile))
+
+    @mock.patch.dict(settings.JOB_AUTOMATION, COVER_LETTER_AI=True)
+    def test_enabled_letters_are_prepared_once(self):
+        self.assertEqual(self.prepare(done(chat_result('  Tailored letter\n'))), (1, 1))
+        self.assertEqual(self.letter(), 'Tailored letter')
+        self.assertEqual(self.prepare(), (0, 0))
+        self.assertEqual(AIUsage.objects.get().purpose, 'cover_letter')
+
+    @mock.patch.dict(settings.JOB_AUTOMATION, COVER_LETTER_AI=True)
+    def test_failed_generation_falls_back_to_the_template(self):
+        failed = Future()
+        failed.set_exception(RuntimeError('upstream error'))
+        self.assertEqual(self.prepare(failed), (0, 1))
+        self.assertEqual(self.prepare(done(chat_result('   '))), (0, 1))
+        self.assertIn('Engineer', self.letter())
+
+
+class ArtifactTests(AutomationTestCase):
+
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        override = override_settings(ARTIFACT_DIR=directory)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def page(self, chromium=True, webp=True):
+        page = mock.Mock()
+        session = page.context.new_cdp_session.return_value
+        if not chromium:
+            page.context.new_cdp_session.side_effect = RuntimeError('not Chromium')
+        if webp:
+            session.send.return_value = {'data': base64.b64encode(b'webp frame').decode()}
+        else:
+            session.send.side_effect = RuntimeError('unsupported format')
+        page.screenshot.return_value = b'jpeg frame'
+        return page
+
+    def files(self):
+        return sorted(
+            os.path.relpath(os.path.join(directory, name), settings.ARTIFACT_DIR)
+            for directory, _, names in os.walk(settings.ARTIFACT_DIR) for name in names
+        )
+
+    def test_store_once_per_content(self):
+        key = artifacts.store(b'frame', '.webp')
+        digest = hashlib.sha256(b'frame').hexdigest()
+        self.assertEqual(key, f'{digest[:2]}/{digest[2:4]}/{digest}.webp')
+        self.assertEqual(artifacts.key_for(b'frame', '.webp'), key)
+
+        os.utime(artifacts.path_for(key), (1, 1))
+        self.assertEqual(artifacts.store(b'frame', '.webp'), key)
+        self.assertGreater(os.path.getmtime(artifacts.path_for(key)), 1)  # refreshed for pruning
+        artifacts.store(b'other frame', '.webp')
+        self.assertEqual(len(self.files()), 2)
+        with open(artifacts.path_for(key), 'rb') as handle:
+            self.assertEqual(handle.read(), b'frame')
+
+    def test_capture(self):
+        key = artifacts.capture(self.page(), quality=40).result(timeout=5)
+        self.assertTrue(key.endswith('.webp'))
+        with open(artifacts.path_for(key), 'rb') as handle:
+            self.assertEqual(handle.read(), b'webp frame')
+
+        for page in (self.page(chromium=False), self.page(webp=False)):
+            key = artifacts.capture(page).result(timeout=5)
+            self.assertEqual(key, artifacts.key_for(b'jpeg frame', '.jpg'))
+            page.screenshot.assert_called_once_with(type='jpeg', quality=settings.JOB_AUTOMATION['SCREENSHOT_QUALITY'])
+        page.context.new_cdp_session.return_value.detach.assert_called_once_with()
+
+    def test_capture_is_dropped_when_writes_back_up(self):
+        pending = threading.BoundedSemaphore(1)
+        with mock.patch.object(artifacts, '_pending', pending):
+            pending.acquire()
+            self.assertIsNone(artifacts.capture(self.page()))
+            pending.release()
+
+            page = self.page(chromium=False)
+            page.screenshot.side_effect = RuntimeError('page closed')
+            with self.assertRaises(RuntimeError):
+                artifacts.capture(page)
+            # The failed capture gave its slot back
+            self.assertIsNotNone(artifacts.capture(self.page()).result(timeout=5))
+        self.assertEqual(len(self.files()), 1)
+
+    def test_prune(self):
+        now = time.time()
+        old = artifacts.store(b'old', '.webp')
+        os.utime(artifacts.path_for(old), (now - 30 * 24 * 60 * 60,) * 2)
+        older, newer = artifacts.store(b'a' * 100, '.webp'), artifacts.store(b'b' * 100, '.webp')
+        os.utime(artifacts.path_for(older), (now - 60,) * 2)
+        for name, age in (('stale.tmp', 2 * artifacts.STALE_TEMP_SECONDS), ('writing.tmp', 0)):
+            with open(os.path.join(settings.ARTIFACT_DIR, name), 'wb') as handle:
+                handle.write(b'partial')
+            os.utime(os.path.join(settings.ARTIFACT_DIR, name), (now - age,) * 2)
+
+        self.assertEqual(artifacts.prune(max_age_days=14, max_bytes=10 ** 6), 2)
+        self.assertEqual(self.files(), sorted([older, newer, 'writing.tmp']))
+        self.assertEqual(artifacts.prune(max_age_days=14, max_bytes=150), 1)
+        self.assertEqual(self.files(), sorted([newer, 'writing.tmp']))
+
+        with mock.patch.dict(settings.JOB_AUTOMATION, {'ARTIFACT_MAX_AGE_DAYS': 14, 'ARTIFACT_MAX_BYTES': 0}):
+            self.assertEqual(tasks.prune_artifacts(), 'Pruned 1 artifacts')
+        self.assertEqual(self.files(), ['writing.tmp'])
+
+    def test_screenshot_modes(self):
+        automator = LinkedInAutomator(self.user, self.make_session())
+        automator.page = self.page()
+        for mode, expected in (('off', []), ('failures', ['error']), ('all', ['error', 'step_1', 'error'])):
+            with mock.patch.dict(settings.JOB_AUTOMATION, {'SCREENSHOTS': mode}):
+                automator.take_screenshot('step_1')
+                automator.take_screenshot('error', failure=True)
+            self.assertEqual([name for name, _, _ in automator.screenshots], expected)
+
+        automator.page.context.new_cdp_session.side_effect = RuntimeError('not Chromium')
+        automator.page.screenshot.side_effect = RuntimeError('page closed')
+        with mock.patch.dict(settings.JOB_AUTOMATION, {'SCREENSHOTS': 'all'}):
+            self.assertIsNone(automator.take_screenshot('closed', failure=True))
+
+        failed, slow = Future(), Future()
+        failed.set_exception(OSError('disk full'))
+        automator.screenshots += [('failed', 'now', failed), ('slow', 'now', slow)]
+        stored = automator.stored_screenshots(timeout=0.1)
+        self.assertEqual([entry['name'] for entry in stored], ['error', 'step_1', 'error'])
+        self.assertEqual(stored[0]['key'], artifacts.key_for(b'webp frame', '.webp'))
+
+
+class ApplicationScreenshotTests(ApplyTaskTestCase):
+
+    def test_stored_screenshots_are_recorded(self):
+        entry = {'name': 'apply_error', 'key': 'ab/cd/abcd.webp', 'taken_at': '2026-01-01T00:00:00+00:00'}
+        failing = type('Automator', (FakeAutomator,), {
+            'result': {'success': False, 'error': 'No apply button', 'scope': circuit_breaker.JOB},
+            'stored_screenshots': lambda self: [entry],
+        })
+        with mock.patch('automation.tasks.LinkedInAutomator', failing):
+            apply_to_job_task(self.user.id, self.job.id, str(self.session.session_id))
+        self.assertEqual(JobApplication.objects.get(job=self.job).screenshots, [entry])
@@ -9,6 +9,7 @@ router.register(r'rules', views.AutomationRuleViewSet, basename='automationrule'
 router.register(r'credentials', views.PlatformCredentialsViewSet, basename='platformcredentials')
 
 urlpatterns = [
+    path('sessions/<int:pk>/events/', views.session_events, name='automationsession-events'),
     path('', include(router.urls)),
     path('stats/', views.AutomationStatsView.as_view(), name='automation-stats'),
     path('bulk-apply/', views.BulkApplyView.as_view(), name='bulk-apply'),
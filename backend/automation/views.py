@@ -1,4 +1,6 @@
 from django.shortcuts import render
+from django.http import JsonResponse, StreamingHttpResponse
+from django.urls import reverse
 from rest_framework import generics, viewsets, status
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
@@ -13,12 +15,20 @@ from .serializers import (
     PlatformCredentialsSerializer
 )
 from .tasks import apply_to_job_task, bulk_apply_task
+from hopeforjob.conditional import ConditionalGetMixin
+from . import checkpoints, events
+from .cancellation import cancel_session
+from .rules import matching_listings
+from jobs.serializers import JobListingSerializer
+from analytics.rollups import get_rollup, SUBMITTED_STATUSES
+from profiles.letter_templates import TemplateError, validate as validate_letter_template
 
 
-class AutomationSessionViewSet(viewsets.ModelViewSet):
+class AutomationSessionViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """Automation session management"""
     serializer_class = AutomationSessionSerializer
     permission_classes = [IsAuthenticated]
+    conditional_fields = ('updated_at', 'applications__last_updated')
     
     def get_queryset(self):
         return AutomationSession.objects.filter(user=self.request.user).order_by('-created_at')
@@ -32,7 +42,8 @@ class AutomationSessionViewSet(viewsets.ModelViewSet):
             session.save()
             
             # Start background automation
-            bulk_apply_task.delay(session.id)
+            config = session.automation_config
+            bulk_apply_task.delay(request.user.id, config.get('job_ids', []), config, str(session.session_id))
             
             return Response({'message': 'Automation session started'})
         
@@ -40,14 +51,47 @@ class AutomationSessionViewSet(viewsets.ModelViewSet):
     
     @action(detail=True, methods=['post'])
     def stop_session(self, request, pk=None):
-        """Stop an automation session"""
+        """Stop an automation session: revoke queued jobs and abort running ones"""
         session = self.get_object()
-        if session.status == 'running':
-            session.status = 'stopped'
-            session.save()
-            return Response({'message': 'Automation session stopped'})
+        if session.status in ('pending', 'running'):
+            session = cancel_session(session)
+            return Response({
+                'message': 'Automation session cancelled',
+                'status': session.status,
+                **events.session_counters(session)
+            })
         
         return Response({'error': 'Session is not running'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    @action(detail=True, methods=['post'])
+    def stream_ticket(self, request, pk=None):
+        """Short-lived, single-use ticket for opening the session's event stream"""
+        session = self.get_object()
+        ticket = events.issue_ticket(session)
+        return Response({
+            'ticket': ticket,
+            'expires_in': events.TICKET_TIMEOUT,
+            'url': f"{reverse('automationsession-events', args=[session.pk])}?ticket={ticket}"
+        })
+    
+    @action(detail=True, methods=['post'])
+    def resume_session(self, request, pk=None):
+        """
+        Re-enqueue the unfinished jobs of a cancelled or failed session, or the
+        stalled jobs of a running one
+        """
+        session = self.get_object()
+        if session.status not in ('running', 'cancelled', 'failed'):
+            return Response({'error': 'Session cannot be resumed'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        queued = checkpoints.resume(session)
+        if not queued and session.status == 'running':
+            return Response({'error': 'Session is running and none of its jobs have stalled'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if not queued:
+            return Response({'error': 'Session has no unfinished jobs'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response({'message': 'Automation session resumed', 'jobs_queued': queued})
 
 
 class JobApplicationViewSet(viewsets.ModelViewSet):
@@ -66,13 +110,12 @@ class JobApplicationViewSet(viewsets.ModelViewSet):
     def apply_to_job(self, request):
         """Apply to a single job"""
         job_id = request.data.get('job_id')
-        cover_letter = request.data.get('cover_letter', '')
         
         if not job_id:
             return Response({'error': 'job_id is required'}, status=status.HTTP_400_BAD_REQUEST)
         
-        # Start background application task
-        task = apply_to_job_task.delay(request.user.id, job_id, cover_letter)
+        # Start background application task (repeat clicks are deduplicated by the task)
+        task = apply_to_job_task.delay(request.user.id, job_id)
         
         return Response({
             'message': 'Job application started',
@@ -87,6 +130,17 @@ class AutomationRuleViewSet(viewsets.ModelViewSet):
     
     def get_queryset(self):
         return AutomationRule.objects.filter(user=self.request.user).order_by('-created_at')
+    
+    @action(detail=True, methods=['get'])
+    def matching_jobs(self, request, pk=None):
+        """Active job listings the rule's conditions currently select"""
+        rule = self.get_object()
+        listings = matching_listings(rule).select_related('source').order_by('-posted_date', '-scraped_at')
+        
+        page = self.paginate_queryset(listings)
+        if page is not None:
+            return self.get_paginated_response(JobListingSerializer(page, many=True).data)
+        return Response(JobListingSerializer(listings, many=True).data)
 
 
 class PlatformCredentialsViewSet(viewsets.ModelViewSet):
@@ -105,24 +159,17 @@ class AutomationStatsView(generics.RetrieveAPIView):
     def get(self, request, *args, **kwargs):
         user = request.user
         
+        rollup = get_rollup(user)
+        by_status = rollup.applications_by_status
+        
         stats = {
-            'total_applications': JobApplication.objects.filter(user=user).count(),
-            'successful_applications': JobApplication.objects.filter(
-                user=user, status='applied'
-            ).count(),
-            'failed_applications': JobApplication.objects.filter(
-                user=user, status='failed'
-            ).count(),
-            'pending_applications': JobApplication.objects.filter(
-                user=user, status='pending'
-            ).count(),
-            'active_sessions': AutomationSession.objects.filter(
-                user=user, status='running'
-            ).count(),
-            'total_sessions': AutomationSession.objects.filter(user=user).count(),
-            'active_rules': AutomationRule.objects.filter(
-                user=user, is_active=True
-            ).count()
+            'total_applications': rollup.total_applications,
+            'successful_applications': sum(by_status.get(status, 0) for status in SUBMITTED_STATUSES),
+            'failed_applications': by_status.get('failed', 0),
+            'pending_applications': by_status.get('pending', 0),
+            'active_sessions': rollup.sessions_by_status.get('running', 0),
+            'total_sessions': rollup.total_sessions,
+            'active_rules': rollup.active_rules
         }
         
         return Response(stats)
@@ -138,23 +185,78 @@ class BulkApplyView(generics.CreateAPIView):
         
         if not job_ids:
             return Response({'error': 'job_ids is required'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            validate_letter_template(cover_letter_template)
+        except TemplateError as e:
+            return Response({'cover_letter_template': [str(e)]}, status=status.HTTP_400_BAD_REQUEST)
         
         # Create automation session
+        config = {
+            'job_ids': job_ids,
+            'cover_letter_template': cover_letter_template
+        }
         session = AutomationSession.objects.create(
             user=request.user,
-            session_type='bulk_apply',
-            target_count=len(job_ids),
+            session_type='job_application',
+            target_platform='multiple',
+            total_jobs_targeted=len(job_ids),
             status='pending',
-            config={
-                'job_ids': job_ids,
-                'cover_letter_template': cover_letter_template
-            }
+            automation_config=config
         )
         
         # Start background bulk application
-        bulk_apply_task.delay(session.id)
+        bulk_apply_task.delay(request.user.id, job_ids, config, str(session.session_id))
         
         return Response({
             'message': 'Bulk application started',
             'session_id': session.id
         }, status=status.HTTP_202_ACCEPTED)
+
+
+async def _authenticate(request, session_id):
+    """
+    Session cookie, DRF token header, or a stream ticket passed as
+    ``?ticket=`` (EventSource cannot set headers)
+    """
+    from django.contrib.auth.models import User
+    from rest_framework.authtoken.models import Token
+    
+    user = await request.auser()
+    if user.is_authenticated:
+        return user
+    
+    ticket = request.GET.get('ticket')
+    if ticket:
+        user_id = await events.redeem_ticket(ticket, session_id)
+        if user_id is None:
+            return None
+        return await User.objects.filter(pk=user_id, is_active=True).afirst()
+    
+    header = request.headers.get('Authorization', '')
+    if not header.startswith('Token '):
+        return None
+    token = await Token.objects.select_related('user').filter(key=header[len('Token '):].strip()).afirst()
+    if token is None or not token.user.is_active:
+        return None
+    return token.user
+
+
+async def session_events(request, pk):
+    """
+    Stream session progress as Server-Sent Events (needs an ASGI server)
+    """
+    if request.method != 'GET':
+        return JsonResponse({'detail': f'Method "{request.method}" not allowed.'}, status=405)
+    
+    user = await _authenticate(request, pk)
+    if user is None:
+        return JsonResponse({'detail': 'Authentication credentials were not provided.'}, status=401)
+    
+    session = await AutomationSession.objects.filter(pk=pk, user=user).afirst()
+    if session is None:
+        return JsonResponse({'detail': 'No AutomationSession matches the given query.'}, status=404)
+    
+    response = StreamingHttpResponse(events.stream(session), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # let nginx flush each event
+    return response
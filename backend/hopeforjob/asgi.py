@@ -3,6 +3,11 @@ ASGI config for hopeforjob project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Serve the project with an ASGI server (e.g. ``uvicorn hopeforjob.asgi:application``)
+for the streaming endpoints: the live session progress stream at
+``/api/automation/sessions/<id>/events/`` holds one cheap connection per
+watcher, which a WSGI worker cannot do without being tied up.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
@@ -14,3 +19,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'hopeforjob.settings')
 
 application = get_asgi_application()
+
+# Load in-process search indexes before the first request arrives
+from jobs.autocomplete import warm_autocomplete_index  # noqa: E402
+
+warm_autocomplete_index()
@@ -1,5 +1,6 @@
 import os
 from celery import Celery
+from celery.signals import celeryd_init
 from django.conf import settings
 
 # Set the default Django settings module for the 'celery' program.
@@ -14,6 +15,24 @@ app.config_from_object('django.conf:settings', namespace='CELERY')
 # Load task modules from all registered Django apps.
 app.autodiscover_tasks()
 
+
+@celeryd_init.connect
+def apply_worker_profile(sender=None, conf=None, options=None, **kwargs):
+    """
+    Size a worker for the queue it consumes (WORKER_PROFILES in settings).
+    
+    Only applies to workers started for a single profiled queue; values given
+    on the command line win because Celery only falls back to ``conf``.
+    """
+    queues = options.get('queues') or []
+    if isinstance(queues, str):
+        queues = queues.split(',')
+    profiles = [settings.WORKER_PROFILES[queue] for queue in queues if queue in settings.WORKER_PROFILES]
+    if len(profiles) != 1:
+        return
+    for key, value in profiles[0].items():
+        conf[f'worker_{key}'] = value
+
 @app.task(bind=True)
 def debug_task(self):
     print(f'Request: {self.request!r}')
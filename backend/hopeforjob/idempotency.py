@@ -0,0 +1,76 @@
+"""
+Idempotent Celery task execution.
+
+A duplicate delivery of a task (double-clicked button, redelivery under
+``acks_late``) is recognised by a key built from the task name and a hash of
+the arguments that identify the work. The first run holds a short-lived
+lock in the shared cache and memoizes its result for a short window;
+duplicates get the in-flight marker or the memoized result back without
+doing any work. The window only covers late duplicates of the same call, so
+a search or bulk run asked for again later does the work again.
+"""
+import functools
+import hashlib
+import json
+import logging
+
+from django.core.cache import cache
+
+logger = logging.getLogger('automation')
+
+LOCK_TIMEOUT = 600  # seconds; a crashed run stops blocking duplicates after this
+RESULT_TIMEOUT = 60  # seconds a finished run answers its duplicates
+
+
+def _succeeded(result):
+    if isinstance(result, dict):
+        return result.get('status') not in ('failed', 'cancelled', 'deferred')
+    return True
+
+
+def idempotency_key(task_name, parts):
+    digest = hashlib.sha1(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+    return f'idempotency:{task_name}:{digest}'
+
+
+def idempotent(key_parts, lock_timeout=LOCK_TIMEOUT, result_timeout=RESULT_TIMEOUT, memoize_if=_succeeded):
+    """
+    Decorate a task body (below ``@shared_task``) so duplicate calls are no-ops.
+
+    ``key_parts`` receives the task arguments and returns the JSON-able
+    values that identify the work. Results are memoized only if
+    ``memoize_if(result)`` is true, so failed or deferred runs can be retried.
+    """
+    def decorator(func):
+        task_name = f'{func.__module__}.{func.__name__}'
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            from celery import current_task
+
+            try:
+                key = idempotency_key(task_name, key_parts(*args, **kwargs))
+            except (TypeError, ValueError) as e:
+                # Malformed arguments: let the task body report them
+                logger.warning(f"No idempotency key for {task_name}: {str(e)}")
+                return func(*args, **kwargs)
+            memo = cache.get(f'{key}:result')
+            if memo is not None:
+                logger.info(f"Duplicate {task_name} call answered from memo")
+                return dict(memo, duplicate=True) if isinstance(memo, dict) else memo
+
+            task_id = current_task.request.id if current_task else None
+            if not cache.add(f'{key}:lock', task_id or '', timeout=lock_timeout):
+                logger.info(f"Duplicate {task_name} call skipped: already in flight")
+                return {'status': 'in_progress', 'duplicate': True, 'task_id': cache.get(f'{key}:lock')}
+
+            try:
+                result = func(*args, **kwargs)
+                if memoize_if(result):
+                    cache.set(f'{key}:result', result, timeout=result_timeout)
+                return result
+            finally:
+                cache.delete(f'{key}:lock')
+
+        return wrapper
+    return decorator
@@ -0,0 +1,188 @@
+"""
+Shared OpenAI client.
+
+One AsyncOpenAI client per process, running on a background event loop
+thread, so every caller shares its pooled keep-alive connections. Sync code
+(Celery tasks, Playwright automators) submits a call and gets a
+concurrent.futures.Future back, and can keep working while the request is
+in flight; async code awaits acomplete().
+
+Calls are limited by a semaphore (concurrent requests) and token buckets
+(requests and tokens per minute) before they leave the process; timeouts
+and retries with exponential backoff are handled by the OpenAI client.
+Point ``OPENAI_BASE_URL`` at a local stub server to run without the real API.
+"""
+import asyncio
+import logging
+import os
+import re
+import threading
+import time
+from collections import namedtuple
+
+from django.conf import settings
+
+logger = logging.getLogger('automation')
+
+# estimated_tokens: local prompt estimate; duration: seconds the call took
+ChatResult = namedtuple('ChatResult', 'content prompt_tokens completion_tokens model estimated_tokens duration')
+
+# Local stand-in for the model's tokenizer: runs of word characters and runs
+# of punctuation (e.g. '":"' in JSON) each split into ~4 character pieces,
+# plus a few tokens of framing per message
+TOKEN_PIECE = re.compile(r'\w+|[^\w\s]+')
+CHARS_PER_TOKEN = 4
+TOKENS_PER_MESSAGE = 4
+
+
+def is_configured():
+    return bool(settings.OPENAI_API_KEY or settings.OPENAI_BASE_URL)
+
+
+def estimate_tokens(text):
+    """Approximate token count of ``text``, for budgeting prompts without the model's tokenizer"""
+    return sum((len(piece) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN for piece in TOKEN_PIECE.findall(text))
+
+
+def estimate_message_tokens(messages):
+    return sum(estimate_tokens(message['content']) + TOKENS_PER_MESSAGE for message in messages)
+
+
+class TokenBucket:
+    """Allows ``rate`` units per minute, in bursts of up to a minute's worth"""
+
+    def __init__(self, rate):
+        self.rate = rate
+        self.tokens = rate
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self, amount=1):
+        amount = min(amount, self.rate)  # a single oversized call must still be able to run
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate / 60)
+                self.updated = now
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((amount - self.tokens) * 60 / self.rate)
+
+
+class LLMClient:
+    """Rate-limited chat completions over one pooled connection set"""
+
+    def __init__(self, api_key, base_url=None, timeout=30, max_retries=3, max_concurrency=8,
+                 requests_per_minute=500, tokens_per_minute=80000, model='gpt-4'):
+        self.model = model
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name='llm-client', daemon=True)
+        self.thread.start()
+        self.client = asyncio.run_coroutine_threadsafe(
+            self._create(api_key, base_url, timeout, max_retries, max_concurrency), self.loop
+        ).result()
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+
+    async def _create(self, api_key, base_url, timeout, max_retries, max_concurrency):
+        from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+        import httpx
+
+        return AsyncOpenAI(
+            api_key=api_key or 'not-needed',
+            base_url=base_url or None,
+            timeout=timeout,
+            max_retries=max_retries,
+            http_client=DefaultAsyncHttpxClient(limits=httpx.Limits(
+                max_connections=max_concurrency, max_keepalive_connections=max_concurrency
+            )),
+        )
+
+    async def _complete(self, messages, model=None, max_tokens=1000, temperature=0.3, **kwargs):
+        prompt_tokens = estimate_message_tokens(messages)
+        await self.requests.acquire()
+        await self.tokens.acquire(prompt_tokens + max_tokens)
+        async with self.semaphore:
+            started = time.monotonic()
+            response = await self.client.chat.completions.create(
+                model=model or self.model,
+                messages=messages,
+                max_tokens=max_tokens,
+                temperature=temperature,
+                **kwargs
+            )
+        usage = response.usage
+        return ChatResult(
+            response.choices[0].message.content,
+            usage.prompt_tokens if usage else prompt_tokens,
+            usage.completion_tokens if usage else 0,
+            response.model,
+            prompt_tokens,
+            time.monotonic() - started,
+        )
+
+    def submit(self, messages, **kwargs):
+        """Start a chat completion; returns a concurrent.futures.Future of a ChatResult"""
+        return asyncio.run_coroutine_threadsafe(self._complete(messages, **kwargs), self.loop)
+
+    def complete(self, messages, **kwargs):
+        """Blocking chat completion; returns a ChatResult"""
+        return self.submit(messages, **kwargs).result()
+
+    async def acomplete(self, messages, **kwargs):
+        """Chat completion awaitable from any event loop"""
+        if asyncio.get_running_loop() is self.loop:
+            return await self._complete(messages, **kwargs)
+        return await asyncio.wrap_future(self.submit(messages, **kwargs))
+
+    def close(self):
+        asyncio.run_coroutine_threadsafe(self.client.close(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+
+
+_client = None
+_client_pid = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """The process-wide client (recreated in a forked worker child)"""
+    global _client, _client_pid
+    with _client_lock:
+        if _client is None or _client_pid != os.getpid():
+            _client = LLMClient(
+                api_key=settings.OPENAI_API_KEY,
+                base_url=settings.OPENAI_BASE_URL,
+                timeout=settings.OPENAI_TIMEOUT,
+                max_retries=settings.OPENAI_MAX_RETRIES,
+                max_concurrency=settings.OPENAI_MAX_CONCURRENCY,
+                requests_per_minute=settings.OPENAI_REQUESTS_PER_MINUTE,
+                tokens_per_minute=settings.OPENAI_TOKENS_PER_MINUTE,
+                model=settings.OPENAI_MODEL,
+            )
+            _client_pid = os.getpid()
+        return _client
+
+
+def reset_client():
+    """Drop the process-wide client (e.g. after changing settings in tests)"""
+    global _client
+    with _client_lock:
+        if _client is not None and _client_pid == os.getpid():
+            _client.close()
+        _client = None
+
+
+def submit(messages, **kwargs):
+    return get_client().submit(messages, **kwargs)
+
+
+def complete(messages, **kwargs):
+    return get_client().complete(messages, **kwargs)
+
+
+async def acomplete(messages, **kwargs):
+    return await get_client().acomplete(messages, **kwargs)
@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 from pathlib import Path
 from decouple import config
+from celery.schedules import crontab
 import os
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -50,6 +51,7 @@ INSTALLED_APPS = [
     'jobs',
     'automation',
     'profiles',
+    'analytics',
 ]
 
 MIDDLEWARE = [
@@ -94,6 +96,27 @@ DATABASES = {
 }
 
 
+# Cache
+# Redis in production (set CACHE_URL); per-process memory for local runs
+# (tests use hopeforjob.settings_test)
+
+CACHE_URL = config('CACHE_URL', default='')
+
+if CACHE_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -164,21 +187,165 @@ CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
 
+# Task routing: each workload has its own queue (and its own worker pool, sized by
+# WORKER_PROFILES below) so short tasks never wait behind multi-minute browser sessions
+CELERY_TASK_DEFAULT_QUEUE = 'default'
+CELERY_TASK_ROUTES = {
+    # Playwright sessions
+    'automation.tasks.apply_to_job_task': {'queue': 'browser'},
+    'automation.tasks.scrape_jobs_task': {'queue': 'browser'},
+    'jobs.tasks.scrape_jobs_task': {'queue': 'browser'},
+    # Listing and resume ingestion, index upkeep
+    'jobs.tasks.refresh_job_indexes': {'queue': 'ingest'},
+    'jobs.tasks.refresh_changed_job_indexes': {'queue': 'ingest'},
+    'automation.tasks.schedule_auto_apply': {'queue': 'ingest'},
+    'profiles.tasks.parse_resume_task': {'queue': 'ingest'},
+    # Notifications
+    'jobs.tasks.check_job_alerts': {'queue': 'alerts'},
+    'automation.tasks.send_job_alerts': {'queue': 'alerts'},
+    # Periodic housekeeping
+    'jobs.tasks.cleanup_old_jobs': {'queue': 'maintenance'},
+    'jobs.tasks.rebuild_autocomplete_snapshot': {'queue': 'maintenance'},
+    'automation.tasks.cleanup_old_sessions': {'queue': 'maintenance'},
+    'automation.tasks.reap_stale_checkpoints': {'queue': 'maintenance'},
+    'automation.tasks.prune_form_analysis_cache': {'queue': 'maintenance'},
+    'automation.tasks.prune_cover_letters': {'queue': 'maintenance'},
+    'automation.tasks.prune_artifacts': {'queue': 'maintenance'},
+    'analytics.tasks.reconcile_stats_rollups': {'queue': 'maintenance'},
+}
+# Browser tasks are acknowledged only once finished, so a lost worker's job is
+# redelivered (checkpoints and idempotency keys make the retry safe)
+CELERY_TASK_ANNOTATIONS = {
+    'automation.tasks.apply_to_job_task': {'acks_late': True},
+    'automation.tasks.scrape_jobs_task': {'acks_late': True},
+    'jobs.tasks.scrape_jobs_task': {'acks_late': True},
+}
+# Staggered bulk applications are queued hours ahead; keep Redis from redelivering them early
+CELERY_BROKER_TRANSPORT_OPTIONS = {'visibility_timeout': 60 * 60 * 12}
+
+# Worker settings applied by hopeforjob/celery.py when a worker is started for one queue
+# (`celery -A hopeforjob worker -Q browser`); command-line options still take precedence
+WORKER_PROFILES = {
+    'browser': {'concurrency': 2, 'prefetch_multiplier': 1, 'max_tasks_per_child': 20},
+    'ingest': {'concurrency': 4, 'prefetch_multiplier': 4},
+    'alerts': {'concurrency': 4, 'prefetch_multiplier': 8},
+    'maintenance': {'concurrency': 1, 'prefetch_multiplier': 1},
+    'default': {'concurrency': 4, 'prefetch_multiplier': 4},
+}
+
+CELERY_BEAT_SCHEDULE = {
+    'reconcile-stats-rollups': {
+        'task': 'analytics.tasks.reconcile_stats_rollups',
+        'schedule': crontab(hour=3, minute=0),
+    },
+    'rebuild-autocomplete-snapshot': {
+        'task': 'jobs.tasks.rebuild_autocomplete_snapshot',
+        'schedule': crontab(hour=3, minute=30),
+    },
+    'schedule-auto-apply': {
+        'task': 'automation.tasks.schedule_auto_apply',
+        'schedule': crontab(minute='*/30'),
+    },
+    'reap-stale-checkpoints': {
+        'task': 'automation.tasks.reap_stale_checkpoints',
+        'schedule': crontab(minute='*/5'),
+    },
+    'prune-form-analysis-cache': {
+        'task': 'automation.tasks.prune_form_analysis_cache',
+        'schedule': crontab(hour=4, minute=0),
+    },
+    'prune-cover-letters': {
+        'task': 'automation.tasks.prune_cover_letters',
+        'schedule': crontab(hour=4, minute=15),
+    },
+    'prune-artifacts': {
+        'task': 'automation.tasks.prune_artifacts',
+        'schedule': crontab(hour=4, minute=30),
+    },
+}
+
 # Media files
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+    # Uploaded resumes, stored by content hash (profiles.uploads); swap in an object storage backend in production
+    'resumes': {'BACKEND': config('RESUME_STORAGE_BACKEND', default='django.core.files.storage.FileSystemStorage')},
+}
+
+# Resume uploads are streamed to temporary files and rejected past this size (bytes)
+RESUME_UPLOAD_MAX_SIZE = config('RESUME_UPLOAD_MAX_SIZE', default=10 * 1024 * 1024, cast=int)
+
 # OpenAI API Key
 OPENAI_API_KEY = config('OPENAI_API_KEY', default='')
+OPENAI_BASE_URL = config('OPENAI_BASE_URL', default='')  # e.g. a local stub server in development
+OPENAI_MODEL = config('OPENAI_MODEL', default='gpt-4')
+OPENAI_TIMEOUT = config('OPENAI_TIMEOUT', default=30, cast=float)  # seconds per attempt
+OPENAI_MAX_RETRIES = config('OPENAI_MAX_RETRIES', default=3, cast=int)
+OPENAI_MAX_CONCURRENCY = config('OPENAI_MAX_CONCURRENCY', default=8, cast=int)  # requests in flight per process
+OPENAI_REQUESTS_PER_MINUTE = config('OPENAI_REQUESTS_PER_MINUTE', default=500, cast=int)
+OPENAI_TOKENS_PER_MINUTE = config('OPENAI_TOKENS_PER_MINUTE', default=80000, cast=int)
 
 # Job Automation Settings
 JOB_AUTOMATION = {
     'MAX_APPLICATIONS_PER_DAY': config('MAX_APPLICATIONS_PER_DAY', default=50, cast=int),
     'MIN_DELAY_BETWEEN_APPLICATIONS': config('MIN_DELAY_BETWEEN_APPLICATIONS', default=30, cast=int),  # seconds
+    'APPLICATION_LEASE_SECONDS': config('APPLICATION_LEASE_SECONDS', default=600, cast=int),  # per-job worker lease
+    'MAX_APPLICATION_ATTEMPTS': config('MAX_APPLICATION_ATTEMPTS', default=3, cast=int),
+    'AUTO_APPLY_LOOKBACK_HOURS': config('AUTO_APPLY_LOOKBACK_HOURS', default=24, cast=int),
+    # Auto-apply jobs that may be queued or in flight per platform at once
+    'PLATFORM_CAPACITY': {
+        'linkedin': config('LINKEDIN_APPLY_CAPACITY', default=200, cast=int),
+        'indeed': config('INDEED_APPLY_CAPACITY', default=200, cast=int),
+        'default': 100,
+    },
+    # Known form answers (automation.answer_store): fuzzy label match threshold, trusted AI suggestions
+    'ANSWER_MIN_SIMILARITY': config('ANSWER_MIN_SIMILARITY', default=0.6, cast=float),
+    'ANSWER_MIN_CONFIDENCE': config('ANSWER_MIN_CONFIDENCE', default=0.7, cast=float),
+    # Cached AI answers per form structure and profile version (automation.form_cache)
+    'FORM_ANALYSIS_TTL_DAYS': config('FORM_ANALYSIS_TTL_DAYS', default=30, cast=int),
+    'FORM_ANALYSIS_CACHE_SIZE': config('FORM_ANALYSIS_CACHE_SIZE', default=50000, cast=int),
+    # Form analysis prompts (automation.prompts): prompt token budget, answer token cap
+    'FORM_PROMPT_TOKEN_BUDGET': config('FORM_PROMPT_TOKEN_BUDGET', default=1500, cast=int),
+    'FORM_ANALYSIS_MAX_TOKENS': config('FORM_ANALYSIS_MAX_TOKENS', default=1000, cast=int),
+    # Cover letters tailored by AI before bulk sessions start (automation.cover_letters);
+    # opt-in, as it sends job postings and profile details to the model
+    'COVER_LETTER_AI': config('COVER_LETTER_AI', default=False, cast=bool),
+    'COVER_LETTER_PREPARE_TIMEOUT': config('COVER_LETTER_PREPARE_TIMEOUT', default=120, cast=int),  # seconds per batch
+    'COVER_LETTER_TTL_DAYS': config('COVER_LETTER_TTL_DAYS', default=30, cast=int),
+    'COVER_LETTER_CACHE_SIZE': config('COVER_LETTER_CACHE_SIZE', default=50000, cast=int),
+    # Debug screenshots (automation.artifacts): 'off', 'failures' or 'all' (every form step), retention
+    'SCREENSHOTS': config('AUTOMATION_SCREENSHOTS', default='failures'),
+    'SCREENSHOT_QUALITY': config('SCREENSHOT_QUALITY', default=60, cast=int),  # WebP/JPEG, 1-100
+    'ARTIFACT_MAX_AGE_DAYS': config('ARTIFACT_MAX_AGE_DAYS', default=14, cast=int),
+    'ARTIFACT_MAX_BYTES': config('ARTIFACT_MAX_BYTES', default=2 * 1024 ** 3, cast=int),
+    # Per-platform and per-account breakers that defer applications during platform incidents
+    'CIRCUIT_BREAKER': {
+        'WINDOW_SECONDS': config('CIRCUIT_WINDOW_SECONDS', default=300, cast=int),
+        'MIN_CALLS': config('CIRCUIT_MIN_CALLS', default=5, cast=int),
+        'FAILURE_RATE': config('CIRCUIT_FAILURE_RATE', default=0.5, cast=float),
+        'OPEN_SECONDS': config('CIRCUIT_OPEN_SECONDS', default=60, cast=int),  # doubled on every repeated trip
+        'MAX_OPEN_SECONDS': config('CIRCUIT_MAX_OPEN_SECONDS', default=1800, cast=int),
+    },
     'LINKEDIN_LOGIN_URL': 'https://www.linkedin.com/login',
     'LINKEDIN_JOBS_URL': 'https://www.linkedin.com/jobs/search/',
 }
 
+# Job search indexes (snapshot files shared by all workers on a host)
+JOB_INDEX_DIR = config('JOB_INDEX_DIR', default=os.path.join(BASE_DIR, 'var', 'indexes'))
+JOB_FILTER_INDEX_PATH = os.path.join(JOB_INDEX_DIR, 'filter_index.bin')
+JOB_AUTOCOMPLETE_SNAPSHOT_PATH = os.path.join(JOB_INDEX_DIR, 'autocomplete.json.gz')
+JOB_SEARCH_CACHE_TIMEOUT = config('JOB_SEARCH_CACHE_TIMEOUT', default=600, cast=int)  # seconds
+
+# Automation artifacts (debug screenshots), stored by content hash
+ARTIFACT_DIR = config('ARTIFACT_DIR', default=os.path.join(BASE_DIR, 'var', 'artifacts'))
+
+# Live session progress (Redis pub/sub; in-process when unset, e.g. eager Celery in development)
+AUTOMATION_EVENTS_URL = config('AUTOMATION_EVENTS_URL', default=CACHE_URL)
+AUTOMATION_EVENTS_HEARTBEAT = config('AUTOMATION_EVENTS_HEARTBEAT', default=15, cast=int)  # seconds
+
 # Logging
 LOGGING = {
     'version': 1,
@@ -205,6 +372,16 @@ LOGGING = {
             'level': 'DEBUG',
             'propagate': True,
         },
+        'analytics': {
+            'handlers': ['file', 'console'],
+            'level': 'INFO',
+            'propagate': True,
+        },
+        'jobs': {
+            'handlers': ['file', 'console'],
+            'level': 'INFO',
+            'propagate': True,
+        },
     },
 }
 
@@ -0,0 +1,16 @@
+"""
+Settings for the test suite (manage.py test selects them; other runners set
+DJANGO_SETTINGS_MODULE=hopeforjob.settings_test)
+"""
+from .settings import *  # noqa: F401,F403
+
+# Per-process cache whatever CACHE_URL says, so tests never share state through Redis
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+AUTOMATION_EVENTS_URL = ''
+
+# Tasks run inline instead of needing a broker
+CELERY_TASK_ALWAYS_EAGER = True
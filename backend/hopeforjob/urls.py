@@ -32,6 +32,7 @@ urlpatterns = [
     path('api/profiles/', include('profiles.urls')),
     path('api/jobs/', include('jobs.urls')),
     path('api/automation/', include('automation.urls')),
+    path('api/analytics/', include('analytics.urls')),
     
     # REST Framework auth
     path('api-auth/', include('rest_framework.urls')),
@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'hopeforjob.settings')
 
 application = get_wsgi_application()
+
+# Load in-process search indexes before the first request arrives
+from jobs.autocomplete import warm_autocomplete_index  # noqa: E402
+
+warm_autocomplete_index()
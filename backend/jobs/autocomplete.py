@@ -0,0 +1,286 @@
+"""
+In-memory typeahead index for job titles, companies, skills and locations.
+
+Term frequencies are collected from JobListing rows into a gzipped JSON
+snapshot under JOB_INDEX_DIR. Each worker loads the snapshot into sorted
+prefix arrays (every word suffix of a term is indexed, so "eng" finds
+"Senior Software Engineer") with the top suggestions for short prefixes
+precomputed, and answers queries without touching the database.
+"""
+import bisect
+import gzip
+import heapq
+import json
+import logging
+import os
+import re
+import threading
+import time
+import zlib
+from collections import Counter
+from contextlib import contextmanager
+
+from django.conf import settings
+
+logger = logging.getLogger('jobs')
+
+KINDS = ('title', 'company', 'skill', 'location')
+MAX_SUGGESTIONS = 20
+PRECOMPUTED_PREFIX_LENGTH = 3
+RELOAD_CHECK_INTERVAL = 5  # seconds between snapshot mtime checks
+# Truncated or corrupt snapshot files (bad gzip stream, bad JSON, unexpected shape)
+SNAPSHOT_ERRORS = (OSError, EOFError, zlib.error, ValueError, KeyError, TypeError, AttributeError)
+
+_NON_WORD = re.compile(r'[^\w+#.]+')
+
+
+def normalize(text):
+    return _NON_WORD.sub(' ', str(text).lower()).strip()
+
+
+class PrefixIndex:
+    """Sorted word-suffix keys with top-K by frequency per prefix"""
+
+    def __init__(self, terms):
+        # terms: {normalized term: (display text, frequency)}
+        self.texts = []
+        self.counts = []
+        entries = []
+        for term, (display, count) in terms.items():
+            ref = len(self.texts)
+            self.texts.append(display)
+            self.counts.append(count)
+            words = term.split()
+            for start in range(len(words)):
+                entries.append((' '.join(words[start:]), ref))
+        entries.sort()
+        self.keys = [key for key, _ in entries]
+        self.refs = [ref for _, ref in entries]
+        self.top = self._precompute_top()
+
+    def _precompute_top(self):
+        groups = {}
+        for key, ref in zip(self.keys, self.refs):
+            for length in range(1, min(len(key), PRECOMPUTED_PREFIX_LENGTH) + 1):
+                groups.setdefault(key[:length], set()).add(ref)
+        return {
+            prefix: heapq.nlargest(MAX_SUGGESTIONS, refs, key=self._rank)
+            for prefix, refs in groups.items()
+        }
+
+    def _rank(self, ref):
+        return (self.counts[ref], -len(self.texts[ref]))
+
+    def search(self, prefix, limit=10):
+        """Return [(display text, frequency)] for terms with a word starting with ``prefix``"""
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        if len(prefix) <= PRECOMPUTED_PREFIX_LENGTH:
+            refs = self.top.get(prefix, [])[:limit]
+        else:
+            lo = bisect.bisect_left(self.keys, prefix)
+            hi = bisect.bisect_left(self.keys, prefix + '\uffff', lo)
+            refs = heapq.nlargest(limit, set(self.refs[lo:hi]), key=self._rank)
+        return [(self.texts[ref], self.counts[ref]) for ref in refs]
+
+
+class AutocompleteIndex:
+    """Per-kind prefix indexes loaded from the shared snapshot file"""
+
+    def __init__(self, path):
+        self.path = path
+        self.indexes = {}
+        self.watermark = 0
+        self._mtime = None
+        self._checked_at = 0
+        self._lock = threading.Lock()
+
+    def load(self):
+        """(Re)load the snapshot if it changed on disk; returns False if absent or unreadable"""
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return False
+        if mtime == self._mtime:
+            return True
+
+        with self._lock:
+            if mtime == self._mtime:
+                return True
+            try:
+                snapshot = read_snapshot(self.path)
+                indexes = {
+                    kind: PrefixIndex({term: tuple(value) for term, value in snapshot['terms'].get(kind, {}).items()})
+                    for kind in KINDS
+                }
+            except SNAPSHOT_ERRORS as e:
+                # Keep serving what is loaded; the rebuild replaces the file
+                logger.error(f"Unreadable autocomplete snapshot {self.path}, rebuilding: {str(e)}")
+                self._mtime = mtime
+                _queue_rebuild()
+                return False
+            self.indexes = indexes
+            self.watermark = snapshot['watermark']
+            self._mtime = mtime
+            logger.info(f"Loaded autocomplete snapshot up to listing {self.watermark}")
+        return True
+
+    def suggest(self, query, kinds=KINDS, limit=10):
+        now = time.monotonic()
+        if now - self._checked_at > RELOAD_CHECK_INTERVAL:
+            self._checked_at = now
+            self.load()
+
+        suggestions = []
+        for kind in kinds:
+            index = self.indexes.get(kind)
+            if index is None:
+                continue
+            for text, count in index.search(query, limit):
+                suggestions.append({'text': text, 'type': kind, 'count': count})
+        suggestions.sort(key=lambda suggestion: -suggestion['count'])
+        return suggestions[:limit]
+
+
+def _queue_rebuild():
+    from .tasks import rebuild_autocomplete_snapshot
+
+    rebuild_autocomplete_snapshot.delay()
+
+
+def read_snapshot(path):
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def write_snapshot(path, snapshot):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f'{path}.tmp'
+    with gzip.open(tmp_path, 'wt', encoding='utf-8', compresslevel=5) as f:
+        json.dump(snapshot, f)
+    os.replace(tmp_path, path)
+
+
+def _place_display(place):
+    if place.country in ('US', 'CA'):
+        return f"{place.name}, {place.region}"
+    return place.name
+
+
+def collect_terms(queryset, terms=None):
+    """Add term frequencies from listings to ``terms`` ({kind: {term: [display, count]}})"""
+    from .geo import get_gazetteer
+
+    terms = terms or {kind: {} for kind in KINDS}
+    counters = {kind: Counter() for kind in KINDS}
+    displays = {kind: {} for kind in KINDS}
+    places = get_gazetteer().places
+    watermark = 0
+
+    def add(kind, text):
+        term = normalize(text)
+        if term:
+            counters[kind][term] += 1
+            displays[kind].setdefault(term, str(text).strip())
+
+    rows = queryset.values_list(
+        'id', 'title', 'company_name', 'required_skills', 'preferred_skills', 'place_id', 'location'
+    )
+    for listing_id, title, company, required, preferred, place_id, location in rows.iterator():
+        watermark = max(watermark, listing_id)
+        add('title', title)
+        add('company', company)
+        for skill in set(required or []) | set(preferred or []):
+            add('skill', skill)
+        if place_id in places:
+            add('location', _place_display(places[place_id]))
+        elif location:
+            add('location', location)
+
+    for kind in KINDS:
+        existing = terms.setdefault(kind, {})
+        for term, count in counters[kind].items():
+            if term in existing:
+                existing[term][1] += count
+            else:
+                existing[term] = [displays[kind][term], count]
+    return terms, watermark
+
+
+_index = None
+
+
+def get_autocomplete_index():
+    global _index
+    if _index is None:
+        _index = AutocompleteIndex(settings.JOB_AUTOCOMPLETE_SNAPSHOT_PATH)
+    return _index
+
+
+def warm_autocomplete_index():
+    """Load the snapshot at worker startup so the first request is fast"""
+    try:
+        get_autocomplete_index().load()
+    except Exception as e:
+        logger.error(f"Failed to load autocomplete snapshot: {str(e)}")
+
+
+@contextmanager
+def _snapshot_lock(path):
+    import fcntl
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(f'{path}.lock', 'w') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _rebuild(path):
+    from .geo import get_gazetteer
+    from .models import JobListing
+
+    terms, watermark = collect_terms(JobListing.objects.filter(is_active=True))
+    locations = terms['location']
+    for place in get_gazetteer().places.values():
+        display = _place_display(place)
+        locations.setdefault(normalize(display), [display, 0])
+
+    write_snapshot(path, {'watermark': watermark, 'terms': terms})
+    return watermark
+
+
+def rebuild_snapshot():
+    """Recount every listing; also seeds every gazetteer place at frequency 0"""
+    path = settings.JOB_AUTOCOMPLETE_SNAPSHOT_PATH
+    with _snapshot_lock(path):
+        return _rebuild(path)
+
+
+def update_snapshot():
+    """
+    Fold listings ingested since the last snapshot into it.
+
+    Only listings above the snapshot's id watermark are counted; edits and
+    deletions are picked up by the periodic full rebuild.
+    """
+    from .models import JobListing
+
+    path = settings.JOB_AUTOCOMPLETE_SNAPSHOT_PATH
+    with _snapshot_lock(path):
+        if not os.path.exists(path):
+            return _rebuild(path)
+
+        try:
+            snapshot = read_snapshot(path)
+        except SNAPSHOT_ERRORS as e:
+            logger.error(f"Unreadable autocomplete snapshot {path}, rebuilding: {str(e)}")
+            return _rebuild(path)
+        new_listings = JobListing.objects.filter(is_active=True, id__gt=snapshot['watermark'])
+        terms, watermark = collect_terms(new_listings, snapshot['terms'])
+        if watermark:
+            write_snapshot(path, {'watermark': watermark, 'terms': terms})
+        return watermark or snapshot['watermark']
@@ -0,0 +1,446 @@
+"""
+Compressed bitmap index over JobListing ids for low-cardinality filters.
+
+Every (field, value) pair owns one bitmap where bit ``n`` is set when listing
+``n`` has that value. Bitmaps are plain Python ints, so combining filters is a
+handful of C-level ``&``/``|`` operations. The index is persisted to a single
+snapshot file (zlib-compressed bitmaps behind a JSON header) which every
+worker maps read-only and reloads when the ingest path rewrites it.
+
+The snapshot also stores every listing id in the list endpoint's order
+(newest ``scraped_at`` first), so a page of filtered results is read off the
+bitmaps without sorting in the database. The first write to a missing
+snapshot indexes every listing, so an incremental refresh never publishes a
+partial index.
+"""
+import json
+import logging
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+import zlib
+from array import array
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from itertools import islice
+
+from django.conf import settings
+from django.db.models import Q
+from rest_framework.exceptions import ValidationError
+
+logger = logging.getLogger('jobs')
+
+# Query parameter -> model field for every filter the index can answer
+INDEXED_FIELDS = {
+    'employment_type': 'employment_type',
+    'experience_level': 'experience_level',
+    'is_remote': 'is_remote',
+    'is_active': 'is_active',
+    'source': 'source_id',
+    'auto_apply_difficulty': 'auto_apply_difficulty',
+    'is_auto_applicable': 'is_auto_applicable',
+}
+
+BOOLEAN_FIELDS = ('is_remote', 'is_active', 'is_auto_applicable')
+
+MAGIC = b'HFJBMI02'
+HEADER = struct.Struct('<8sI')
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def normalize_value(value):
+    """Normalize a filter value to the string key stored in the index"""
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    value = str(value).strip().lower()
+    if value in ('1', 'yes', 'on'):
+        return 'true'
+    if value in ('0', 'no', 'off'):
+        return 'false'
+    return value
+
+
+def parse_filters(query_params):
+    """Collect indexed filters from request query parameters as value lists"""
+    filters = {}
+    job_type = query_params.get('job_type')
+    if job_type:
+        filters['employment_type'] = job_type.split(',')
+    for param in INDEXED_FIELDS:
+        value = query_params.get(param)
+        if value:
+            filters[param] = value.split(',')
+    if not all(value.strip().isdigit() for value in filters.get('source', [])):
+        raise ValidationError({'source': "Expected one or more source ids"})
+    return filters
+
+
+def filter_queryset(queryset, filters):
+    """
+    Apply the same filters through the ORM, for when the index is unavailable;
+    values are matched the way the index stores them (normalize_value)
+    """
+    for param, values in filters.items():
+        field = INDEXED_FIELDS[param]
+        if field == 'source_id':  # digits only (parse_filters)
+            queryset = queryset.filter(source_id__in=[int(value) for value in values])
+            continue
+        values = [normalize_value(value) for value in values]
+        if field in BOOLEAN_FIELDS:
+            queryset = queryset.filter(**{f'{field}__in': [value == 'true' for value in values]})
+        else:
+            condition = Q()
+            for value in values:
+                condition |= Q(**{f'{field}__iexact': value})
+            queryset = queryset.filter(condition)
+    return queryset
+
+
+def sort_key(scraped_at):
+    """Integer key ordering listings like ``-scraped_at`` does (larger is newer)"""
+    epoch = EPOCH if scraped_at.tzinfo else EPOCH.replace(tzinfo=None)
+    return (scraped_at - epoch) // timedelta(microseconds=1)
+
+
+def _pack(values):
+    packed = array('q', values)
+    if sys.byteorder != 'little':
+        packed.byteswap()
+    return packed.tobytes()
+
+
+def _unpack(data):
+    values = array('q')
+    values.frombytes(data)
+    if sys.byteorder != 'little':
+        values.byteswap()
+    return values
+
+
+class _Snapshot:
+    """One loaded generation of the snapshot file; never changed once published"""
+
+    def __init__(self, mapped, header, base):
+        self.mapped = mapped
+        self.generation = header['generation']
+        self.offsets = {
+            tuple(key.split('=', 1)): (base + start, length)
+            for key, (start, length) in header['bitmaps'].items()
+        }
+        start, length = header['order']
+        self.order_location = (base + start, length)
+        self.bitmaps = {}
+        self._order = None
+
+    def bitmap(self, field, value):
+        key = (field, value)
+        bitmap = self.bitmaps.get(key)
+        if bitmap is None:
+            location = self.offsets.get(key)
+            if location is None:
+                return 0
+            start, length = location
+            bitmap = int.from_bytes(zlib.decompress(self.mapped[start:start + length]), 'little')
+            self.bitmaps[key] = bitmap
+        return bitmap
+
+    def order(self):
+        """Listing ids and their sort keys, in list order"""
+        if self._order is None:
+            start, length = self.order_location
+            values = _unpack(zlib.decompress(self.mapped[start:start + length]))
+            half = len(values) // 2
+            self._order = (values[:half], values[half:])
+        return self._order
+
+    def query(self, filters):
+        result = None
+        for param, values in filters.items():
+            field = INDEXED_FIELDS[param]
+            if not isinstance(values, (list, tuple, set)):
+                values = [values]
+            bitmap = 0
+            for value in values:
+                bitmap |= self.bitmap(field, normalize_value(value))
+            result = bitmap if result is None else result & bitmap
+            if not result:
+                return 0
+        if result is None:
+            result = self.all_ids()
+        return result
+
+    def all_ids(self):
+        bitmap = 0
+        for field, value in self.offsets:
+            if field == 'is_active':
+                bitmap |= self.bitmap(field, value)
+        return bitmap
+
+
+class BitmapFilterIndex:
+    """Bitmap index over listing ids, persisted to a shared snapshot file"""
+
+    def __init__(self, path):
+        self.path = path
+        self._snapshot = None
+        self._mtime = None
+        self._lock = threading.Lock()
+
+    @property
+    def generation(self):
+        return self._snapshot.generation if self._snapshot is not None else 0
+
+    # Reading
+
+    def snapshot(self):
+        """
+        The current snapshot, remapped if the ingest path replaced it, or None
+        when it does not exist yet
+        """
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        mtime = (stat.st_mtime_ns, stat.st_ino)
+        if mtime == self._mtime:
+            return self._snapshot
+
+        with self._lock:
+            if mtime == self._mtime:
+                return self._snapshot
+            with open(self.path, 'rb') as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, header_size = HEADER.unpack_from(mapped, 0)
+            if magic != MAGIC:
+                mapped.close()
+                logger.error(f"Ignoring filter index with bad header: {self.path}")
+                return None
+            header = json.loads(mapped[HEADER.size:HEADER.size + header_size])
+
+            # Requests still paging through the previous snapshot keep using
+            # it; its map is released once the last of them drops it
+            self._snapshot = _Snapshot(mapped, header, HEADER.size + header_size)
+            self._mtime = mtime
+            logger.info(f"Loaded filter index generation {self.generation}")
+        return self._snapshot
+
+    def is_available(self):
+        return self.snapshot() is not None
+
+    def query(self, filters):
+        """
+        Return a bitmap of listing ids matching every filter.
+
+        ``filters`` maps query parameter names from INDEXED_FIELDS to a value or
+        a list of values (OR-ed together). Returns None when the snapshot does
+        not exist yet, so callers can fall back to the database.
+        """
+        snapshot = self.snapshot()
+        if snapshot is None:
+            return None
+        return snapshot.query(filters)
+
+    # Writing
+
+    @contextmanager
+    def writer(self):
+        """
+        Exclusive, atomic read-modify-write of the snapshot file; the writer's
+        ``complete`` is False when there was no snapshot to start from
+        """
+        import fcntl
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(f'{self.path}.lock', 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                self._mtime = None
+                snapshot = self.snapshot()
+                if snapshot is not None:
+                    bitmaps = {key: snapshot.bitmap(*key) for key in snapshot.offsets}
+                    ids, keys = snapshot.order()
+                    writer = _IndexWriter(bitmaps, dict(zip(ids, keys)), snapshot.generation, complete=True)
+                else:
+                    # Generations stay increasing when a lost snapshot is rebuilt
+                    writer = _IndexWriter({}, {}, int(time.time()), complete=False)
+                yield writer
+                self._write(writer)
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _write(self, writer):
+        header = {'generation': writer.generation + 1, 'bitmaps': {}}
+        blobs = []
+        position = 0
+        for (field, value), bitmap in sorted(writer.bitmaps.items()):
+            if not bitmap:
+                continue
+            blob = zlib.compress(bitmap.to_bytes((bitmap.bit_length() + 7) // 8, 'little'), 1)
+            header['bitmaps'][f'{field}={value}'] = (position, len(blob))
+            blobs.append(blob)
+            position += len(blob)
+
+        order = sorted(writer.order.items(), key=lambda item: (item[1], item[0]), reverse=True)
+        blob = zlib.compress(_pack([listing_id for listing_id, _ in order]) + _pack([key for _, key in order]), 1)
+        header['order'] = (position, len(blob))
+        blobs.append(blob)
+
+        header_bytes = json.dumps(header).encode()
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, len(header_bytes)))
+            f.write(header_bytes)
+            for blob in blobs:
+                f.write(blob)
+        os.replace(tmp_path, self.path)
+        self._mtime = None
+
+    def update(self, listings):
+        """Set the bits for ``listings`` (dicts of id, scraped_at and indexed model fields)"""
+        with self.writer() as writer:
+            writer.set_many(listings)
+
+    def remove(self, ids):
+        with self.writer() as writer:
+            writer.clear_many(ids)
+
+    def rebuild(self, listings):
+        """Replace the whole index with ``listings``"""
+        with self.writer() as writer:
+            writer.bitmaps.clear()
+            writer.order.clear()
+            writer.set_many(listings)
+            writer.complete = True
+
+
+def _bits(ids, size):
+    buffer = bytearray(size)
+    for listing_id in ids:
+        buffer[listing_id >> 3] |= 1 << (listing_id & 7)
+    return buffer
+
+
+class _IndexWriter:
+    """Mutable view of the bitmaps and list order held while the snapshot lock is taken"""
+
+    def __init__(self, bitmaps, order, generation, complete):
+        self.bitmaps = bitmaps
+        self.order = order
+        self.generation = generation
+        self.complete = complete
+
+    def clear_many(self, ids):
+        ids = list(ids)
+        if not ids:
+            return
+        mask = ~int.from_bytes(_bits(ids, max(ids) // 8 + 1), 'little')
+        for key, bitmap in self.bitmaps.items():
+            self.bitmaps[key] = bitmap & mask
+        for listing_id in ids:
+            self.order.pop(listing_id, None)
+
+    def set_many(self, listings):
+        # Build each value's new bits in a bytearray; OR-ing ``1 << id`` into a
+        # large int row by row would copy the whole bitmap every time
+        grouped = {}
+        keys = {}
+        for listing in listings:
+            keys[listing['id']] = sort_key(listing['scraped_at'])
+            for field in INDEXED_FIELDS.values():
+                key = (field, normalize_value(listing[field]))
+                grouped.setdefault(key, []).append(listing['id'])
+        if not keys:
+            return
+
+        self.clear_many(keys)
+        size = max(keys) // 8 + 1
+        for key, key_ids in grouped.items():
+            self.bitmaps[key] = self.bitmaps.get(key, 0) | int.from_bytes(_bits(key_ids, size), 'little')
+        self.order.update(keys)
+
+
+def iter_ordered(bitmap, order):
+    """Yield the ids set in ``bitmap`` in list order"""
+    data = bitmap.to_bytes((bitmap.bit_length() + 7) // 8, 'little')
+    size = len(data)
+    for listing_id in order:
+        byte = listing_id >> 3
+        if byte < size and data[byte] >> (listing_id & 7) & 1:
+            yield listing_id
+
+
+class IndexedListingPage:
+    """
+    Sequence of JobListings backed by an index bitmap, in list order (newest
+    ``scraped_at`` first).
+
+    Supports ``len()`` and slicing so it can be handed to DRF pagination; only
+    the requested slice is fetched from the database.
+    """
+
+    def __init__(self, queryset, bitmap, order):
+        self.queryset = queryset
+        self.bitmap = bitmap
+        self.order = order
+        self._count = bitmap.bit_count()
+
+    def __len__(self):
+        return self._count
+
+    def count(self):
+        return self._count
+
+    def __getitem__(self, item):
+        if not isinstance(item, slice):
+            return self[item:item + 1][0]
+        start, stop, _ = item.indices(self._count)
+        ids = list(islice(iter_ordered(self.bitmap, self.order), start, stop))
+        listings = self.queryset.in_bulk(ids)
+        return [listings[listing_id] for listing_id in ids if listing_id in listings]
+
+
+_index = None
+
+
+def get_filter_index():
+    """Process-wide index instance bound to settings.JOB_FILTER_INDEX_PATH"""
+    global _index
+    if _index is None:
+        _index = BitmapFilterIndex(settings.JOB_FILTER_INDEX_PATH)
+    return _index
+
+
+def listing_rows(queryset):
+    return queryset.values('id', 'scraped_at', *INDEXED_FIELDS.values()).iterator()
+
+
+def refresh_listings(job_ids):
+    """
+    Incrementally re-index the given listings (deleted ids are dropped); when
+    there is no snapshot yet every listing is indexed instead
+    """
+    from .models import JobListing
+
+    index = get_filter_index()
+    rows = list(listing_rows(JobListing.objects.filter(id__in=job_ids)))
+    found = {row['id'] for row in rows}
+    with index.writer() as writer:
+        if not writer.complete:
+            logger.info("No filter index snapshot, indexing all listings")
+            writer.set_many(listing_rows(JobListing.objects.all()))
+            writer.complete = True
+            return len(writer.order)
+        writer.clear_many(set(job_ids) - found)
+        writer.set_many(rows)
+    return len(rows)
+
+
+def rebuild_index():
+    from .models import JobListing
+
+    index = get_filter_index()
+    index.rebuild(listing_rows(JobListing.objects.all()))
+    return index
@@ -0,0 +1,328 @@
+"""
+Offline location normalization and radius search.
+
+Free-text locations ("SF", "San Francisco, CA", "Bay Area") are resolved
+against the gazetteer bundled in ``jobs/data/gazetteer.tsv`` to a canonical
+place id plus coordinates. Listings store the place id, lat/lon and a geohash,
+so location filters become indexed equality or prefix lookups instead of
+``icontains`` scans.
+"""
+import math
+import os
+import re
+from collections import namedtuple
+
+from django.db.models import ExpressionWrapper, F, FloatField, Q, Value
+from django.db.models.functions import ASin, Cos, Power, Radians, Sin, Sqrt
+
+GAZETTEER_PATH = os.path.join(os.path.dirname(__file__), 'data', 'gazetteer.tsv')
+
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE = 111.32
+GEOHASH_PRECISION = 7
+GEOHASH_ALPHABET = '0123456789bcdefghjkmnpqrstuvwxyz'
+MAX_COVERING_CELLS = 16
+MAX_RADIUS_KM = 1000  # radius searches beyond this are not a location filter any more
+
+Place = namedtuple('Place', 'place_id name region country latitude longitude')
+
+COUNTRY_NAMES = {
+    'us': 'US', 'usa': 'US', 'united states': 'US', 'united states of america': 'US', 'america': 'US',
+    'canada': 'CA', 'mexico': 'MX', 'brazil': 'BR', 'argentina': 'AR',
+    'uk': 'GB', 'united kingdom': 'GB', 'england': 'GB', 'scotland': 'GB', 'great britain': 'GB',
+    'ireland': 'IE', 'france': 'FR', 'germany': 'DE', 'netherlands': 'NL', 'spain': 'ES',
+    'portugal': 'PT', 'italy': 'IT', 'switzerland': 'CH', 'sweden': 'SE', 'denmark': 'DK',
+    'poland': 'PL', 'israel': 'IL', 'uae': 'AE', 'united arab emirates': 'AE', 'india': 'IN',
+    'singapore': 'SG', 'japan': 'JP', 'south korea': 'KR', 'korea': 'KR', 'china': 'CN',
+    'hong kong': 'HK', 'australia': 'AU', 'new zealand': 'NZ', 'south africa': 'ZA',
+    'nigeria': 'NG', 'kenya': 'KE',
+}
+
+REGION_NAMES = {
+    'alabama': 'AL', 'alaska': 'AK', 'arizona': 'AZ', 'arkansas': 'AR', 'california': 'CA',
+    'colorado': 'CO', 'connecticut': 'CT', 'delaware': 'DE', 'florida': 'FL', 'georgia': 'GA',
+    'hawaii': 'HI', 'idaho': 'ID', 'illinois': 'IL', 'indiana': 'IN', 'iowa': 'IA',
+    'kansas': 'KS', 'kentucky': 'KY', 'louisiana': 'LA', 'maine': 'ME', 'maryland': 'MD',
+    'massachusetts': 'MA', 'michigan': 'MI', 'minnesota': 'MN', 'mississippi': 'MS',
+    'missouri': 'MO', 'montana': 'MT', 'nebraska': 'NE', 'nevada': 'NV', 'new hampshire': 'NH',
+    'new jersey': 'NJ', 'new mexico': 'NM', 'new york': 'NY', 'north carolina': 'NC',
+    'north dakota': 'ND', 'ohio': 'OH', 'oklahoma': 'OK', 'oregon': 'OR', 'pennsylvania': 'PA',
+    'rhode island': 'RI', 'south carolina': 'SC', 'south dakota': 'SD', 'tennessee': 'TN',
+    'texas': 'TX', 'utah': 'UT', 'vermont': 'VT', 'virginia': 'VA', 'washington': 'WA',
+    'west virginia': 'WV', 'wisconsin': 'WI', 'wyoming': 'WY', 'district of columbia': 'DC',
+    'ontario': 'ON', 'british columbia': 'BC', 'quebec': 'QC', 'alberta': 'AB',
+    'karnataka': 'KA', 'maharashtra': 'MH', 'delhi': 'DL', 'haryana': 'HR', 'uttar pradesh': 'UP',
+    'telangana': 'TG', 'tamil nadu': 'TN', 'west bengal': 'WB', 'gujarat': 'GJ',
+    'new south wales': 'NSW', 'victoria': 'VIC', 'bavaria': 'BY',
+}
+
+# Noise around the place name in scraped location strings
+_PARENTHESES = re.compile(r'\(.*?\)')
+_PUNCTUATION = re.compile(r'[^\w\s,-]')
+_WHITESPACE = re.compile(r'\s+')
+_DIGITS = re.compile(r'\d+')
+_AFFIXES = re.compile(r'^(greater|metro)\s+|\s+(metropolitan area|metro area|metro|area|region)$')
+_REMOTE = re.compile(r'\b(remote|anywhere|work from home|wfh)\b')
+
+
+def _clean(text):
+    text = _PARENTHESES.sub(' ', text.lower())
+    text = _PUNCTUATION.sub(' ', text)
+    return _WHITESPACE.sub(' ', text).strip(' ,-')
+
+
+class Gazetteer:
+    """In-memory lookup tables over the bundled place list"""
+
+    def __init__(self, path=GAZETTEER_PATH):
+        self.places = {}
+        self.by_name = {}
+        self.by_alias = {}
+
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                if not line.strip() or line.startswith('#'):
+                    continue
+                columns = line.rstrip('\n').split('\t')
+                place_id, name, region, country, latitude, longitude = columns[:6]
+                aliases = columns[6].split('|') if len(columns) > 6 and columns[6] else []
+
+                place = Place(place_id, name, region, country, float(latitude), float(longitude))
+                self.places[place_id] = place
+                self.by_name.setdefault(_clean(name), []).append(place)
+                for alias in aliases:
+                    self.by_alias.setdefault(_clean(alias), place)
+
+    def resolve(self, text):
+        """
+        Resolve free text to a Place, or None when it is not recognised.
+
+        Tries the whole string as a name or alias first, then treats the first
+        comma-separated part as the city and the rest as region/country
+        qualifiers used to pick between same-named places.
+        """
+        if not text:
+            return None
+        cleaned = _clean(text)
+        if not cleaned:
+            return None
+
+        place = self._lookup(cleaned)
+        if place:
+            return place
+
+        parts = [part.strip() for part in cleaned.split(',') if part.strip()]
+        if not parts:
+            return None
+        qualifiers = {_AFFIXES.sub('', _DIGITS.sub('', part)).strip() for part in parts[1:]} - {''}
+        candidates = self.by_name.get(parts[0]) or self.by_name.get(_AFFIXES.sub('', parts[0]))
+        if not candidates:
+            return self.by_alias.get(parts[0]) or self.by_alias.get(_AFFIXES.sub('', parts[0]))
+        if not qualifiers:
+            return candidates[0]
+
+        regions = {REGION_NAMES.get(q, q.upper()) for q in qualifiers}
+        countries = {COUNTRY_NAMES.get(q, q.upper()) for q in qualifiers}
+        for candidate in candidates:
+            if candidate.region in regions:
+                return candidate
+        for candidate in candidates:
+            if candidate.country in countries:
+                return candidate
+
+        # "Portland, ME" must not resolve to Portland, OR; only fall back to the
+        # first candidate when the qualifiers are not a recognisable region
+        if any(q in REGION_NAMES or q in COUNTRY_NAMES or len(q) <= 3 for q in qualifiers):
+            return None
+        return candidates[0]
+
+    def _lookup(self, key):
+        for variant in (key, _AFFIXES.sub('', key)):
+            place = self.by_alias.get(variant)
+            if place:
+                return place
+            candidates = self.by_name.get(variant)
+            if candidates:
+                return candidates[0]
+        return None
+
+
+_gazetteer = None
+
+
+def get_gazetteer():
+    global _gazetteer
+    if _gazetteer is None:
+        _gazetteer = Gazetteer()
+    return _gazetteer
+
+
+def resolve_location(text):
+    return get_gazetteer().resolve(text)
+
+
+def is_remote_location(text):
+    return bool(text and _REMOTE.search(text.lower()))
+
+
+# Geohash
+
+def geohash_encode(latitude, longitude, precision=GEOHASH_PRECISION):
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True
+    while len(chars) < precision:
+        value, interval = (longitude, lon_range) if even else (latitude, lat_range)
+        mid = (interval[0] + interval[1]) / 2
+        if value >= mid:
+            bits = (bits << 1) | 1
+            interval[0] = mid
+        else:
+            bits <<= 1
+            interval[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(GEOHASH_ALPHABET[bits])
+            bits = 0
+            bit_count = 0
+    return ''.join(chars)
+
+
+def _cell_size(precision):
+    """(height, width) in degrees of a geohash cell"""
+    lon_bits = math.ceil(precision * 5 / 2)
+    lat_bits = math.floor(precision * 5 / 2)
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lon_bits
+
+
+def covering_cells(min_lat, max_lat, min_lon, max_lon):
+    """Smallest set of same-precision geohash cells covering a bounding box"""
+    min_lat, max_lat = max(min_lat, -90.0), min(max_lat, 90.0)
+    min_lon, max_lon = max(min_lon, -180.0), min(max_lon, 180.0)
+
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        height, width = _cell_size(precision)
+        rows = int((max_lat - min_lat) / height) + 2
+        cols = int((max_lon - min_lon) / width) + 2
+        if rows * cols <= MAX_COVERING_CELLS or precision == 1:
+            break
+
+    cells = set()
+    lat = min_lat
+    while True:
+        lon = min_lon
+        while True:
+            cells.add(geohash_encode(lat, lon, precision))
+            if lon >= max_lon:
+                break
+            lon = min(lon + width, max_lon)
+        if lat >= max_lat:
+            break
+        lat = min(lat + height, max_lat)
+    return sorted(cells)
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(min(1.0, a)))
+
+
+def location_fields(text):
+    """Column values to store for a free-text location"""
+    place = resolve_location(text)
+    if not place:
+        return {'place_id': '', 'latitude': None, 'longitude': None, 'geohash': ''}
+    return {
+        'place_id': place.place_id,
+        'latitude': place.latitude,
+        'longitude': place.longitude,
+        'geohash': geohash_encode(place.latitude, place.longitude),
+    }
+
+
+def within_radius(queryset, latitude, longitude, radius_km):
+    """
+    Restrict a JobListing queryset to listings within ``radius_km``.
+
+    Candidates are narrowed with the indexed geohash prefix of every cell
+    covering the bounding box, then the exact great-circle distance is
+    computed for the survivors and exposed as ``distance_km``.
+    """
+    lat_delta = radius_km / KM_PER_DEGREE
+    lon_delta = radius_km / (KM_PER_DEGREE * max(math.cos(math.radians(latitude)), 0.01))
+    min_lat, max_lat = latitude - lat_delta, latitude + lat_delta
+    min_lon, max_lon = longitude - lon_delta, longitude + lon_delta
+
+    cells = Q()
+    for cell in covering_cells(min_lat, max_lat, min_lon, max_lon):
+        cells |= Q(geohash__startswith=cell)
+
+    lat1 = math.radians(latitude)
+    lat2 = Radians(F('latitude'))
+    half_dlat = (lat2 - Value(lat1)) / 2
+    half_dlon = (Radians(F('longitude')) - Value(math.radians(longitude))) / 2
+    a = Power(Sin(half_dlat), 2) + Value(math.cos(lat1)) * Cos(lat2) * Power(Sin(half_dlon), 2)
+    distance = ExpressionWrapper(Value(2 * EARTH_RADIUS_KM) * ASin(Sqrt(a)), output_field=FloatField())
+
+    return queryset.filter(
+        cells,
+        latitude__range=(min_lat, max_lat),
+        longitude__range=(min_lon, max_lon),
+    ).annotate(distance_km=distance).filter(distance_km__lte=radius_km)
+
+
+def filter_by_location(queryset, text, radius_km=None):
+    """
+    Location filter for JobListing querysets.
+
+    Recognised places become an indexed ``place_id`` lookup (or a radius search
+    when ``radius_km`` is given); unrecognised text falls back to ``icontains``.
+    """
+    if is_remote_location(text) and not resolve_location(text):
+        return queryset.filter(is_remote=True)
+
+    place = resolve_location(text)
+    if not place:
+        return queryset.filter(location__icontains=text)
+    if radius_km:
+        return within_radius(queryset, place.latitude, place.longitude, radius_km)
+    return queryset.filter(place_id=place.place_id)
+
+
+def location_match_score(profile, job, full_score_km=25, zero_score_km=500):
+    """
+    0-100 score of how well a listing's location suits a profile.
+
+    Remote listings and exact place matches score 100; otherwise the score
+    decays linearly with distance to the closest of the profile's places.
+    """
+    if job.is_remote:
+        return 100
+    if not job.place_id or job.latitude is None or job.longitude is None:
+        return 50
+
+    place_ids = [profile.place_id] if profile.place_id else []
+    place_ids.extend(profile.preferred_place_ids or [])
+    if not place_ids:
+        return 50
+    if job.place_id in place_ids:
+        return 100
+
+    places = get_gazetteer().places
+    distances = [
+        haversine_km(places[pid].latitude, places[pid].longitude, job.latitude, job.longitude)
+        for pid in place_ids if pid in places
+    ]
+    if not distances:
+        return 50
+    closest = min(distances)
+    if closest <= full_score_km:
+        return 100
+    if closest >= zero_score_km:
+        return 0
+    return round(100 * (zero_score_km - closest) / (zero_score_km - full_score_km))
@@ -0,0 +1,66 @@
+from django.core.management.base import BaseCommand
+from jobs.autocomplete import rebuild_snapshot
+from jobs.filter_index import rebuild_index
+from jobs.models import JobListing
+from jobs.search_cache import bump_generation
+from profiles import snapshot
+from profiles.models import UserProfile
+
+JOB_FIELDS = ['place_id', 'latitude', 'longitude', 'geohash', 'is_remote']
+PROFILE_FIELDS = ['place_id', 'latitude', 'longitude', 'preferred_place_ids']
+
+
+def _values(instance, fields):
+    return [getattr(instance, field) for field in fields]
+
+
+class Command(BaseCommand):
+    help = 'Resolve job listing and profile locations against the offline gazetteer'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+
+        # bulk_update() sends no save signals, so only changed rows are written
+        # and the indexes and snapshots that signals keep fresh are refreshed below
+        listings = []
+        resolved = changed_listings = 0
+        rows = JobListing.objects.only('id', 'location', *JOB_FIELDS).iterator(chunk_size=batch_size)
+        for job in rows:
+            before = _values(job, JOB_FIELDS)
+            job.normalize_location()
+            resolved += bool(job.place_id)
+            if _values(job, JOB_FIELDS) != before:
+                listings.append(job)
+            if len(listings) >= batch_size:
+                JobListing.objects.bulk_update(listings, JOB_FIELDS)
+                changed_listings += len(listings)
+                listings = []
+        if listings:
+            JobListing.objects.bulk_update(listings, JOB_FIELDS)
+            changed_listings += len(listings)
+        self.stdout.write(f'Resolved {resolved} job listing locations ({changed_listings} changed)')
+
+        if changed_listings:
+            # is_remote and locations feed the filter index and autocomplete
+            # terms; cached search pages may list the old values
+            rebuild_index()
+            rebuild_snapshot()
+            bump_generation()
+            self.stdout.write('Rebuilt the job search indexes')
+
+        profiles = []
+        for profile in UserProfile.objects.iterator(chunk_size=batch_size):
+            before = _values(profile, PROFILE_FIELDS)
+            profile.normalize_locations()
+            if _values(profile, PROFILE_FIELDS) != before:
+                profiles.append(profile)
+        UserProfile.objects.bulk_update(profiles, PROFILE_FIELDS, batch_size=batch_size)
+        for profile in profiles:
+            snapshot.invalidate(profile.user_id)
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Normalized profile locations ({len(profiles)} changed)')
+        )
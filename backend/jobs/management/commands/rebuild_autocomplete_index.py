@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from jobs.autocomplete import rebuild_snapshot
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the autocomplete snapshot from all active job listings'
+
+    def handle(self, *args, **options):
+        watermark = rebuild_snapshot()
+        self.stdout.write(
+            self.style.SUCCESS(f'Rebuilt autocomplete snapshot up to listing {watermark}')
+        )
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from jobs.filter_index import rebuild_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the bitmap filter index over all job listings'
+
+    def handle(self, *args, **options):
+        index = rebuild_index()
+        index.is_available()
+        self.stdout.write(
+            self.style.SUCCESS(f'Rebuilt filter index (generation {index.generation}) at {index.path}')
+        )
@@ -59,6 +59,13 @@ class JobListing(models.Model):
     requirements = models.TextField(blank=True)
     location = models.CharField(max_length=200)
     is_remote = models.BooleanField(default=False)
+    
+    # Normalized location (resolved from `location` against the offline gazetteer)
+    place_id = models.CharField(max_length=100, blank=True, db_index=True)
+    latitude = models.FloatField(blank=True, null=True)
+    longitude = models.FloatField(blank=True, null=True)
+    geohash = models.CharField(max_length=12, blank=True, db_index=True)
+    
     employment_type = models.CharField(max_length=20, choices=EMPLOYMENT_TYPES, default='full_time')
     experience_level = models.CharField(max_length=20, choices=EXPERIENCE_LEVELS, blank=True)
     
@@ -106,6 +113,19 @@ class JobListing(models.Model):
     def __str__(self):
         return f"{self.title} at {self.company_name}"
     
+    def save(self, *args, **kwargs):
+        self.normalize_location()
+        super().save(*args, **kwargs)
+    
+    def normalize_location(self):
+        """Resolve the free-text location to a place id, coordinates and geohash"""
+        from .geo import location_fields, is_remote_location
+        
+        for field, value in location_fields(self.location).items():
+            setattr(self, field, value)
+        if not self.place_id and is_remote_location(self.location):
+            self.is_remote = True
+    
     @property
     def salary_range_display(self):
         """Display salary range in readable format"""
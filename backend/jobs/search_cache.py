@@ -0,0 +1,152 @@
+"""
+Result cache for job search endpoints.
+
+Pages of search results are cached as lists of listing ids, keyed by the
+normalized query parameters and the current search generation. The ingest
+path bumps the generation after every crawl, which orphans all previously
+cached pages at once; they simply expire from the cache. Each bump logs the
+hit rate of the generation it retires.
+"""
+import hashlib
+import json
+import logging
+import re
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger('jobs')
+
+GENERATION_KEY = 'job-search:generation'
+STATS_KEY = 'job-search:stats:{}'
+TEXT_PARAMS = ('q', 'search', 'location')
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+def get_generation():
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        cache.add(GENERATION_KEY, 1, timeout=None)
+        generation = cache.get(GENERATION_KEY, 1)
+    return generation
+
+
+def bump_generation():
+    """Invalidate every cached search result (called after ingestion)"""
+    stats = get_stats(reset=True)
+    if stats['hits'] or stats['misses']:
+        logger.info(
+            f"Search cache generation {stats['generation']}: {stats['hits']} hits, "
+            f"{stats['misses']} misses ({stats['hit_rate']:.0f}% hit rate)"
+        )
+    try:
+        return cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.add(GENERATION_KEY, 2, timeout=None)
+        return cache.get(GENERATION_KEY)
+
+
+def normalize_params(query_params):
+    """Canonical form of the query: case/whitespace-insensitive text, sorted keys"""
+    params = {}
+    for key in sorted(query_params):
+        values = query_params.getlist(key) if hasattr(query_params, 'getlist') else [query_params[key]]
+        if key in TEXT_PARAMS:
+            values = [_WHITESPACE.sub(' ', value).strip().lower() for value in values]
+        values = sorted(value for value in values if value != '')
+        if values:
+            params[key] = values
+    return params
+
+
+def cache_key(namespace, query_params):
+    payload = json.dumps(normalize_params(query_params), separators=(',', ':'))
+    digest = hashlib.sha1(payload.encode()).hexdigest()
+    return f'job-search:{get_generation()}:{namespace}:{digest}'
+
+
+def record(outcome):
+    key = STATS_KEY.format(outcome)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, timeout=None)
+        cache.incr(key)
+
+
+def get_stats(reset=False):
+    """Hit/miss counts since the last reset; ``reset`` starts counting afresh"""
+    keys = [STATS_KEY.format('hit'), STATS_KEY.format('miss')]
+    counts = cache.get_many(keys)
+    if reset:
+        cache.delete_many(keys)
+    hits = counts.get(keys[0], 0)
+    misses = counts.get(keys[1], 0)
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': (hits / total) * 100 if total else 0,
+        'generation': get_generation(),
+    }
+
+
+class CachedPage:
+    """
+    Stand-in object list for DRF pagination on a cache hit.
+
+    Reports the cached total count and yields the cached page's listings for
+    whatever slice the paginator asks for, so next/previous links are built
+    exactly as on a miss.
+    """
+
+    def __init__(self, count, listings):
+        self._count = count
+        self.listings = listings
+
+    def __len__(self):
+        return self._count
+
+    def count(self):
+        return self._count
+
+    def __getitem__(self, item):
+        return self.listings
+
+
+class CachedSearchMixin:
+    """
+    Serve paginated job search responses from the result cache.
+
+    Views set ``search_cache_namespace``; on a miss the normal ``list`` runs
+    and the ids of the returned page are stored for the next identical query.
+    """
+    search_cache_namespace = None
+
+    def list(self, request, *args, **kwargs):
+        from .models import JobListing
+
+        key = cache_key(self.search_cache_namespace, request.query_params)
+        cached = cache.get(key)
+        if cached is not None:
+            listings = JobListing.objects.select_related('source').in_bulk(cached['ids'])
+            page = self.paginate_queryset(
+                CachedPage(cached['count'], [listings[i] for i in cached['ids'] if i in listings])
+            )
+            if page is not None:
+                record('hit')
+                serializer = self.get_serializer(page, many=True)
+                response = self.get_paginated_response(serializer.data)
+                response['X-Search-Cache'] = 'HIT'
+                return response
+
+        record('miss')
+        response = super().list(request, *args, **kwargs)
+        if response.status_code == 200 and 'results' in response.data:
+            cache.set(key, {
+                'count': response.data['count'],
+                'ids': [listing['id'] for listing in response.data['results']],
+            }, timeout=settings.JOB_SEARCH_CACHE_TIMEOUT)
+        response['X-Search-Cache'] = 'MISS'
+        return response
@@ -0,0 +1,64 @@
+"""
+Keep the listing search indexes in step with JobListing rows however they
+are written (API, admin, shell, scraper)
+
+Code writing many listings (crawls, cleanup) wraps the writes in
+batched_index_refresh() so they are re-indexed by a single
+refresh_job_indexes task once the transaction commits. Other saves and
+deletes schedule refresh_changed_job_indexes a little later instead: every
+refresh rewrites the index snapshot and retires all cached searches, so
+single edits are collected into one delayed refresh.
+"""
+import threading
+from contextlib import contextmanager
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import JobListing
+
+_batch = threading.local()
+
+
+def _queue_refresh(job_ids):
+    from .tasks import refresh_job_indexes
+
+    job_ids = sorted(job_ids)
+    transaction.on_commit(lambda: refresh_job_indexes.delay(job_ids))
+
+
+@contextmanager
+def batched_index_refresh():
+    """Collect listing changes made inside the block into one index refresh"""
+    if getattr(_batch, 'ids', None) is not None:
+        yield  # nested: the outer block refreshes
+        return
+    _batch.ids = set()
+    try:
+        yield
+    finally:
+        job_ids, _batch.ids = _batch.ids, None
+        if job_ids:
+            _queue_refresh(job_ids)
+
+
+def _listing_changed(job_id):
+    batch = getattr(_batch, 'ids', None)
+    if batch is not None:
+        batch.add(job_id)
+    else:
+        from .tasks import schedule_index_refresh
+
+        transaction.on_commit(schedule_index_refresh)
+
+
+@receiver(post_save, sender=JobListing)
+def listing_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        _listing_changed(instance.pk)
+
+
+@receiver(post_delete, sender=JobListing)
+def listing_deleted(sender, instance, **kwargs):
+    _listing_changed(instance.pk)
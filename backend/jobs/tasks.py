@@ -1,11 +1,27 @@
+from datetime import timedelta
+
 from celery import shared_task
+from django.core.cache import cache
+from django.utils import timezone
+from hopeforjob.idempotency import idempotent
 from .models import JobListing, JobSource
+from .signals import batched_index_refresh
 import logging
 
 logger = logging.getLogger('jobs')
 
+INDEX_REFRESH_DELAY = 30  # seconds; single-listing edits within this window share one refresh
+INDEX_REFRESH_OVERLAP = timedelta(minutes=5)  # re-read edits whose transaction committed late
+INDEX_REFRESH_LOOKBACK = timedelta(hours=1)  # when the last delayed refresh is unknown
+REFRESH_SCHEDULED_KEY = 'job-index:refresh-scheduled'
+REFRESHED_AT_KEY = 'job-index:refreshed-at'
+
 
 @shared_task
+@idempotent(
+    lambda source_name, search_query='', location='': [source_name.lower(), search_query.lower(), location.lower()],
+    memoize_if=lambda result: not result.startswith('Error')
+)
 def scrape_jobs_task(source_name, search_query='', location=''):
     """
     Background task to scrape jobs from various sources
@@ -14,7 +30,7 @@ def scrape_jobs_task(source_name, search_query='', location=''):
         # Get or create job source
         source, created = JobSource.objects.get_or_create(
             name=source_name,
-            defaults={'url': f'https://{source_name}.com', 'is_active': True}
+            defaults={'base_url': f'https://{source_name}.com', 'is_active': True}
         )
         
         # Import automation engine
@@ -24,24 +40,31 @@ def scrape_jobs_task(source_name, search_query='', location=''):
             automator = LinkedInAutomator()
             jobs = automator.search_jobs(search_query, location)
             
-            created_count = 0
-            for job_data in jobs:
-                job, created = JobListing.objects.get_or_create(
-                    external_id=job_data.get('id'),
-                    source=source,
-                    defaults={
-                        'title': job_data.get('title', ''),
-                        'company': job_data.get('company', ''),
-                        'location': job_data.get('location', ''),
-                        'description': job_data.get('description', ''),
-                        'url': job_data.get('url', ''),
-                        'job_type': job_data.get('job_type', 'full_time'),
-                        'experience_level': job_data.get('experience_level', 'entry')
-                    }
-                )
-                if created:
-                    created_count += 1
+            created_ids = []
+            # Listings created here are re-indexed together, once
+            with batched_index_refresh():
+                for job_data in jobs:
+                    job, created = JobListing.objects.get_or_create(
+                        external_id=job_data.get('id') or job_data.get('external_id'),
+                        source=source,
+                        defaults={
+                            'title': job_data.get('title', ''),
+                            'company_name': job_data.get('company_name') or job_data.get('company', ''),
+                            'location': job_data.get('location', ''),
+                            'description': job_data.get('description', ''),
+                            'source_url': job_data.get('source_url') or job_data.get('url', ''),
+                            'employment_type': job_data.get('job_type', 'full_time'),
+                            'experience_level': job_data.get('experience_level', 'entry')
+                        }
+                    )
+                    if created:
+                        created_ids.append(job.id)
+            
+            if created_ids:
+                from automation.tasks import schedule_auto_apply
+                schedule_auto_apply.delay(created_ids)
             
+            created_count = len(created_ids)
             logger.info(f"Scraped {created_count} new jobs from {source_name}")
             return f"Successfully scraped {created_count} new jobs"
         
@@ -54,6 +77,66 @@ def scrape_jobs_task(source_name, search_query='', location=''):
         return f"Error: {str(e)}"
 
 
+@shared_task
+def refresh_job_indexes(job_ids):
+    """
+    Bring the in-process search indexes up to date after listings were
+    created, updated or deleted, and invalidate cached search results
+    """
+    from .filter_index import refresh_listings
+    from .autocomplete import update_snapshot
+    from .search_cache import bump_generation
+    
+    count = refresh_listings(job_ids)
+    update_snapshot()
+    bump_generation()
+    logger.info(f"Re-indexed {count} job listings")
+    return f"Re-indexed {count} job listings"
+
+
+def schedule_index_refresh():
+    """Queue one delayed refresh_changed_job_indexes, unless one is already waiting"""
+    if cache.add(REFRESH_SCHEDULED_KEY, True, timeout=INDEX_REFRESH_DELAY * 10):
+        refresh_changed_job_indexes.apply_async(countdown=INDEX_REFRESH_DELAY)
+
+
+@shared_task
+def refresh_changed_job_indexes():
+    """
+    Re-index the listings edited or deleted one at a time (admin, API, shell)
+    since the last delayed refresh, so a burst of edits rewrites the index and
+    retires the cached searches once
+    """
+    from .filter_index import get_filter_index
+    
+    cache.delete(REFRESH_SCHEDULED_KEY)
+    started = timezone.now()
+    since = cache.get(REFRESHED_AT_KEY) or started - INDEX_REFRESH_LOOKBACK
+    job_ids = set(
+        JobListing.objects.filter(updated_at__gte=since - INDEX_REFRESH_OVERLAP).values_list('id', flat=True)
+    )
+    snapshot = get_filter_index().snapshot()
+    if snapshot is not None:
+        indexed = set(snapshot.order()[0])
+        job_ids |= indexed - set(JobListing.objects.filter(id__in=indexed).values_list('id', flat=True))
+    
+    result = refresh_job_indexes(sorted(job_ids)) if job_ids else "No changed job listings"
+    cache.set(REFRESHED_AT_KEY, started, timeout=None)
+    return result
+
+
+@shared_task
+def rebuild_autocomplete_snapshot():
+    """
+    Periodic full recount of autocomplete terms (drops edited/deleted listings)
+    """
+    from .autocomplete import rebuild_snapshot
+    
+    watermark = rebuild_snapshot()
+    logger.info(f"Rebuilt autocomplete snapshot up to listing {watermark}")
+    return f"Rebuilt autocomplete snapshot up to listing {watermark}"
+
+
 @shared_task
 def check_job_alerts():
     """
@@ -92,9 +175,10 @@ def cleanup_old_jobs():
     
     # Delete jobs older than 90 days
     cutoff_date = timezone.now() - timedelta(days=90)
-    old_jobs = JobListing.objects.filter(created_at__lt=cutoff_date)
-    count = old_jobs.count()
-    old_jobs.delete()
+    old_jobs = JobListing.objects.filter(scraped_at__lt=cutoff_date)
+    with batched_index_refresh():
+        _, deleted = old_jobs.delete()
+    count = deleted.get('jobs.JobListing', 0)
     
     logger.info(f"Cleaned up {count} old job listings")
     return f"Cleaned up {count} old job listings"
@@ -1,3 +1,350 @@
-from django.test import TestCase
+import io
+import shutil
+import tempfile
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from profiles import snapshot
+from profiles.models import UserProfile
+
+from . import autocomplete, filter_index, search_cache
+from .geo import location_match_score
+from .models import JobListing, JobSource
+from .signals import batched_index_refresh
+from .tasks import INDEX_REFRESH_DELAY, cleanup_old_jobs, refresh_changed_job_indexes, refresh_job_indexes
+
+
+class IndexTestCase(TestCase):
+    """Runs each test against empty index snapshots in a temporary directory"""
+
+    def setUp(self):
+        self.directory = directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        overrides = override_settings(
+            JOB_INDEX_DIR=directory,
+            JOB_FILTER_INDEX_PATH=f'{directory}/filter_index.bin',
+            JOB_AUTOCOMPLETE_SNAPSHOT_PATH=f'{directory}/autocomplete.json.gz',
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        filter_index._index = None
+        autocomplete._index = None
+        self.addCleanup(setattr, filter_index, '_index', None)
+        self.addCleanup(setattr, autocomplete, '_index', None)
+        cache.clear()
+
+        self.source = JobSource.objects.create(name='linkedin', base_url='https://linkedin.com')
+        self.user = User.objects.create_user('reader', password='secret')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def make_listing(self, title, **fields):
+        fields.setdefault('source', self.source)
+        return JobListing.objects.create(
+            title=title,
+            company_name=fields.pop('company_name', 'Acme'),
+            description='',
+            location=fields.pop('location', 'Berlin'),
+            source_url='https://linkedin.com/jobs/1',
+            **fields
+        )
+
+    def make_listings(self, count, **fields):
+        # Created outside the signal hooks, as rows imported before indexing existed
+        with batched_index_refresh():
+            listings = [self.make_listing(f'Job {n}', **fields) for n in range(count)]
+        return listings
+
+    def listing_titles(self, query=''):
+        response = self.client.get(f'/api/jobs/listings/{query}')
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.data['count'], [row['title'] for row in response.data['results']]
+
+
+class FilterIndexTests(IndexTestCase):
+
+    def test_first_refresh_indexes_every_listing(self):
+        self.make_listings(5)
+        self.assertFalse(filter_index.get_filter_index().is_available())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            new = self.make_listing('New job')
+
+        self.assertTrue(filter_index.get_filter_index().is_available())
+        count, titles = self.listing_titles()
+        self.assertEqual(count, 6)
+        self.assertEqual(titles[0], new.title)
+
+    def test_listing_order_follows_scraped_at(self):
+        listings = self.make_listings(3)
+        now = timezone.now()
+        # Oldest id scraped last: the index must not fall back to id order
+        for listing, age in zip(listings, (0, 2, 1)):
+            JobListing.objects.filter(pk=listing.pk).update(scraped_at=now - timedelta(hours=age))
+        refresh_job_indexes([listing.pk for listing in listings])
+
+        self.assertEqual(self.listing_titles()[1], ['Job 0', 'Job 2', 'Job 1'])
+        database = self.listing_titles('?search=Job')[1]
+        self.assertEqual(database, ['Job 0', 'Job 2', 'Job 1'])
+
+    def test_index_and_database_filters_agree(self):
+        remote = self.make_listing('Remote', is_remote=True, experience_level='senior')
+        self.make_listing('Office', experience_level='senior')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.make_listing('Junior', is_remote=True, experience_level='entry')
+
+        for query, expected in (
+            ('?is_remote=true&experience_level=senior', [remote.title]),
+            ('?is_remote=YES&experience_level=Senior', [remote.title]),
+            ('?job_type=Full_Time,%20contract%20&experience_level=SENIOR,entry', ['Junior', 'Office', 'Remote']),
+            (f'?source={self.source.id}&is_remote=0', ['Office']),
+        ):
+            cache.clear()
+            filter_index._index = None
+            indexed = self.listing_titles(query)
+            cache.clear()
+            with self.settings(JOB_FILTER_INDEX_PATH=f'{self.directory}/missing.bin'):
+                filter_index._index = None
+                database = self.listing_titles(query)
+            self.assertEqual(sorted(indexed[1]), expected, query)
+            self.assertEqual(database, indexed, query)
+
+    def test_orm_updates_and_deletes_are_indexed(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            first, second = self.make_listings(2)
+        with self.captureOnCommitCallbacks(execute=True):
+            first.is_remote = True
+            first.save()
+        self.assertEqual(self.listing_titles('?is_remote=true'), (1, [first.title]))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        self.assertEqual(self.listing_titles()[0], 1)
+
+    def test_single_edits_share_one_delayed_refresh(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            first, second, third = self.make_listings(3)
+        generation = search_cache.get_generation()
+
+        with mock.patch.object(refresh_changed_job_indexes, 'apply_async') as apply_async:
+            for listing in (first, second):
+                with self.captureOnCommitCallbacks(execute=True):
+                    listing.is_remote = True
+                    listing.save()
+            with self.captureOnCommitCallbacks(execute=True):
+                third.delete()
+        apply_async.assert_called_once_with(countdown=INDEX_REFRESH_DELAY)
+        self.assertEqual(search_cache.get_generation(), generation)
+
+        self.assertEqual(refresh_changed_job_indexes(), "Re-indexed 2 job listings")
+        self.assertEqual(search_cache.get_generation(), generation + 1)
+        self.assertEqual(self.listing_titles('?is_remote=true')[0], 2)
+        self.assertEqual(self.listing_titles()[0], 2)
+        # Nothing edited since: nothing to re-index
+        with mock.patch('jobs.tasks.INDEX_REFRESH_OVERLAP', timedelta(0)):
+            self.assertEqual(refresh_changed_job_indexes(), "No changed job listings")
+
+    def test_batched_changes_refresh_once(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.make_listings(3)
+        self.assertEqual(len(callbacks), 1)
+
+    def test_cleanup_drops_old_listings_from_index(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            old, recent = self.make_listings(2)
+        JobListing.objects.filter(pk=old.pk).update(scraped_at=timezone.now() - timedelta(days=91))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(cleanup_old_jobs(), "Cleaned up 1 old job listings")
+        self.assertEqual(self.listing_titles(), (1, [recent.title]))
+
+    def test_readers_keep_their_snapshot_across_reloads(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.make_listings(2)
+        index = filter_index.get_filter_index()
+        snapshot = index.snapshot()
+        bitmap = snapshot.query({})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.make_listing('Later')
+        self.assertIsNot(index.snapshot(), snapshot)
+        self.assertEqual(bitmap, snapshot.query({}))
+        self.assertEqual(len(snapshot.order()[0]), 2)
+
+    def test_non_numeric_source_is_rejected(self):
+        response = self.client.get('/api/jobs/listings/?source=abc')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('source', response.data)
+        self.assertEqual(self.client.get(f'/api/jobs/listings/?source={self.source.pk}').status_code, 200)
+
+
+class LocationFilterTests(IndexTestCase):
+
+    def setUp(self):
+        super().setUp()
+        for city in ('New York', 'Newark', 'Philadelphia', 'Boston'):
+            self.make_listing(city, location=city)
+
+    def test_radius_search(self):
+        count, titles = self.listing_titles('?location=New York&radius_km=50')
+        self.assertEqual(sorted(titles), ['New York', 'Newark'])
+        self.assertEqual(self.listing_titles('?location=New York')[1], ['New York'])
+
+    def test_invalid_radius_is_rejected(self):
+        for radius in ('abc', '0', '-5', 'nan', 'inf', '100000'):
+            response = self.client.get(f'/api/jobs/listings/?location=New York&radius_km={radius}')
+            self.assertEqual(response.status_code, 400, radius)
+            self.assertIn('radius_km', response.data)
+
+    def test_location_match_score(self):
+        profile = SimpleNamespace(place_id='us-ny-new-york', preferred_place_ids=('de-be-berlin',))
+        scores = {
+            listing.title: location_match_score(profile, listing)
+            for listing in JobListing.objects.all()
+        }
+        self.assertEqual(scores['New York'], 100)
+        self.assertEqual(scores['Newark'], 100)  # within full_score_km
+        self.assertGreater(scores['Philadelphia'], scores['Boston'])
+        self.assertGreater(scores['Boston'], 0)
+
+        remote = self.make_listing('Anywhere', location='Remote')
+        self.assertEqual(location_match_score(profile, remote), 100)
+        unknown = self.make_listing('Somewhere', location='Atlantis')
+        self.assertEqual(location_match_score(profile, unknown), 50)
+
+
+class AutocompleteTests(IndexTestCase):
+
+    def setUp(self):
+        super().setUp()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.make_listing('Senior Software Engineer', company_name='Initech')
+        self.path = settings.JOB_AUTOCOMPLETE_SNAPSHOT_PATH
+
+    def suggestions(self, query):
+        response = self.client.get(f'/api/jobs/autocomplete/?q={query}')
+        self.assertEqual(response.status_code, 200)
+        return [suggestion['text'] for suggestion in response.data['suggestions']]
+
+    def test_suggest_from_snapshot(self):
+        self.assertIn('Senior Software Engineer', self.suggestions('eng'))
+        self.assertIn('Initech', self.suggestions('ini'))
+
+    def test_unreadable_snapshot_is_rebuilt(self):
+        with open(self.path, 'rb') as f:
+            data = f.read()
+        for broken in (b'not gzip at all', data[:len(data) // 2]):
+            with open(self.path, 'wb') as f:
+                f.write(broken)
+            index = autocomplete.AutocompleteIndex(self.path)
+            self.assertEqual(index.suggest('eng'), [])
+            # The rebuild ran (eagerly) and the next reload picks it up
+            self.assertTrue(index.load())
+            self.assertEqual(index.suggest('eng')[0]['text'], 'Senior Software Engineer')
+
+    def test_update_rebuilds_unreadable_snapshot(self):
+        with open(self.path, 'wb') as f:
+            f.write(b'\x1f\x8b garbage')
+        autocomplete.update_snapshot()
+        self.assertIn('senior software engineer', autocomplete.read_snapshot(self.path)['terms']['title'])
+
+    def test_invalid_limit(self):
+        self.assertEqual(self.client.get('/api/jobs/autocomplete/?q=e&limit=x').status_code, 400)
+        response = self.client.get('/api/jobs/autocomplete/?q=eng&limit=-3')
+        self.assertEqual(len(response.data['suggestions']), 1)
+
+    def test_full_rebuild_is_scheduled(self):
+        tasks = {entry['task'] for entry in settings.CELERY_BEAT_SCHEDULE.values()}
+        self.assertIn('jobs.tasks.rebuild_autocomplete_snapshot', tasks)
+
+
+class SearchCacheTests(IndexTestCase):
+
+    def test_hits_are_counted_and_logged_per_generation(self):
+        self.make_listing('Engineer')
+        first = self.client.get('/api/jobs/search/?q=engineer')
+        second = self.client.get('/api/jobs/search/?q=%20Engineer')
+        self.assertEqual((first['X-Search-Cache'], second['X-Search-Cache']), ('MISS', 'HIT'))
+        self.assertEqual(second.data['count'], 1)
+
+        stats = search_cache.get_stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['hit_rate']), (1, 1, 50))
+        with self.assertLogs('jobs', 'INFO') as logs:
+            search_cache.bump_generation()
+        self.assertIn('1 hits, 1 misses (50% hit rate)', logs.output[0])
+        self.assertEqual(search_cache.get_stats()['hits'], 0)
+
+        self.assertEqual(self.client.get('/api/jobs/search/?q=engineer')['X-Search-Cache'], 'MISS')
+
+
+class ConditionalListingTests(IndexTestCase):
+
+    def test_list_etag_follows_index_and_search_generations(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.make_listing('Engineer')
+        first = self.client.get('/api/jobs/listings/')
+        self.assertEqual(first.status_code, 200)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/jobs/listings/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(len(queries.captured_queries), 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.make_listing('Designer')
+        response = self.client.get('/api/jobs/listings/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 2)
+
+    def test_detail_etag_tracks_the_row(self):
+        listing = self.make_listing('Engineer')
+        first = self.client.get(f'/api/jobs/listings/{listing.pk}/')
+        self.assertEqual(
+            self.client.get(f'/api/jobs/listings/{listing.pk}/', HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304
+        )
+        listing.title = 'Senior Engineer'
+        listing.save()
+        self.assertEqual(
+            self.client.get(f'/api/jobs/listings/{listing.pk}/', HTTP_IF_NONE_MATCH=first['ETag']).status_code, 200
+        )
+
+
+class NormalizeLocationsCommandTests(IndexTestCase):
+
+    def test_indexes_and_snapshots_follow_the_rewritten_rows(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            office, remote = self.make_listings(2)
+        # Rows written before locations were resolved
+        JobListing.objects.filter(pk=remote.pk).update(location='Remote', is_remote=False, place_id='')
+        JobListing.objects.filter(pk=office.pk).update(place_id='', latitude=None, longitude=None)
+        profile = UserProfile.objects.create(user=self.user, location='Berlin')
+        UserProfile.objects.filter(pk=profile.pk).update(place_id='', latitude=None, longitude=None)
+        self.assertEqual(snapshot.for_user(self.user).place_id, '')
+        self.assertEqual(self.listing_titles('?is_remote=true')[0], 0)
+        generation = search_cache.get_generation()
+
+        output = io.StringIO()
+        call_command('normalize_locations', stdout=output)
+        self.assertIn('(2 changed)', output.getvalue())
+        self.assertIn('Normalized profile locations (1 changed)', output.getvalue())
+
+        self.assertGreater(search_cache.get_generation(), generation)
+        self.assertEqual(self.listing_titles('?is_remote=true'), (1, [remote.title]))
+        self.assertTrue(JobListing.objects.get(pk=office.pk).place_id)
+        self.assertTrue(snapshot.for_user(self.user).place_id)
+
+        # Nothing left to change: the indexes are left alone
+        generation = search_cache.get_generation()
+        call_command('normalize_locations', stdout=io.StringIO())
+        self.assertEqual(search_cache.get_generation(), generation)
@@ -12,6 +12,7 @@ router.register(r'matches', views.JobMatchViewSet, basename='jobmatch')
 urlpatterns = [
     path('', include(router.urls)),
     path('search/', views.JobSearchView.as_view(), name='job-search'),
+    path('autocomplete/', views.JobAutocompleteView.as_view(), name='job-autocomplete'),
     path('scrape/', views.JobScrapingView.as_view(), name='job-scrape'),
     path('recommendations/', views.JobRecommendationsView.as_view(), name='job-recommendations'),
     path('analytics/', views.JobAnalyticsView.as_view(), name='job-analytics'),
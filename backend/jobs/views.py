@@ -3,7 +3,8 @@ from rest_framework import viewsets, generics, status
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.decorators import action
-from django.db.models import Q
+from rest_framework.exceptions import ValidationError
+from django.db.models import Q, QuerySet
 from .models import JobListing, JobSource, SavedJob, JobAlert, JobMatch
 from .serializers import (
     JobListingSerializer, JobListingCreateSerializer,
@@ -11,19 +12,34 @@ from .serializers import (
     JobAlertSerializer, JobMatchSerializer
 )
 from .tasks import scrape_jobs_task
+from .filter_index import get_filter_index, parse_filters, filter_queryset, IndexedListingPage
+from .geo import filter_by_location, MAX_RADIUS_KM
+from .autocomplete import get_autocomplete_index, KINDS, MAX_SUGGESTIONS
+from .search_cache import CachedSearchMixin, get_generation
+from hopeforjob.conditional import ConditionalGetMixin
+from analytics.rollups import get_rollup
 
 
-class JobListingViewSet(viewsets.ModelViewSet):
+class JobListingViewSet(ConditionalGetMixin, CachedSearchMixin, viewsets.ModelViewSet):
     """Job listing viewset"""
     permission_classes = [IsAuthenticated]
+    search_cache_namespace = 'listings'
     
     def get_serializer_class(self):
         if self.action == 'create':
             return JobListingCreateSerializer
         return JobListingSerializer
     
+    def get_conditional_version(self, request):
+        # Every listing write re-indexes and bumps the search generation, so the
+        # pair versions any list response without touching the table
+        if self.action != 'list':
+            return super().get_conditional_version(request)
+        snapshot = get_filter_index().snapshot()
+        return f'{get_generation()}:{snapshot.generation if snapshot else 0}', None
+    
     def get_queryset(self):
-        queryset = JobListing.objects.all().order_by('-scraped_at')
+        queryset = JobListing.objects.all().order_by('-scraped_at', '-id')
         
         # Filter by search query
         search = self.request.query_params.get('search')
@@ -34,17 +50,40 @@ class JobListingViewSet(viewsets.ModelViewSet):
                 Q(description__icontains=search)
             )
         
-        # Filter by location
+        # Filter by location (canonical place or radius in km around it)
         location = self.request.query_params.get('location')
         if location:
-            queryset = queryset.filter(location__icontains=location)
+            queryset = filter_by_location(queryset, location, self.get_radius_km())
         
-        # Filter by job type
-        job_type = self.request.query_params.get('job_type')
-        if job_type:
-            queryset = queryset.filter(employment_type=job_type)
+        # Filter by job type, experience level, source and other flags
+        queryset = filter_queryset(queryset, parse_filters(self.request.query_params))
             
         return queryset
+    
+    def get_radius_km(self):
+        radius_km = self.request.query_params.get('radius_km')
+        if not radius_km:
+            return None
+        try:
+            radius_km = float(radius_km)
+        except ValueError:
+            raise ValidationError({'radius_km': "Expected a number of kilometres"})
+        if not 0 < radius_km <= MAX_RADIUS_KM:
+            raise ValidationError({'radius_km': f"Expected a distance between 0 and {MAX_RADIUS_KM} km"})
+        return radius_km
+    
+    def paginate_queryset(self, queryset):
+        # Structured-only filters are answered by the bitmap index; the database
+        # is only asked for the rows on the requested page
+        params = self.request.query_params
+        if isinstance(queryset, QuerySet) and not (params.get('search') or params.get('location')):
+            snapshot = get_filter_index().snapshot()
+            if snapshot is not None:
+                bitmap = snapshot.query(parse_filters(params))
+                ids, _ = snapshot.order()
+                queryset = IndexedListingPage(JobListing.objects.select_related('source'), bitmap, ids)
+        
+        return super().paginate_queryset(queryset)
 
 
 class JobSourceViewSet(viewsets.ModelViewSet):
@@ -81,10 +120,11 @@ class JobMatchViewSet(viewsets.ModelViewSet):
         return JobMatch.objects.filter(user=self.request.user).order_by('-match_score')
 
 
-class JobSearchView(generics.ListAPIView):
+class JobSearchView(CachedSearchMixin, generics.ListAPIView):
     """Job search view"""
     serializer_class = JobListingSerializer
     permission_classes = [IsAuthenticated]
+    search_cache_namespace = 'search'
     
     def get_queryset(self):
         queryset = JobListing.objects.all()
@@ -146,16 +186,32 @@ class JobAnalyticsView(generics.RetrieveAPIView):
     def get(self, request, *args, **kwargs):
         user = request.user
         
+        rollup = get_rollup(user)
+        
         analytics = {
-            'total_saved_jobs': SavedJob.objects.filter(user=user).count(),
-            'total_applications': 0,  # Will be filled from automation app
-            'active_alerts': JobAlert.objects.filter(user=user, is_active=True).count(),
-            'job_matches': JobMatch.objects.filter(user=user).count(),
-            'top_companies': list(
-                SavedJob.objects.filter(user=user)
-                .values_list('job__company_name', flat=True)
-                .distinct()[:10]
-            )
+            'total_saved_jobs': rollup.saved_jobs,
+            'total_applications': rollup.total_applications,
+            'active_alerts': rollup.active_alerts,
+            'job_matches': rollup.job_matches,
+            'top_companies': rollup.top_companies
         }
         
         return Response(analytics)
+
+
+class JobAutocompleteView(generics.RetrieveAPIView):
+    """Typeahead suggestions for titles, companies, skills and locations"""
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request, *args, **kwargs):
+        query = request.query_params.get('q', '')
+        kinds = [kind for kind in request.query_params.get('type', '').split(',') if kind in KINDS] or KINDS
+        try:
+            limit = max(1, min(int(request.query_params.get('limit', 10)), MAX_SUGGESTIONS))
+        except ValueError:
+            return Response({'error': 'limit must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response({
+            'query': query,
+            'suggestions': get_autocomplete_index().suggest(query, kinds, limit)
+        })
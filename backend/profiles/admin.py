@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import UserProfile, Experience, Education, ApplicationTemplate
+from .models import UserProfile, Experience, Education, ApplicationTemplate, ResumeParse
 
 @admin.register(UserProfile)
 class UserProfileAdmin(admin.ModelAdmin):
@@ -28,3 +28,10 @@ class ApplicationTemplateAdmin(admin.ModelAdmin):
     list_filter = ['is_default', 'created_at']
     search_fields = ['profile__user__username', 'name']
     readonly_fields = ['created_at', 'updated_at']
+
+@admin.register(ResumeParse)
+class ResumeParseAdmin(admin.ModelAdmin):
+    list_display = ['content_hash', 'status', 'parser_version', 'created_at', 'updated_at']
+    list_filter = ['status', 'parser_version', 'created_at']
+    search_fields = ['content_hash']
+    readonly_fields = ['created_at', 'updated_at']
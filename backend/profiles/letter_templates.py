@@ -0,0 +1,314 @@
+"""
+Cover letter templates.
+
+A template is plain text with placeholders and conditionals:
+
+    Dear {company_name} team,
+    I am applying for the {job_title} role.{if matching_skills} I work with {matching_skills}.{endif}
+    {if not remote}I am based in {location}.{else}I have worked remotely for years.{endif}
+
+``{if name}`` / ``{if not name}`` test whether a placeholder has a value
+(non-empty, non-zero), with an optional ``{else}``; conditionals may nest.
+Any other braces are kept as written, so ``{{job_title}}`` renders the title
+inside single braces, as the old replace()-based rendering did.
+
+Placeholders (job, then profile):
+
+    job_title, company_name, job_location, remote, employment_type,
+    experience_level, salary_range, required_skills, matching_skills,
+    user_name, first_name, last_name, email, phone, location,
+    current_position, years_of_experience, skills, website, linkedin_url,
+    github_url
+
+A template is parsed once. The profile's values and the conditionals on
+them are then filled in once per profile snapshot, leaving literal text with
+gaps for the job's values: rendering a letter reads the job attributes the
+template uses (in one attrgetter call when that is all it needs) and joins
+the pieces.
+Compiled templates are cached by (model, id, updated_at) for saved templates
+and by text otherwise. validate() rejects unknown placeholders and
+unbalanced conditionals; at render time unknown placeholders are left as
+they are written, as the old replace()-based rendering did.
+"""
+import re
+import threading
+from collections import OrderedDict
+from operator import attrgetter
+
+CACHE_SIZE = 1024
+
+TOKEN = re.compile(r'\{\s*(if\s+(?:not\s+)?\w+|else|endif|\w+)\s*\}')
+
+
+class TemplateError(ValueError):
+    """Raised for templates with unknown placeholders or unbalanced conditionals"""
+
+
+def _profile(profile, attribute, default=''):
+    return getattr(profile, attribute, default) if profile is not None else default
+
+
+def _salary_range(job):
+    low, high = job.salary_min, job.salary_max
+    if not low and not high:
+        return ''
+    currency = job.salary_currency or ''
+    if low and high and low != high:
+        return f"{currency} {low:,}-{high:,}".strip()
+    return f"{currency} {low or high:,}".strip()
+
+
+def _matching_skills(job, profile):
+    own = {skill.lower() for skill in _profile(profile, 'skills', None) or []}
+    wanted = list(job.required_skills or []) + list(job.preferred_skills or [])
+    matching = []
+    for skill in wanted:
+        if isinstance(skill, str) and skill.lower() in own and skill not in matching:
+            matching.append(skill)
+    return matching
+
+
+# name -> value for (job, profiles.snapshot.ProfileSnapshot); lists are joined with commas, False/None render empty
+PLACEHOLDERS = {
+    'job_title': lambda job, profile: job.title,
+    'company_name': lambda job, profile: job.company_name,
+    'job_location': lambda job, profile: job.location,
+    'remote': lambda job, profile: job.is_remote,
+    'employment_type': lambda job, profile: job.get_employment_type_display(),
+    'experience_level': lambda job, profile: job.get_experience_level_display() if job.experience_level else '',
+    'salary_range': lambda job, profile: _salary_range(job),
+    'required_skills': lambda job, profile: job.required_skills or [],
+    'matching_skills': _matching_skills,
+    'user_name': lambda job, profile: _profile(profile, 'full_name'),
+    'first_name': lambda job, profile: _profile(profile, 'first_name'),
+    'last_name': lambda job, profile: _profile(profile, 'last_name'),
+    'email': lambda job, profile: _profile(profile, 'email'),
+    'phone': lambda job, profile: _profile(profile, 'phone_number'),
+    'location': lambda job, profile: _profile(profile, 'location'),
+    'current_position': lambda job, profile: _profile(profile, 'current_position'),
+    'years_of_experience': lambda job, profile: _profile(profile, 'years_of_experience', 0),
+    'skills': lambda job, profile: _profile(profile, 'skills', None) or [],
+    'website': lambda job, profile: _profile(profile, 'website'),
+    'linkedin_url': lambda job, profile: _profile(profile, 'linkedin_url'),
+    'github_url': lambda job, profile: _profile(profile, 'github_url'),
+}
+
+
+# Placeholders that are plain job attributes, read with one attrgetter call per letter
+JOB_ATTRIBUTES = {
+    'job_title': 'title',
+    'company_name': 'company_name',
+    'job_location': 'location',
+    'remote': 'is_remote',
+}
+
+# Placeholders that only depend on the profile, filled in once per profile
+PROFILE_PLACEHOLDERS = frozenset({
+    'user_name', 'first_name', 'last_name', 'email', 'phone', 'location', 'current_position',
+    'years_of_experience', 'skills', 'website', 'linkedin_url', 'github_url',
+})
+
+# Placeholders whose value is always a string
+TEXT_PLACEHOLDERS = frozenset(PLACEHOLDERS) - {
+    'remote', 'required_skills', 'matching_skills', 'years_of_experience', 'skills',
+}
+
+
+def _text(value):
+    if type(value) is str:
+        return value
+    if value is None or value is False:
+        return ''
+    if value is True:
+        return 'yes'
+    if isinstance(value, (list, tuple)):
+        return ', '.join(str(item) for item in value)
+    return str(value)
+
+
+def _value(get, profile):
+    return lambda job: _text(get(job, profile))
+
+
+def _conditional(test, negate, then, otherwise, profile):
+    return lambda job: (then if bool(test(job, profile)) != negate else otherwise).render(job)
+
+
+class Letter:
+    """
+    A template bound to one profile: its text with the profile's values and
+    conditionals filled in, and a gap at every odd position of ``pieces`` for
+    each job value or conditional on one. ``gaps`` holds a function of the
+    job per gap; when every gap is a plain job attribute, ``fetch`` reads
+    them all in one call instead.
+    """
+
+    __slots__ = ('pieces', 'gaps', 'fetch', 'convert')
+
+    def __init__(self, nodes, profile):
+        literals = ['']
+        attributes = []
+        self.gaps = []
+
+        def add(nodes):
+            for node in nodes:
+                if isinstance(node, str):
+                    literals[-1] += node
+                    continue
+                name = node[1]
+                if node[0] == 'if':
+                    then, otherwise = node[3:]
+                    if name in PROFILE_PLACEHOLDERS:
+                        add(then if bool(PLACEHOLDERS[name](None, profile)) != node[2] else otherwise)
+                        continue
+                    self.gaps.append(_conditional(
+                        PLACEHOLDERS[name], node[2], Letter(then, profile), Letter(otherwise, profile), profile
+                    ))
+                    attributes.append(None)
+                elif name in PROFILE_PLACEHOLDERS:
+                    literals[-1] += _text(PLACEHOLDERS[name](None, profile))
+                    continue
+                else:
+                    self.gaps.append(_value(PLACEHOLDERS[name], profile))
+                    attributes.append(name)
+                literals.append('')
+
+        add(nodes)
+        self.pieces = [piece for literal in literals for piece in (literal, '')][:-1]
+        self.fetch = None
+        if len(attributes) > 1 and all(name in JOB_ATTRIBUTES for name in attributes):
+            self.fetch = attrgetter(*[JOB_ATTRIBUTES[name] for name in attributes])
+        self.convert = not TEXT_PLACEHOLDERS.issuperset(filter(None, attributes))
+
+    def render(self, job):
+        if self.fetch is not None:
+            texts = self.fetch(job)
+            if self.convert or None in texts:  # flags, or a text field that was never set
+                texts = [_text(text) for text in texts]
+        else:
+            texts = [gap(job) for gap in self.gaps]
+        pieces = self.pieces[:]
+        pieces[1::2] = texts
+        return ''.join(pieces)
+
+
+class Template:
+    """
+    A compiled template; render(job, profile) returns the letter.
+
+    ``nodes`` is the parsed text: strings, ('value', name) and
+    ('if', name, negate, then nodes, else nodes). The Letter for the last
+    profile rendered is kept, since bulk runs render one template for many
+    jobs with the same (immutable) profile snapshot.
+    """
+
+    __slots__ = ('source', 'nodes', 'letter')
+
+    def __init__(self, source, nodes):
+        self.source = source
+        self.nodes = nodes
+        self.letter = (None, Letter(nodes, None))
+
+    def render(self, job, profile=None):
+        bound, letter = self.letter
+        if bound is not profile:
+            letter = Letter(self.nodes, profile)
+            self.letter = (profile, letter)
+        return letter.render(job)
+
+
+def _parse(source, strict):
+    """
+    Build a Template from ``source``; with ``strict``, unknown placeholders
+    raise TemplateError instead of rendering literally
+    """
+    unknown = []
+    # One frame per open conditional: [nodes, name, negate, then nodes or None]
+    stack = [[[], None, False, None]]
+
+    position = 0
+    for match in TOKEN.finditer(source):
+        frame = stack[-1]
+        nodes = frame[0]
+        nodes.append(source[position:match.start()])
+        position = match.end()
+        tag = ' '.join(match.group(1).split())
+
+        if tag.startswith('if '):
+            words = tag.split()
+            name, negate = words[-1], len(words) == 3
+            if name not in PLACEHOLDERS:
+                raise TemplateError(f"Unknown placeholder in condition: {{{tag}}}")
+            stack.append([[], name, negate, None])
+        elif tag == 'else':
+            if len(stack) == 1 or frame[3] is not None:
+                raise TemplateError("{else} without a matching {if ...}")
+            frame[3], frame[0] = nodes, []
+        elif tag == 'endif':
+            if len(stack) == 1:
+                raise TemplateError("{endif} without a matching {if ...}")
+            stack.pop()
+            then, otherwise = (frame[3], nodes) if frame[3] is not None else (nodes, [])
+            stack[-1][0].append(('if', frame[1], frame[2], then, otherwise))
+        elif tag in PLACEHOLDERS:
+            nodes.append(('value', tag))
+        else:
+            unknown.append(tag)
+            nodes.append(match.group(0))
+
+    if len(stack) > 1:
+        raise TemplateError(f"{{if {stack[-1][1]}}} is never closed with {{endif}}")
+    if strict and unknown:
+        raise TemplateError(f"Unknown placeholder(s): {', '.join('{%s}' % name for name in unknown)}")
+
+    stack[0][0].append(source[position:])
+    return Template(source, stack[0][0])
+
+
+def validate(source):
+    """Raise TemplateError if ``source`` uses unknown placeholders or unbalanced conditionals"""
+    _parse(source or '', strict=True)
+
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def compile_cached(key, source):
+    """Compiled template for ``source``, cached under ``key`` (e.g. a snapshot's cover_letter_template_key)"""
+    with _cache_lock:
+        template = _cache.get(key)
+        if template is not None:
+            _cache.move_to_end(key)
+            return template
+
+    try:
+        template = _parse(source, strict=False)
+    except TemplateError:
+        # Saved before validation existed: render it as plain text
+        template = Template(source, [source])
+
+    with _cache_lock:
+        _cache[key] = template
+        if len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return template
+
+
+def compile_template(source):
+    """Compiled template for ``source`` text (cached by text)"""
+    return compile_cached(('text', source), source)
+
+
+def template_for(instance, field='cover_letter_template'):
+    """Compiled template stored on a model instance, cached by (model, id, updated_at)"""
+    source = getattr(instance, field) or ''
+    if instance.pk is None:
+        return compile_template(source)
+    key = (instance._meta.label, instance.pk, field, instance.updated_at)
+    return compile_cached(key, source)
+
+
+def clear_cache():
+    with _cache_lock:
+        _cache.clear()
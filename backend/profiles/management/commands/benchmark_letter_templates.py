@@ -0,0 +1,101 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from jobs.models import JobListing
+from profiles.letter_templates import PLACEHOLDERS, compile_template
+from profiles.snapshot import ProfileSnapshot
+
+# A letter of typical length (about 250 words) using the three placeholders the old rendering knew
+SIMPLE_TEMPLATE = (
+    "Dear Hiring Manager,\n\n"
+    "I am excited to apply for the {job_title} position at {company_name}. I have followed {company_name} "
+    "for years and believe my background fits the role well.\n\n"
+    "Over the last eight years I have designed, built and operated web services used by millions of people. "
+    "Most recently I led a small team rewriting a payments platform: we split a monolith into services with "
+    "clear ownership, moved batch jobs onto a queue, and cut the time from merge to production from days to "
+    "minutes. Along the way I mentored four engineers, two of whom now lead teams of their own.\n\n"
+    "I care about software that is simple to run. I write tests first where it pays, measure before I "
+    "optimise, and leave documentation behind so that the next person can change what I built without "
+    "being afraid of it. I am comfortable with databases, caching, background processing and the "
+    "operational work that keeps them healthy, and I enjoy working closely with product and design.\n\n"
+    "What draws me to this role is the chance to work on problems that matter to your customers with a "
+    "team that values craft. I would welcome the opportunity to discuss how my experience could help you "
+    "reach your goals for the coming year.\n\n"
+    "Thank you for your time and consideration.\n\n"
+    "Best regards,\n{user_name}"
+)
+
+CONDITIONAL_TEMPLATE = (
+    "Dear {company_name} team,\n\nI am applying for the {job_title} role"
+    "{if job_location} in {job_location}{endif}.{if matching_skills} I work daily with {matching_skills}.{endif}"
+    "{if salary_range} The advertised range of {salary_range} matches my expectations.{endif}\n\n"
+    "{if remote}I have worked remotely for years.{else}I am happy to work from your office.{endif}\n\n"
+    "Best regards,\n{user_name}\n{email}"
+)
+
+
+def replace_render(template, job, profile):
+    """The chained str.replace() rendering cover letters used before compiled templates"""
+    cover_letter = template.replace('{job_title}', job.title)
+    cover_letter = cover_letter.replace('{company_name}', job.company_name)
+    cover_letter = cover_letter.replace('{user_name}', profile.full_name)
+    return cover_letter
+
+
+def replace_all_render(template, job, profile):
+    """str.replace() extended to the whole placeholder set (still without conditionals)"""
+    for name, value in PLACEHOLDERS.items():
+        template = template.replace('{' + name + '}', str(value(job, profile)))
+    return template
+
+
+class Command(BaseCommand):
+    help = 'Micro-benchmark compiled cover letter templates against chained str.replace() rendering'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--letters', type=int, default=20000, help='Letters to render per run')
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per case; the fastest is reported')
+
+    def handle(self, *args, **options):
+        count, repeat = options['letters'], options['repeat']
+        profile = ProfileSnapshot(
+            user_id=1, version='benchmark', first_name='Ada', last_name='Lovelace', full_name='Ada Lovelace',
+            email='ada@example.com', phone_number='', location='London', website='', linkedin_url='',
+            github_url='', current_position='Engineer', years_of_experience=8,
+            desired_salary_min=None, desired_salary_max=None, skills=('Python', 'Django', 'PostgreSQL'),
+            preferred_locations=(), place_id='', preferred_place_ids=(), education=(), experiences=(),
+            cover_letter_template='', cover_letter_template_key=None,
+        )
+        jobs = [
+            JobListing(
+                title=f'Backend Engineer {i}', company_name=f'Company {i % 50}', location='London',
+                is_remote=i % 2 == 0, salary_min=90000 + i % 7 * 1000, salary_max=120000,
+                required_skills=['Python', 'Django'], preferred_skills=['Kubernetes'],
+            )
+            for i in range(500)
+        ]
+
+        def run(label, render):
+            elapsed = float('inf')
+            for _ in range(repeat):
+                started = time.perf_counter()
+                for i in range(count):
+                    render(jobs[i % len(jobs)])
+                elapsed = min(elapsed, time.perf_counter() - started)
+            self.stdout.write(f'{label:<48} {count / elapsed:>12,.0f} letters/s')
+            return elapsed
+
+        # Automation compiles (or fetches) a template once per session and renders it per job
+        simple, conditional = compile_template(SIMPLE_TEMPLATE), compile_template(CONDITIONAL_TEMPLATE)
+        baseline = run('str.replace, 3 placeholders', lambda job: replace_render(SIMPLE_TEMPLATE, job, profile))
+        compiled = run('compiled, 3 placeholders', lambda job: simple.render(job, profile))
+        replace_all = run('str.replace, every placeholder',
+                          lambda job: replace_all_render(SIMPLE_TEMPLATE, job, profile))
+        run('compiled, 8 placeholders + 4 conditionals',
+            lambda job: conditional.render(job, profile))
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Compiled: {baseline / compiled:.2f}x three replace() calls, '
+            f'{replace_all / compiled:.2f}x replace() over the full placeholder set'
+        ))
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.2 on 2026-10-19 14:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('profiles', '0002_normalized_location'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumeParse',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content_hash', models.CharField(max_length=64, unique=True)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('parsed', 'Parsed'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('parser_version', models.PositiveIntegerField(default=0)),
+                ('data', models.JSONField(blank=True, default=dict)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='resume_hash',
+            field=models.CharField(blank=True, db_index=True, help_text='SHA-256 of the resume file', max_length=64),
+        ),
+    ]
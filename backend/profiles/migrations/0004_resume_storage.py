@@ -0,0 +1,19 @@
+# Generated by Django 5.2.2 on 2026-10-19 15:20
+
+import profiles.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('profiles', '0003_resume_parse'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='userprofile',
+            name='resume_file',
+            field=models.FileField(blank=True, null=True, storage=profiles.models.resume_storage, upload_to='resumes/'),
+        ),
+    ]
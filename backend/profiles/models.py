@@ -1,9 +1,15 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.core.files.storage import storages
 from django.core.validators import URLValidator
 import json
 
 
+def resume_storage():
+    """Storage for uploaded resumes (settings.STORAGES['resumes'])"""
+    return storages['resumes']
+
+
 class UserProfile(models.Model):
     """Extended user profile for job application automation"""
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='profile')
@@ -16,7 +22,8 @@ class UserProfile(models.Model):
     github_url = models.URLField(blank=True, validators=[URLValidator()])
     
     # Resume and Documents
-    resume_file = models.FileField(upload_to='resumes/', blank=True, null=True)
+    resume_file = models.FileField(upload_to='resumes/', storage=resume_storage, blank=True, null=True)
+    resume_hash = models.CharField(max_length=64, blank=True, db_index=True, help_text="SHA-256 of the resume file")
     cover_letter_template = models.TextField(blank=True, help_text="Template for cover letters with placeholders")
     
     # Professional Information
@@ -26,6 +33,12 @@ class UserProfile(models.Model):
     desired_salary_max = models.PositiveIntegerField(blank=True, null=True)
     preferred_locations = models.JSONField(default=list, blank=True)
     
+    # Normalized locations (resolved against the offline gazetteer)
+    place_id = models.CharField(max_length=100, blank=True, db_index=True)
+    latitude = models.FloatField(blank=True, null=True)
+    longitude = models.FloatField(blank=True, null=True)
+    preferred_place_ids = models.JSONField(default=list, blank=True)
+    
     # Skills and Preferences
     skills = models.JSONField(default=list, blank=True, help_text="List of skills")
     job_preferences = models.JSONField(default=dict, blank=True)
@@ -45,6 +58,26 @@ class UserProfile(models.Model):
     def __str__(self):
         return f"{self.user.username}'s Profile"
     
+    def save(self, *args, **kwargs):
+        self.normalize_locations()
+        super().save(*args, **kwargs)
+    
+    def normalize_locations(self):
+        """Resolve location and preferred_locations to gazetteer place ids"""
+        from jobs.geo import location_fields, resolve_location
+        
+        fields = location_fields(self.location)
+        self.place_id = fields['place_id']
+        self.latitude = fields['latitude']
+        self.longitude = fields['longitude']
+        
+        place_ids = []
+        for location in self.preferred_locations or []:
+            place = resolve_location(location)
+            if place and place.place_id not in place_ids:
+                place_ids.append(place.place_id)
+        self.preferred_place_ids = place_ids
+    
     @property
     def full_name(self):
         return f"{self.user.first_name} {self.user.last_name}".strip()
@@ -111,3 +144,24 @@ class ApplicationTemplate(models.Model):
     
     def __str__(self):
         return f"{self.name} - {self.profile.user.username}"
+
+
+class ResumeParse(models.Model):
+    """Structured data parsed from a resume file, shared by every upload of the same content"""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('parsed', 'Parsed'),
+        ('failed', 'Failed'),
+    ]
+    
+    content_hash = models.CharField(max_length=64, unique=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    parser_version = models.PositiveIntegerField(default=0)
+    data = models.JSONField(default=dict, blank=True)
+    error = models.TextField(blank=True)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.content_hash[:12]} ({self.status})"
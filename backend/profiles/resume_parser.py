@@ -0,0 +1,533 @@
+"""
+Offline resume parsing.
+
+extract_text() reads PDF, DOCX and plain-text resumes with the standard
+library only. DOCX is a zip of WordprocessingML; PDF text comes from the
+page content streams, decoding Flate-compressed streams, object streams and
+ToUnicode font maps (what word processors and LaTeX export; scanned PDFs
+have no text to find). Sizes are capped so a crafted file cannot expand
+without bound.
+
+parse() turns the text into structured data: contact details, skills found
+against a vocabulary, and experience and education entries with their date
+ranges, from which years of experience are estimated.
+"""
+import html
+import io
+import re
+import zipfile
+import zlib
+from datetime import date
+
+PARSER_VERSION = 1
+
+MAX_STREAM_BYTES = 20 * 1024 * 1024  # decompressed, per PDF stream or DOCX part
+MAX_TEXT_CHARS = 100000
+MAX_CMAP_RANGE = 65536
+
+
+class ResumeParseError(ValueError):
+    """Raised for files that are not a readable PDF, DOCX or text resume"""
+
+
+# Text extraction
+
+def extract_text(data):
+    """Plain text of a resume file's bytes"""
+    if data.startswith(b'%PDF'):
+        text = _pdf_text(data)
+    elif data.startswith(b'PK'):
+        text = _docx_text(data)
+    else:
+        text = _plain_text(data)
+    text = text[:MAX_TEXT_CHARS]
+    if not text.strip():
+        raise ResumeParseError("No text found in the file (scanned or empty document?)")
+    return text
+
+
+def _plain_text(data):
+    if b'\x00' in data[:4096]:
+        raise ResumeParseError("Unsupported file type: expected PDF, DOCX or plain text")
+    try:
+        return data.decode('utf-8')
+    except UnicodeDecodeError:
+        return data.decode('cp1252', errors='replace')
+
+
+def _inflate(data):
+    decompressor = zlib.decompressobj()
+    try:
+        return decompressor.decompress(data, MAX_STREAM_BYTES)
+    except Exception:
+        return b''
+
+
+# DOCX
+
+DOCX_PARAGRAPH = re.compile(r'<w:p[ >].*?</w:p>|<w:p/>', re.S)
+DOCX_RUN = re.compile(r'<w:t(?: [^>]*)?>(.*?)</w:t>|<w:tab/>|<w:br/>|<w:cr/>', re.S)
+
+
+def _docx_text(data):
+    try:
+        archive = zipfile.ZipFile(io.BytesIO(data))
+        info = archive.getinfo('word/document.xml')
+    except (zipfile.BadZipFile, KeyError):
+        raise ResumeParseError("Unsupported file type: expected PDF, DOCX or plain text")
+    if info.file_size > MAX_STREAM_BYTES:
+        raise ResumeParseError("Document is too large")
+    document = archive.read(info).decode('utf-8', errors='replace')
+
+    lines = []
+    for paragraph in DOCX_PARAGRAPH.findall(document):
+        parts = []
+        for match in DOCX_RUN.finditer(paragraph):
+            if match.group(1) is not None:
+                parts.append(html.unescape(match.group(1)))
+            elif match.group(0) == '<w:tab/>':
+                parts.append('\t')
+            else:
+                parts.append('\n')
+        lines.append(''.join(parts))
+    return '\n'.join(lines)
+
+
+# PDF
+
+PDF_OBJECT = re.compile(rb'(\d+)\s+(\d+)\s+obj\b(.*?)\bendobj', re.S)
+PDF_STREAM_START = re.compile(rb'\bstream\r?\n')
+PDF_REF = rb'(\d+)\s+\d+\s+R'
+PDF_CONTENT_TOKEN = re.compile(
+    rb'\((?:\\.|[^\\()]|\((?:\\.|[^\\()])*\))*\)'  # literal string (one level of nested parentheses)
+    rb'|<<|>>|<[0-9A-Fa-f\s]*>'  # dictionary delimiters, hex string
+    rb'|/[^\s/\[\]()<>{}%]*'  # name
+    rb'|\[|\]'
+    rb'|[-+]?(?:\d+\.?\d*|\.\d+)'  # number
+    rb'|[A-Za-z\'"*][A-Za-z0-9*]*',  # operator
+    re.S
+)
+CONTROL_CHARS = re.compile(r'[\x00-\x08\x0b-\x1f\x7f\ufffd]')
+PDF_ESCAPES = {b'n': b'\n', b'r': b'\r', b't': b'\t', b'b': b'\b', b'f': b'\f'}
+
+
+def _pdf_objects(data):
+    """{object number: (dictionary bytes, decoded stream bytes or None)}, object streams expanded"""
+    objects = {}
+    object_streams = []
+    for match in PDF_OBJECT.finditer(data):
+        body = match.group(3)
+        stream = None
+        start = PDF_STREAM_START.search(body)
+        if start:
+            head = body[:start.start()]
+            raw = body[start.end():body.rfind(b'endstream')]
+            if re.search(rb'/Filter\s*\[?\s*/FlateDecode\s*\]?', head):
+                stream = _inflate(raw)
+            elif b'/Filter' not in head:
+                stream = raw
+            else:
+                stream = b''  # images and other encodings carry no text
+            body = head
+        objects[int(match.group(1))] = (body, stream)
+        if stream and re.search(rb'/Type\s*/ObjStm', body):
+            object_streams.append((body, stream))
+
+    for head, stream in object_streams:
+        first = re.search(rb'/First\s+(\d+)', head)
+        if not first:
+            continue
+        first = int(first.group(1))
+        numbers = [int(n) for n in re.findall(rb'\d+', stream[:first])]
+        pairs = list(zip(numbers[::2], numbers[1::2]))
+        for index, (number, offset) in enumerate(pairs):
+            end = first + pairs[index + 1][1] if index + 1 < len(pairs) else len(stream)
+            objects.setdefault(number, (stream[first + offset:end], None))
+    return objects
+
+
+def _pdf_pages(objects):
+    """Page object numbers in document order"""
+    catalog = next((body for body, _ in objects.values() if re.search(rb'/Type\s*/Catalog', body)), b'')
+    root = re.search(rb'/Pages\s+' + PDF_REF, catalog)
+    pages = []
+    if root:
+        pending = [int(root.group(1))]
+        seen = set()
+        while pending and len(seen) < 10000:
+            number = pending.pop(0)
+            if number in seen or number not in objects:
+                continue
+            seen.add(number)
+            body = objects[number][0]
+            if re.search(rb'/Type\s*/Pages', body):
+                kids = re.search(rb'/Kids\s*\[(.*?)\]', body, re.S)
+                if kids:
+                    pending[:0] = [int(n) for n in re.findall(PDF_REF, kids.group(1))]
+            elif re.search(rb'/Type\s*/Page\b', body):
+                pages.append(number)
+    if not pages:
+        pages = sorted(n for n, (body, _) in objects.items() if re.search(rb'/Type\s*/Page\b', body))
+    return pages
+
+
+def _utf16(hex_digits):
+    raw = bytes.fromhex(hex_digits.decode())
+    return raw.decode('utf-16-be', errors='ignore')
+
+
+def _parse_cmap(data):
+    """(code width in bytes, {code: text}) from a ToUnicode CMap"""
+    mapping = {}
+    width = 1
+    space = re.search(rb'begincodespacerange\s*<([0-9A-Fa-f]+)>', data)
+    if space:
+        width = max(len(space.group(1)) // 2, 1)
+    for block in re.findall(rb'beginbfchar(.*?)endbfchar', data, re.S):
+        for source, target in re.findall(rb'<([0-9A-Fa-f]+)>\s*<([0-9A-Fa-f]*)>', block):
+            mapping[int(source, 16)] = _utf16(target)
+            width = max(width, len(source) // 2)
+    for block in re.findall(rb'beginbfrange(.*?)endbfrange', data, re.S):
+        for low, high, target in re.findall(
+            rb'<([0-9A-Fa-f]+)>\s*<([0-9A-Fa-f]+)>\s*(<[0-9A-Fa-f]*>|\[[^\]]*\])', block
+        ):
+            low, high = int(low, 16), min(int(high, 16), int(low, 16) + MAX_CMAP_RANGE)
+            if target.startswith(b'['):
+                for code, item in zip(range(low, high + 1), re.findall(rb'<([0-9A-Fa-f]*)>', target)):
+                    mapping[code] = _utf16(item)
+            else:
+                base = _utf16(target[1:-1])
+                if not base:
+                    continue
+                for offset in range(high - low + 1):
+                    mapping[low + offset] = base[:-1] + chr(min(ord(base[-1]) + offset, 0x10FFFF))
+    return width, mapping
+
+
+def _pdf_fonts(objects, resources):
+    """{font resource name: (code width, cmap or None)} for a page's resources dictionary"""
+    fonts = {}
+    font_dict = re.search(rb'/Font\s*(<<.*?>>|' + PDF_REF + rb')', resources, re.S)
+    if not font_dict:
+        return fonts
+    entries = font_dict.group(1)
+    if font_dict.group(2):
+        entries = objects.get(int(font_dict.group(2)), (b'', None))[0]
+    for name, number in re.findall(rb'/([^\s/<>\[\]()]+)\s+' + PDF_REF, entries):
+        font = objects.get(int(number), (b'', None))[0]
+        to_unicode = re.search(rb'/ToUnicode\s+' + PDF_REF, font)
+        cmap = objects.get(int(to_unicode.group(1)), (b'', None))[1] if to_unicode else None
+        if cmap:
+            fonts[name] = _parse_cmap(cmap)
+        elif re.search(rb'/Encoding\s*/Identity-[HV]', font):
+            fonts[name] = (2, {})  # glyph ids with no map back to text
+        else:
+            fonts[name] = (1, None)
+    return fonts
+
+
+def _pdf_resources(objects, page):
+    """A page's resources dictionary, following references and inheritance from parent nodes"""
+    number = page
+    for _ in range(32):
+        body = objects.get(number, (b'', None))[0]
+        resources = re.search(rb'/Resources\s*(' + PDF_REF + rb'|<<)', body)
+        if resources:
+            if resources.group(2):
+                return objects.get(int(resources.group(2)), (b'', None))[0]
+            return body[resources.start():]
+        parent = re.search(rb'/Parent\s+' + PDF_REF, body)
+        if not parent:
+            break
+        number = int(parent.group(1))
+    return b''
+
+
+def _literal(token):
+    out = bytearray()
+    body = token[1:-1]
+    index = 0
+    while index < len(body):
+        char = body[index:index + 1]
+        if char != b'\\':
+            out += char
+            index += 1
+            continue
+        following = body[index + 1:index + 2]
+        if following in PDF_ESCAPES:
+            out += PDF_ESCAPES[following]
+            index += 2
+        elif following.isdigit():
+            octal = re.match(rb'[0-7]{1,3}', body[index + 1:index + 4]).group(0)
+            out.append(int(octal, 8) & 0xFF)
+            index += 1 + len(octal)
+        elif following in (b'\n', b'\r'):
+            index += 2
+        else:
+            out += following
+            index += 2
+    return bytes(out)
+
+
+def _show(string, font):
+    width, cmap = font
+    if cmap is None:
+        return string.decode('cp1252', errors='replace')
+    chars = []
+    for index in range(0, len(string) - width + 1, width):
+        chars.append(cmap.get(int.from_bytes(string[index:index + width], 'big'), ''))
+    return ''.join(chars)
+
+
+def _content_text(content, fonts):
+    out = []
+    operands = []
+    font = (1, None)
+    line_y = None
+    for match in PDF_CONTENT_TOKEN.finditer(content):
+        token = match.group(0)
+        first = token[:1]
+        if first == b'(':
+            operands.append(_literal(token))
+        elif first == b'<' and token != b'<<':
+            digits = re.sub(rb'\s', b'', token[1:-1])
+            operands.append(bytes.fromhex((digits + b'0' * (len(digits) % 2)).decode()))
+        elif first == b'/':
+            operands.append(token[1:])
+        elif token in (b'[', b']', b'<<', b'>>'):
+            operands.append(token)
+        elif first.isdigit() or first in b'-+.':
+            operands.append(float(token))
+        else:
+            if token == b'Tf' and len(operands) >= 2 and isinstance(operands[-2], bytes):
+                font = fonts.get(operands[-2], (1, None))
+            elif token == b'Tj' and operands and isinstance(operands[-1], bytes):
+                out.append(_show(operands[-1], font))
+            elif token in (b"'", b'"') and operands and isinstance(operands[-1], bytes):
+                out.append('\n' + _show(operands[-1], font))
+            elif token == b'TJ':
+                start = len(operands) - 1 - operands[::-1].index(b'[') if b'[' in operands else len(operands)
+                for item in operands[start + 1:]:
+                    if isinstance(item, bytes) and item != b']':
+                        out.append(_show(item, font))
+                    elif isinstance(item, float) and item < -200:
+                        out.append(' ')
+            elif token in (b'Td', b'TD') and len(operands) >= 2 and isinstance(operands[-1], float):
+                out.append('\n' if abs(operands[-1]) > 1 else ' ')
+            elif token == b'Tm' and len(operands) >= 6 and isinstance(operands[-1], float):
+                if line_y is not None and abs(operands[-1] - line_y) > 1:
+                    out.append('\n')
+                elif line_y is not None:
+                    out.append(' ')
+                line_y = operands[-1]
+            elif token == b'T*':
+                out.append('\n')
+            elif token == b'ET':
+                out.append(' ')
+            operands = []
+    return ''.join(out)
+
+
+def _pdf_text(data):
+    objects = _pdf_objects(data)
+    pages = []
+    for page in _pdf_pages(objects):
+        body = objects[page][0]
+        fonts = _pdf_fonts(objects, _pdf_resources(objects, page))
+        contents = re.search(rb'/Contents\s*(\[[^\]]*\]|' + PDF_REF + rb')', body)
+        if not contents:
+            continue
+        numbers = [int(n) for n in re.findall(PDF_REF, contents.group(1))]
+        stream = b'\n'.join(objects.get(n, (b'', None))[1] or b'' for n in numbers)
+        pages.append(_content_text(stream, fonts))
+        if sum(len(text) for text in pages) > MAX_TEXT_CHARS:
+            break
+    return CONTROL_CHARS.sub('', '\n\n'.join(pages))
+
+
+# Structured data
+
+MONTHS = {
+    'jan': 1, 'feb': 2, 'mar': 3, 'apr': 4, 'may': 5, 'jun': 6,
+    'jul': 7, 'aug': 8, 'sep': 9, 'oct': 10, 'nov': 11, 'dec': 12,
+}
+MONTH = r'(?:jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?|aug(?:ust)?|sept?(?:ember)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?)'
+DATE = rf'(?:{MONTH}\.?,?\s+(?:19|20)\d{{2}}|\d{{1,2}}\s*/\s*(?:19|20)\d{{2}}|(?:19|20)\d{{2}})'
+DATE_RANGE = re.compile(
+    rf'(?P<start>{DATE})\s*(?:-|–|—|to|until)\s*(?P<end>{DATE}|present|current|now|today)', re.I
+)
+EMAIL = re.compile(r'[\w.+-]+@[\w-]+(?:\.[\w-]+)+')
+PHONE = re.compile(r'(?<!\w)\+?\d[\d ().-]{7,}\d(?!\w)')
+LINK = re.compile(r'(?:https?://)?(?:www\.)?(?:linkedin\.com/in|github\.com)/[\w-]+/?', re.I)
+SKILL_TOKEN = re.compile(r'[a-z0-9][a-z0-9+#.]*', re.I)
+
+TITLE_WORDS = {
+    'engineer', 'developer', 'programmer', 'architect', 'manager', 'lead', 'director', 'analyst',
+    'scientist', 'designer', 'consultant', 'administrator', 'intern', 'specialist', 'officer',
+    'head', 'president', 'founder', 'cto', 'ceo', 'vp', 'researcher', 'tester', 'devops', 'sre',
+    'coordinator', 'associate', 'technician', 'owner',
+}
+EDUCATION_WORDS = {
+    'university', 'college', 'school', 'institute', 'academy', 'bachelor', 'bachelors', 'master',
+    'masters', 'phd', 'ph.d', 'doctorate', 'bsc', 'b.sc', 'msc', 'm.sc', 'ba', 'ma', 'mba', 'b.tech',
+    'btech', 'm.tech', 'mtech', 'b.s', 'm.s', 'bs', 'ms', 'degree', 'diploma',
+}
+SEPARATORS = re.compile(r'\s+(?:at|@|\||–|—|-|,)\s+|\s*[|,]\s*|\t+')
+
+# One-letter and common-word languages (C, R, Go) are left out: they match ordinary text
+BASE_SKILLS = (
+    'Python', 'Java', 'JavaScript', 'TypeScript', 'Golang', 'Rust', 'C++', 'C#', 'Ruby', 'PHP',
+    'Swift', 'Kotlin', 'Scala', 'MATLAB', 'Perl', 'Haskell', 'Elixir', 'Erlang', 'Clojure', 'Dart',
+    'Objective-C', 'Bash', 'Shell', 'PowerShell', 'SQL', 'NoSQL', 'HTML', 'CSS', 'Sass',
+    'Django', 'Flask', 'FastAPI', 'Rails', 'Ruby on Rails', 'Spring', 'Spring Boot', 'Laravel', 'Symfony',
+    'Express', 'Node.js', 'NestJS', 'React', 'React Native', 'Redux', 'Next.js', 'Vue', 'Vue.js', 'Nuxt',
+    'Angular', 'Svelte', 'jQuery', 'Tailwind', 'Bootstrap', 'Flutter', '.NET', 'ASP.NET', 'GraphQL', 'REST',
+    'gRPC', 'WebSockets', 'Celery', 'RabbitMQ', 'Kafka', 'Redis', 'Memcached', 'Elasticsearch',
+    'PostgreSQL', 'MySQL', 'SQLite', 'MongoDB', 'Cassandra', 'DynamoDB', 'Oracle', 'SQL Server',
+    'Snowflake', 'BigQuery', 'Redshift', 'Spark', 'Hadoop', 'Airflow', 'dbt', 'Pandas', 'NumPy', 'SciPy',
+    'scikit-learn', 'TensorFlow', 'PyTorch', 'Keras', 'OpenCV', 'NLP', 'Machine Learning', 'Deep Learning',
+    'Computer Vision', 'Data Science', 'Data Analysis', 'Statistics', 'Tableau', 'Power BI', 'Excel',
+    'AWS', 'Azure', 'GCP', 'Google Cloud', 'Docker', 'Kubernetes', 'Terraform', 'Ansible', 'Puppet', 'Chef',
+    'Jenkins', 'GitHub Actions', 'GitLab CI', 'CircleCI', 'CI/CD', 'Linux', 'Unix', 'Nginx', 'Apache',
+    'Git', 'Jira', 'Agile', 'Scrum', 'Kanban', 'TDD', 'Microservices', 'Serverless', 'Lambda',
+    'Selenium', 'Playwright', 'Cypress', 'Jest', 'Pytest', 'JUnit', 'Figma', 'Sketch', 'Photoshop',
+    'Android', 'iOS', 'Unity', 'Blockchain', 'Solidity', 'Security', 'Networking', 'Prometheus', 'Grafana',
+    'Datadog', 'Splunk', 'OAuth', 'Salesforce', 'SAP', 'Project Management', 'Product Management',
+)
+
+
+def _skill_key(text):
+    return ' '.join(token.rstrip('.').lower() for token in SKILL_TOKEN.findall(text))
+
+
+def build_vocabulary(skills=()):
+    """{normalized skill: display name} for BASE_SKILLS plus ``skills``"""
+    vocabulary = {}
+    for skill in list(BASE_SKILLS) + list(skills):
+        if isinstance(skill, str) and skill.strip():
+            vocabulary.setdefault(_skill_key(skill), skill.strip())
+    vocabulary.pop('', None)
+    return vocabulary
+
+
+def find_skills(text, vocabulary):
+    """Vocabulary skills mentioned in ``text``, in order of first mention"""
+    tokens = [token.rstrip('.').lower() for token in SKILL_TOKEN.findall(text)]
+    longest = max((key.count(' ') + 1 for key in vocabulary), default=1)
+    found = []
+    seen = set()
+    for index in range(len(tokens)):
+        for size in range(min(longest, len(tokens) - index), 0, -1):
+            key = ' '.join(tokens[index:index + size])
+            if key in vocabulary and key not in seen:
+                seen.add(key)
+                found.append(vocabulary[key])
+                break
+    return found
+
+
+def _parse_date(text):
+    """'YYYY-MM' for a resume date, None for present/current"""
+    text = text.lower().strip()
+    if text in ('present', 'current', 'now', 'today'):
+        return None
+    year = int(re.search(r'(?:19|20)\d{2}', text).group(0))
+    month = 1
+    named = re.match(r'[a-z]{3}', text)
+    numeric = re.match(r'(\d{1,2})\s*/', text)
+    if named and named.group(0) in MONTHS:
+        month = MONTHS[named.group(0)]
+    elif numeric and 1 <= int(numeric.group(1)) <= 12:
+        month = int(numeric.group(1))
+    return f'{year:04d}-{month:02d}'
+
+
+def _words(text):
+    return set(re.findall(r'[a-z][a-z.]*', text.lower()))
+
+
+def _split_heading(text):
+    """(title, organization) from an entry heading like 'Senior Engineer at Acme' or 'Acme | Engineer'"""
+    parts = [part.strip(' .:;') for part in SEPARATORS.split(text) if part and part.strip(' .:;')]
+    if not parts:
+        return '', ''
+    titled = [part for part in parts if _words(part) & TITLE_WORDS]
+    title = titled[0] if titled else parts[0]
+    others = [part for part in parts if part != title]
+    return title, others[0] if others else ''
+
+
+def _months(start, end, today):
+    start_year, start_month = map(int, start.split('-'))
+    end_year, end_month = (today.year, today.month) if end is None else map(int, end.split('-'))
+    return start_year * 12 + start_month, end_year * 12 + end_month
+
+
+def _years_of_experience(experiences, today):
+    """Whole years covered by the experience date ranges, overlaps counted once"""
+    spans = sorted(_months(entry['start'], entry['end'], today) for entry in experiences if entry['start'])
+    total = 0
+    current_start = current_end = None
+    for start, end in spans:
+        if end < start:
+            continue
+        if current_end is None or start > current_end:
+            if current_end is not None:
+                total += current_end - current_start
+            current_start, current_end = start, end
+        else:
+            current_end = max(current_end, end)
+    if current_end is not None:
+        total += current_end - current_start
+    return total // 12
+
+
+def parse(text, vocabulary=None, today=None):
+    """Structured data from a resume's text"""
+    vocabulary = vocabulary if vocabulary is not None else build_vocabulary()
+    today = today or date.today()
+    lines = [' '.join(line.split()) for line in text.splitlines()]
+    lines = [line for line in lines if line]
+
+    experiences = []
+    education = []
+    for index, line in enumerate(lines):
+        match = DATE_RANGE.search(line)
+        if not match:
+            continue
+        heading = (line[:match.start()] + ' ' + line[match.end():]).strip(' ()|,–—-')
+        if not heading and index:
+            heading = lines[index - 1]
+        if not heading:
+            continue
+        try:
+            start, end = _parse_date(match.group('start')), _parse_date(match.group('end'))
+        except AttributeError:
+            continue
+        entry_words = _words(heading)
+        if entry_words & EDUCATION_WORDS and not entry_words & TITLE_WORDS:
+            degree, institution = heading, ''
+            for part in SEPARATORS.split(heading):
+                if part and _words(part) & {'university', 'college', 'school', 'institute', 'academy'}:
+                    institution = part.strip(' .:;')
+                    degree = heading.replace(part, '').strip(' ,|–—-') or heading
+                    break
+            education.append({'degree': degree, 'institution': institution, 'start': start, 'end': end})
+        else:
+            title, company = _split_heading(heading)
+            experiences.append({
+                'title': title, 'company': company, 'start': start, 'end': end, 'is_current': end is None,
+            })
+
+    return {
+        'parser_version': PARSER_VERSION,
+        'emails': list(dict.fromkeys(EMAIL.findall(text)))[:5],
+        'phones': list(dict.fromkeys(' '.join(m.split()) for m in PHONE.findall(text) if not DATE_RANGE.search(m)))[:5],
+        'links': list(dict.fromkeys(LINK.findall(text)))[:5],
+        'skills': find_skills(text, vocabulary),
+        'titles': list(dict.fromkeys(entry['title'] for entry in experiences if entry['title'])),
+        'experiences': experiences,
+        'education': education,
+        'years_of_experience': _years_of_experience(experiences, today),
+        'text': text,
+    }
@@ -0,0 +1,148 @@
+"""
+Resume upload pipeline.
+
+An upload is stored on the profile with the SHA-256 of its content and
+returns straight away; profiles.tasks.parse_resume_task extracts and parses
+the text off the request path (see resume_parser). Results are stored once
+per content hash in ResumeParse, so uploading a file that was already parsed,
+by anyone, applies the stored result without parsing it again.
+
+Applying a result merges the parsed skills into UserProfile.skills and fills
+years_of_experience when it is unset. Experience and education entries are
+never written to the profile; suggestions() offers the ones it does not
+already have.
+"""
+import hashlib
+import logging
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from . import resume_parser
+from .models import ResumeParse, UserProfile
+
+logger = logging.getLogger('automation')
+
+VOCABULARY_KEY = 'resume_skill_vocabulary'
+VOCABULARY_TIMEOUT = 24 * 60 * 60
+VOCABULARY_LISTINGS = 5000  # most recent listings whose skills extend the vocabulary
+MAX_SKILL_WORDS = 4
+STALE_PENDING = timedelta(minutes=15)  # re-queue a parse whose worker was lost
+
+
+def content_hash(upload):
+    """SHA-256 of an uploaded file, read in chunks"""
+    digest = hashlib.sha256()
+    for chunk in upload.chunks():
+        digest.update(chunk)
+    upload.seek(0)
+    return digest.hexdigest()
+
+
+def skill_vocabulary():
+    """Skill vocabulary for parsing: the built-in skills plus those asked for by recent listings"""
+    vocabulary = cache.get(VOCABULARY_KEY)
+    if vocabulary is None:
+        from jobs.models import JobListing
+
+        skills = set()
+        rows = JobListing.objects.order_by('-scraped_at').values_list('required_skills', 'preferred_skills')
+        for required, preferred in rows[:VOCABULARY_LISTINGS]:
+            for skill in list(required or []) + list(preferred or []):
+                if isinstance(skill, str) and len(skill) <= 40 and len(skill.split()) <= MAX_SKILL_WORDS:
+                    skills.add(skill.strip())
+        vocabulary = resume_parser.build_vocabulary(sorted(skills))
+        cache.set(VOCABULARY_KEY, vocabulary, timeout=VOCABULARY_TIMEOUT)
+    return vocabulary
+
+
+def submit(profile):
+    """
+    Parse state for the profile's current resume: applies a stored result
+    right away, otherwise queues the parse (once per content hash)
+    """
+    entry, created = ResumeParse.objects.get_or_create(content_hash=profile.resume_hash)
+    if entry.status == 'parsed' and entry.parser_version == resume_parser.PARSER_VERSION:
+        apply(profile, entry.data)
+        return entry
+
+    stale = entry.status == 'pending' and entry.updated_at < timezone.now() - STALE_PENDING
+    if created or stale or entry.status != 'pending' or entry.parser_version != resume_parser.PARSER_VERSION:
+        from .tasks import parse_resume_task
+
+        ResumeParse.objects.filter(pk=entry.pk).update(status='pending', error='', updated_at=timezone.now())
+        entry.status = 'pending'
+        transaction.on_commit(lambda: parse_resume_task.delay(entry.content_hash))
+    return entry
+
+
+def parse_stored(content_hash):
+    """Parse the stored file with ``content_hash`` and apply the result to every profile that uploaded it"""
+    entry = ResumeParse.objects.get(content_hash=content_hash)
+    profiles = list(UserProfile.objects.filter(resume_hash=content_hash).exclude(resume_file=''))
+    if not profiles:
+        entry.status, entry.error = 'failed', 'No stored file with this content'
+        entry.save(update_fields=['status', 'error', 'updated_at'])
+        return entry
+
+    try:
+        with profiles[0].resume_file.open('rb') as handle:
+            data = handle.read()
+        text = resume_parser.extract_text(data)
+        entry.data = resume_parser.parse(text, skill_vocabulary())
+        entry.status, entry.error = 'parsed', ''
+    except resume_parser.ResumeParseError as e:
+        entry.data, entry.status, entry.error = {}, 'failed', str(e)
+    except Exception as e:
+        logger.error(f"Error parsing resume {content_hash[:12]}: {str(e)}")
+        entry.data, entry.status, entry.error = {}, 'failed', "The file could not be read"
+    entry.parser_version = resume_parser.PARSER_VERSION
+    entry.save()
+
+    if entry.status == 'parsed':
+        for profile in profiles:
+            apply(profile, entry.data)
+    logger.info(f"Resume {content_hash[:12]} {entry.status} for {len(profiles)} profile(s)")
+    return entry
+
+
+def apply(profile, data):
+    """Merge parsed skills into the profile and fill years of experience when unset"""
+    skills = list(profile.skills or [])
+    known = {skill.lower() for skill in skills if isinstance(skill, str)}
+    added = [skill for skill in data.get('skills', []) if skill.lower() not in known]
+    fields = []
+    if added:
+        profile.skills = skills + added
+        fields.append('skills')
+    if not profile.years_of_experience and data.get('years_of_experience'):
+        profile.years_of_experience = data['years_of_experience']
+        fields.append('years_of_experience')
+    if fields:
+        profile.save(update_fields=fields + ['updated_at'])
+    return added
+
+
+def suggestions(profile, data):
+    """Parsed skills, experience and education the profile does not have yet"""
+    known_skills = {skill.lower() for skill in profile.skills or [] if isinstance(skill, str)}
+    known_jobs = {
+        (experience.position_title.lower(), experience.company_name.lower())
+        for experience in profile.experiences.all()
+    }
+    known_schools = {education.institution_name.lower() for education in profile.education.all()}
+    return {
+        'skills': [skill for skill in data.get('skills', []) if skill.lower() not in known_skills],
+        'experiences': [
+            entry for entry in data.get('experiences', [])
+            if (entry['title'].lower(), entry['company'].lower()) not in known_jobs
+        ],
+        'education': [
+            entry for entry in data.get('education', [])
+            if not entry['institution'] or entry['institution'].lower() not in known_schools
+        ],
+        'titles': data.get('titles', []),
+        'years_of_experience': data.get('years_of_experience', 0),
+    }
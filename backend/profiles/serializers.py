@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from .letter_templates import TemplateError, validate
 from .models import UserProfile, Experience, Education, ApplicationTemplate
 
 
@@ -16,12 +17,23 @@ class EducationSerializer(serializers.ModelSerializer):
         read_only_fields = ('id',)
 
 
+def validate_cover_letter(value):
+    try:
+        validate(value)
+    except TemplateError as e:
+        raise serializers.ValidationError(str(e))
+    return value
+
+
 class ApplicationTemplateSerializer(serializers.ModelSerializer):
     class Meta:
         model = ApplicationTemplate
         fields = '__all__'
         read_only_fields = ('id', 'created_at', 'updated_at')
 
+    def validate_cover_letter_template(self, value):
+        return validate_cover_letter(value)
+
 
 class UserProfileSerializer(serializers.ModelSerializer):
     experiences = ExperienceSerializer(many=True, read_only=True)
@@ -33,6 +45,9 @@ class UserProfileSerializer(serializers.ModelSerializer):
         fields = '__all__'
         read_only_fields = ('id', 'user', 'created_at', 'updated_at')
 
+    def validate_cover_letter_template(self, value):
+        return validate_cover_letter(value)
+
     def create(self, validated_data):
         validated_data['user'] = self.context['request'].user
         return super().create(validated_data)
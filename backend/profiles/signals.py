@@ -0,0 +1,38 @@
+"""
+Signal handlers dropping cached profile snapshots when profile data changes
+"""
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+
+from .models import ApplicationTemplate, Education, Experience, UserProfile
+from .snapshot import invalidate
+
+
+def _invalidate_later(user_id):
+    # Also after commit, or a read during the transaction could cache the old rows again
+    invalidate(user_id)
+    transaction.on_commit(lambda: invalidate(user_id))
+
+
+def _profile_changed(sender, instance, **kwargs):
+    _invalidate_later(instance.user_id)
+
+
+def _child_changed(sender, instance, **kwargs):
+    user_id = UserProfile.objects.filter(pk=instance.profile_id).values_list('user_id', flat=True).first()
+    if user_id is not None:
+        _invalidate_later(user_id)
+
+
+def _user_changed(sender, instance, **kwargs):
+    _invalidate_later(instance.pk)
+
+
+for signal in (post_save, post_delete):
+    signal.connect(_profile_changed, sender=UserProfile, dispatch_uid=f'snapshot-profile-{signal is post_save}')
+    signal.connect(_user_changed, sender=User, dispatch_uid=f'snapshot-user-{signal is post_save}')
+    for model in (Experience, Education, ApplicationTemplate):
+        signal.connect(
+            _child_changed, sender=model, dispatch_uid=f'snapshot-{model.__name__}-{signal is post_save}'
+        )
@@ -0,0 +1,151 @@
+"""
+Profile snapshots.
+
+A ProfileSnapshot is an immutable, compact copy of everything automation
+reads from a user's profile: contact details, experience summary, skills,
+places (duck-compatible with jobs.geo.location_match_score) and the cover
+letter template in effect. It is built with a handful of queries, kept in
+the shared cache and handed to automators, prompt builders and cover letter
+rendering, so applying to a job reads no profile rows once it is cached.
+
+``version`` changes whenever the profile, its experience, education or
+application templates, or the user's name and email change; AI answer and
+cover letter caches are keyed on it. Signal handlers drop the cached
+snapshot on any of those changes; the timeout only covers writes that skip
+signals (queryset.update()).
+"""
+import hashlib
+import json
+
+from django.core.cache import cache
+
+SNAPSHOT_KEY = 'profile_snapshot:{}'
+SNAPSHOT_TIMEOUT = 60 * 60
+MAX_EDUCATION = 2
+MAX_EXPERIENCE = 3
+
+
+class ProfileSnapshot:
+    """Read-only view of a user's profile at one version"""
+
+    __slots__ = (
+        'user_id', 'version',
+        'first_name', 'last_name', 'full_name', 'email', 'phone_number',
+        'location', 'website', 'linkedin_url', 'github_url',
+        'current_position', 'years_of_experience', 'desired_salary_min', 'desired_salary_max',
+        'skills', 'preferred_locations', 'place_id', 'preferred_place_ids',
+        'education', 'experiences',
+        'cover_letter_template', 'cover_letter_template_key',
+    )
+
+    def __init__(self, *values, **fields):
+        if len(values) > len(self.__slots__):
+            raise TypeError(f"{type(self).__name__} takes {len(self.__slots__)} values, got {len(values)}")
+        for name, value in zip(self.__slots__, values):
+            if name in fields:
+                raise TypeError(f"{type(self).__name__} got two values for {name!r}")
+            fields[name] = value
+        missing = [name for name in self.__slots__ if name not in fields]
+        unknown = set(fields) - set(self.__slots__)
+        if missing or unknown:
+            raise TypeError(f"{type(self).__name__}: missing {missing}, unknown {sorted(unknown)}")
+        for name in self.__slots__:
+            object.__setattr__(self, name, fields[name])
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __reduce__(self):
+        return (type(self), tuple(getattr(self, name) for name in self.__slots__))
+
+    def __repr__(self):
+        return f"<ProfileSnapshot user={self.user_id} version={self.version}>"
+
+    def summary(self):
+        """The profile as context for AI prompts"""
+        return {
+            'name': self.full_name,
+            'current_position': self.current_position,
+            'experience_years': self.years_of_experience,
+            'skills': list(self.skills),
+            'location': self.location,
+            'education': list(self.education),
+            'experience': list(self.experiences),
+        }
+
+
+def build(user_id):
+    """Snapshot of the user's profile from the database, or None without a profile"""
+    from .models import ApplicationTemplate, UserProfile
+
+    profile = UserProfile.objects.select_related('user').filter(user_id=user_id).first()
+    if profile is None:
+        return None
+    user = profile.user
+    education = list(profile.education.all())
+    experiences = list(profile.experiences.all())
+    template = ApplicationTemplate.objects.filter(profile=profile, is_default=True).exclude(
+        cover_letter_template=''
+    ).only('id', 'cover_letter_template', 'updated_at').first()
+
+    if template is not None:
+        cover_letter_template = template.cover_letter_template
+        template_key = (template._meta.label, template.pk, 'cover_letter_template', template.updated_at)
+    else:
+        cover_letter_template = profile.cover_letter_template
+        template_key = (profile._meta.label, profile.pk, 'cover_letter_template', profile.updated_at)
+
+    stamps = [
+        profile.updated_at.isoformat(),
+        sorted((item.pk, item.updated_at.isoformat()) for item in education),
+        sorted((item.pk, item.updated_at.isoformat()) for item in experiences),
+        template.updated_at.isoformat() if template is not None else '',
+        [user.first_name, user.last_name, user.email],
+    ]
+    version = hashlib.sha256(json.dumps(stamps).encode()).hexdigest()[:16]
+
+    return ProfileSnapshot(
+        user_id=user.id, version=version,
+        first_name=user.first_name, last_name=user.last_name, full_name=profile.full_name, email=user.email,
+        phone_number=profile.phone_number, location=profile.location, website=profile.website,
+        linkedin_url=profile.linkedin_url, github_url=profile.github_url,
+        current_position=profile.current_position, years_of_experience=profile.years_of_experience,
+        desired_salary_min=profile.desired_salary_min, desired_salary_max=profile.desired_salary_max,
+        skills=tuple(profile.skills or ()), preferred_locations=tuple(profile.preferred_locations or ()),
+        place_id=profile.place_id, preferred_place_ids=tuple(profile.preferred_place_ids or ()),
+        education=tuple(str(item) for item in education[:MAX_EDUCATION]),
+        experiences=tuple(str(item) for item in experiences[:MAX_EXPERIENCE]),
+        cover_letter_template=cover_letter_template, cover_letter_template_key=template_key,
+    )
+
+def for_user(user):
+    """The user's (or user id's) snapshot, from the cache when possible; None without a profile"""
+    user_id = getattr(user, 'pk', user)
+    snapshot = cache.get(SNAPSHOT_KEY.format(user_id))
+    if snapshot is None:
+        snapshot = build(user_id)
+        if snapshot is not None:
+            cache.set(SNAPSHOT_KEY.format(user_id), snapshot, timeout=SNAPSHOT_TIMEOUT)
+    return snapshot
+
+
+def for_users(user_ids):
+    """{user id: snapshot} in one cache round trip plus a build per miss (users without a profile are left out)"""
+    keys = {SNAPSHOT_KEY.format(user_id): user_id for user_id in user_ids}
+    snapshots = {keys[key]: snapshot for key, snapshot in cache.get_many(list(keys)).items()}
+    built = {}
+    for user_id in user_ids:
+        if user_id not in snapshots:
+            snapshot = build(user_id)
+            if snapshot is not None:
+                snapshots[user_id] = built[SNAPSHOT_KEY.format(user_id)] = snapshot
+    if built:
+        cache.set_many(built, timeout=SNAPSHOT_TIMEOUT)
+    return snapshots
+
+
+def invalidate(user_id):
+    cache.delete(SNAPSHOT_KEY.format(user_id))
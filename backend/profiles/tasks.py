@@ -0,0 +1,18 @@
+from celery import shared_task
+from . import resumes
+import logging
+
+logger = logging.getLogger('automation')
+
+
+@shared_task
+def parse_resume_task(content_hash):
+    """
+    Background task parsing an uploaded resume and applying it to the profiles that uploaded it
+    """
+    try:
+        entry = resumes.parse_stored(content_hash)
+        return f"Resume {content_hash[:12]}: {entry.status}"
+    except Exception as e:
+        logger.error(f"Error in parse_resume_task: {str(e)}")
+        return f"Error: {str(e)}"
@@ -1,3 +1,528 @@
-from django.test import TestCase
+import hashlib
+import io
+import pickle
+import shutil
+import tempfile
+import zipfile
+import zlib
+from datetime import date
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from jobs.models import JobListing
+from . import resume_parser, resumes, snapshot
+from .letter_templates import TemplateError, clear_cache, compile_template, template_for, validate
+from .models import ApplicationTemplate, Education, Experience, ResumeParse, UserProfile
+from .serializers import ApplicationTemplateSerializer
+from .snapshot import ProfileSnapshot
+
+
+class ProfileTestCase(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user('ada', email='ada@example.com', password='secret')
+        self.profile = UserProfile.objects.create(user=self.user, location='Berlin', skills=['Python'])
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def add_experience(self, title='Engineer'):
+        return Experience.objects.create(
+            profile=self.profile, company_name='Initech', position_title=title, start_date=date(2020, 1, 1)
+        )
+
+
+class ConditionalProfileTests(ProfileTestCase):
+
+    def get(self, etag=None):
+        headers = {'HTTP_IF_NONE_MATCH': etag} if etag else {}
+        return self.client.get('/api/profiles/me/', **headers)
+
+    def test_not_modified_until_a_nested_row_changes(self):
+        first = self.get()
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(self.get(first['ETag']).status_code, 304)
+
+        experience = self.add_experience()
+        second = self.get(first['ETag'])
+        self.assertEqual(second.status_code, 200)
+        self.assertNotEqual(second['ETag'], first['ETag'])
+
+        # Deleting a row moves no timestamp forward; the row count does
+        experience.delete()
+        third = self.get(second['ETag'])
+        self.assertEqual(third.status_code, 200)
+        self.assertNotEqual(third['ETag'], second['ETag'])
+
+    def test_relations_are_aggregated_separately(self):
+        for title in ('Engineer', 'Lead', 'Manager'):
+            self.add_experience(title)
+        for school in ('TU Berlin', 'ETH'):
+            Education.objects.create(
+                profile=self.profile, institution_name=school, degree_type='master', field_of_study='CS',
+                start_date=date(2015, 1, 1)
+            )
+        etag = self.get()['ETag']
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.get(etag).status_code, 304)
+        aggregates = [query['sql'] for query in queries.captured_queries if 'COUNT(' in query['sql']]
+        self.assertEqual(len(aggregates), 4)
+        for sql in aggregates:
+            self.assertLessEqual(sql.count(' JOIN '), 1, sql)
+
+
+class LetterTemplateTests(ProfileTestCase):
+
+    def setUp(self):
+        super().setUp()
+        clear_cache()
+        self.job = JobListing(
+            title='Backend Engineer', company_name='Initech', location='Berlin', is_remote=False,
+            salary_min=90000, salary_max=120000, salary_currency='EUR',
+            required_skills=['Python', 'Go'], preferred_skills=['Django'],
+        )
+        self.snapshot = ProfileSnapshot(
+            user_id=self.user.id, version='v1', first_name='Ada', last_name='Lovelace', full_name='Ada Lovelace',
+            email='ada@example.com', phone_number='', location='London', website='', linkedin_url='',
+            github_url='', current_position='Engineer', years_of_experience=8,
+            desired_salary_min=None, desired_salary_max=None, skills=('python', 'Django'),
+            preferred_locations=(), place_id='', preferred_place_ids=(), education=(), experiences=(),
+            cover_letter_template='', cover_letter_template_key=None,
+        )
+
+    def render(self, source, profile=None):
+        return compile_template(source).render(self.job, profile or self.snapshot)
+
+    def test_values_literals_and_repeats(self):
+        self.assertEqual(
+            self.render('{{{job_title}}} at {company_name}, {company_name}! {user_name} ({ email })'),
+            '{{Backend Engineer}} at Initech, Initech! Ada Lovelace (ada@example.com)'
+        )
+        self.assertEqual(self.render('No placeholders'), 'No placeholders')
+        self.assertEqual(self.render(''), '')
+
+    def test_non_text_values(self):
+        self.assertEqual(
+            self.render('{required_skills}|{matching_skills}|{skills}|{years_of_experience}|{remote}|{salary_range}'),
+            'Python, Go|Python, Django|python, Django|8||EUR 90,000-120,000'
+        )
+        self.job.is_remote = True
+        self.assertEqual(self.render('{remote}'), 'yes')
+
+    def test_conditionals(self):
+        source = (
+            '{if remote}Remote{else}Based in {location}{endif}.'
+            '{if not phone} No phone.{endif}'
+            '{if matching_skills} Skills: {if website}{website}{else}{matching_skills}{endif}.{endif}'
+        )
+        self.assertEqual(self.render(source), 'Based in London. No phone. Skills: Python, Django.')
+        self.job.is_remote = True
+        self.job.required_skills = self.job.preferred_skills = []
+        self.assertEqual(self.render(source), 'Remote. No phone.')
+
+    def test_profiles_filled_in_once_do_not_leak(self):
+        template = compile_template('{job_title}: {user_name}{if website} ({website}){endif}')
+        fields = {name: getattr(self.snapshot, name) for name in ProfileSnapshot.__slots__}
+        other = ProfileSnapshot(**{**fields, 'full_name': 'Grace Hopper', 'website': 'hopper.dev'})
+        self.assertEqual(template.render(self.job, self.snapshot), 'Backend Engineer: Ada Lovelace')
+        self.assertEqual(template.render(self.job, other), 'Backend Engineer: Grace Hopper (hopper.dev)')
+        self.job.title = 'Data Engineer'
+        self.assertEqual(template.render(self.job, self.snapshot), 'Data Engineer: Ada Lovelace')
+        self.assertEqual(template.render(self.job), 'Data Engineer: ')
+
+    def test_missing_profile_uses_defaults(self):
+        template = compile_template('{user_name}|{years_of_experience}|{skills}|{job_title}{if not email}!{endif}')
+        self.assertEqual(template.render(self.job), '|0||Backend Engineer!')
+
+    def test_none_attributes_render_empty(self):
+        self.job.company_name = None
+        self.assertEqual(self.render('[{company_name}] {job_title}'), '[] Backend Engineer')
+
+    def test_unknown_placeholders_render_literally(self):
+        self.assertEqual(self.render('{job_title} {hiring_manager}'), 'Backend Engineer {hiring_manager}')
+
+    def test_validate(self):
+        validate('Dear {company_name},{if remote} remote{else} on site{endif}{{}}')
+        validate(None)
+        cases = {
+            '{hiring_manager}': 'Unknown placeholder',
+            '{if hiring_manager}x{endif}': 'Unknown placeholder in condition',
+            '{else}': '{else} without',
+            '{endif}': '{endif} without',
+            '{if remote}a{else}b{else}c{endif}': '{else} without',
+            '{if remote}{if email}x{endif}': '{if remote} is never closed',
+        }
+        for source, message in cases.items():
+            with self.subTest(source=source), self.assertRaisesMessage(TemplateError, message):
+                validate(source)
+
+    def test_invalid_saved_templates_render_as_text(self):
+        self.assertEqual(self.render('{if remote}{job_title}'), '{if remote}{job_title}')
+
+    def test_compiled_templates_are_cached(self):
+        template = ApplicationTemplate.objects.create(
+            profile=self.profile, name='Default', cover_letter_template='Hi {company_name}'
+        )
+        compiled = template_for(template)
+        self.assertIs(template_for(template), compiled)
+        self.assertIs(compile_template('Hi {company_name}'), compile_template('Hi {company_name}'))
+
+        template.cover_letter_template = 'Hello {company_name}'
+        template.save()
+        self.assertEqual(template_for(template).render(self.job), 'Hello Initech')
+
+    def test_serializer_rejects_invalid_templates(self):
+        data = {'profile': self.profile.id, 'name': 'Default', 'cover_letter_template': '{if remote}x'}
+        serializer = ApplicationTemplateSerializer(data=data)
+        self.assertFalse(serializer.is_valid())
+        self.assertIn('never closed', str(serializer.errors['cover_letter_template'][0]))
+
+        data['cover_letter_template'] = '{if remote}x{endif}'
+        self.assertTrue(ApplicationTemplateSerializer(data=data).is_valid())
+
+    def test_snapshot_keywords_are_checked(self):
+        self.assertEqual(self.snapshot.full_name, 'Ada Lovelace')
+        with self.assertRaises(TypeError):
+            ProfileSnapshot(user_id=1)
+        with self.assertRaises(TypeError):
+            ProfileSnapshot(1, user_id=1)
+
+
+class SnapshotTests(ProfileTestCase):
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def test_cached_after_the_first_read(self):
+        self.add_experience()
+        first = snapshot.for_user(self.user)
+        self.assertEqual((first.email, first.location, first.skills), ('ada@example.com', 'Berlin', ('Python',)))
+        self.assertEqual(len(first.experiences), 1)
+
+        with self.assertNumQueries(0):
+            cached = snapshot.for_user(self.user.id)
+        self.assertEqual(cached.version, first.version)
+        self.assertEqual(pickle.loads(pickle.dumps(first)).summary(), first.summary())
+
+    def test_immutable(self):
+        profile = snapshot.for_user(self.user)
+        with self.assertRaises(AttributeError):
+            profile.location = 'Paris'
+        with self.assertRaises(AttributeError):
+            del profile.email
+
+    def test_changes_drop_the_cache_and_move_the_version(self):
+        versions = [snapshot.for_user(self.user).version]
+
+        def changed():
+            current = snapshot.for_user(self.user)
+            self.assertNotIn(current.version, versions)
+            versions.append(current.version)
+            return current
+
+        self.profile.location = 'Paris'
+        self.profile.save()
+        self.assertEqual(changed().location, 'Paris')
+        experience = self.add_experience()
+        changed()
+        experience.delete()
+        # Back to the rows of the version before it
+        self.assertEqual(snapshot.for_user(self.user).version, versions[-2])
+        self.user.email = 'lovelace@example.com'
+        self.user.save()
+        self.assertEqual(changed().email, 'lovelace@example.com')
+        ApplicationTemplate.objects.create(
+            profile=self.profile, name='Default', cover_letter_template='Hi {company_name}', is_default=True
+        )
+        self.assertEqual(changed().cover_letter_template, 'Hi {company_name}')
+
+    def test_writes_inside_a_transaction_are_dropped_again_on_commit(self):
+        snapshot.for_user(self.user)
+        with self.captureOnCommitCallbacks(execute=True), transaction.atomic():
+            self.profile.location = 'Paris'
+            self.profile.save()
+            # A read before commit caches what it sees; commit drops it again
+            snapshot.for_user(self.user)
+            cache.set(snapshot.SNAPSHOT_KEY.format(self.user.id), 'stale')
+        self.assertEqual(snapshot.for_user(self.user).location, 'Paris')
+
+    def test_template_in_effect(self):
+        self.profile.cover_letter_template = 'From the profile'
+        self.profile.save()
+        profile = snapshot.for_user(self.user)
+        self.assertEqual(profile.cover_letter_template, 'From the profile')
+        self.assertEqual(profile.cover_letter_template_key[:2], ('profiles.UserProfile', self.profile.pk))
+
+        ApplicationTemplate.objects.create(profile=self.profile, name='Empty', cover_letter_template='', is_default=True)
+        ApplicationTemplate.objects.create(profile=self.profile, name='Other', cover_letter_template='Not default')
+        self.assertEqual(snapshot.for_user(self.user).cover_letter_template, 'From the profile')
+
+        default = ApplicationTemplate.objects.create(
+            profile=self.profile, name='Default', cover_letter_template='From the template', is_default=True
+        )
+        profile = snapshot.for_user(self.user)
+        self.assertEqual(profile.cover_letter_template, 'From the template')
+        self.assertEqual(profile.cover_letter_template_key[:2], ('profiles.ApplicationTemplate', default.pk))
+
+    def test_users_without_a_profile(self):
+        other = User.objects.create_user('grace', password='secret')
+        self.assertIsNone(snapshot.for_user(other))
+        self.assertIsNone(cache.get(snapshot.SNAPSHOT_KEY.format(other.id)))
+
+        snapshots = snapshot.for_users([self.user.id, other.id])
+        self.assertEqual(list(snapshots), [self.user.id])
+        with self.assertNumQueries(1):  # only the user without a profile is looked up again
+            self.assertEqual(list(snapshot.for_users([self.user.id, other.id])), [self.user.id])
+
+
+RESUME = """Ada Lovelace
+ada@example.com | +44 20 7946 0958 | linkedin.com/in/ada-lovelace
+Skills: Python, django, PostgreSQL, Machine Learning, Fortran
+
+Experience
+Senior Software Engineer at Initech    Jan 2020 - Present
+Built Python services on Kubernetes.
+Analytical Engines Ltd | Developer    03/2016 - 2021
+
+Education
+MSc Computer Science, University of London    2012 - 2014
+"""
+
+
+def make_pdf(content, flate=True):
+    stream = zlib.compress(content) if flate else content
+    return b''.join([
+        b'%PDF-1.4\n1 0 obj << /Type /Catalog /Pages 2 0 R >> endobj\n',
+        b'2 0 obj << /Type /Pages /Kids [3 0 R] /Count 1 >> endobj\n',
+        b'3 0 obj << /Type /Page /Parent 2 0 R /Contents 4 0 R /Resources << /Font << /F1 5 0 R >> >> >> endobj\n',
+        b'4 0 obj << /Length %d%s >>\nstream\n' % (len(stream), b' /Filter /FlateDecode' if flate else b''),
+        stream, b'\nendstream\nendobj\n',
+        b'5 0 obj << /Type /Font /Subtype /Type1 /BaseFont /Helvetica >> endobj\n',
+    ])
+
+
+def make_docx(paragraphs, part='word/document.xml'):
+    body = ''.join(f'<w:p><w:r><w:t>{text}</w:t></w:r></w:p>' for text in paragraphs)
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        archive.writestr(part, f'<w:document><w:body>{body}</w:body></w:document>')
+    return buffer.getvalue()
+
+
+class ResumeParserTests(SimpleTestCase):
+
+    def test_parse(self):
+        data = resume_parser.parse(RESUME, resume_parser.build_vocabulary(['Fortran']), today=date(2024, 1, 1))
+        self.assertEqual(data['emails'], ['ada@example.com'])
+        self.assertEqual(data['phones'], ['+44 20 7946 0958'])
+        self.assertEqual(data['links'], ['linkedin.com/in/ada-lovelace'])
+        self.assertEqual(
+            data['skills'], ['Python', 'Django', 'PostgreSQL', 'Machine Learning', 'Fortran', 'Kubernetes']
+        )
+        self.assertEqual(
+            [(entry['title'], entry['company'], entry['start'], entry['end']) for entry in data['experiences']],
+            [('Senior Software Engineer', 'Initech', '2020-01', None),
+             ('Developer', 'Analytical Engines Ltd', '2016-03', '2021-01')]
+        )
+        self.assertEqual(
+            data['education'],
+            [{'degree': 'MSc Computer Science', 'institution': 'University of London',
+              'start': '2012-01', 'end': '2014-01'}]
+        )
+        # 2016-03 until today, the overlapping years counted once
+        self.assertEqual(data['years_of_experience'], 7)
+
+    def test_parse_without_entries(self):
+        data = resume_parser.parse('Just a name\nand a line')
+        self.assertEqual((data['experiences'], data['education'], data['years_of_experience']), ([], [], 0))
+
+    def test_extract_text(self):
+        content = b'BT /F1 12 Tf 72 700 Td (Ada Lovelace) Tj 0 -14 Td (Engineer at Initech \\(Python\\)) Tj ET'
+        for flate in (True, False):
+            text = resume_parser.extract_text(make_pdf(content, flate))
+            self.assertEqual(text.split(), ['Ada', 'Lovelace', 'Engineer', 'at', 'Initech', '(Python)'])
+        self.assertEqual(
+            resume_parser.extract_text(make_docx(['Ada Lovelace', 'R&amp;D Engineer'])), 'Ada Lovelace\nR&D Engineer'
+        )
+        self.assertEqual(resume_parser.extract_text('Zoë'.encode()), 'Zoë')
+        self.assertEqual(resume_parser.extract_text('Zoë'.encode('cp1252')), 'Zoë')
+
+    def test_unreadable_files(self):
+        cases = {
+            'binary': b'\x7fELF\x00\x00',
+            'empty text': b'  \n ',
+            'pdf without text': make_pdf(b'BT ET'),
+            'zip without a document': make_docx(['Ada'], part='other.xml'),
+            'broken zip': b'PK\x03\x04 not really',
+        }
+        for name, data in cases.items():
+            with self.subTest(name), self.assertRaises(resume_parser.ResumeParseError):
+                resume_parser.extract_text(data)
+
+
+class ResumeTestCase(ProfileTestCase):
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        storages = {**settings.STORAGES, 'resumes': {'BACKEND': 'django.core.files.storage.FileSystemStorage'}}
+        override = override_settings(MEDIA_ROOT=media, STORAGES=storages)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def upload(self, content=RESUME.encode(), name='cv.txt', client=None):
+        with self.captureOnCommitCallbacks(execute=True):
+            return (client or self.client).post(
+                '/api/profiles/upload-resume/', {'resume': SimpleUploadedFile(name, content)}, format='multipart'
+            )
+
+
+class ResumePipelineTests(ResumeTestCase):
+
+    def test_upload_is_parsed_and_applied(self):
+        response = self.upload()
+        self.assertEqual((response.status_code, response.data['parse_status']), (201, 'pending'))
+
+        self.profile.refresh_from_db()
+        entry = ResumeParse.objects.get(content_hash=self.profile.resume_hash)
+        self.assertEqual((entry.status, entry.parser_version), ('parsed', resume_parser.PARSER_VERSION))
+        self.assertEqual(self.profile.skills[:3], ['Python', 'Django', 'PostgreSQL'])
+        self.assertEqual(self.profile.skills.count('Python'), 1)
+        self.assertGreaterEqual(self.profile.years_of_experience, 7)
+
+        Experience.objects.create(
+            profile=self.profile, company_name='Analytical Engines Ltd', position_title='Developer',
+            start_date=date(2016, 3, 1)
+        )
+        suggestions = self.client.get('/api/profiles/resume/').data['suggestions']
+        self.assertEqual([entry['title'] for entry in suggestions['experiences']], ['Senior Software Engineer'])
+        self.assertEqual(suggestions['skills'], [])
+
+    def test_same_content_is_parsed_once(self):
+        self.upload()
+        other = User.objects.create_user('grace', password='secret')
+        client = APIClient()
+        client.force_authenticate(other)
+        with mock.patch('profiles.tasks.parse_resume_task.delay') as delay:
+            response = self.upload(client=client)
+        delay.assert_not_called()
+        self.assertEqual(response.data['parse_status'], 'parsed')
+        self.assertIn('Machine Learning', UserProfile.objects.get(user=other).skills)
+        self.assertEqual(ResumeParse.objects.count(), 1)
+
+    def test_years_of_experience_are_kept(self):
+        self.profile.years_of_experience = 3
+        self.profile.save()
+        self.upload()
+        self.profile.refresh_from_db()
+        self.assertEqual(self.profile.years_of_experience, 3)
+
+    def test_unreadable_upload_fails(self):
+        self.upload(b'   \n')
+        response = self.client.get('/api/profiles/resume/')
+        self.assertEqual(response.data['parse_status'], 'failed')
+        self.assertIn('No text found', response.data['error'])
+        self.assertIsNone(response.data['suggestions'])
+
+    def test_no_resume(self):
+        self.assertEqual(self.client.get('/api/profiles/resume/').status_code, 404)
+        self.assertEqual(self.client.post('/api/profiles/upload-resume/', {}, format='multipart').status_code, 400)
+
+    def test_parse_without_a_stored_file(self):
+        ResumeParse.objects.create(content_hash='0' * 64)
+        self.assertEqual(resumes.parse_stored('0' * 64).status, 'failed')
+
+    def test_stale_and_outdated_parses_are_queued_again(self):
+        self.upload()
+        self.profile.refresh_from_db()
+        entry = ResumeParse.objects.get()
+        with mock.patch('profiles.tasks.parse_resume_task.delay') as delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                ResumeParse.objects.update(status='pending')
+                self.assertEqual(resumes.submit(self.profile).status, 'pending')
+            delay.assert_not_called()  # still running somewhere
+
+            with self.captureOnCommitCallbacks(execute=True):
+                ResumeParse.objects.update(updated_at=timezone.now() - resumes.STALE_PENDING * 2)
+                resumes.submit(self.profile)
+            with self.captureOnCommitCallbacks(execute=True):
+                ResumeParse.objects.update(status='parsed', parser_version=0)
+                resumes.submit(self.profile)
+        self.assertEqual(delay.call_args_list, [mock.call(entry.content_hash)] * 2)
+
+
+@override_settings(RESUME_UPLOAD_MAX_SIZE=256 * 1024)
+class ResumeUploadTests(ResumeTestCase):
+
+    def test_oversized_requests_are_refused_before_the_body_is_read(self):
+        with mock.patch('django.http.multipartparser.LazyStream') as stream:
+            response = self.upload(b'a' * (400 * 1024))
+        self.assertEqual(response.status_code, 413)
+        self.assertEqual(response.data['error'], 'File is larger than 0.25 MB')
+        stream.assert_not_called()
+        self.profile.refresh_from_db()
+        self.assertEqual(self.profile.resume_hash, '')
+
+    def test_oversized_files_are_refused_while_streaming(self):
+        # Within the multipart allowance, so only the running size catches it
+        response = self.upload(b'a' * (300 * 1024))
+        self.assertEqual(response.status_code, 413)
+        self.assertFalse(ResumeParse.objects.exists())
+
+    def test_unsupported_types(self):
+        cases = {
+            'cv.exe': RESUME.encode(),
+            'cv': RESUME.encode(),
+            'cv.pdf': RESUME.encode(),
+            'cv.docx': make_pdf(b'BT ET'),
+            'cv.txt': b'\x00\x01binary',
+        }
+        for name, content in cases.items():
+            with self.subTest(name):
+                response = self.upload(content, name)
+                self.assertEqual(response.status_code, 415)
+                self.assertIn('error', response.data)
+        self.assertFalse(ResumeParse.objects.exists())
+
+    def test_each_supported_type(self):
+        for name, content in (('cv.PDF', make_pdf(b'BT (Ada) Tj ET')), ('cv.docx', make_docx(['Ada']))):
+            with self.subTest(name):
+                self.assertEqual(self.upload(content, name).status_code, 201)
+
+    def test_same_content_is_stored_once(self):
+        other = User.objects.create_user('grace', password='secret')
+        client = APIClient()
+        client.force_authenticate(other)
+        self.upload()
+        with mock.patch.object(FileSystemStorage, 'save') as save:
+            self.upload(client=client)
+        save.assert_not_called()
+
+        digest = hashlib.sha256(RESUME.encode()).hexdigest()
+        first, second = UserProfile.objects.get(user=self.user), UserProfile.objects.get(user=other)
+        self.assertEqual(first.resume_file.name, f'resumes/{digest[:2]}/{digest[2:4]}/{digest}.txt')
+        self.assertEqual(second.resume_file.name, first.resume_file.name)
+        self.assertEqual((first.resume_hash, second.resume_hash), (digest, digest))
+        with first.resume_file.open('rb') as handle:
+            self.assertEqual(handle.read(), RESUME.encode())
+
+    def test_other_file_fields_are_ignored(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/profiles/upload-resume/', {
+                'avatar': SimpleUploadedFile('me.exe', b'MZ'),
+                'resume': SimpleUploadedFile('cv.txt', RESUME.encode()),
+            }, format='multipart')
+        self.assertEqual(response.status_code, 201)
@@ -0,0 +1,113 @@
+"""
+Streaming resume uploads.
+
+ResumeUploadHandler replaces Django's upload handlers for the resume upload
+view: the file is never held in memory (Django keeps uploads under 2.5 MB in
+RAM by default). Chunks go straight to a temporary file while their SHA-256
+is computed, and limits are checked as early as the data allows: the request's
+Content-Length before any of the body is read, the extension when the file
+part starts, its leading bytes on the first chunk and the running size on
+every chunk.
+
+save() then stores the file in the 'resumes' storage (settings.STORAGES)
+under its content hash, so the same file is written once however often it is
+uploaded. The storage backend is configurable; the local filesystem stands in
+for an object store.
+"""
+import hashlib
+import os
+
+from django.conf import settings
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.core.files.uploadhandler import FileUploadHandler, SkipFile, StopUpload
+from django.http import QueryDict
+from django.utils.datastructures import MultiValueDict
+
+FIELD_NAME = 'resume'
+MULTIPART_OVERHEAD = 64 * 1024  # headers and other form fields allowed beyond the file size limit
+
+# extension -> leading bytes of the file (None: text, checked for binary content)
+ALLOWED_TYPES = {
+    '.pdf': b'%PDF',
+    '.docx': b'PK\x03\x04',
+    '.txt': None,
+}
+
+
+class ResumeUploadHandler(FileUploadHandler):
+    """
+    Writes the 'resume' file part to a temporary file, hashing it on the way;
+    after parsing, ``error`` and ``status_code`` describe a rejected upload
+    """
+
+    chunk_size = 64 * 1024
+
+    def __init__(self, request=None, max_size=None):
+        super().__init__(request)
+        self.max_size = max_size or settings.RESUME_UPLOAD_MAX_SIZE
+        self.error = None
+        self.status_code = None
+        self.digest = None
+
+    def reject(self, error, status_code):
+        self.error = error
+        self.status_code = status_code
+
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        if content_length > self.max_size + MULTIPART_OVERHEAD:
+            self.reject(f"File is larger than {self.max_size / (1024 * 1024):g} MB", 413)
+            # Returning the (empty) data and files ends parsing before the body is read
+            return QueryDict(encoding=encoding), MultiValueDict()
+
+    def new_file(self, field_name, file_name, content_type, content_length, charset=None, content_type_extra=None):
+        super().new_file(field_name, file_name, content_type, content_length, charset, content_type_extra)
+        if field_name != FIELD_NAME:
+            raise SkipFile()
+        if os.path.splitext(file_name)[1].lower() not in ALLOWED_TYPES:
+            self.reject(f"Unsupported file type; upload one of: {', '.join(sorted(ALLOWED_TYPES))}", 415)
+            raise SkipFile()
+        self.file = TemporaryUploadedFile(file_name, content_type, 0, charset, content_type_extra)
+        self.digest = hashlib.sha256()
+
+    def receive_data_chunk(self, raw_data, start):
+        if start + len(raw_data) > self.max_size:
+            self.reject(f"File is larger than {self.max_size / (1024 * 1024):g} MB", 413)
+            raise StopUpload(connection_reset=True)
+        if start == 0 and not self._looks_like(raw_data):
+            self.reject("File content does not match its type", 415)
+            raise SkipFile()
+        self.file.write(raw_data)
+        self.digest.update(raw_data)
+
+    def file_complete(self, file_size):
+        self.file.seek(0)
+        self.file.size = file_size
+        self.file.content_hash = self.digest.hexdigest()
+        return self.file
+
+    def _looks_like(self, head):
+        magic = ALLOWED_TYPES[os.path.splitext(self.file_name)[1].lower()]
+        if magic is None:
+            return b'\x00' not in head
+        return head.startswith(magic)
+
+
+def storage_name(content_hash, file_name):
+    """Content-addressed storage key, sharded by the hash's leading characters"""
+    extension = os.path.splitext(file_name)[1].lower()
+    return f'resumes/{content_hash[:2]}/{content_hash[2:4]}/{content_hash}{extension}'
+
+
+def save(profile, upload):
+    """Store ``upload`` (once per content) and point the profile's resume at it"""
+    from .resumes import content_hash
+
+    digest = getattr(upload, 'content_hash', None) or content_hash(upload)
+    storage = profile.resume_file.storage
+    name = storage_name(digest, upload.name)
+    if not storage.exists(name):
+        name = storage.save(name, upload)
+    profile.resume_file.name = name
+    profile.resume_hash = digest
+    profile.save()
+    return digest
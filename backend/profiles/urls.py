@@ -14,4 +14,5 @@ urlpatterns = [
     path('templates/', views.ApplicationTemplateListCreateView.as_view(), name='template-list'),
     path('templates/<int:pk>/', views.ApplicationTemplateDetailView.as_view(), name='template-detail'),
     path('upload-resume/', views.ResumeUploadView.as_view(), name='upload-resume'),
+    path('resume/', views.ResumeParseView.as_view(), name='resume-parse'),
 ]
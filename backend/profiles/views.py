@@ -3,16 +3,24 @@ from rest_framework import generics, status
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.parsers import MultiPartParser, FormParser
-from .models import UserProfile, Experience, Education, ApplicationTemplate
+from hopeforjob.conditional import ConditionalGetMixin
+from . import resumes, uploads
+from .models import UserProfile, Experience, Education, ApplicationTemplate, ResumeParse
 from .serializers import (
     UserProfileSerializer, UserProfileUpdateSerializer,
     ExperienceSerializer, EducationSerializer, ApplicationTemplateSerializer
 )
 
 
-class ProfileDetailView(generics.RetrieveUpdateAPIView):
+class ProfileDetailView(ConditionalGetMixin, generics.RetrieveUpdateAPIView):
     """User profile detail view"""
     permission_classes = [IsAuthenticated]
+    conditional_fields = (
+        'updated_at', 'experiences__updated_at', 'education__updated_at', 'templates__updated_at'
+    )
+    
+    def get_conditional_queryset(self):
+        return UserProfile.objects.filter(user=self.request.user)
     
     def get_serializer_class(self):
         if self.request.method == 'GET':
@@ -91,19 +99,48 @@ class ApplicationTemplateDetailView(generics.RetrieveUpdateDestroyAPIView):
 
 
 class ResumeUploadView(generics.CreateAPIView):
-    """Resume upload view"""
+    """Resume upload view; the file is streamed to disk and parsed in the background"""
     permission_classes = [IsAuthenticated]
     parser_classes = [MultiPartParser, FormParser]
     
+    def initialize_request(self, request, *args, **kwargs):
+        # Before authentication, whose CSRF check may already parse the body
+        self.upload_handler = uploads.ResumeUploadHandler(request)
+        request.upload_handlers = [self.upload_handler]
+        return super().initialize_request(request, *args, **kwargs)
+    
     def post(self, request, *args, **kwargs):
-        profile, created = UserProfile.objects.get_or_create(user=request.user)
+        upload = request.FILES.get('resume')
+        if self.upload_handler.error:
+            return Response({'error': self.upload_handler.error}, status=self.upload_handler.status_code)
         
-        if 'resume' in request.FILES:
-            profile.resume = request.FILES['resume']
-            profile.save()
+        if upload is not None:
+            profile, created = UserProfile.objects.get_or_create(user=request.user)
+            uploads.save(profile, upload)
+            entry = resumes.submit(profile)
             return Response({
                 'message': 'Resume uploaded successfully',
-                'resume_url': profile.resume.url if profile.resume else None
+                'resume_url': profile.resume_file.url if profile.resume_file else None,
+                'parse_status': entry.status
             }, status=status.HTTP_201_CREATED)
         
         return Response({'error': 'No resume file provided'}, status=status.HTTP_400_BAD_REQUEST)
+
+
+class ResumeParseView(generics.RetrieveAPIView):
+    """Parse status of the current resume and the profile updates it suggests"""
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request, *args, **kwargs):
+        profile = UserProfile.objects.filter(user=request.user).first()
+        if profile is None or not profile.resume_hash:
+            return Response({'error': 'No resume uploaded'}, status=status.HTTP_404_NOT_FOUND)
+        
+        entry = ResumeParse.objects.filter(content_hash=profile.resume_hash).first()
+        parse_status = entry.status if entry is not None else 'pending'
+        return Response({
+            'resume_url': profile.resume_file.url if profile.resume_file else None,
+            'parse_status': parse_status,
+            'error': entry.error if entry is not None else '',
+            'suggestions': resumes.suggestions(profile, entry.data) if parse_status == 'parsed' else None
+        })